@@ -1,4 +1,3 @@
-# backend/app/__init__.py
 """
 Flaskアプリケーション本体を作成する。
 またapiオブジェクトをアプリケーションに登録する。
@@ -7,24 +6,119 @@ Flaskアプリケーション本体を作成する。
 
 # --- モジュールのインポート ---
 # 標準モジュールのインポート
+import os
 from flask import Flask
 
 # 依存モジュールのインポート
 from .routes import api
+from .services.recognition_session import DEFAULT_SESSION_TTL, RecognitionSessionStore
 
 
-def create_app():
+def _env_flag(name: str) -> bool:
+    """
+    環境変数を真偽値として読み取る。
+
+    Args:
+        name: 環境変数名。
+
+    Returns:
+        値が "1", "true", "yes", "on" のいずれか(大文字小文字を問わない)ならTrue。
+    """
+    return os.environ.get(name, '').strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def create_app(preload_model: bool | None = None, scoring_only: bool | None = None,
+               score_store: str | None = None, inference_server: str | None = None,
+               start_inference_server: bool | None = None):
     """
     Flaskアプリケーションのインスタンスを作成し、設定を行う。
 
+    Args:
+        preload_model: Trueなら、認識モデルの読み込みとウォームアップ推論を
+                       アプリケーションの作成時に行う。Noneの場合は環境変数
+                       MAHJONG_PRELOAD_MODEL に従う。
+        scoring_only: Trueなら、画像認識を無効にした点数計算専用モードで動作する。
+                      このモードのワーカーはtorchなどのML関連ライブラリを一切
+                      読み込まない。Noneの場合は環境変数 MAHJONG_SCORING_ONLY に従う。
+        score_store: 点数計算の結果を保存するSQLiteファイルのパス。指定すると、
+                     同じ手牌と状況の結果をワーカー間・再起動後も使い回す。
+                     Noneの場合は環境変数 MAHJONG_SCORE_STORE に従い、空なら保存しない。
+        inference_server: 推論サーバー(ml/inference_server.py)のアドレス(UNIXドメインソケットの
+                          パス、または "ホスト:ポート")。指定すると、このプロセスではモデルを読み込まず、
+                          画像を共有メモリ経由でサーバーに渡して推論する。Noneの場合は環境変数
+                          MAHJONG_INFERENCE_SERVER に従い、空ならこのプロセスで推論する。
+        start_inference_server: Trueなら、推論サーバーを別プロセスとして起動する。アドレスが
+                                未指定なら既定のソケットを使う。Noneの場合は環境変数
+                                MAHJONG_START_INFERENCE_SERVER に従う。
+
     Returns:
         Flaskアプリケーションのインスタンス
     """
-    
+
     # Flaskアプリケーションのインスタンスを作成
     app = Flask(__name__)
 
+    # --- 設定 ---
+    if preload_model is None:
+        preload_model = _env_flag('MAHJONG_PRELOAD_MODEL')
+    if scoring_only is None:
+        scoring_only = _env_flag('MAHJONG_SCORING_ONLY')
+    if inference_server is None:
+        inference_server = os.environ.get('MAHJONG_INFERENCE_SERVER', '').strip() or None
+    if start_inference_server is None:
+        start_inference_server = _env_flag('MAHJONG_START_INFERENCE_SERVER')
+    if scoring_only:
+        inference_server, start_inference_server = None, False
+    if start_inference_server and inference_server is None:
+        from ml.inference_server import DEFAULT_ADDRESS
+        inference_server = DEFAULT_ADDRESS
+    # 点数計算専用モードではモデルを使わないため、事前読み込みも行わない。
+    # 推論サーバーを使う場合は、モデルはサーバーが読み込む。
+    app.config['SCORING_ONLY'] = scoring_only
+    app.config['PRELOAD_MODEL'] = preload_model and not scoring_only and inference_server is None
+    app.config['INFERENCE_SERVER'] = inference_server
+    if score_store is None:
+        score_store = os.environ.get('MAHJONG_SCORE_STORE', '').strip()
+    app.config['SCORE_STORE'] = None
+
+    # --- 点数計算結果の永続ストア ---
+    # WALモードのため、同じファイルを複数のワーカーで共有できる。
+    if score_store:
+        from .mahjong_logic.result_store import ScoreStore
+        from .mahjong_logic.scorer import MahjongScorer
+        store = ScoreStore(score_store)
+        MahjongScorer.result_store = store
+        app.config['SCORE_STORE'] = store
+
+    # --- 認識セッション ---
+    # /api/recognize の認識結果を保持する秒数。環境変数 MAHJONG_SESSION_TTL で変更できる。
+    session_ttl = float(os.environ.get('MAHJONG_SESSION_TTL', '') or DEFAULT_SESSION_TTL)
+    app.extensions['recognition_sessions'] = RecognitionSessionStore(ttl=session_ttl)
+
     # --- Blueprintの登録 ---
     app.register_blueprint(api, url_prefix='/api')
 
-    return app
\ No newline at end of file
+    # --- 推論サーバー ---
+    # モデルを1つだけ読み込んだ推論専用のプロセスを全ワーカーで共有する。gunicornなどで
+    # 複数のワーカーを起動する場合は、create_app を1度だけ呼ぶ(--preload)か、
+    # `python -m ml.inference_server` で別に起動したサーバーのアドレスを指定する。
+    from .services import recognition_service
+    if start_inference_server:
+        from ml.inference_server import start_server_process
+        threads = os.environ.get('MAHJONG_INFERENCE_THREADS', '').strip()
+        app.extensions['inference_server_process'] = start_server_process(
+            recognition_service.resolve_model_path(), inference_server,
+            max_batch_size=recognition_service.INFERENCE_MAX_BATCH,
+            max_wait=recognition_service.INFERENCE_MAX_WAIT_MS / 1000,
+            torch_threads=int(threads) if threads else None,
+        )
+    recognition_service.configure_inference_server(inference_server)
+
+    # --- 認識モデルの事前読み込み ---
+    # 最初のアップロードでモデル読み込みと初回推論のコストを払わないよう、
+    # ワーカーがリクエストを受け付ける前に済ませておく。
+    if app.config['PRELOAD_MODEL']:
+        from .services.recognition_service import preload_model as _preload
+        _preload()
+
+    return app
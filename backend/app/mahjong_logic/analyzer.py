@@ -1,5 +1,12 @@
+import functools
+import itertools
+
 from .helpers import Tile, Call
-import collections
+from .encoding import CAN_START_SHUNTSU, NUM_TILE_KINDS, NUMBER_OF, TILE_NAMES, YAOCHU_IDS, EncodedHand
+from .cache import LRUCache
+from .canonical import FROM_CANONICAL, IDENTITY, TO_CANONICAL, canonical_counts
+from .features import build_features
+from .tables import GROUP_PAIR, SUIT_TABLE, group_tiles, suit_key
 
 # 牌の定義
 # 萬子: 1m-9m, 筒子: 1p-9p, 索子: 1s-9s, 字牌: 1z-7z (東南西北白發中)
@@ -14,9 +21,192 @@ ALL_TILES = sum(TILES.values(), [])
 YAOCHUHAI = {"1m", "9m", "1p", "9p", "1s", "9s", "1z", "2z", "3z", "4z", "5z", "6z", "7z"}
 SANGENPAI = {"5z", "6z", "7z"}
 
+# 面子分解のキャッシュ. 同じ手牌をリーチ・ツモなどの条件だけ変えて
+# 再計算する場合に、分解の探索を省略する.
+# 色を入れ替えただけの手牌で共有するため、正規化した枚数配列 (canonical.py) をキーとする.
+# 値は色の並べ替え(SuitOrder)ごとの分解の辞書で、IDENTITY の分解は正規の牌IDで表したものになる.
+# 最初は分解を求めた手牌の並べ替えだけを持ち、他の並べ替えは最初に必要になったときに付け替えて追加する.
+DECOMPOSITION_CACHE_SIZE = 4096
+DECOMPOSITION_CACHE = LRUCache(DECOMPOSITION_CACHE_SIZE)
+
+def _mentsu_order(mentsu: tuple[int, ...]) -> tuple[int, bool, int]:
+    """面子の並び順. 牌IDの順で、同じ牌から始まる場合は槓子・刻子・順子の順."""
+    return (mentsu[0], mentsu[0] != mentsu[1], -len(mentsu))
+
+
+def _decomposition_order(decomposition: tuple[int, tuple[tuple[int, ...], ...]]) -> tuple:
+    """分解の並び順. 雀頭の牌IDの順で、同じ雀頭なら面子の並び順で比較する."""
+    janto, combo = decomposition
+    return (janto, [_mentsu_order(m) for m in combo])
+
+
+def suit_decompositions(counts: list[int], base: int) -> list[tuple[int, tuple[tuple[int, ...], ...]]]:
+    """
+    数牌1色分を分解テーブルで分解する関数.
+
+    Args:
+        counts (list[int]): 門前部分の枚数配列 (長さ34).
+        base (int)        : 色の先頭の牌ID (萬子0, 筒子9, 索子18).
+
+    Returns:
+        list: (雀頭の牌ID または -1, 面子(牌IDのタプル)のタプル) のリスト.
+              分解できない場合は空のリスト.
+    """
+    suit_counts = counts[base:base + 9]
+    if not any(suit_counts):
+        return [(-1, ())]
+    candidates = []
+    for groups in SUIT_TABLE.lookup(suit_key(suit_counts)):
+        janto = -1
+        mentsu = []
+        for group in groups:
+            if group >> 4 == GROUP_PAIR:
+                janto = base + (group & 0x0f)
+            else:
+                mentsu.append(group_tiles(group, base))
+        candidates.append((janto, tuple(mentsu)))
+    return candidates
+
+
+def honor_decompositions(counts: list[int]) -> list[tuple[int, tuple[tuple[int, ...], ...]]]:
+    """
+    字牌を分解する関数. 字牌は順子にならないため、枚数だけで分解が決まる.
+
+    Args:
+        counts (list[int]): 門前部分の枚数配列 (長さ34).
+
+    Returns:
+        list: suit_decompositionsと同じ形式.
+    """
+    honor_janto = -1
+    honor_mentsu = []
+    for tile in range(27, NUM_TILE_KINDS):
+        count = counts[tile]
+        if count == 0:
+            continue
+        if count == 1 or (count == 2 and honor_janto != -1):
+            return []
+        if count == 2:
+            honor_janto = tile
+        else:
+            honor_mentsu.append((tile,) * count)
+    return [(honor_janto, tuple(honor_mentsu))]
+
+
+def iter_join_decompositions(parts: list[list]):
+    """
+    色ごとの分解を組み合わせ、雀頭がちょうど1つになるものを順に返すジェネレータ.
+    雀頭の牌IDごとに組み合わせを作るため、全ての組み合わせを一度に持たない.
+
+    Args:
+        parts (list[list]): 萬子・筒子・索子・字牌の順に並べた、各色の分解のリスト.
+
+    Yields:
+        tuple: (雀頭の牌ID, 門前の面子(牌IDのタプル)のタプル). join_decompositionsと同じ順.
+    """
+    jantos = sorted({janto for part in parts for janto, _ in part if janto != -1})
+    for janto in jantos:
+        # 雀頭を含む色はその雀頭の分解だけ、他の色は雀頭のない分解だけを組み合わせる.
+        selected = [[d for d in part if d[0] == janto] or [d for d in part if d[0] == -1] for part in parts]
+        results = [(janto, sum((mentsu for _, mentsu in selection), ()))
+                   for selection in itertools.product(*selected)
+                   if sum(1 for j, _ in selection if j != -1) == 1]
+        yield from sorted(results, key=_decomposition_order)
+
+
+def permute_decompositions(decompositions, table: tuple[int, ...]) -> tuple:
+    """
+    牌IDの対応表で分解の牌IDを付け替え、面子と分解を並び順に並べ直す関数.
+
+    Args:
+        decompositions: (雀頭の牌ID, 門前の面子(牌IDのタプル)のタプル) の列.
+        table (tuple[int, ...]): 牌IDの対応表 (canonical.TO_CANONICAL / FROM_CANONICAL).
+
+    Returns:
+        tuple: 付け替えた分解のタプル. 付け替える前の分解と同じく _decomposition_order の順.
+    """
+    results = []
+    for janto, combo in decompositions:
+        combo = tuple(sorted((tuple(table[i] for i in mentsu) for mentsu in combo), key=_mentsu_order))
+        results.append((table[janto], combo))
+    results.sort(key=_decomposition_order)
+    return tuple(results)
+
+
+def join_decompositions(parts: list[list]) -> list[tuple[int, tuple[tuple[int, ...], ...]]]:
+    """
+    色ごとの分解を組み合わせ、雀頭がちょうど1つになるものだけを残す関数.
+
+    Args:
+        parts (list[list]): 萬子・筒子・索子・字牌の順に並べた、各色の分解のリスト.
+
+    Returns:
+        list: (雀頭の牌ID, 門前の面子(牌IDのタプル)のタプル) のリスト.
+    """
+    return list(iter_join_decompositions(parts))
+
+
+def machi_type(mentsu: tuple[int, ...], agari_id: int) -> str:
+    """
+    アガリ牌を含む面子から待ちの形を判定する関数.
+
+    Args:
+        mentsu (tuple[int, ...]): アガリ牌を含む1つの面子(牌IDのタプル).
+        agari_id (int)          : アガリ牌の牌ID.
+
+    Returns:
+        str: 待ちの形 ("ryanmen", "penchan", "kanchan", "shanpon").
+    """
+    # 刻子・槓子はシャンポン待ち.
+    if mentsu[0] == mentsu[1]:
+        return "shanpon"
+    # 嵌張待ち(順子の真ん中待ち)の判定.
+    if mentsu[1] == agari_id:
+        return "kanchan"
+    # 辺張待ち(1,2を持っているときの3,または8,9を持っているときの7待ち)の判定.
+    first_number = NUMBER_OF[mentsu[0]]
+    if (first_number == 1 and agari_id == mentsu[2]) or (first_number == 7 and agari_id == mentsu[0]):
+        return "penchan"
+    # 両面待ち(順子の両端待ち)の判定.
+    return "ryanmen"
+
+
+def _build_machi_table() -> dict[tuple[tuple[int, ...], int], str]:
+    """アガリ牌を含みうる全ての面子について、(面子, アガリ牌の牌ID) から待ちの形への表を作る."""
+    table = {}
+    for tile in range(NUM_TILE_KINDS):
+        for mentsu in ((tile,) * 3, (tile,) * 4):
+            table[mentsu, tile] = machi_type(mentsu, tile)
+        if CAN_START_SHUNTSU[tile]:
+            mentsu = (tile, tile + 1, tile + 2)
+            for agari_id in mentsu:
+                table[mentsu, agari_id] = machi_type(mentsu, agari_id)
+    return table
+
+
+# (面子, アガリ牌の牌ID) から待ちの形への表. アガリ牌を含まない組み合わせは持たないため、
+# 面子分解を1回走査するだけで、アガリ牌を含む面子と待ちの形が同時に求まる.
+MACHI_TABLE = _build_machi_table()
+
+
+@functools.lru_cache(maxsize=1024)
+def mentsu_names(mentsu: tuple[int, ...]) -> tuple[str, ...]:
+    """
+    面子の牌の文字列. 赤ドラは面子の形に関わらないため、通常の5として表す.
+
+    Args:
+        mentsu (tuple[int, ...]): 面子(牌IDのタプル).
+
+    Returns:
+        tuple[str, ...]: 牌の文字列のタプル.
+    """
+    return tuple(TILE_NAMES[i] for i in mentsu)
+
+
 class HandAnalysis:
     """手牌の解析（面子分解、待ちの形特定）を行うクラス"""
-    def __init__(self, hand: list[str], called_mentsu: list[Call], agari_hai: str):
+    def __init__(self, hand: list[str], called_mentsu: list[Call], agari_hai: str,
+                 encoded_hand: EncodedHand | None = None, decompositions: list | None = None):
         """
         手牌の解析を初期化する.
         
@@ -24,173 +214,218 @@ class HandAnalysis:
             hand (list[str])  : 手牌のリスト (例: ["1m", "2m", "3m", "4m", "5m", "6m", "7m"])
             called_mentsu (list[Call]): 鳴きの情報 (例: [Call("pon", [1m,2m,3m]), Call("chi", [4m,5m,6m]) )
             agari_hai (str)   : アガリ牌の文字列 (例: "5m")
+            encoded_hand (EncodedHand | None): エンコード済みの手牌.
+                                               省略した場合は hand から作成する.
+            decompositions (list | None): 事前に求めた門前部分の面子分解 (_decomposeと同じ形式).
+                                          省略した場合は分解を探索する(キャッシュを含む).
         """
         self.hand = sorted(hand, key=Tile.sort_key)
         self.called_mentsu = called_mentsu
         self.agari_hai = agari_hai
-        self.agari_combinations = self._analyze()
+        if encoded_hand is None:
+            encoded_hand = EncodedHand(hand, [m.tiles for m in called_mentsu], agari_hai)
+        self.encoded_hand = encoded_hand
+        self._decompositions = decompositions
+
+    @functools.cached_property
+    def agari_combinations(self) -> list[dict]:
+        """全ての和了パターンのリスト. 最初に参照したときに iter_combinations から求める."""
+        return list(self.iter_combinations())
     
-    def _find_combinations(self, hand_counter: collections.Counter) -> list[list[str]]:
+    def _find_combinations(self, counts: list[int], start: int = 0) -> list[list[tuple[int, ...]]]:
         """
-        手牌のカウンターから面子の組み合わせを再帰的に探す関数.
+        手牌の枚数配列から面子の組み合わせを再帰的に探す関数.
+
+        枚数配列はその場で増減させ、探索後に元に戻す(コピーしない).
         
         Args:
-            hand_counter (collections.Counter): 手牌のカウンター.
+            counts (list[int]): 手牌の枚数配列 (長さ34).
+            start (int)       : 探索を開始する牌のID. これより前の牌は0枚である.
         
         Returns:
-            list[list[str]]: 面子の組み合わせのリスト.
+            list[list[tuple[int, ...]]]: 面子(牌IDのタプル)の組み合わせのリスト.
         """
+        # 最初の牌を取り出す.
+        tile = start
+        while tile < NUM_TILE_KINDS and counts[tile] == 0:
+            tile += 1
         # 手牌が空なら空の組み合わせを返す.
-        if not hand_counter:
+        if tile == NUM_TILE_KINDS:
             return [[]]
-        
-        # 最初の牌を取り出す.
-        tile = next(iter(hand_counter))
-        count = hand_counter[tile]
+        count = counts[tile]
         results = []
         
         # 槓子として取り出す.
         if count >= 4:
-            hand_counter[tile] -= 4
-            if not hand_counter[tile]:
-                del hand_counter[tile]
-            sub_results = self._find_combinations(hand_counter.copy())
-            for res in sub_results:
-                results.append([[tile, tile, tile, tile]] + res)
-            hand_counter[tile] += 4
+            counts[tile] -= 4
+            for res in self._find_combinations(counts, tile):
+                results.append([(tile, tile, tile, tile)] + res)
+            counts[tile] += 4
             
         # 刻子として取り出す.
         if count >= 3:
-            hand_counter[tile] -= 3
-            if not hand_counter[tile]:
-                del hand_counter[tile]
-            sub_results = self._find_combinations(hand_counter.copy())
-            # 刻子の組み合わせを結果に追加.
-            for res in sub_results:
-                results.append([[tile, tile, tile]] + res)
-            hand_counter[tile] += 3
+            counts[tile] -= 3
+            for res in self._find_combinations(counts, tile):
+                results.append([(tile, tile, tile)] + res)
+            counts[tile] += 3
         
         # 順子として取り出す.
-        # 牌の種類を取得 (m, p, s, z)
-        suit = tile[-1]  
-        if suit != 'z' and count > 0:
-            normal_tile = Tile.to_normal(tile)
-            num = int(normal_tile[:-1])
-            t1, t2, t3 = f"{num}{suit}", f"{num+1}{suit}", f"{num+2}{suit}"
-            if t2 in hand_counter and t3 in hand_counter:
-                hand_counter[t1] -= 1
-                hand_counter[t2] -= 1
-                hand_counter[t3] -= 1
-                for t in [t1, t2, t3]:
-                    if not hand_counter[t]:
-                        del hand_counter[t]
-                sub_results = self._find_combinations(hand_counter.copy())
-                for res in sub_results:
-                    results.append([[t1, t2, t3]] + res)
-                for t in [t1, t2, t3]:
-                    hand_counter[t] = hand_counter.get(t, 0) + 1
+        if CAN_START_SHUNTSU[tile] and counts[tile + 1] and counts[tile + 2]:
+            counts[tile] -= 1
+            counts[tile + 1] -= 1
+            counts[tile + 2] -= 1
+            for res in self._find_combinations(counts, tile):
+                results.append([(tile, tile + 1, tile + 2)] + res)
+            counts[tile] += 1
+            counts[tile + 1] += 1
+            counts[tile + 2] += 1
         return results
     
-    def _analyze(self) -> list[dict]:
+    def iter_combinations(self):
         """
-        手牌の解析を行い、面子分解と待ちの形を特定する関数.
+        手牌の解析を行い、和了パターンを1つずつ返すジェネレータ.
+        面子分解は必要になった分だけ求めるため、途中で止めた場合は残りの分解を探索しない.
 
-        Returns:
-            list[dict]: 解析結果のリスト.各辞書は面子の情報を含む.
+        Yields:
+            dict: 和了パターン. 順番は agari_combinations と同じ.
         """
-        agari_combination = []
-        normalization_hand = [Tile.to_normal(t) for t in self.hand]
+        encoded = self.encoded_hand
+        counts = encoded.counts
+        # 同じ牌が5枚以上ある場合は、和了形不成立.
+        if any(c > 4 for c in counts):
+            return
         # 国士無双と七対子のチェック.
-        counts = collections.Counter(normalization_hand)
-        # 同じ牌が5枚以上ある場合は、和了形不成立として空のリストを返す
-        if any(c > 4 for c in counts.values()):
-            return []
         if len(self.called_mentsu) == 0 and len(self.hand) == 14:
             # 国士無双の判定.
-            if set(counts.keys()) == YAOCHUHAI:
-                return [{"type": "kokushi", "janto": self.agari_hai, "mentsu": self.hand}]
+            if all(counts[i] for i in YAOCHU_IDS) and sum(counts[i] for i in YAOCHU_IDS) == 14:
+                yield self._with_features({"type": "kokushi", "janto": self.agari_hai, "mentsu": self.hand})
+                return
             # 七対子の判定.
-            if len(counts) == 7 and all(c == 2 for c in counts.values()):
+            if sum(1 for c in counts if c) == 7 and all(c in (0, 2) for c in counts):
                 machi_type = "tanki" # 七対子は単騎待ち.
-                agari_combination.append({"type": "chitoitsu", "janto": None, "mentsu": self.hand, "machi": machi_type})
-        
+                yield self._with_features(
+                    {"type": "chitoitsu", "janto": None, "mentsu": self.hand, "machi": machi_type}
+                )
+
         # 4面子1雀頭の解析.
-        hand_counter = collections.Counter(normalization_hand)
-        open_mentsu = []
-        for m in self.called_mentsu:
-            open_mentsu.append(m.tiles)
-            for tile in m.tiles:
-                hand_counter[tile] -= 1
-        # Counterから枚数が1以上の牌だけをリストに戻す
-        closed_hand = list(hand_counter.elements())
-        results_normal = []
-        
+        # アガリ牌が門前部分にない場合は、どの分解でもアガリ牌を含む面子・雀頭がない.
+        agari_id = encoded.agari_id
+        if agari_id < 0 or encoded.closed_counts[agari_id] == 0:
+            return
+        open_mentsu = [m.tiles for m in self.called_mentsu]
+
+        # 面子分解はアガリ牌に依存しないため、キャッシュした結果を使う.
+        # アガリ牌に依存する待ちの判定だけを毎回行う.
+        decompositions = self._decompositions if self._decompositions is not None else self._iter_decompositions()
+        for janto, combo in decompositions:
+            # アガリ牌が雀頭なら単騎待ち.
+            machi_list = ["tanki"] if agari_id == janto else []
+            # アガリ牌を含む面子ごとに待ちを表から引く. 同じ待ちの形は1つにまとめる.
+            for mentsu in combo:
+                machi = MACHI_TABLE.get((mentsu, agari_id))
+                if machi is not None and machi not in machi_list:
+                    machi_list.append(machi)
+            # 面子の文字列と特徴量は待ちの形によらないため、同じ分解のパターンで共有する.
+            mentsu_list = None
+            features = None
+            for machi in machi_list:
+                if mentsu_list is None:
+                    mentsu_list = self._to_tile_strings(combo) + open_mentsu
+                pattern = {
+                    "type": "normal",
+                    "janto": TILE_NAMES[janto],
+                    "mentsu": mentsu_list,
+                    "machi": machi
+                }
+                if features is None:
+                    features = build_features(pattern, self.called_mentsu, self.agari_hai)
+                pattern["features"] = features
+                yield pattern
+
+    def _with_features(self, pattern: dict) -> dict:
+        """
+        和了パターンに特徴量(features.HandFeatures)を付ける関数.
+        役判定と符計算は、この特徴量を共通して使う.
+
+        Args:
+            pattern (dict): 和了パターン.
+
+        Returns:
+            dict: "features" を追加した和了パターン.
+        """
+        pattern["features"] = build_features(pattern, self.called_mentsu, self.agari_hai)
+        return pattern
+
+    def _iter_decompositions(self):
+        """
+        門前部分を雀頭と面子に分解したパターンを順に返すジェネレータ.
+        全てのパターンを返し終えた場合は、正規化した門前部分の枚数配列をキーとしてキャッシュする.
+
+        Yields:
+            tuple: (雀頭の牌ID, 門前の面子(牌IDのタプル)のタプル).
+        """
+        closed_counts = self.encoded_hand.closed_counts
+        key, order = canonical_counts(closed_counts)
+        views = DECOMPOSITION_CACHE.get(key)
+        if views is not None:
+            decompositions = views.get(order)
+            if decompositions is None:
+                canonical = views.get(IDENTITY)
+                if canonical is None:
+                    stored_order, stored = next(iter(views.items()))
+                    canonical = views[IDENTITY] = permute_decompositions(stored, TO_CANONICAL[stored_order])
+                decompositions = views[order] = permute_decompositions(canonical, FROM_CANONICAL[order])
+            yield from decompositions
+            return
+
+        if SUIT_TABLE is not None and all(sum(closed_counts[b:b + 9]) <= 14 for b in (0, 9, 18)):
+            parts = [suit_decompositions(closed_counts, base) for base in (0, 9, 18)]
+            parts.append(honor_decompositions(closed_counts))
+            results = iter_join_decompositions(parts)
+        else:
+            results = self._decompose_recursive(closed_counts)
+        found = []
+        for decomposition in results:
+            found.append(decomposition)
+            yield decomposition
+        DECOMPOSITION_CACHE.put(key, {order: tuple(found)})
+
+    def _decompose_recursive(self, closed_counts: list[int]) -> list[tuple[int, tuple[tuple[int, ...], ...]]]:
+        """
+        雀頭を決めてから再帰探索で面子に分解する関数.
+        分解テーブルが使えない場合と、テーブルの検証に用いる.
+
+        Args:
+            closed_counts (list[int]): 門前部分の枚数配列 (長さ34).
+
+        Returns:
+            list: (雀頭の牌ID, 門前の面子(牌IDのタプル)のタプル) のリスト. 同じ分解は1つにまとめる.
+        """
+        counts = closed_counts[:]
+        results = {}
         # 雀頭の候補を探す.
-        closed_hand_counter = collections.Counter(closed_hand)
-        unique_tiles = sorted(list(closed_hand_counter), key=Tile.sort_key)
-        for janto_candidate in unique_tiles:
-            normal_janto_candidate = Tile.to_normal(janto_candidate)
+        for janto in range(NUM_TILE_KINDS):
             # 雀頭候補が手牌に2枚以上ある場合のみ処理.
-            if closed_hand.count(normal_janto_candidate) >= 2:
-                # 雀頭を除いた手牌から面子の組み合わせを探す.
-                temp_hand = closed_hand[:]
-                temp_hand.remove(normal_janto_candidate)
-                temp_hand.remove(normal_janto_candidate)
-                combinations = self._find_combinations(collections.Counter(temp_hand))
-                # 各面子の組み合わせに対して待ちの形を判定.
-                for combo in combinations:
-                    # 待ちの形を判定.
-                    agari_mentsu = []
-                    is_agari_in_janto = self.agari_hai == normal_janto_candidate
-                    # アガリ牌が手牌に含まれているか確認.
-                    for m in combo:
-                        if self.agari_hai in m:
-                            agari_mentsu.append(m)
-                    # アガリ牌が面子に含まれていない場合は雀頭待ちかどうかを確認.
-                    if not agari_mentsu and not is_agari_in_janto:
-                        continue
-                    for i in range(len(combo)):
-                        for j in range(len(combo[i])):
-                            if not combo[i][j] in self.hand:
-                                combo[i][j] = combo[i][j] + 'r'  # 赤ドラの牌を元に戻す.
-                    machi = self._get_machi_type(agari_mentsu[0] if agari_mentsu else [], normal_janto_candidate, is_agari_in_janto)                    
-                    results_normal.append({
-                        "type": "normal",
-                        "janto": normal_janto_candidate,
-                        "mentsu": combo + open_mentsu,
-                        "machi": machi
-                    })
-        agari_combination.extend(results_normal)
-        return agari_combination
-
-    def _get_machi_type(self, mentsu: list[str], janto: list[str], is_agari_in_janto: bool) -> str:
+            if counts[janto] < 2:
+                continue
+            # 雀頭を除いた手牌から面子の組み合わせを探す.
+            counts[janto] -= 2
+            for combo in self._find_combinations(counts):
+                # 同じ牌が4枚ある場合などに、面子の順番だけが違う分解が重複して見つかる.
+                combo = tuple(sorted(combo, key=_mentsu_order))
+                results[(janto, combo)] = None
+            counts[janto] += 2
+        return sorted(results, key=_decomposition_order)
+
+    def _to_tile_strings(self, combo: tuple[tuple[int, ...], ...]) -> list[list[str]]:
         """
-        待ちの形を判定する関数.
+        牌IDで表された門前の面子を、文字列のリストに戻す関数.
+        赤ドラは面子に戻さず、枚数は encoded_hand.closed_red_counts で数える.
 
         Args:
-            mentsu (list[str]): アガリ牌を含む1つの面子.
-            janto (list[str]): 雀頭の牌.
-            is_agari_in_janto (bool): アガリ牌が雀頭に含まれているかどうか.
+            combo (tuple[tuple[int, ...], ...]): 牌IDで表された面子のタプル.
 
         Returns:
-            str: 待ちの形 ("tanki", "ryanmen", "penchan", "kanchan", "shanpon").
+            list[list[str]]: 牌の文字列で表された面子のリスト.
         """
-        # 単騎待ちの判定.
-        if is_agari_in_janto:
-            return "tanki"
-        # 面子が順子か刻子かを判定.
-        is_shuntsu = len(set(mentsu)) > 1
-        agari_normal = Tile.to_normal(self.agari_hai)
-        # 面子が順子の場合、待ちの形を判定.
-        if is_shuntsu:
-            sorted_mentsu = sorted([Tile.to_normal(t) for t in mentsu], key=Tile.sort_key)
-            # 嵌張待ち(順子の真ん中待ち)の判定.
-            if sorted_mentsu[1] == agari_normal: return "kanchan"
-            # 辺張待ち(1,2を持っているときの3,または8,9を持っているときの7待ち)の判定.
-            if (int(sorted_mentsu[0][:-1]) == 1 and agari_normal == sorted_mentsu[2]) or (int(sorted_mentsu[0][:-1]) == 7 and agari_normal == sorted_mentsu[0]):
-                return "penchan"
-            # 両面待ち(順子の両端待ち)の判定.
-            return "ryanmen"
-        else: # 刻子
-            return "shanpon"
-        
+        return [list(mentsu_names(mentsu)) for mentsu in combo]
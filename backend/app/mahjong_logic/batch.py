@@ -0,0 +1,556 @@
+import functools
+import itertools
+from typing import NamedTuple
+
+import numpy as np
+
+from .analyzer import suit_decompositions
+from .dora import dora_vector_of
+from .encoding import NUM_TILE_KINDS, RED_FIVE_NAMES, TILE_IDS, TILE_NAMES
+from .features import GREEN_TILES, TERMINALS, YAOCHUHAI
+from .fu import YAKUMAN_LIST
+from .helpers import Call
+from .tables import SUIT_TABLE
+from .yaku import compile_yaku_plan
+
+# 大量の手牌の一括点数計算
+# 手牌を枚数の行列(手牌数×34)にまとめ、役と符の判定を列ごとのNumPy演算で行う.
+# 数牌の面子分解は、色ごとの枚数配列の種類ごとに一度だけ分解テーブルを引いて使い回す.
+#
+# 一括計算(高速経路)で扱うのは、和了パターンが通常形の1つだけに決まる手牌に限る.
+# 以下の手牌は MahjongScorer.calculate (スカラー経路) で計算する.
+#   - 牌の文字列が不正な手牌、同じ牌が5枚以上ある手牌、和了形でない手牌.
+#   - 面子分解が複数ある手牌、アガリ牌の待ちの形が複数ある手牌、七対子の形の手牌.
+#   - 役満の可能性がある手牌 (役満の前提条件を満たすものを全て含める).
+#   - 門前部分に4枚の面子がある手牌、面子の形でない鳴き面子がある手牌.
+#   - 一括計算が判定方法を知らない役が役の登録表に含まれる場合.
+# 高速経路の結果はスカラー経路と完全に一致する (test/test_batch.py).
+
+# 牌の文字列 -> コード. 赤ドラは牌ID + 34.
+TILE_CODES = {name: i for i, name in enumerate(TILE_NAMES)}
+TILE_CODES.update({name: TILE_IDS[name] + NUM_TILE_KINDS for name in RED_FIVE_NAMES})
+# 赤ドラを含まない牌の文字列 -> ID (自風・場風などの文字列の比較に用いる).
+PLAIN_IDS = {name: i for i, name in enumerate(TILE_NAMES)}
+
+
+def _id_mask(names) -> np.ndarray:
+    """牌の文字列の集合を、長さ34の真偽値の配列に変換する."""
+    mask = np.zeros(NUM_TILE_KINDS, dtype=bool)
+    for name in names:
+        if name in PLAIN_IDS:
+            mask[PLAIN_IDS[name]] = True
+    return mask
+
+
+IS_YAOCHU = _id_mask(YAOCHUHAI)
+IS_TERMINAL = _id_mask(TERMINALS)
+IS_GREEN = _id_mask(GREEN_TILES)
+# 5進数のキーを求めるための重み (tables.suit_key と同じ).
+SUIT_KEY_WEIGHTS = 5 ** np.arange(9, dtype=np.int64)
+# 九蓮宝燈の基本形 (1112345678999) の色内の位置ごとの枚数.
+CHUREN_MIN_COUNTS = np.array([3, 1, 1, 1, 1, 1, 1, 1, 3])
+# 順子の種類の数 (開始位置7).
+SHUNTSU_KINDS = 7
+# 一括計算できるゲームの状況の真偽値のキー.
+STATE_FLAGS = ('is_menzen', 'is_tsumo', 'is_riichi', 'is_ippatsu', 'is_double_riichi',
+               'is_chankan', 'is_rinshan', 'is_haitei', 'is_houtei', 'is_tenhou', 'is_chiihou')
+
+
+class SuitSummary(NamedTuple):
+    """数牌1色分の分解の要約 (分解が1つに決まる場合)."""
+    ok: bool                     # 一括計算できるか (分解が1つで、4枚の面子がない).
+    pair: int                    # 雀頭の色内の位置 (雀頭がない場合は-1).
+    kotsu: int                   # 刻子の位置のビット.
+    shuntsu: int                 # 順子の開始位置ごとの個数 (3ビットずつ).
+    all_yaochu: bool             # 全ての面子に么九牌が含まれるか.
+
+
+_UNSUPPORTED_SUIT = SuitSummary(False, -1, 0, 0, False)
+
+
+@functools.lru_cache(maxsize=65536)
+def summarize_suit(key: int) -> SuitSummary:
+    """
+    数牌1色分の枚数配列を分解テーブルで分解し、要約を求める関数.
+    赤ドラは analyzer.HandAnalysis._to_tile_strings と同じく、面子の形に関わらない.
+
+    Args:
+        key (int): 1色分の枚数配列のキー (tables.suit_key).
+
+    Returns:
+        SuitSummary: 分解の要約. 分解が1つに決まらない場合などは ok が False.
+    """
+    counts = [(key // 5 ** i) % 5 for i in range(9)]
+    decompositions = suit_decompositions(counts, 0)
+    if len(decompositions) != 1:
+        return _UNSUPPORTED_SUIT
+    pair, mentsu_list = decompositions[0]
+    kotsu = 0
+    shuntsu = 0
+    all_yaochu = True
+    for mentsu in mentsu_list:
+        if len(mentsu) == 4:
+            return _UNSUPPORTED_SUIT
+        if mentsu[0] == mentsu[1]:
+            kotsu |= 1 << mentsu[0]
+            all_yaochu = all_yaochu and mentsu[0] in (0, 8)
+        else:
+            shuntsu += 1 << mentsu[0] * 3
+            all_yaochu = all_yaochu and mentsu[0] in (0, 6)
+    return SuitSummary(True, pair, kotsu, shuntsu, all_yaochu)
+
+
+# 鳴き面子の種類.
+MELD_SHUNTSU = 0
+MELD_KOTSU = 1
+
+
+class CalledSummary(NamedTuple):
+    """鳴き面子1つの要約."""
+    ok: bool            # 一括計算できる形か.
+    tiles: tuple        # 牌IDのタプル.
+    reds: int           # 赤ドラの枚数.
+    kind: int           # MELD_SHUNTSU, MELD_KOTSU.
+    first: int          # 先頭の牌ID.
+    is_kan: bool        # 4枚の面子か.
+    yaochu: bool        # 么九牌を含むか.
+    fu: int             # 面子の符.
+
+
+@functools.lru_cache(maxsize=4096)
+def summarize_called(tiles: tuple) -> CalledSummary:
+    """
+    鳴き面子の牌の文字列のタプルから要約を求める関数.
+    features.build_features と同じく、赤ドラを通常の牌として牌の種類の数で順子・刻子を分ける.
+
+    Args:
+        tiles (tuple): 鳴き面子の牌の文字列 (Call.tiles).
+
+    Returns:
+        CalledSummary: 鳴き面子の要約.
+    """
+    codes = [TILE_CODES.get(t, -1) if isinstance(t, str) else -1 for t in tiles]
+    ids = tuple(c % NUM_TILE_KINDS for c in codes)
+    if len(tiles) not in (3, 4) or -1 in codes:
+        return CalledSummary(False, ids, 0, -1, -1, False, False, 0)
+    reds = sum(1 for c in codes if c >= NUM_TILE_KINDS)
+    kinds = len(set(ids))
+    first = ids[0]
+    yaochu = any(t in YAOCHUHAI for t in tiles)
+    is_kan = len(tiles) == 4
+    if kinds == 3 and not is_kan:
+        # 順子は同じ色の連続した3枚に限る (Call.tilesは牌の順に並んでいる).
+        if first >= 27 or first % 9 > 6 or ids != (first, first + 1, first + 2):
+            return CalledSummary(False, ids, 0, -1, -1, False, False, 0)
+        return CalledSummary(True, ids, reds, MELD_SHUNTSU, first, False, yaochu, 0)
+    if kinds != 1:
+        return CalledSummary(False, ids, 0, -1, -1, False, False, 0)
+    # 鳴いた刻子は明刻、槓子は明槓.
+    fu = (8 if is_kan else 2) * (2 if tiles[0] in YAOCHUHAI else 1)
+    return CalledSummary(True, ids, reds, MELD_KOTSU, first, is_kan, yaochu, fu)
+
+
+class _Plan(NamedTuple):
+    """一括計算用に展開した役の判定順 (和了形は通常形)."""
+    ok: bool                      # 一括計算できる役だけか.
+    yakuman: tuple[str, ...]      # 役満の判定メソッド名.
+    names: tuple[str, ...]        # 役満以外の役名.
+    checks: tuple[str, ...]       # 役満以外の役の判定メソッド名.
+    han: tuple[int | None, ...]   # 役満以外の役の飜数.
+    excludes: tuple[tuple[int, ...], ...]  # 上位の役の番号.
+
+
+# 役満の可能性の判定 (成立しうる場合にTrue) と、役の判定を行う列の名前.
+YAKUMAN_CHECKS = frozenset([
+    '_is_daisuushi', '_is_junsei_churenpoutou', '_is_normal_churenpoutou', '_is_suuankou_tanki',
+    '_is_normal_suuankou', '_is_daisangen', '_is_suukantsu', '_is_ryuuiisou', '_is_tuuiisou',
+    '_is_chinroutou', '_is_shousuushi', '_is_daisharin', '_is_tenhou', '_is_chiihou',
+])
+YAKU_CHECKS = frozenset([
+    '_is_chinitsu', '_is_honitsu', '_is_ryanpeiko', '_is_iipeko', '_is_junchan', '_is_chanta',
+    '_is_honroutou', '_is_ikkitsukan', '_is_sanshoku_doujun', '_is_shousangen', '_is_jikaze',
+    '_is_bakaze', '_is_haku', '_is_hatsu', '_is_chun', '_is_sankantsu', '_is_toitoi', '_is_sanankou',
+    '_is_sanshoku_doukou', '_is_double_riichi', '_is_chankan', '_is_rinshan', '_is_haitei',
+    '_is_houtei', '_is_tanyao', '_is_pinfu', '_is_menzen_tsumo', '_is_ippatsu', '_is_riiti', '_is_dora',
+])
+
+
+@functools.lru_cache(maxsize=64)
+def _compile_plan(is_menzen: bool, enabled_local: frozenset, disabled: frozenset) -> _Plan:
+    """YakuJudgeの判定順(yaku.compile_yaku_plan)を、一括計算用に展開する."""
+    yakuman_phase, yaku_phase = compile_yaku_plan('normal', is_menzen, enabled_local, disabled).phases
+    yakuman = tuple(rule[1].__name__ for group in yakuman_phase for rule in group.rules)
+    rules = [rule for group in yaku_phase for rule in group.rules]
+    names = tuple(rule[0] for rule in rules)
+    checks = tuple(rule[1].__name__ for rule in rules)
+    ok = (all(check in YAKUMAN_CHECKS for check in yakuman)
+          and all(check in YAKU_CHECKS for check in checks)
+          and all((han is None) == (check == '_is_dora') for check, (_, _, han, _, _) in zip(checks, rules))
+          # 役満以外に、以降の役を判定せずに終了する役はない.
+          and not any(rule[4] for rule in rules)
+          # 符計算は役名で役満・七対子を判定するため、それらの名前の役は扱わない.
+          and not any(name in YAKUMAN_LIST or name == '七対子' for name in names)
+          and len(rules) < 63)
+    excludes = tuple(tuple(names.index(name) for name in rule[3] if name in names) for rule in rules)
+    return _Plan(ok, yakuman, names, checks, tuple(rule[2] for rule in rules), excludes)
+
+
+class BatchEvaluation(NamedTuple):
+    """
+    一括計算の結果.
+
+    Attributes:
+        fast (np.ndarray)    : 高速経路で計算した手牌か (真偽値).
+        yaku (list)          : 手牌ごとの役名と飜数の辞書 (高速経路でない手牌はNone).
+        han (np.ndarray)     : 飜数.
+        fu (np.ndarray)      : 符.
+    """
+    fast: np.ndarray
+    yaku: list
+    han: np.ndarray
+    fu: np.ndarray
+
+
+def _state_values(game_states: list[dict], key: str, default=None) -> list:
+    """ゲームの状況のキーの値のリスト."""
+    return [state.get(key, default) for state in game_states]
+
+
+def _lookup(values: list, codes: dict) -> np.ndarray:
+    """値のリストを辞書でコードの列に変換する (該当しない値は-1)."""
+    try:
+        return np.fromiter(map(codes.get, values, itertools.repeat(-1)), dtype=np.int64, count=len(values))
+    except TypeError:
+        # リストなどのハッシュできない値が含まれる場合.
+        return np.fromiter((codes.get(v, -1) if isinstance(v, str) else -1 for v in values),
+                           dtype=np.int64, count=len(values))
+
+
+def _flag_column(game_states: list[dict], key: str) -> np.ndarray:
+    """ゲームの状況のキーの値を真偽値の列にする."""
+    return np.fromiter(map(bool, _state_values(game_states, key, False)), dtype=bool, count=len(game_states))
+
+
+def _encode_hands(hands: list[list[str]]) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    手牌を枚数の行列に変換する.
+
+    Returns:
+        tuple: (枚数 (手牌数×34, 5枚以上は5), 色ごとの赤ドラの枚数 (手牌数×3), 手牌の枚数, 不正な牌を含むか).
+    """
+    n = len(hands)
+    lengths = np.fromiter(map(len, hands), dtype=np.int64, count=n)
+    codes = _lookup(list(itertools.chain.from_iterable(hands)), TILE_CODES)
+    owner = np.repeat(np.arange(n), lengths)
+    invalid = np.bincount(owner[codes < 0], minlength=n) > 0
+    owner, codes = owner[codes >= 0], codes[codes >= 0]
+    ids = codes % NUM_TILE_KINDS
+    counts = np.bincount(owner * NUM_TILE_KINDS + ids, minlength=n * NUM_TILE_KINDS).reshape(n, NUM_TILE_KINDS)
+    # 枚数の行列は int8 で持つ (5枚以上の牌は扱わないため、5で打ち切る).
+    counts = np.minimum(counts, 5).astype(np.int8)
+    red = codes >= NUM_TILE_KINDS
+    red_counts = np.bincount(owner[red] * 3 + ids[red] // 9, minlength=n * 3).reshape(n, 3)
+    return counts, red_counts, lengths, invalid
+
+
+def evaluate_batch(hands: list[list[str]], called_mentsu_lists: list[list[Call]],
+                   game_states: list[dict]) -> BatchEvaluation:
+    """
+    手牌の役・飜数・符を一括で求める関数. 高速経路で扱えない手牌は fast が False になる.
+
+    Args:
+        hands (list[list[str]])               : 手牌のリスト.
+        called_mentsu_lists (list[list[Call]]): 手牌ごとの鳴き面子のリスト.
+        game_states (list[dict])              : 手牌ごとのゲームの状況.
+
+    Returns:
+        BatchEvaluation: 一括計算の結果.
+    """
+    n = len(hands)
+    rows = np.arange(n)
+    counts, red_counts, lengths, unsupported = _encode_hands(hands)
+    unsupported |= (counts > 4).any(axis=1)
+    if SUIT_TABLE is None:
+        unsupported[:] = True
+
+    # --- 鳴き面子 ---
+    # 鳴き面子の種類ごとに要約を一度だけ求め、手牌の行に足し込む.
+    meld_rows = []
+    meld_index = []
+    melds = {}
+    has_called = np.zeros(n, dtype=bool)
+    for i, calls in enumerate(called_mentsu_lists):
+        if not calls:
+            continue
+        has_called[i] = True
+        for call in calls:
+            tiles = tuple(call.tiles)
+            if tiles not in melds:
+                melds[tiles] = len(melds)
+            meld_rows.append(i)
+            meld_index.append(melds[tiles])
+    summaries = [summarize_called(tiles) for tiles in melds]
+    meld_counts = np.zeros((len(summaries), NUM_TILE_KINDS), dtype=np.int64)
+    meld_kotsu = np.zeros((len(summaries), NUM_TILE_KINDS), dtype=bool)
+    meld_shuntsu = np.zeros((len(summaries), 3 * SHUNTSU_KINDS), dtype=np.int8)
+    meld_reds = np.zeros((len(summaries), 3), dtype=np.int64)
+    for k, meld in enumerate(summaries):
+        if not meld.ok:
+            continue
+        for tile in meld.tiles:
+            meld_counts[k, tile] += 1
+        suit = meld.first // 9
+        meld_reds[k, suit % 3] = meld.reds
+        if meld.kind == MELD_SHUNTSU:
+            meld_shuntsu[k, suit * SHUNTSU_KINDS + meld.first % 9] = 1
+        elif meld.kind == MELD_KOTSU:
+            meld_kotsu[k, meld.first] = True
+    meld_rows = np.array(meld_rows, dtype=np.int64)
+    meld_index = np.array(meld_index, dtype=np.int64)
+
+    def add_melds(values: np.ndarray) -> np.ndarray:
+        """鳴き面子ごとの値を手牌ごとに合計する."""
+        total = np.zeros((n,) + values.shape[1:], dtype=np.int64)
+        np.add.at(total, meld_rows, values[meld_index])
+        return total
+
+    unsupported |= add_melds(np.array([not m.ok for m in summaries], dtype=np.int64)) > 0
+    called_counts = add_melds(meld_counts)
+    unsupported |= (called_counts > 4).any(axis=1)
+    called_counts = np.minimum(called_counts, 5).astype(np.int8)
+    called_kotsu = add_melds(meld_kotsu.astype(np.int64)) > 0
+    called_shuntsu = add_melds(meld_shuntsu).astype(np.int8)
+    called_reds = add_melds(meld_reds)
+    num_kan = add_melds(np.array([m.is_kan for m in summaries], dtype=np.int64))
+    called_fu = add_melds(np.array([m.fu for m in summaries], dtype=np.int64))
+    called_yaochu = add_melds(np.array([not m.yaochu for m in summaries], dtype=np.int64)) == 0
+
+    # --- 門前部分の面子分解 ---
+    # EncodedHandと同じく、鳴き面子の牌を手牌から除く (0未満にはしない).
+    closed = np.maximum(counts - called_counts, 0)
+    closed_reds = np.minimum(np.maximum(red_counts - called_reds, 0), 4)
+    pair = np.full(n, -1, dtype=np.int64)
+    num_pairs = np.zeros(n, dtype=np.int64)
+    closed_kotsu = np.zeros((n, NUM_TILE_KINDS), dtype=bool)
+    closed_shuntsu = np.zeros((n, 3 * SHUNTSU_KINDS), dtype=np.int8)
+    closed_yaochu = np.ones(n, dtype=bool)
+    positions = np.arange(9)
+    shuntsu_shifts = np.arange(SHUNTSU_KINDS) * 3
+    for suit in range(3):
+        base = suit * 9
+        keys = closed[:, base:base + 9] @ SUIT_KEY_WEIGHTS
+        unique, inverse = np.unique(keys, return_inverse=True)
+        # 分解の要約 (SuitSummaryの各項目) を、手牌ごとの行列に展開する.
+        ok, suit_pair, kotsu_bits, shuntsu_bits, all_yaochu = np.array(
+            [summarize_suit(key) for key in unique.tolist()], dtype=np.int64)[inverse].T
+        unsupported |= ok == 0
+        has_pair = suit_pair >= 0
+        pair[has_pair] = base + suit_pair[has_pair]
+        num_pairs += has_pair
+        closed_kotsu[:, base:base + 9] = (kotsu_bits[:, None] >> positions) & 1
+        closed_shuntsu[:, suit * SHUNTSU_KINDS:(suit + 1) * SHUNTSU_KINDS] = (shuntsu_bits[:, None] >> shuntsu_shifts) & 7
+        closed_yaochu &= all_yaochu > 0
+    # 字牌は2枚なら雀頭、3枚なら刻子. 1枚・4枚の字牌がある手牌は扱わない.
+    honors = closed[:, 27:]
+    unsupported |= ((honors == 1) | (honors == 4)).any(axis=1)
+    honor_pairs = honors == 2
+    num_pairs += honor_pairs.sum(axis=1)
+    has_honor_pair = honor_pairs.any(axis=1)
+    pair[has_honor_pair] = 27 + honor_pairs[has_honor_pair].argmax(axis=1)
+    closed_kotsu[:, 27:] = honors == 3
+    # 雀頭がちょうど1つでなければ和了形にならない.
+    unsupported |= num_pairs != 1
+    # 七対子の形の手牌は、七対子と通常形の和了パターンがある.
+    unsupported |= (~has_called & (lengths == 14) & (honor_pairs.sum(axis=1) + (closed[:, :27] == 2).sum(axis=1) == 7)
+                    & ((closed == 0) | (closed == 2)).all(axis=1))
+
+    # --- ゲームの状況 ---
+    # どの手牌の状況にもないキーは、全ての手牌で既定値として扱う.
+    state_keys = set().union(*game_states)
+    flags = {key: _flag_column(game_states, key) if key in state_keys else np.zeros(n, dtype=bool)
+             for key in STATE_FLAGS}
+    is_menzen = flags['is_menzen']
+    is_tsumo = flags['is_tsumo']
+    is_ron = ~is_tsumo
+    agari_codes = _lookup(_state_values(game_states, 'agari_hai'), TILE_CODES)
+    unsupported |= agari_codes < 0
+    agari = np.where(agari_codes < 0, 0, agari_codes % NUM_TILE_KINDS)
+    jikaze = _lookup(_state_values(game_states, 'jikaze'), PLAIN_IDS)
+    bakaze = _lookup(_state_values(game_states, 'bakaze'), PLAIN_IDS)
+    # ドラの多重度ベクトル (dora.py). 同じベクトルは1行にまとめ、手牌ごとに行を引く.
+    dora_vectors = {}
+    dora_index = np.fromiter((dora_vectors.setdefault(sum(dora_vector_of(state), ()), len(dora_vectors))
+                              for state in game_states), dtype=np.int64, count=n)
+    dora_table = np.array(list(dora_vectors), dtype=np.int64).reshape(-1, 2, NUM_TILE_KINDS).sum(axis=1)
+    dora_weights = dora_table[dora_index]
+    # 役の有効・無効の指定がある手牌は、指定ごとに役の判定順を用意する.
+    plan_index = is_menzen.astype(np.int64)
+    plan_keys = [(False, frozenset(), frozenset()), (True, frozenset(), frozenset())]
+    if 'enabled_local_yaku' in state_keys or 'disabled_yaku' in state_keys:
+        toggles = zip(_state_values(game_states, 'enabled_local_yaku'), _state_values(game_states, 'disabled_yaku'))
+        for i, (enabled_local, disabled) in enumerate(toggles):
+            if not (enabled_local or disabled):
+                continue
+            try:
+                key = (bool(is_menzen[i]), frozenset(enabled_local or ()), frozenset(disabled or ()))
+            except TypeError:
+                unsupported[i] = True
+                continue
+            if key not in plan_keys:
+                plan_keys.append(key)
+            plan_index[i] = plan_keys.index(key)
+
+    # --- 待ちの形 ---
+    # アガリ牌を含む門前の面子・雀頭から待ちの形を求める (analyzer.machi_type).
+    agari_pos = agari % 9
+    is_number = agari < 27
+    agari_shuntsu = closed_shuntsu.reshape(n, 3, 7)[rows, np.minimum(agari // 9, 2)]
+
+    def shuntsu_from(offset: int) -> np.ndarray:
+        """アガリ牌の位置から offset 前に始まる門前の順子があるか."""
+        start = agari_pos - offset
+        return is_number & (start >= 0) & (start <= 6) & (agari_shuntsu[rows, np.clip(start, 0, 6)] > 0)
+
+    starts_at_agari, ends_at_agari = shuntsu_from(0), shuntsu_from(2)
+    tanki = pair == agari
+    shanpon = closed_kotsu[rows, agari]
+    kanchan = shuntsu_from(1)
+    penchan = (ends_at_agari & (agari_pos == 2)) | (starts_at_agari & (agari_pos == 6))
+    ryanmen = (ends_at_agari & (agari_pos != 2)) | (starts_at_agari & (agari_pos != 6))
+    # 待ちの形が複数ある手牌は和了パターンが複数になる. 1つもない手牌は和了形でない.
+    unsupported |= tanki.astype(np.int64) + shanpon + kanchan + penchan + ryanmen != 1
+
+    # --- 特徴量 (features.HandFeatures に相当) ---
+    tiles = closed + called_counts
+    kotsu = closed_kotsu | called_kotsu
+    shuntsu = closed_shuntsu + called_shuntsu
+    shuntsu_by_start = shuntsu.reshape(n, 3, 7)
+    num_tiles = tiles.sum(axis=1)
+    num_honors = tiles[:, 27:].sum(axis=1)
+    num_terminals = tiles[:, IS_TERMINAL].sum(axis=1)
+    num_green = tiles[:, IS_GREEN].sum(axis=1)
+    suit_mask = ((tiles[:, 0:9].any(axis=1) * 1) | (tiles[:, 9:18].any(axis=1) * 2)
+                 | (tiles[:, 18:27].any(axis=1) * 4) | ((num_honors > 0) * 8))
+    number_mask = suit_mask & 0b0111
+    single_suit = suit_mask & (suit_mask - 1) == 0
+    one_number_suit = number_mask & (number_mask - 1) == 0
+    janto = np.maximum(pair, 0)
+    janto_yaochu = IS_YAOCHU[janto]
+    all_mentsu_yaochu = closed_yaochu & called_yaochu
+    winds = kotsu[:, 27:31].sum(axis=1)
+    dragons = kotsu[:, 31:34].sum(axis=1)
+    # ロンで完成した刻子は暗刻に数えない.
+    ron_kotsu = is_ron & shanpon
+    num_ankou = closed_kotsu.sum(axis=1) - (ron_kotsu & closed_kotsu[rows, agari])
+    # ドラ: 多重度ベクトルと枚数配列の内積と、赤ドラの枚数の和.
+    dora_count = (tiles * dora_weights).sum(axis=1) + (closed_reds + called_reds).sum(axis=1)
+
+    # 役満の可能性 (YakuJudgeの役満の判定の必要条件).
+    # 九蓮宝燈は1色で1と9が3枚以上、2から8が1枚以上ある場合に限る.
+    number_counts = tiles[:, :27].reshape(n, 3, 9).sum(axis=1)
+    churen = (is_menzen & np.isin(suit_mask, (1, 2, 4)) & (number_counts >= CHUREN_MIN_COUNTS).all(axis=1))
+    yakuman_columns = {
+        '_is_daisuushi': winds == 4,
+        '_is_junsei_churenpoutou': churen,
+        '_is_normal_churenpoutou': churen,
+        '_is_suuankou_tanki': is_menzen & (num_ankou == 4),
+        '_is_normal_suuankou': is_menzen & (num_ankou == 4),
+        '_is_daisangen': dragons == 3,
+        '_is_suukantsu': num_kan == 4,
+        '_is_ryuuiisou': num_green == num_tiles,
+        '_is_tuuiisou': num_honors == num_tiles,
+        '_is_chinroutou': num_terminals == num_tiles,
+        '_is_shousuushi': (pair >= 27) & (pair <= 30) & (winds == 3),
+        '_is_daisharin': (tiles[:, 10:17] >= 2).all(axis=1),
+        '_is_tenhou': flags['is_tenhou'],
+        '_is_chiihou': flags['is_chiihou'],
+    }
+    # 役の判定 (YakuJudgeの同じ名前のメソッドに相当).
+    yaku_columns = {
+        '_is_chinitsu': single_suit,
+        '_is_honitsu': one_number_suit,
+        '_is_ryanpeiko': is_menzen & (((shuntsu == 2).sum(axis=1) == 2) | (shuntsu == 4).any(axis=1)),
+        '_is_iipeko': is_menzen & ((shuntsu == 2).sum(axis=1) == 1),
+        '_is_junchan': janto_yaochu & all_mentsu_yaochu & (num_honors == 0),
+        '_is_chanta': janto_yaochu & all_mentsu_yaochu,
+        '_is_honroutou': num_honors + num_terminals == num_tiles,
+        '_is_ikkitsukan': (shuntsu_by_start[:, :, [0, 3, 6]] > 0).all(axis=2).any(axis=1),
+        '_is_sanshoku_doujun': (shuntsu_by_start > 0).all(axis=1).any(axis=1),
+        '_is_shousangen': (pair >= 31) & (dragons == 2),
+        '_is_jikaze': (jikaze >= 0) & kotsu[rows, np.maximum(jikaze, 0)],
+        '_is_bakaze': (bakaze >= 0) & kotsu[rows, np.maximum(bakaze, 0)],
+        '_is_haku': kotsu[:, 31],
+        '_is_hatsu': kotsu[:, 32],
+        '_is_chun': kotsu[:, 33],
+        '_is_sankantsu': num_kan == 3,
+        '_is_toitoi': kotsu.sum(axis=1) == 4,
+        '_is_sanankou': num_ankou == 3,
+        '_is_sanshoku_doukou': (kotsu[:, 0:9] & kotsu[:, 9:18] & kotsu[:, 18:27]).any(axis=1),
+        '_is_double_riichi': flags['is_double_riichi'],
+        '_is_chankan': flags['is_chankan'],
+        '_is_rinshan': flags['is_rinshan'],
+        '_is_haitei': flags['is_haitei'],
+        '_is_houtei': flags['is_houtei'],
+        '_is_tanyao': num_honors + num_terminals == 0,
+        '_is_pinfu': is_menzen & ryanmen & ~janto_yaochu,
+        '_is_menzen_tsumo': is_menzen & is_tsumo,
+        '_is_ippatsu': flags['is_ippatsu'],
+        '_is_riiti': flags['is_riichi'],
+        '_is_dora': dora_count > 0,
+    }
+
+    # --- 役の登録表の順に役を並べる ---
+    # 成立する役の組み合わせをビットで表し、組み合わせごとに役の辞書の雛形を作る.
+    han = np.zeros(n, dtype=np.int64)
+    yaku_bits = np.zeros(n, dtype=np.int64)
+    is_pinfu = np.zeros(n, dtype=bool)
+    plans = [_compile_plan(*key) for key in plan_keys]
+    for index, plan in enumerate(plans):
+        target = plan_index == index
+        if not plan.ok:
+            unsupported |= target
+            continue
+        for check in plan.yakuman:
+            unsupported |= target & yakuman_columns[check]
+        present = []
+        for k, (name, check, value, excludes) in enumerate(zip(plan.names, plan.checks, plan.han, plan.excludes)):
+            column = target & yaku_columns[check]
+            for excluded_by in excludes:
+                column &= ~present[excluded_by]
+            present.append(column)
+            yaku_bits |= column.astype(np.int64) << k
+            han += np.where(column, dora_count if value is None else value, 0)
+            if name == '平和':
+                is_pinfu |= column
+
+    # --- 符 (fu.FuCalculator に相当) ---
+    yaochu_double = 1 + IS_YAOCHU
+    fu = 20 + (~has_called & is_ron) * 10 + is_tsumo * 2 + called_fu
+    fu += (closed_kotsu * yaochu_double).sum(axis=1) * 4
+    fu -= ron_kotsu * yaochu_double[agari] * 2
+    fu += np.isin(pair, (31, 32, 33)) * 2 + (pair == bakaze) * 2 + (pair == jikaze) * 2
+    fu = np.where(has_called & (fu == 20), 30, -(-fu // 10) * 10)
+    fu = np.where(is_pinfu, np.where(is_tsumo, 20, 30), fu)
+
+    # --- 役の辞書 ---
+    fast = ~unsupported
+    yaku = [None] * n
+    fast_rows = np.flatnonzero(fast)
+    if len(fast_rows):
+        template_keys = yaku_bits[fast_rows] * len(plans) + plan_index[fast_rows]
+        unique, inverse = np.unique(template_keys, return_inverse=True)
+        templates = []
+        for key in unique.tolist():
+            plan = plans[key % len(plans)]
+            bits = key // len(plans)
+            template = {name: (0 if value is None else value)
+                        for k, (name, value) in enumerate(zip(plan.names, plan.han)) if bits >> k & 1}
+            dora_name = next((name for k, (name, value) in enumerate(zip(plan.names, plan.han))
+                              if value is None and bits >> k & 1), None)
+            templates.append((template, dora_name))
+        for i, t, dora in zip(fast_rows.tolist(), inverse.tolist(), dora_count[fast_rows].tolist()):
+            template, dora_name = templates[t]
+            yaku[i] = template.copy()
+            if dora_name is not None:
+                yaku[i][dora_name] = dora
+    return BatchEvaluation(fast, yaku, han, fu)
@@ -0,0 +1,83 @@
+import collections
+import threading
+
+
+class LRUCache:
+    """
+    サイズ上限付きのLRUキャッシュ.
+    ヒット・ミス・追い出しの回数を記録する. 複数スレッドから安全に利用できる.
+    """
+    def __init__(self, maxsize: int):
+        """
+        キャッシュを初期化する.
+
+        Args:
+            maxsize (int): 保持する要素数の上限.
+        """
+        self.maxsize = maxsize
+        self._data = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        """
+        キーに対応する値を取得する.
+
+        Args:
+            key: キャッシュのキー(ハッシュ可能な値).
+            default: キーが存在しない場合に返す値.
+
+        Returns:
+            キャッシュされた値. 存在しない場合は default.
+        """
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value) -> None:
+        """
+        値をキャッシュに格納する. 上限を超えた場合は最も古い要素を追い出す.
+
+        Args:
+            key: キャッシュのキー(ハッシュ可能な値).
+            value: 格納する値. 呼び出し側で変更されないよう、不変な値を推奨する.
+        """
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """キャッシュの内容と統計情報をすべて消去する."""
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        """
+        キャッシュの統計情報を返す.
+
+        Returns:
+            dict: hits, misses, evictions, size, maxsize を含む辞書.
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+            }
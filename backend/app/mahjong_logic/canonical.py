@@ -0,0 +1,164 @@
+# 手牌の正規化キー
+# 萬子・筒子・索子を入れ替えても、面子分解と、ほとんどの役・符の判定結果は変わらない.
+# 色の並びを正規の順序に並べ替えた枚数配列を詰めてキーにすると、色だけが違う手牌でキャッシュを共有できる.
+#
+# 正規の順序: 色ごとの (枚数配列, 鳴き面子, 赤ドラの枚数) を大きい順に並べる. 同じものは元の順に並べる.
+# 元の色への対応は SuitOrder (正規の k 番目の色が元のどの色か) で表し、
+# 牌IDの対応表 TO_CANONICAL / FROM_CANONICAL で、キャッシュした結果を元の手牌の牌IDに戻す.
+#
+# 色によって結果が変わるもの:
+#   - 緑一色(索子だけ)と大車輪(筒子だけ)は、成立しうる手牌を SUIT_SPECIFIC_BITS としてキーに含める.
+#   - ドラ表示牌・アガリ牌などの牌は、キーを使う側で TO_CANONICAL / to_canonical_name により並べ替える.
+
+from typing import NamedTuple
+
+from .encoding import NUM_SUITS, NUM_TILE_KINDS, RED_FIVE_NAMES, TILE_IDS, EncodedHand
+from .features import GREEN_TILES
+
+SuitOrder = tuple[int, int, int]
+IDENTITY: SuitOrder = (0, 1, 2)
+
+# 色によって結果が変わる役が成立しうる手牌のビット.
+SUIT_SPECIFIC_BITS = {'ryuuiisou': 1, 'daisharin': 2}
+# 役の判定(YakuJudge._is_ryuuiisou)と同じ GREEN_TILES から作る.
+_GREEN_IDS = frozenset(TILE_IDS[t] for t in GREEN_TILES)
+_DAISHARIN_IDS = frozenset(range(10, 17))  # 2p-8p.
+
+
+def _permutation(order: SuitOrder, to_canonical: bool) -> tuple[int, ...]:
+    """色の並べ替えに対応する牌IDの対応表を作る. 字牌は変わらない."""
+    table = list(range(NUM_TILE_KINDS))
+    for canonical_suit, suit in enumerate(order):
+        for number in range(9):
+            if to_canonical:
+                table[suit * 9 + number] = canonical_suit * 9 + number
+            else:
+                table[canonical_suit * 9 + number] = suit * 9 + number
+    return tuple(table)
+
+
+_ORDERS = [(a, b, c) for a in range(3) for b in range(3) for c in range(3) if len({a, b, c}) == 3]
+# 色の並べ替えごとの、元の牌ID -> 正規の牌ID と、正規の牌ID -> 元の牌ID の対応表.
+TO_CANONICAL = {order: _permutation(order, True) for order in _ORDERS}
+FROM_CANONICAL = {order: _permutation(order, False) for order in _ORDERS}
+
+
+class CanonicalKey(NamedTuple):
+    """
+    色の並べ替えで同じになる手牌が共有する、ハッシュ可能なキー.
+
+    Attributes:
+        counts (bytes): 正規の順序に並べ替えた門前部分の枚数配列 (1牌1バイト).
+        melds (tuple) : 正規の牌IDに並べ替えた鳴き面子のタプル (面子の順によらないよう並べ替える).
+        reds (bytes)  : 正規の順序に並べ替えた色ごとの赤ドラの枚数 (門前部分3色と鳴き面子3色).
+        suit_specific (int): 色によって結果が変わる役が成立しうるかのビット (SUIT_SPECIFIC_BITS の和).
+        context (int) : 呼び出し側が与える状況のビット.
+    """
+    counts: bytes
+    melds: tuple[tuple[int, ...], ...]
+    reds: bytes
+    suit_specific: int
+    context: int
+
+
+def suit_order(counts: list[int], melds: list[tuple[int, ...]] = (), reds: list[int] = (0, 0, 0)) -> SuitOrder:
+    """
+    正規の順序を求める関数.
+
+    Args:
+        counts (list[int])           : 門前部分の枚数配列 (長さ34).
+        melds (list[tuple[int, ...]]): 鳴き面子ごとの牌IDのタプル.
+        reds (list[int])             : 色ごとの赤ドラの枚数 (色ごとの比較に含める値).
+
+    Returns:
+        SuitOrder: 正規の k 番目の色に対応する元の色のタプル.
+    """
+    signatures = []
+    for suit in range(NUM_SUITS):
+        base = suit * 9
+        suit_melds = sorted(tuple(i - base for i in m) for m in melds if base <= m[0] < base + 9)
+        signatures.append((counts[base:base + 9], suit_melds, reds[suit]))
+    # sorted は安定なため、同じ色の組は元の順に並ぶ.
+    return tuple(sorted(range(NUM_SUITS), key=signatures.__getitem__, reverse=True))
+
+
+def canonical_counts(counts: list[int]) -> tuple[bytes, SuitOrder]:
+    """
+    枚数配列だけから正規化したキーを求める関数 (面子分解のキャッシュに用いる).
+
+    Args:
+        counts (list[int]): 枚数配列 (長さ34).
+
+    Returns:
+        tuple[bytes, SuitOrder]: 正規の順序に並べ替えた枚数配列と、正規の順序.
+    """
+    # バイト列の比較は枚数配列の比較と同じ順になるため、色ごとのバイト列で比較する (suit_order と同じ順序).
+    packed = bytes(counts)
+    suits = (packed[0:9], packed[9:18], packed[18:27])
+    if suits[0] >= suits[1] >= suits[2]:
+        return packed, IDENTITY
+    order = tuple(sorted(range(NUM_SUITS), key=suits.__getitem__, reverse=True))
+    return b''.join(suits[s] for s in order) + packed[27:], order
+
+
+def suit_specific_bits(counts: list[int]) -> int:
+    """
+    色によって結果が変わる役が成立しうるかのビットを求める関数.
+
+    Args:
+        counts (list[int]): 鳴き面子を含む手牌全体の枚数配列.
+
+    Returns:
+        int: SUIT_SPECIFIC_BITS の和.
+    """
+    tiles = {i for i, c in enumerate(counts) if c}
+    bits = 0
+    if tiles and tiles <= _GREEN_IDS:
+        bits |= SUIT_SPECIFIC_BITS['ryuuiisou']
+    if tiles and tiles <= _DAISHARIN_IDS:
+        bits |= SUIT_SPECIFIC_BITS['daisharin']
+    return bits
+
+
+def canonical_key(encoded: EncodedHand, context: int = 0) -> tuple[CanonicalKey, SuitOrder]:
+    """
+    エンコード済みの手牌から正規化キーを求める関数.
+    アガリ牌・ドラ表示牌は含まないため、必要な場合は to_canonical_name で並べ替えてキーに加える.
+
+    Args:
+        encoded (EncodedHand): エンコード済みの手牌.
+        context (int)        : キーに含める状況のビット (ツモ・立直など、呼び出し側で決める).
+
+    Returns:
+        tuple[CanonicalKey, SuitOrder]: 正規化キーと、元の色に戻すための正規の順序.
+    """
+    closed = encoded.closed_counts
+    red_pairs = list(zip(encoded.closed_red_counts, encoded.called_red_counts))
+    order = suit_order(closed, encoded.called, red_pairs)
+    to_canonical = TO_CANONICAL[order]
+    counts = bytes(closed[s * 9 + n] for s in order for n in range(9)) + bytes(closed[27:])
+    melds = tuple(sorted(tuple(to_canonical[i] for i in m) for m in encoded.called))
+    reds = (bytes(encoded.closed_red_counts[s] for s in order)
+            + bytes(encoded.called_red_counts[s] for s in order))
+    all_counts = closed[:]
+    for meld in encoded.called:
+        for i in meld:
+            all_counts[i] += 1
+    return CanonicalKey(counts, melds, reds, suit_specific_bits(all_counts), context), order
+
+
+def to_canonical_name(tile: str, order: SuitOrder) -> str:
+    """
+    牌の文字列を、正規の順序の牌の文字列に並べ替える関数 (赤ドラは赤ドラのまま).
+
+    Args:
+        tile (str)       : 牌の文字列.
+        order (SuitOrder): 正規の順序.
+
+    Returns:
+        str: 正規の順序の牌の文字列. 不正な牌はそのまま返す.
+    """
+    if tile not in TILE_IDS or tile[1] == 'z':
+        return tile
+    suit = 'mps'[order.index('mps'.index(tile[1]))]
+    return tile[0] + suit + ('r' if tile in RED_FIVE_NAMES else '')
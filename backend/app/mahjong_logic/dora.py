@@ -0,0 +1,127 @@
+# ドラの計算
+# ドラ・槓ドラ・裏ドラ・槓裏ドラの表示牌から、牌IDごとのドラの枚数(長さ34の多重度ベクトル)を
+# 手牌ごとに一度だけ求める. 同じ表示牌が複数ある場合は、その枚数だけ重ねて数える.
+# 手牌のドラの枚数は、このベクトルと手牌の枚数配列の内積になる. 赤ドラは牌の枚数とは別に数える.
+# 表示牌はリストとカンマ区切りの文字列のどちらでも受け付ける (encoding.split_tiles).
+#
+# ゲームの状況のキー:
+#   dora_indicators, kan_dora_indicators        : ドラ表示牌・槓ドラ表示牌.
+#   ura_dora_indicators, kan_ura_dora_indicators: 裏ドラ表示牌・槓裏ドラ表示牌 (立直している場合だけ数える).
+
+import functools
+from typing import NamedTuple
+
+from .encoding import DORA_OF, NUM_TILE_KINDS, RED_FIVE_NAMES, TILE_IDS, split_tiles
+
+# 裏ドラを数える条件 (いずれかが真).
+RIICHI_KEYS = ('is_riichi', 'is_double_riichi')
+
+
+class DoraCount(NamedTuple):
+    """
+    手牌のドラの枚数.
+
+    Attributes:
+        dora (int): ドラ・槓ドラの枚数.
+        aka (int) : 赤ドラの枚数.
+        ura (int) : 裏ドラ・槓裏ドラの枚数.
+    """
+    dora: int
+    aka: int
+    ura: int
+
+    @property
+    def total(self) -> int:
+        """ドラ・赤ドラ・裏ドラの合計枚数."""
+        return self.dora + self.aka + self.ura
+
+
+class DoraVector(NamedTuple):
+    """
+    表示牌から求めた、牌IDごとのドラの枚数.
+
+    Attributes:
+        dora (tuple[int, ...]): ドラ・槓ドラの多重度ベクトル (長さ34).
+        ura (tuple[int, ...]) : 裏ドラ・槓裏ドラの多重度ベクトル (長さ34. 立直していない場合は全て0).
+    """
+    dora: tuple[int, ...]
+    ura: tuple[int, ...]
+
+    def count(self, counts: list[int], aka: int) -> DoraCount:
+        """
+        枚数配列からドラの枚数を求める関数.
+
+        Args:
+            counts (list[int]): 鳴き面子を含む手牌全体の枚数配列 (赤ドラは通常の5として数える).
+            aka (int)         : 赤ドラの枚数.
+
+        Returns:
+            DoraCount: ドラの枚数.
+        """
+        dora = sum(c * d for c, d in zip(counts, self.dora))
+        ura = sum(c * u for c, u in zip(counts, self.ura))
+        return DoraCount(dora, aka, ura)
+
+    def count_tiles(self, tiles: list[str]) -> DoraCount:
+        """
+        牌の文字列のリストからドラの枚数を求める関数. 不正な牌は数えない.
+
+        Args:
+            tiles (list[str]): 鳴き面子を含む手牌全体の牌のリスト.
+
+        Returns:
+            DoraCount: ドラの枚数.
+        """
+        counts = [0] * NUM_TILE_KINDS
+        aka = 0
+        for tile in tiles:
+            i = TILE_IDS.get(tile)
+            if i is None:
+                continue
+            counts[i] += 1
+            if tile in RED_FIVE_NAMES:
+                aka += 1
+        return self.count(counts, aka)
+
+
+def parse_indicators(indicators) -> tuple[int, ...]:
+    """
+    表示牌を牌IDのタプルに変換する関数. 赤ドラの表示牌は通常の5として扱い、不正な牌は無視する.
+
+    Args:
+        indicators (list[str] | str | None): 表示牌のリスト、またはカンマ区切りの文字列.
+
+    Returns:
+        tuple[int, ...]: 表示牌の牌IDのタプル (入力の順).
+    """
+    return tuple(TILE_IDS[t] for t in split_tiles(indicators) if t in TILE_IDS)
+
+
+@functools.lru_cache(maxsize=1024)
+def _multiplicity(indicator_ids: tuple[int, ...]) -> tuple[int, ...]:
+    """表示牌の牌IDから、牌IDごとのドラの枚数を求める. 表示牌の次の牌がドラになる."""
+    vector = [0] * NUM_TILE_KINDS
+    for i in indicator_ids:
+        vector[DORA_OF[i]] += 1
+    return tuple(vector)
+
+
+def dora_vector_of(game_state: dict) -> DoraVector:
+    """
+    ゲームの状況の表示牌から、ドラの多重度ベクトルを求める関数.
+    同じ表示牌の組み合わせのベクトルは使い回す.
+
+    Args:
+        game_state (dict): ゲームの状況.
+
+    Returns:
+        DoraVector: ドラ・裏ドラの多重度ベクトル.
+    """
+    dora_ids = (parse_indicators(game_state.get('dora_indicators'))
+                + parse_indicators(game_state.get('kan_dora_indicators')))
+    ura_ids = ()
+    if any(game_state.get(key, False) for key in RIICHI_KEYS):
+        ura_ids = (parse_indicators(game_state.get('ura_dora_indicators'))
+                   + parse_indicators(game_state.get('kan_ura_dora_indicators')))
+    # 表示牌の順序によらず同じベクトルになるため、並べ替えてキャッシュのキーにする.
+    return DoraVector(_multiplicity(tuple(sorted(dora_ids))), _multiplicity(tuple(sorted(ura_ids))))
@@ -0,0 +1,155 @@
+from .helpers import Call
+from .encoding import (IS_HONOR, IS_YAOCHU, NUM_TILE_KINDS, SUIT_OF, TILE_IDS, TILE_NAMES, YAOCHU_IDS, EncodedHand,
+                       split_tiles)
+from .shanten import combine_block_values, honor_block_values, suit_block_values
+
+# 打牌候補の評価(牌効率)
+# 14枚の手牌について、打牌ごとに打牌後の向聴数と受け入れ(向聴数が進む牌の種類と残り枚数)を求める.
+# 向聴数は色ごとの評価値(shanten.py)を保持しておき、打牌・ツモで変わった色だけを引き直す.
+
+
+def _part_values(counts: list[int], suit: int):
+    """色(0:萬子, 1:筒子, 2:索子, 3:字牌)ごとのブロックの評価値を求める関数."""
+    if suit == 3:
+        return honor_block_values(counts[27:])
+    return suit_block_values(counts[suit * 9:suit * 9 + 9])
+
+
+class _FormCounter:
+    """
+    七対子・国士無双の向聴数を、1枚ずつの増減に合わせて差分で更新するクラス.
+    対子の数・牌の種類数・么九牌の種類数・么九牌の対子の数を保持する.
+    """
+    def __init__(self, counts: list[int]):
+        self.counts = counts
+        self.pairs = sum(1 for c in counts if c >= 2)
+        self.kinds = sum(1 for c in counts if c)
+        self.yaochu_kinds = sum(1 for i in YAOCHU_IDS if counts[i])
+        self.yaochu_pairs = sum(1 for i in YAOCHU_IDS if counts[i] >= 2)
+
+    def add(self, tile: int, delta: int) -> None:
+        """牌を delta 枚(1 または -1)増減させる."""
+        before = self.counts[tile]
+        after = before + delta
+        self.counts[tile] = after
+        kind_change = (after > 0) - (before > 0)
+        pair_change = (after >= 2) - (before >= 2)
+        self.kinds += kind_change
+        self.pairs += pair_change
+        if IS_YAOCHU[tile]:
+            self.yaochu_kinds += kind_change
+            self.yaochu_pairs += pair_change
+
+    def shanten(self) -> int:
+        """七対子と国士無双のうち小さい方の向聴数."""
+        chiitoitsu = 6 - self.pairs + max(0, 7 - self.kinds)
+        kokushi = 13 - self.yaochu_kinds - (1 if self.yaochu_pairs else 0)
+        return min(chiitoitsu, kokushi)
+
+
+def _shanten(forms: _FormCounter, values: list, num_called: int) -> int:
+    """色ごとの評価値から、通常形・七対子・国士無双のうち最小の向聴数を求める関数."""
+    result = combine_block_values(values, num_called)
+    if num_called == 0:
+        result = min(result, forms.shanten())
+    return result
+
+
+def _draw_candidates(forms: _FormCounter, num_called: int) -> list[int]:
+    """
+    ツモで向聴数が進む可能性がある牌のIDを返す関数.
+    通常形は手牌の牌か、同じ色で2つ以内の距離にある牌. 七対子は手牌の牌
+    (牌の種類が7種類未満の場合は全ての牌). 国士無双は么九牌.
+    """
+    counts = forms.counts
+    if num_called == 0 and forms.kinds < 7:
+        return list(range(NUM_TILE_KINDS))
+    candidates = set()
+    for i in range(NUM_TILE_KINDS):
+        if not counts[i]:
+            continue
+        if IS_HONOR[i]:
+            candidates.add(i)
+            continue
+        for j in range(i - 2, i + 3):
+            if 0 <= j < 27 and SUIT_OF[j] == SUIT_OF[i]:
+                candidates.add(j)
+    if num_called == 0:
+        candidates.update(YAOCHU_IDS)
+    return sorted(candidates)
+
+
+def recommend_discards(hand: list[str], called_mentsu: list[Call] | None = None,
+                       dora_indicators=None, visible_tiles=None) -> list[dict]:
+    """
+    14枚の手牌について、打牌候補ごとの向聴数と受け入れを求める関数.
+
+    Args:
+        hand (list[str])          : 14枚の手牌のリスト (鳴き面子の牌を含んでいてもよい).
+        called_mentsu (list[Call]): 鳴きの面子リスト.
+        dora_indicators           : ドラ表示牌 (リストまたはカンマ区切りの文字列).
+        visible_tiles             : その他の見えている牌 (河の牌など. リストまたはカンマ区切りの文字列).
+
+    Returns:
+        list[dict]: 打牌候補ごとの辞書のリスト. 向聴数が小さく、受け入れ枚数が多い順.
+            - discard (str)       : 打牌する牌 (赤ドラは通常の5として扱う).
+            - shanten (int)       : 打牌後の向聴数.
+            - ukeire (list[dict]) : 向聴数が進む牌ごとの {"tile": 牌, "remaining": 残り枚数}.
+                                    残り枚数が0の牌は含めない.
+            - ukeire_count (int)  : 受け入れ枚数の合計.
+
+    Raises:
+        ValueError: 牌の文字列が不正な場合や、手牌の枚数が14枚でない場合.
+    """
+    called_mentsu = called_mentsu or []
+    encoded = EncodedHand(hand, [m.tiles for m in called_mentsu], "")
+    counts = encoded.closed_counts[:]
+    num_called = len(called_mentsu)
+    if num_called > 4 or sum(counts) + 3 * num_called != 14:
+        raise ValueError(f"打牌候補は14枚の手牌で求めます: {len(hand)}枚")
+
+    # 見えている牌を数え、残り枚数を求める.
+    seen = counts[:]
+    for tiles in encoded.called:
+        for i in tiles:
+            seen[i] += 1
+    for tile in split_tiles(dora_indicators) + split_tiles(visible_tiles):
+        if tile not in TILE_IDS:
+            raise ValueError(f"不正な牌です: {tile}")
+        seen[TILE_IDS[tile]] += 1
+    remaining = [max(0, 4 - c) for c in seen]
+
+    # 14枚の手牌の色ごとの評価値. 打牌・ツモでは変わった色だけを引き直す.
+    values = [_part_values(counts, suit) for suit in range(4)]
+    forms = _FormCounter(counts)
+    results = []
+    for discard in range(NUM_TILE_KINDS):
+        if not counts[discard]:
+            continue
+        discard_suit = SUIT_OF[discard]
+        forms.add(discard, -1)
+        discard_values = values[:]
+        discard_values[discard_suit] = _part_values(counts, discard_suit)
+        shanten = _shanten(forms, discard_values, num_called)
+
+        ukeire = []
+        for draw in _draw_candidates(forms, num_called):
+            if not remaining[draw]:
+                continue
+            draw_suit = SUIT_OF[draw]
+            forms.add(draw, 1)
+            draw_values = discard_values[:]
+            draw_values[draw_suit] = _part_values(counts, draw_suit)
+            if _shanten(forms, draw_values, num_called) < shanten:
+                ukeire.append({"tile": TILE_NAMES[draw], "remaining": remaining[draw]})
+            forms.add(draw, -1)
+        forms.add(discard, 1)
+
+        results.append({
+            "discard": TILE_NAMES[discard],
+            "shanten": shanten,
+            "ukeire": ukeire,
+            "ukeire_count": sum(u["remaining"] for u in ukeire),
+        })
+    results.sort(key=lambda r: (r["shanten"], -r["ukeire_count"]))
+    return results
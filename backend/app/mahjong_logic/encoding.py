@@ -0,0 +1,179 @@
+# 牌の内部表現（整数エンコーディング）
+# 牌の種類を 0-33 の整数ID で表し、手牌は長さ34の枚数配列で表す.
+#   0-8  : 1m-9m (萬子)
+#   9-17 : 1p-9p (筒子)
+#   18-26: 1s-9s (索子)
+#   27-33: 1z-7z (東南西北白發中)
+# 赤ドラ(5mr, 5pr, 5sr)は通常の5と同じIDとし、赤の枚数は色ごとに別に数える.
+
+NUM_TILE_KINDS = 34
+NUM_SUITS = 3
+SUIT_CHARS = 'mpsz'
+
+# ID -> 牌の文字列.
+TILE_NAMES = tuple(f'{n}{s}' for s in 'mps' for n in range(1, 10)) + tuple(f'{n}z' for n in range(1, 8))
+# 赤ドラのID (5m, 5p, 5s).
+RED_FIVE_IDS = (4, 13, 22)
+RED_FIVE_NAMES = ('5mr', '5pr', '5sr')
+
+# 牌の文字列 -> ID (赤ドラも含む).
+TILE_IDS = {name: i for i, name in enumerate(TILE_NAMES)}
+TILE_IDS.update({name: tile_id for name, tile_id in zip(RED_FIVE_NAMES, RED_FIVE_IDS)})
+
+# IDごとの属性テーブル.
+SUIT_OF = tuple(i // 9 for i in range(NUM_TILE_KINDS))            # 0:m, 1:p, 2:s, 3:z
+NUMBER_OF = tuple(i % 9 + 1 if i < 27 else i - 26 for i in range(NUM_TILE_KINDS))
+IS_HONOR = tuple(i >= 27 for i in range(NUM_TILE_KINDS))
+IS_TERMINAL = tuple(i < 27 and i % 9 in (0, 8) for i in range(NUM_TILE_KINDS))
+IS_YAOCHU = tuple(IS_HONOR[i] or IS_TERMINAL[i] for i in range(NUM_TILE_KINDS))
+YAOCHU_IDS = tuple(i for i in range(NUM_TILE_KINDS) if IS_YAOCHU[i])
+# 順子の先頭になれるか (数牌の1-7).
+CAN_START_SHUNTSU = tuple(i < 27 and i % 9 <= 6 for i in range(NUM_TILE_KINDS))
+
+
+def _next_tile_id(i: int) -> int:
+    """
+    ドラ表示牌のIDからドラのIDを求める関数.
+
+    Args:
+        i (int): ドラ表示牌のID.
+
+    Returns:
+        int: ドラのID.
+    """
+    if i < 27:
+        return i // 9 * 9 + (i % 9 + 1) % 9
+    if i <= 30:  # 風牌: 東->南->西->北->東
+        return 27 + (i - 27 + 1) % 4
+    return 31 + (i - 31 + 1) % 3  # 三元牌: 白->發->中->白
+
+
+DORA_OF = tuple(_next_tile_id(i) for i in range(NUM_TILE_KINDS))
+
+
+def tile_id(tile: str) -> int:
+    """
+    牌の文字列をIDに変換する関数.
+
+    Args:
+        tile (str): 牌の文字列 (例: "1m", "5pr", "7z")
+
+    Returns:
+        int: 牌のID (0-33).
+
+    Raises:
+        ValueError: 牌の文字列として不正な場合.
+    """
+    try:
+        return TILE_IDS[tile]
+    except (KeyError, TypeError):
+        raise ValueError(f"不正な牌です: {tile}") from None
+
+
+def is_red(tile: str) -> bool:
+    """
+    牌が赤ドラかどうかを判定する関数.
+
+    Args:
+        tile (str): 牌の文字列 (例: "5mr")
+
+    Returns:
+        bool: 赤ドラならTrue.
+    """
+    return tile in RED_FIVE_NAMES
+
+
+def to_counts(tiles: list[str]) -> tuple[list[int], list[int]]:
+    """
+    牌の文字列リストを枚数配列に変換する関数.
+
+    Args:
+        tiles (list[str]): 牌の文字列リスト.
+
+    Returns:
+        tuple[list[int], list[int]]: 長さ34の枚数配列と、色ごと(m, p, s)の赤ドラの枚数.
+    """
+    counts = [0] * NUM_TILE_KINDS
+    red_counts = [0] * NUM_SUITS
+    for tile in tiles:
+        i = tile_id(tile)
+        counts[i] += 1
+        if tile in RED_FIVE_NAMES:
+            red_counts[SUIT_OF[i]] += 1
+    return counts, red_counts
+
+
+def from_counts(counts: list[int]) -> list[str]:
+    """
+    枚数配列を牌の文字列リスト(ソート済み、赤ドラなし)に変換する関数.
+
+    Args:
+        counts (list[int]): 長さ34の枚数配列.
+
+    Returns:
+        list[str]: 牌の文字列リスト.
+    """
+    return [TILE_NAMES[i] for i in range(NUM_TILE_KINDS) for _ in range(counts[i])]
+
+
+class EncodedHand:
+    """
+    点数計算の入口で一度だけ作成する、手牌の内部表現.
+
+    Attributes:
+        counts (list[int])           : 手牌全体の枚数配列.
+        red_counts (list[int])       : 手牌に含まれる色ごとの赤ドラの枚数.
+        closed_counts (list[int])    : 鳴き面子を除いた門前部分の枚数配列.
+        closed_red_counts (list[int]): 門前部分に含まれる色ごとの赤ドラの枚数.
+        called_red_counts (list[int]): 鳴き面子に含まれる色ごとの赤ドラの枚数.
+        called (list[tuple[int, ...]]): 鳴き面子ごとの牌IDのタプル.
+        agari_id (int)               : アガリ牌のID (不明な場合は-1).
+    """
+    __slots__ = ('counts', 'red_counts', 'closed_counts', 'closed_red_counts', 'called_red_counts', 'called',
+                 'agari_id')
+
+    def __init__(self, hand: list[str], called_tiles: list[list[str]], agari_hai: str):
+        """
+        手牌をエンコードする.
+
+        Args:
+            hand (list[str])              : 手牌のリスト (鳴き面子の牌を含んでいてもよい).
+            called_tiles (list[list[str]]): 鳴き面子ごとの牌のリスト.
+            agari_hai (str)               : アガリ牌の文字列.
+        """
+        self.counts, self.red_counts = to_counts(hand)
+        self.called = [tuple(tile_id(t) for t in tiles) for tiles in called_tiles]
+        # 手牌に鳴き面子の牌が含まれていない場合もあるため、0未満にはしない.
+        self.closed_counts = self.counts[:]
+        for tiles in self.called:
+            for i in tiles:
+                if self.closed_counts[i] > 0:
+                    self.closed_counts[i] -= 1
+        self.closed_red_counts = self.red_counts[:]
+        self.called_red_counts = [0] * NUM_SUITS
+        for tiles in called_tiles:
+            for t in tiles:
+                if t in RED_FIVE_NAMES:
+                    suit = SUIT_OF[TILE_IDS[t]]
+                    self.called_red_counts[suit] += 1
+                    if self.closed_red_counts[suit] > 0:
+                        self.closed_red_counts[suit] -= 1
+        self.agari_id = TILE_IDS.get(agari_hai, -1)
+
+
+def split_tiles(tiles) -> list[str]:
+    """
+    牌のリスト、またはカンマ区切りの文字列を牌のリストに変換する関数.
+    ドラ表示牌などの入力形式は、ここで統一する.
+
+    Args:
+        tiles (list[str] | str | None): 牌のリスト、またはカンマ区切りの文字列.
+
+    Returns:
+        list[str]: 前後の空白を除いた牌の文字列のリスト (空の要素は除く).
+    """
+    if not tiles:
+        return []
+    if isinstance(tiles, str):
+        tiles = tiles.split(',')
+    return [t.strip() for t in tiles if t and t.strip()]
@@ -0,0 +1,150 @@
+from typing import NamedTuple
+
+from .helpers import Tile, Call
+
+# 和了パターンごとの特徴量
+# 役判定(yaku.py)と符計算(fu.py)が共通して使う、面子の分類・手牌の集計を
+# パターンごとに一度だけ求めて保持する. HandAnalysisが各パターンに "features" として付ける.
+
+YAOCHUHAI = frozenset(["1m", "9m", "1p", "9p", "1s", "9s", "1z", "2z", "3z", "4z", "5z", "6z", "7z"])
+TERMINALS = frozenset(["1m", "9m", "1p", "9p", "1s", "9s"])
+GREEN_TILES = frozenset(["2s", "3s", "4s", "6s", "8s", "9s", "6z"])
+# 色ごとのビット (suit_mask).
+SUIT_BITS = {'m': 1, 'p': 2, 's': 4, 'z': 8}
+
+
+class MeldFeatures(NamedTuple):
+    """順子以外の面子(刻子・槓子)の特徴量."""
+    tile: str          # 面子の先頭の牌.
+    is_kotsu: bool     # 同じ牌だけでできているか.
+    is_kantsu: bool    # 4枚の面子か.
+    is_open: bool      # 鳴いた面子か.
+    has_agari: bool    # 和了牌を含むか.
+
+
+class HandFeatures(NamedTuple):
+    """
+    1つの和了パターン(解釈)の特徴量. 和了パターンとアガリ牌だけで決まり、
+    ツモ・ロンなどのゲームの状況によらない.
+    """
+    hand: tuple[str, ...]                  # 雀頭2枚と面子の牌を並べた手牌.
+    shuntsu: tuple[tuple[str, ...], ...]   # 順子 (牌の順に並べたもの).
+    shuntsu_counts: tuple[int, ...]        # 同じ順子ごとの個数 (順子が2つ以上ある場合).
+    kotsu: tuple[str, ...]                 # 刻子・槓子の牌.
+    kantsu: tuple[str, ...]                # 4種類の牌でできた面子の牌.
+    melds: tuple[MeldFeatures, ...]        # 順子以外の面子.
+    num_kan: int                           # 4枚の面子の数.
+    all_mentsu_yaochu: bool                # 全ての面子に么九牌が含まれるか.
+    suit_mask: int                         # 手牌に含まれる色のビット (SUIT_BITS).
+    num_tiles: int                         # 手牌の枚数.
+    num_honors: int                        # 字牌の枚数.
+    num_terminals: int                     # 老頭牌(数牌の1と9)の枚数.
+    num_green: int                         # 緑一色に使える牌の枚数.
+    agari_hai: str | None                  # 和了牌.
+
+
+def hand_of(analysis: dict) -> list[str]:
+    """
+    和了パターンから、雀頭2枚と面子の牌を並べた手牌を作る関数.
+    七対子・国士無双は面子のリストをそのまま手牌とする.
+
+    Args:
+        analysis (dict): 和了パターン.
+
+    Returns:
+        list[str]: 手牌のリスト.
+    """
+    mentsu_list = analysis.get("mentsu", [])
+    if analysis.get("type") in ("chitoitsu", "kokushi"):
+        return mentsu_list
+    janto = analysis.get("janto")
+    hand = [janto, janto]
+    for mentsu in mentsu_list:
+        hand.extend(mentsu)
+    return hand
+
+
+def build_features(analysis: dict, called_mentsu: list[Call], agari_hai: str | None,
+                   hand: list[str] | None = None) -> HandFeatures:
+    """
+    和了パターンの特徴量を求める関数.
+    面子は赤ドラを通常の牌に直してから分類する. 赤ドラは面子の形に関わらない.
+
+    Args:
+        analysis (dict)           : 和了パターン (HandAnalysisの解析結果と同じ形式).
+        called_mentsu (list[Call]): 鳴きの面子リスト.
+        agari_hai (str | None)    : 和了牌.
+        hand (list[str] | None)   : 手牌. 省略した場合は和了パターンから作る.
+
+    Returns:
+        HandFeatures: 和了パターンの特徴量.
+    """
+    if hand is None:
+        hand = hand_of(analysis)
+
+    shuntsu = []
+    kotsu = []
+    kantsu = []
+    melds = []
+    num_kan = 0
+    all_mentsu_yaochu = True
+    # 七対子・国士無双は面子を持たない.
+    if analysis.get("type") not in ("chitoitsu", "kokushi"):
+        called_tuples = {tuple(m.tiles) for m in called_mentsu}
+        normal_agari = Tile.to_normal(agari_hai) if agari_hai else agari_hai
+        for mentsu in analysis.get("mentsu", []):
+            tiles = [Tile.to_normal(tile) for tile in mentsu]
+            kinds = len(set(tiles))
+            if len(mentsu) == 4:
+                num_kan += 1
+            if all_mentsu_yaochu and not any(tile in YAOCHUHAI for tile in tiles):
+                all_mentsu_yaochu = False
+            if kinds == 3:
+                shuntsu.append(tuple(sorted(tiles, key=Tile.sort_key)))
+                continue
+            if kinds == 1:
+                kotsu.append(tiles[0])
+            elif kinds == 4:
+                kantsu.append(tiles[0])
+            melds.append(MeldFeatures(
+                tile=tiles[0],
+                is_kotsu=kinds == 1,
+                is_kantsu=len(mentsu) == 4,
+                # 鳴き面子は Call.tiles のまま比べる.
+                is_open=tuple(sorted(mentsu, key=Tile.sort_key)) in called_tuples,
+                has_agari=normal_agari in tiles,
+            ))
+
+    shuntsu_counts = {}
+    if len(shuntsu) >= 2:
+        for s in shuntsu:
+            shuntsu_counts[s] = shuntsu_counts.get(s, 0) + 1
+
+    suit_mask = 0
+    num_honors = num_terminals = num_green = 0
+    for tile in hand:
+        suit = tile[1]
+        suit_mask |= SUIT_BITS.get(suit, 0)
+        if suit == 'z':
+            num_honors += 1
+        elif tile in TERMINALS:
+            num_terminals += 1
+        if tile in GREEN_TILES:
+            num_green += 1
+
+    return HandFeatures(
+        hand=tuple(hand),
+        shuntsu=tuple(shuntsu),
+        shuntsu_counts=tuple(shuntsu_counts.values()),
+        kotsu=tuple(kotsu),
+        kantsu=tuple(kantsu),
+        melds=tuple(melds),
+        num_kan=num_kan,
+        all_mentsu_yaochu=all_mentsu_yaochu,
+        suit_mask=suit_mask,
+        num_tiles=len(hand),
+        num_honors=num_honors,
+        num_terminals=num_terminals,
+        num_green=num_green,
+        agari_hai=agari_hai,
+    )
@@ -1,8 +1,9 @@
 from .helpers import Tile, Call
+from .features import HandFeatures, build_features
 
 # SANGENPAIはヘルパー側にあるかもしれませんが、念のためここに定義
 SANGENPAI = {"5z", "6z", "7z"}
-YAKUMAN_LIST = ["国士無双", "四暗刻", "大三元", "緑一色", "字一色", "清老頭", "九蓮宝燈", "四槓子", "天和", "地和"]
+YAKUMAN_LIST = ["国士無双", "国士無双13面待ち", "四暗刻", "大三元", "緑一色", "字一色", "清老頭", "九蓮宝燈", "四槓子", "天和", "地和"]
 
 class FuCalculator:
     """
@@ -64,41 +65,32 @@ class FuCalculator:
     def _get_mentsu_fu(self) -> int:
         """面子（メンツ）に付く符を計算する。"""
         mentsu_fu = 0
-        agari_hai = self.game_state.get("agari_hai")
         is_tsumo = self.game_state.get("is_tsumo", False)
-        
-        # 鳴き面子の情報を比較しやすいようにタプルのセットに変換
-        called_mentsu_tuples = {tuple(m.tiles) for m in self.called_mentsu}
-
-        for meld in self.analysis.get("mentsu", []):
-            # 順子の符は0
-            if len(set(meld)) == 3:
-                continue
-
-            base = 0
-            is_yaochu = Tile.is_yaochu(meld[0])
-            
-            # 槓子か刻子かを判定
-            is_kantsu = len(meld) == 4
-            
-            # 鳴いているか（明刻/明槓）どうかを判定
-            is_open = tuple(sorted(meld, key=Tile.sort_key)) in called_mentsu_tuples
 
+        # 順子の符は0のため、刻子・槓子だけを見る。
+        for meld in self._get_features().melds:
             # ロンで完成した刻子は明刻扱い
-            is_ron_kotsu = not is_tsumo and (agari_hai in meld)
+            is_ron_kotsu = not is_tsumo and meld.has_agari
             
-            if is_kantsu:
-                base = 8 if is_open else 16 # 明槓:8, 暗槓:16
+            if meld.is_kantsu:
+                base = 8 if meld.is_open else 16 # 明槓:8, 暗槓:16
             else: # 刻子
-                base = 2 if (is_open or is_ron_kotsu) else 4 # 明刻:2, 暗刻:4
+                base = 2 if (meld.is_open or is_ron_kotsu) else 4 # 明刻:2, 暗刻:4
 
-            if is_yaochu:
+            if Tile.is_yaochu(meld.tile):
                 base *= 2
             
             mentsu_fu += base
             
         return mentsu_fu
 
+    def _get_features(self) -> HandFeatures:
+        """和了パターンの特徴量。HandAnalysisの解析結果に付いていない場合はここで求める。"""
+        features = self.analysis.get("features")
+        if features is None:
+            features = build_features(self.analysis, self.called_mentsu, self.game_state.get("agari_hai"))
+        return features
+
     def _get_janto_fu(self) -> int:
         """雀頭（ジャントウ）に付く符を計算する。"""
         janto_tile = self.analysis.get("janto")
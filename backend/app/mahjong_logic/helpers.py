@@ -1,3 +1,5 @@
+from .encoding import DORA_OF, NUMBER_OF, SUIT_OF, TILE_IDS, TILE_NAMES
+
 # 牌の定義
 # 萬子: 1m-9m, 筒子: 1p-9p, 索子: 1s-9s, 字牌: 1z-7z (東南西北白發中)
 # 赤ドラ: 5mr, 5pr, 5sr
@@ -11,6 +13,11 @@ ALL_TILES = sum(TILES.values(), [])
 YAOCHUHAI = {"1m", "9m", "1p", "9p", "1s", "9s", "1z", "2z", "3z", "4z", "5z", "6z", "7z"}
 SANGENPAI = {"5z", "6z", "7z"}
 
+# 文字列APIは内部表現(encoding)への薄いアダプタとして、結果を事前計算しておく.
+_SORT_KEYS = {tile: (SUIT_OF[i] * 10 + NUMBER_OF[i]) for tile, i in TILE_IDS.items()}
+_NORMAL_NAMES = {tile: TILE_NAMES[i] for tile, i in TILE_IDS.items()}
+_NEXT_TILES = {tile: TILE_NAMES[DORA_OF[i]] for tile, i in TILE_IDS.items()}
+
 class Tile:
     """牌の情報を扱うヘルパークラス"""
     @staticmethod
@@ -24,6 +31,9 @@ class Tile:
         Returns:
             int: ソート用の整数値.
         """
+        sort_key = _SORT_KEYS.get(tile)
+        if sort_key is not None:
+            return sort_key
         _tile = tile.replace('r', '')
         suit = 'mpsz'.index(_tile[-1])
         num = int(_tile[:-1])
@@ -40,6 +50,9 @@ class Tile:
         Returns:
             str: 通常の形式の牌 (例: "5m", "1p")
         """
+        normal = _NORMAL_NAMES.get(tile)
+        if normal is not None:
+            return normal
         return tile.replace('r', '')
     
     @staticmethod
@@ -54,7 +67,8 @@ class Tile:
         Returns:
             bool: 牌が幺九牌ならTrue、そうでなければFalse.
         """
-        return Tile.to_normal(tile) in YAOCHUHAI
+        # 赤ドラは幺九牌ではないため、正規化せずにそのまま判定できる.
+        return tile in YAOCHUHAI
     
     @staticmethod
     def is_jihai(tile: str) -> bool:
@@ -80,23 +94,7 @@ class Tile:
         Returns:
             str: ドラ牌の文字列 (例: "6m", "6pr", "6sr")
         """
-        tile = Tile.to_normal(tile)
-        if not tile in ALL_TILES:
-            return None
-        # 牌の種類と数字を分解
-        suit = tile[-1]       # 最後の文字が牌の種類 (m, p, s, z)
-        num = int(tile[:-1])  # 数字部分を整数に変換
-        
-        # 萬子、筒子、索子の処理.
-        if suit in 'mps':
-            return f"{num % 9 + 1}{suit}"
-        # 字牌の処理.
-        if suit == 'z':
-            if 1 <= num <= 3: return f"{num + 1}z"
-            if num == 4: return "1z"
-            if 5 <= num <= 6: return f"{num + 1}z"
-            if num == 7: return "5z"
-        return None
+        return _NEXT_TILES.get(tile)
 
 
 class Call:
@@ -0,0 +1,234 @@
+# 点数の支払い表
+# 翻数・符・親か・ツモかの組み合わせごとの支払いを事前計算しておき、点数計算では表を引くだけにする.
+# 翻数は1から13(13以上は役満), 符は20から110. 満貫以上は符によらないため、符を0として持つ.
+# 本場(1本につき300点)と供託(1本につき1000点)は、表の支払いに加算して求める.
+# 切り上げ満貫(4翻30符・3翻60符を満貫とする)の有無で別の表を持つ.
+#
+# 表はJSONに書き出せる (フロントエンドの点数早見表に用いる).
+
+import json
+from types import MappingProxyType
+from typing import NamedTuple
+
+# 表に含める翻数・符.
+MAX_HAN = 13
+MANGAN_HAN = 5
+FU_VALUES = (20, 25, 30, 40, 50, 60, 70, 80, 90, 100, 110)
+# 本場・供託1本あたりの点数.
+HONBA_POINTS = 300
+KYOUTAKU_POINTS = 1000
+
+
+def _round_up(points: int) -> int:
+    """100点未満を切り上げる."""
+    return -(-points // 100) * 100
+
+
+def get_base_points(han: int, fu: int, kiriage: bool = False) -> tuple[int, str]:
+    """
+    翻数と符から基本点と点数の名前を求める関数.
+
+    Args:
+        han (int)     : 翻数 (1以上).
+        fu (int)      : 符.
+        kiriage (bool): 切り上げ満貫を採用するか.
+
+    Returns:
+        tuple[int, str]: 基本点と点数の名前 (満貫未満は空文字列) のタプル.
+    """
+    if han >= 13:
+        return 8000, "役満"
+    if han >= 11:
+        return 6000, "三倍満"
+    if han >= 8:
+        return 4000, "倍満"
+    if han >= 6:
+        return 3000, "跳満"
+    if han >= 5 or (han == 4 and fu >= 40) or (han == 3 and fu >= 70):
+        return 2000, "満貫"
+    if kiriage and ((han == 4 and fu == 30) or (han == 3 and fu == 60)):
+        return 2000, "満貫"
+    return min(fu * 2 ** (han + 2), 2000), ""
+
+
+class Payment(NamedTuple):
+    """
+    1つの和了の支払い (本場・供託を含まない).
+
+    Attributes:
+        score_name (str): 点数の名前 (満貫未満は空文字列).
+        base_points (int): 基本点.
+        is_oya (bool)   : 親の和了か.
+        is_tsumo (bool) : ツモか.
+        ron (int)       : ロンの支払い (ツモの場合は0).
+        from_oya (int)  : 子のツモで親が支払う点数 (それ以外は0).
+        per_ko (int)    : ツモで子が1人あたり支払う点数 (ロンの場合は0).
+    """
+    score_name: str
+    base_points: int
+    is_oya: bool
+    is_tsumo: bool
+    ron: int
+    from_oya: int
+    per_ko: int
+
+    def details(self, honba: int = 0, kyoutaku: int = 0) -> dict:
+        """
+        本場・供託を加えた支払いの辞書を返す関数.
+        MahjongScorer.calculate の "score" と同じ形式で、本場・供託がある場合はその本数も含める.
+
+        Args:
+            honba (int)   : 本場の数.
+            kyoutaku (int): 供託のリーチ棒の数.
+
+        Returns:
+            dict: 支払いの辞書.
+        """
+        bonus = kyoutaku * KYOUTAKU_POINTS
+        if not self.is_tsumo:
+            ron = self.ron + honba * HONBA_POINTS
+            result = {"total": ron + bonus, "payment_from_ron": ron}
+        elif self.is_oya:
+            per_ko = self.per_ko + honba * HONBA_POINTS // 3
+            result = {"total": per_ko * 3 + bonus, "payment_per_ko": per_ko}
+        else:
+            from_oya = self.from_oya + honba * HONBA_POINTS // 3
+            per_ko = self.per_ko + honba * HONBA_POINTS // 3
+            result = {"total": from_oya + per_ko * 2 + bonus, "payment_from_oya": from_oya, "payment_per_ko": per_ko}
+        if honba:
+            result["honba"] = honba
+        if kyoutaku:
+            result["kyoutaku"] = kyoutaku
+        return result
+
+
+def make_payment(han: int, fu: int, is_oya: bool, is_tsumo: bool, kiriage: bool = False) -> Payment:
+    """
+    支払いを計算する関数. 支払い表を作る場合と、表にない符の場合に用いる.
+
+    Args:
+        han (int)      : 翻数 (1以上).
+        fu (int)       : 符.
+        is_oya (bool)  : 親の和了か.
+        is_tsumo (bool): ツモか.
+        kiriage (bool) : 切り上げ満貫を採用するか.
+
+    Returns:
+        Payment: 支払い.
+    """
+    base_points, score_name = get_base_points(han, fu, kiriage)
+    if not is_tsumo:
+        ron = _round_up(base_points * (6 if is_oya else 4))
+        return Payment(score_name, base_points, is_oya, False, ron, 0, 0)
+    if is_oya:
+        return Payment(score_name, base_points, True, True, 0, 0, _round_up(base_points * 2))
+    return Payment(score_name, base_points, False, True, 0, _round_up(base_points * 2), _round_up(base_points))
+
+
+class PaymentTable:
+    """
+    事前計算した支払い表. 作成後は変更できない.
+
+    Attributes:
+        kiriage (bool): 切り上げ満貫を採用した表か.
+    """
+    __slots__ = ("kiriage", "_payments")
+
+    def __init__(self, kiriage: bool = False):
+        payments = {}
+        for han in range(1, MAX_HAN + 1):
+            # 満貫以上は符によらないため、符を0として1つだけ持つ.
+            for fu in (FU_VALUES if han < MANGAN_HAN else (0,)):
+                for is_oya in (False, True):
+                    for is_tsumo in (False, True):
+                        payments[han, fu, is_oya, is_tsumo] = make_payment(han, fu, is_oya, is_tsumo, kiriage)
+        object.__setattr__(self, "kiriage", kiriage)
+        object.__setattr__(self, "_payments", MappingProxyType(payments))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("PaymentTable は変更できません.")
+
+    def lookup(self, han: int, fu: int, is_oya: bool, is_tsumo: bool) -> Payment:
+        """
+        支払いを表から引く関数.
+
+        Args:
+            han (int)      : 翻数 (1以上. 13以上は役満).
+            fu (int)       : 符.
+            is_oya (bool)  : 親の和了か.
+            is_tsumo (bool): ツモか.
+
+        Returns:
+            Payment: 支払い.
+        """
+        if han >= MANGAN_HAN:
+            fu = 0
+        payment = self._payments.get((min(han, MAX_HAN), fu, bool(is_oya), bool(is_tsumo)))
+        if payment is None:
+            # 表にない符 (110符を超える場合など) は、その場で計算する.
+            payment = make_payment(han, fu, bool(is_oya), bool(is_tsumo), self.kiriage)
+        return payment
+
+    def to_dict(self) -> dict:
+        """
+        点数早見表としてJSONに書き出せる辞書を返す関数.
+
+        Returns:
+            dict: {"kiriage": 切り上げ満貫か, "fu": 符のリスト, "rows": 翻数・符ごとの行のリスト}.
+                  行は han, fu (満貫以上は0), score_name と、子・親のロン・ツモの支払いを持つ.
+        """
+        rows = []
+        for (han, fu, is_oya, is_tsumo), payment in self._payments.items():
+            if is_oya or is_tsumo:
+                continue
+            ko_tsumo = self._payments[han, fu, False, True]
+            rows.append({
+                "han": han,
+                "fu": fu,
+                "score_name": payment.score_name,
+                "ko_ron": payment.ron,
+                "ko_tsumo": {"payment_from_oya": ko_tsumo.from_oya, "payment_per_ko": ko_tsumo.per_ko},
+                "oya_ron": self._payments[han, fu, True, False].ron,
+                "oya_tsumo": {"payment_per_ko": self._payments[han, fu, True, True].per_ko},
+            })
+        return {"kiriage": self.kiriage, "fu": list(FU_VALUES), "rows": rows}
+
+    def to_json(self) -> str:
+        """点数早見表をJSON文字列で返す関数."""
+        return json.dumps(self.to_dict(), ensure_ascii=False)
+
+
+# 切り上げ満貫の有無ごとの支払い表. 表は小さいため、読み込み時に作っておく.
+PAYMENT_TABLES = MappingProxyType({kiriage: PaymentTable(kiriage) for kiriage in (False, True)})
+
+
+def get_payment_table(kiriage: bool = False) -> PaymentTable:
+    """
+    支払い表を返す関数.
+
+    Args:
+        kiriage (bool): 切り上げ満貫を採用するか.
+
+    Returns:
+        PaymentTable: 支払い表.
+    """
+    return PAYMENT_TABLES[bool(kiriage)]
+
+
+def get_final_score(han: int, fu: int, game_state: dict) -> tuple[dict, str]:
+    """
+    翻数と符から、ゲームの状況に応じた支払いと点数の名前を求める関数.
+
+    Args:
+        han (int)        : 翻数.
+        fu (int)         : 符.
+        game_state (dict): ゲームの状況 (is_oya, is_tsumo, honba, kyoutaku, kiriage を参照する).
+
+    Returns:
+        tuple[dict, str]: 支払いの辞書と点数の名前のタプル.
+    """
+    if han == 0:
+        return {"total": 0, "oya": 0, "ko": 0}, ""
+    payment = get_payment_table(game_state.get("kiriage", False)).lookup(
+        han, fu, game_state.get("is_oya", False), game_state.get("is_tsumo", False))
+    return payment.details(game_state.get("honba", 0), game_state.get("kyoutaku", 0)), payment.score_name
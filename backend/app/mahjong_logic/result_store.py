@@ -0,0 +1,270 @@
+# 点数計算結果の永続ストア
+# MahjongScorer.calculate の結果を、ローカルのSQLiteファイルに保存して使い回す.
+# ファイルはWALモードで開くため、複数のワーカー(プロセス)が同じファイルを同時に読み書きできる.
+# 書き込みはキューに積み、バックグラウンドのスレッドがまとめて書き込む.
+# 読み込みは、まだ書き込まれていない結果を先に探し、なければデータベースを引く.
+#
+# キー: 正規化キー (canonical.py) と、点数計算に関わるゲームの状況・鳴きの種類・ドラの枚数.
+# 色を入れ替えただけの手牌は同じキーになる (結果は役名・翻数・符・点数だけで、牌を含まない).
+# 役の登録表や点数計算の規則が変わると RULESET_VERSION が変わり、古い結果はストアを開いたときに消す.
+
+import hashlib
+import json
+import os
+import queue
+import sqlite3
+import threading
+
+from .canonical import TO_CANONICAL, canonical_key, to_canonical_name
+from .dora import DoraCount
+from .encoding import EncodedHand
+from .payments import FU_VALUES, HONBA_POINTS, KYOUTAKU_POINTS
+from .yaku import YAKU_REGISTRY
+
+# 点数計算の規則や結果の形式を変えた場合に上げる.
+SCORER_VERSION = 3
+
+# 点数計算の結果に関わるゲームの状況のキー. ドラの表示牌は、数えたドラの枚数としてキーに含める.
+SCORING_STATE_KEYS = (
+    'is_tsumo', 'is_oya', 'is_menzen', 'is_riichi', 'is_ippatsu', 'is_double_riichi', 'is_chankan',
+    'is_rinshan', 'is_haitei', 'is_houtei', 'is_tenhou', 'is_chiihou',
+    'bakaze', 'jikaze', 'honba', 'kyoutaku', 'kiriage', 'enabled_local_yaku', 'disabled_yaku',
+)
+# 牌の文字列を値に持つキー (正規の順序に並べ替える).
+_TILE_STATE_KEYS = ('agari_hai', 'bakaze', 'jikaze')
+
+
+def _ruleset_version() -> str:
+    """役の登録表・支払いの定数・SCORER_VERSION から、規則のバージョンを求める."""
+    source = repr((SCORER_VERSION, [tuple(rule) for rule in YAKU_REGISTRY], FU_VALUES,
+                   HONBA_POINTS, KYOUTAKU_POINTS))
+    return hashlib.sha1(source.encode('utf-8')).hexdigest()[:16]
+
+
+RULESET_VERSION = _ruleset_version()
+
+
+def result_key(encoded: EncodedHand, called_mentsu: list, game_state: dict, dora: DoraCount) -> str | None:
+    """
+    点数計算の結果のキーを求める関数.
+
+    Args:
+        encoded (EncodedHand): エンコード済みの手牌.
+        called_mentsu (list) : 鳴き面子(Call)のリスト.
+        game_state (dict)    : ゲームの状況.
+        dora (DoraCount)     : 数えたドラの枚数.
+
+    Returns:
+        str | None: キーの文字列. ゲームの状況にJSONで表せない値がある場合はNone (保存しない).
+    """
+    key, order = canonical_key(encoded)
+    to_canonical = TO_CANONICAL[order]
+    melds = sorted((call.call_type, [to_canonical[i] for i in tiles])
+                   for call, tiles in zip(called_mentsu, encoded.called))
+    state = {}
+    for name in SCORING_STATE_KEYS:
+        if name in game_state:
+            value = game_state[name]
+            if isinstance(value, (list, tuple, set, frozenset)):
+                value = sorted(value)
+            state[name] = value
+    for name in _TILE_STATE_KEYS:
+        if isinstance(game_state.get(name), str):
+            state[name] = to_canonical_name(game_state[name], order)
+    try:
+        source = json.dumps([key.counts.hex(), key.reds.hex(), key.suit_specific, melds, state, list(dora)],
+                            sort_keys=True, ensure_ascii=False)
+    except TypeError:
+        return None
+    return hashlib.sha1(source.encode('utf-8')).hexdigest()
+
+
+class ScoreStore:
+    """
+    SQLiteに保存する、点数計算の結果のストア.
+    複数のスレッドから安全に利用でき、フォーク後の子プロセスでもそのまま使える.
+    """
+    def __init__(self, path: str, ruleset_version: str = RULESET_VERSION,
+                 batch_size: int = 256, flush_interval: float = 0.5):
+        """
+        ストアを開く. 規則のバージョンが違う結果は消す.
+
+        Args:
+            path (str)            : SQLiteファイルのパス.
+            ruleset_version (str) : 規則のバージョン.
+            batch_size (int)      : 1回のトランザクションで書き込む結果の数の上限.
+            flush_interval (float): 書き込みを待つ結果がない場合に、キューを確認する間隔(秒).
+        """
+        self.path = path
+        self.ruleset_version = ruleset_version
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._pending = {}
+        self._queue = None
+        self._writer = None
+        self._writer_pid = None
+        self._initialize()
+
+    def _connect(self) -> sqlite3.Connection:
+        """ファイルに接続する. 他のプロセスが書き込み中の場合は待つ."""
+        connection = sqlite3.connect(self.path, timeout=30.0)
+        connection.execute('PRAGMA synchronous=NORMAL')
+        return connection
+
+    def _initialize(self) -> None:
+        """テーブルを作り、規則のバージョンが変わっていれば古い結果を消す."""
+        connection = self._connect()
+        try:
+            connection.execute('PRAGMA journal_mode=WAL')
+            with connection:
+                connection.execute('CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT NOT NULL)')
+                connection.execute('CREATE TABLE IF NOT EXISTS scores '
+                                   '(key TEXT PRIMARY KEY, version TEXT NOT NULL, result TEXT NOT NULL)')
+                row = connection.execute("SELECT value FROM meta WHERE name = 'ruleset_version'").fetchone()
+                if row is None or row[0] != self.ruleset_version:
+                    connection.execute('DELETE FROM scores WHERE version != ?', (self.ruleset_version,))
+                    connection.execute("INSERT OR REPLACE INTO meta VALUES ('ruleset_version', ?)",
+                                       (self.ruleset_version,))
+        finally:
+            connection.close()
+
+    def _reader(self) -> sqlite3.Connection:
+        """スレッドごとの読み込み用の接続. フォーク後は新しく接続する."""
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            local.connection = self._connect()
+            local.pid = os.getpid()
+        return local.connection
+
+    def get(self, key: str) -> dict | None:
+        """
+        結果を取得する.
+
+        Args:
+            key (str): result_key で求めたキー.
+
+        Returns:
+            dict | None: 保存された結果 (呼び出しごとに新しい辞書). ない場合はNone.
+        """
+        with self._lock:
+            value = self._pending.get(key)
+        if value is None:
+            row = self._reader().execute('SELECT result FROM scores WHERE key = ? AND version = ?',
+                                         (key, self.ruleset_version)).fetchone()
+            value = row[0] if row is not None else None
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(value)
+
+    def put(self, key: str, result: dict) -> None:
+        """
+        結果を書き込みのキューに積む. 書き込む前でも get で取得できる.
+
+        Args:
+            key (str)    : result_key で求めたキー.
+            result (dict): 点数計算の結果.
+        """
+        value = json.dumps(result, ensure_ascii=False)
+        with self._lock:
+            self._ensure_writer()
+            self._pending[key] = value
+            self._queue.put((key, value))
+
+    def get_or_compute(self, key: str, compute) -> dict:
+        """
+        結果を取得し、ない場合は計算して保存する.
+
+        Args:
+            key (str)         : result_key で求めたキー.
+            compute (Callable): 結果を計算する関数.
+
+        Returns:
+            dict: 点数計算の結果.
+        """
+        result = self.get(key)
+        if result is None:
+            result = compute()
+            self.put(key, result)
+        return result
+
+    def _ensure_writer(self) -> None:
+        """書き込みのスレッドを起動する. フォーク後の子プロセスでは起動し直す (ロックを取って呼ぶ)."""
+        if self._writer_pid == os.getpid() and self._writer.is_alive():
+            return
+        self._queue = queue.Queue()
+        # フォーク前に積まれた結果は、親プロセスが書き込む.
+        self._pending = {}
+        self._writer = threading.Thread(target=self._write_loop, args=(self._queue,),
+                                        name='score-store-writer', daemon=True)
+        self._writer_pid = os.getpid()
+        self._writer.start()
+
+    def _write_loop(self, items: queue.Queue) -> None:
+        """キューの結果をまとめて書き込む. None を受け取ると終了する."""
+        connection = self._connect()
+        running = True
+        while running:
+            try:
+                item = items.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            batch = [item]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(items.get_nowait())
+                except queue.Empty:
+                    break
+            if None in batch:
+                running = False
+            rows = [(key, self.ruleset_version, value) for key, value in (i for i in batch if i is not None)]
+            try:
+                with connection:
+                    connection.executemany('INSERT OR REPLACE INTO scores VALUES (?, ?, ?)', rows)
+            except sqlite3.Error as e:
+                print(f"点数計算の結果を保存できませんでした: {e}")
+            with self._lock:
+                self.writes += len(rows)
+                for key, _, value in rows:
+                    if self._pending.get(key) == value:
+                        del self._pending[key]
+            for _ in batch:
+                items.task_done()
+        connection.close()
+
+    def flush(self) -> None:
+        """キューに積まれた結果を全て書き込むまで待つ."""
+        with self._lock:
+            items = self._queue if self._writer_pid == os.getpid() else None
+        if items is not None:
+            items.join()
+
+    def close(self) -> None:
+        """キューの結果を書き込み、書き込みのスレッドを止める."""
+        with self._lock:
+            writer = self._writer if self._writer_pid == os.getpid() else None
+            if writer is not None:
+                self._queue.put(None)
+        if writer is not None:
+            writer.join()
+        with self._lock:
+            self._writer = None
+            self._writer_pid = None
+
+    def stats(self) -> dict:
+        """
+        統計を返す.
+
+        Returns:
+            dict: hits, misses, writes, pending (書き込み待ちの数), ruleset_version.
+        """
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "writes": self.writes,
+                    "pending": len(self._pending), "ruleset_version": self.ruleset_version}
@@ -1,9 +1,15 @@
 import collections
+from collections.abc import Iterable
 from itertools import combinations
-from .helpers import Call, Tile
+from .helpers import Call
 from .analyzer import HandAnalysis
+from .encoding import RED_FIVE_NAMES, EncodedHand
+from .dora import DoraCount, dora_vector_of
 from .yaku import YakuJudge
 from .fu import FuCalculator
+from .batch import evaluate_batch
+from .payments import get_final_score
+from .result_store import result_key
 
 # 牌の定義
 # 萬子: 1m-9m, 筒子: 1p-9p, 索子: 1s-9s, 字牌: 1z-7z (東南西北白發中)
@@ -30,8 +36,19 @@ YAOCHUHAI = {
     "6z",
     "7z",
 }
+SANGENPAI = {"5z", "6z", "7z"}
+# 面子の構成によらず、手牌の牌とゲームの状況だけで決まる役.
+# 同じ手牌の通常形のパターンでは、これらの役の翻数は共通になる.
+# ドラも面子の構成によらないが、手牌ごとに一度だけ数えて (dora.py) 別に加える.
+HAND_LEVEL_YAKU = frozenset([
+    "清一色", "混一色", "混老頭", "断么九", "立直", "一発", "門前清自摸和",
+    "ダブル立直", "槍槓", "嶺上開花", "海底摸月", "河底撈魚",
+])
 
 class MahjongScorer:
+    # 点数計算の結果の永続ストア (result_store.ScoreStore). None の場合は毎回計算する.
+    result_store = None
+
     def __init__(self, hand: list[str], called_mentsu: list[Call], **game_state):
         """
         麻雀のスコア計算を行うクラス.
@@ -44,32 +61,113 @@ class MahjongScorer:
         self.hand = hand
         self.called_mentsu = called_mentsu
         self.game_state = game_state
+        # 文字列から内部表現(牌ID・枚数配列)への変換は、ここで一度だけ行う.
+        self.encoded_hand = EncodedHand(
+            hand, [m.tiles for m in called_mentsu], game_state.get("agari_hai", "")
+        )
+        # ドラは和了パターンによらないため、ここで一度だけ数える.
+        self.dora = self._count_dora()
 
     def calculate(self) -> dict:
         """
         手牌のスコアを計算するメインの関数。
         高点法に基づき、最も点数が高くなる解釈を返す。
+        result_store が設定されている場合は、保存された結果を使い、なければ計算して保存する。
         """
-        # 1. 手牌を解析し、考えられる全ての和了パターンを取得
+        store = self.result_store
+        if store is not None:
+            key = result_key(self.encoded_hand, self.called_mentsu, self.game_state, self.dora)
+            if key is not None:
+                return store.get_or_compute(key, self._calculate)
+        return self._calculate()
+
+    def _calculate(self) -> dict:
+        """手牌を解析し、点数を計算する関数 (calculate の本体)."""
+        # 1. 手牌を解析し、考えられる和了パターンを1つずつ取得
+        # 役満が見つかった場合は、残りのパターンを解析しない.
         analysis_patterns = HandAnalysis(
-            self.hand, self.called_mentsu, self.game_state.get("agari_hai", "")
+            self.hand, self.called_mentsu, self.game_state.get("agari_hai", ""),
+            encoded_hand=self.encoded_hand,
         )
-        print(analysis_patterns.hand)  # デバッグ用
-        if not analysis_patterns.agari_combinations:
-            return {"error": "和了形ではありません。"}
+        return self.score_patterns(analysis_patterns.iter_combinations())
+
+    @classmethod
+    def calculate_many(cls, hands: list[list[str]], game_states: list[dict],
+                       called_mentsu_lists: list[list[Call]] | None = None) -> list[dict]:
+        """
+        複数の手牌のスコアを一括で計算する関数.
+        和了パターンが1つに決まる手牌は batch.evaluate_batch でまとめて計算し、
+        それ以外の手牌は calculate で1つずつ計算する. 結果は calculate と同じになる.
+
+        Args:
+            hands (list[list[str]])                      : 手牌のリスト.
+            game_states (list[dict])                     : 手牌ごとのゲームの状態情報.
+            called_mentsu_lists (list[list[Call]] | None): 手牌ごとの鳴きの面子リスト.
+
+        Returns:
+            list[dict]: 手牌ごとの calculate と同じ形式の結果.
+        """
+        if called_mentsu_lists is None:
+            called_mentsu_lists = [[] for _ in hands]
+        if not (len(hands) == len(game_states) == len(called_mentsu_lists)):
+            raise ValueError("hands, game_states, called_mentsu_lists の長さが一致しません。")
+        evaluation = evaluate_batch(hands, called_mentsu_lists, game_states)
+        results = []
+        for i, (fast, found_yaku, han, fu) in enumerate(zip(
+                evaluation.fast.tolist(), evaluation.yaku, evaluation.han.tolist(), evaluation.fu.tolist())):
+            if not fast:
+                results.append(cls(hands[i], called_mentsu_lists[i], **game_states[i]).calculate())
+                continue
+            if han == 0:
+                results.append({"error": "役がありません。"})
+                continue
+            score_details, score_name = get_final_score(han, fu, game_states[i])
+            results.append({
+                "yaku": found_yaku,
+                "han": han,
+                "fu": fu,
+                "score_name": score_name,
+                "score": score_details,
+            })
+        return results
 
+    def score_patterns(self, patterns: Iterable[dict]) -> dict:
+        """
+        解析済みの和了パターンから、最も点数が高くなる解釈を返す関数.
+        同じ手牌の解析結果を、ツモ・ロンなどの条件を変えて使い回す場合に用いる.
+
+        Args:
+            patterns (Iterable[dict]): HandAnalysis.agari_combinations または iter_combinations().
+
+        Returns:
+            dict: calculateと同じ形式の結果.
+        """
         # 2. 各パターンで点数を計算し、最も高いものを選ぶ（高点法）
+        # 点数の上限が現在の最高点を超えないパターンは、役と符の判定を省略する.
         best_result = None
         highest_score = -1
+        hand_han = None  # 面子の構成によらない役の翻数 (通常形で共通).
 
-        for pattern in analysis_patterns.agari_combinations:
-            # 2a. 役を判定
-            yaku_judge = YakuJudge(pattern, self.called_mentsu, self.game_state)
+        has_pattern = False
+
+        for pattern in patterns:
+            has_pattern = True
+            is_normal = pattern["type"] == "normal"
+            # 2a. 点数の上限で枝刈り
+            if is_normal and hand_han is not None and best_result is not None:
+                han_bound = self._get_han_bound(pattern, hand_han)
+                if han_bound == 0:
+                    continue
+                if han_bound is not None and self._get_score_bound(pattern, han_bound) <= highest_score:
+                    continue
+
+            # 2b. 役を判定
+            yaku_judge = YakuJudge(pattern, self.called_mentsu, self.game_state, self.dora.total)
             found_yaku = yaku_judge.check_all_yaku()
-            print(f"Found Yaku: {found_yaku}")  # デバッグ用
             han = sum(found_yaku.values())
-            print(f"Han Count: {han}")  # デバッグ用
-            
+            if is_normal and hand_han is None:
+                hand_han = sum(v for name, v in found_yaku.items() if name in HAND_LEVEL_YAKU)
+
             if han == 0:
                 continue # 役なし
 
@@ -90,41 +188,106 @@ class MahjongScorer:
                     "score_name": score_name,
                     "score": score_details, # totalだけでなく詳細も返す
                 }
+                # 役満は最高点のため、以降のパターンで上回ることはない.
+                if han >= 13:
+                    break
         
+        if not has_pattern:
+            return {"error": "和了形ではありません。"}
         if best_result is None:
             return {"error": "役がありません。"}
             
         return best_result
 
-    def _count_dora(self) -> tuple[int, int, int]:
-        """ドラ、赤ドラ、裏ドラの枚数をそれぞれカウントする。"""
-        dora_indicators = self.game_state.get("dora_indicators", [])
-        ura_dora_indicators = self.game_state.get("ura_dora_indicators", [])
-        is_reach = self.game_state.get("is_riichi", False)
+    def _get_han_bound(self, pattern: dict, hand_han: int) -> int | None:
+        """
+        通常形のパターンで成立しうる翻数の上限を求める関数.
+        面子の構成によらない役の翻数に、面子の構成で決まる役の翻数の上限を加える.
 
-        dora_tiles = {Tile.next_tile(t) for t in dora_indicators if t}
-        uradora_tiles = {Tile.next_tile(t) for t in ura_dora_indicators if t} if is_reach else set()
-        
-        all_hand_tiles = self.hand + sum([m.tiles for m in self.called_mentsu], [])
-        
-        dora_count = 0
-        akadora_count = 0
-        uradora_count = 0
-        
-        for tile in all_hand_tiles:
-            # 赤ドラのチェック
-            if 'r' in tile:
-                akadora_count += 1
-            
-            normal_tile = Tile.to_normal(tile)
-            dora_count += list(dora_tiles).count(normal_tile)
-            uradora_count += list(uradora_tiles).count(normal_tile)
-            
-        return dora_count, akadora_count, uradora_count
+        Args:
+            pattern (dict): HandAnalysisの通常形の解析結果.
+            hand_han (int): 面子の構成によらない役の翻数 (同じ手牌の通常形で共通).
+
+        Returns:
+            int | None: 翻数の上限. 刻子・槓子が3つ以上あり、役満の可能性がある場合はNone.
+        """
+        mentsu_list = pattern["mentsu"]
+        # 赤ドラを含む刻子・槓子も役満(四槓子など)の対象になるため、順子以外を全て数える.
+        shuntsu = [m for m in mentsu_list if len(set(m)) == 3]
+        if len(mentsu_list) - len(shuntsu) >= 3:
+            return None
+        kotsu = [m[0] for m in mentsu_list if len(set(m)) == 1]
+        is_menzen = self.game_state.get("is_menzen", False)
+        janto = pattern["janto"]
+        bound = hand_han + self.dora.total
+        # 順子の開始牌 (赤ドラは通常の5として扱う).
+        starts = collections.Counter(min(t[:2] for t in m) for m in shuntsu)
+        # 一盃口・二盃口.
+        num_peikou = sum(c // 2 for c in starts.values())
+        if is_menzen and num_peikou:
+            bound += 3 if num_peikou >= 2 else 1
+        # 純全帯么九・混全帯么九.
+        if janto in YAOCHUHAI and all(any(t in YAOCHUHAI for t in m) for m in mentsu_list):
+            bound += 3 if is_menzen else 2
+        # 一気通貫・三色同順.
+        if len(starts) >= 3:
+            ittsu = any({f"1{s}", f"4{s}", f"7{s}"} <= starts.keys() for s in "mps")
+            sanshoku = any({f"{n}m", f"{n}p", f"{n}s"} <= starts.keys() for n in "1234567")
+            if ittsu or sanshoku:
+                bound += 2 if is_menzen else 1
+        # 小三元.
+        if janto in SANGENPAI:
+            bound += 2
+        # 役牌.
+        jikaze = self.game_state.get("jikaze", "")
+        bakaze = self.game_state.get("bakaze", "")
+        for tile in kotsu:
+            bound += (tile == jikaze) + (tile == bakaze) + (tile in SANGENPAI)
+        # 平和.
+        if is_menzen and pattern.get("machi") == "ryanmen" and janto not in YAOCHUHAI:
+            bound += 1
+        return bound
+
+    def _get_score_bound(self, pattern: dict, han_bound: int) -> int:
+        """
+        翻数の上限から、通常形のパターンの点数の上限を求める関数.
+        符の上限は役なしとして計算した符 (平和ツモの20符より大きくなる) を用いる.
+
+        Args:
+            pattern (dict) : HandAnalysisの通常形の解析結果.
+            han_bound (int): 翻数の上限.
+
+        Returns:
+            int: 点数 (total) の上限.
+        """
+        # 満貫以上は符によらない.
+        if han_bound >= 5:
+            return self._get_final_score(han_bound, 0)[0]["total"]
+        fu_bound = FuCalculator(pattern, self.called_mentsu, {}, self.game_state).calculate()
+        return self._get_final_score(han_bound, fu_bound)[0]["total"]
+
+    def _count_dora(self) -> DoraCount:
+        """
+        ドラ、赤ドラ、裏ドラの枚数をそれぞれカウントする関数.
+        門前部分と鳴き面子を合わせた枚数配列と、表示牌から求めたドラの多重度ベクトルの内積を求める.
+
+        Returns:
+            DoraCount: ドラ、赤ドラ、裏ドラの枚数.
+        """
+        encoded = self.encoded_hand
+        # 門前部分と鳴き面子を合わせた枚数配列 (和了パターンの牌と同じになる).
+        all_counts = encoded.closed_counts[:]
+        for tiles in encoded.called:
+            for i in tiles:
+                all_counts[i] += 1
+        aka = sum(encoded.closed_red_counts) + sum(
+            1 for m in self.called_mentsu for t in m.tiles if t in RED_FIVE_NAMES
+        )
+        return dora_vector_of(self.game_state).count(all_counts, aka)
 
     def _get_final_score(self, han: int, fu: int) -> tuple[dict, str]:
         """
-        最終的な点数を計算する関数.
+        最終的な点数を計算する関数. 事前計算した支払い表(payments.py)を引く.
 
         Args:
             han (int): 翻数.
@@ -133,47 +296,4 @@ class MahjongScorer:
         Returns:
             tuple[dict, str]: 計算された点数とスコア名のタプル.
         """
-        if han == 0:
-            return {"total": 0, "oya": 0, "ko": 0}, ""
-        if han >= 13:
-            score_name, base_p = "役満", 8000
-        elif han >= 11:
-            score_name, base_p = "三倍満", 6000
-        elif han >= 8:
-            score_name, base_p = "倍満", 4000
-        elif han >= 6:
-            score_name, base_p = "跳満", 3000
-        elif han >= 5 or (han == 4 and fu >= 40) or (han == 3 and fu >= 70):
-            score_name, base_p = "満貫", 2000
-        else:
-            score_name = ""
-            base_p = fu * (2 ** (han + 2))
-            if base_p > 2000:
-                base_p = 2000
-
-        # 親と子の支払いを計算.
-        # 親の計算.
-        if self.game_state.get("is_oya", False):
-            # ツモ.
-            if self.game_state.get("is_tsumo", False):
-                ko_pay = -(-base_p * 2 // 100) * 100
-                return {"total": ko_pay * 3, "payment_per_ko": ko_pay}, score_name
-            # ロン.
-            else:
-                ron_pay = -(-base_p * 6 // 100) * 100
-                return {"total": ron_pay, "payment_from_ron": ron_pay}, score_name
-        # 子の計算.
-        else:
-            # ツモ.
-            if self.game_state.get("is_tsumo", False):
-                oya_pay = -(-base_p * 2 // 100) * 100
-                ko_pay = -(-base_p * 1 // 100) * 100
-                return {
-                    "total": oya_pay + ko_pay * 2,
-                    "payment_from_oya": oya_pay,
-                    "payment_per_ko": ko_pay,
-                }, score_name
-            # ロン.
-            else:
-                ron_pay = -(-base_p * 4 // 100) * 100
-                return {"total": ron_pay, "payment_from_ron": ron_pay}, score_name
+        return get_final_score(han, fu, self.game_state)
@@ -0,0 +1,231 @@
+import functools
+
+from .helpers import Call
+from .encoding import YAOCHU_IDS, EncodedHand
+from .tables import SHANTEN_TABLE, search_block_values
+
+# 向聴数の計算
+# 通常形の向聴数は「8 - 2×面子数 - 塔子数 - 雀頭の有無」で求める(面子数+塔子数は4まで).
+# 数牌は色ごとの向聴数テーブル(tables.py)から、使うブロック数ごとの評価値
+# (面子2点・塔子1点)を引き、字牌の評価値と組み合わせて最大値を求める.
+
+# 評価値の組み合わせで、成立しない場合の値.
+_IMPOSSIBLE = -100
+
+
+@functools.lru_cache(maxsize=4096)
+def _search_block_values(counts: tuple[int, ...]) -> tuple[tuple[int, ...], tuple[int, ...] | None]:
+    """向聴数テーブルがない場合に、1色分の評価値を探索で求める関数."""
+    no_head, head = search_block_values(counts, {})
+    return tuple(no_head), (tuple(head) if head else None)
+
+
+def suit_block_values(counts) -> tuple[tuple[int, ...], tuple[int, ...] | None]:
+    """
+    数牌1色分の枚数配列から、ブロックの評価値を求める関数.
+
+    Args:
+        counts: 長さ9の枚数配列.
+
+    Returns:
+        tuple: (雀頭なしの評価値, 雀頭ありの評価値). 各評価値は使うブロック数 k=0-4 ごとの値.
+               雀頭が取れない場合、後者はNone.
+    """
+    if SHANTEN_TABLE is not None and sum(counts) <= 14:
+        return SHANTEN_TABLE.lookup(counts)
+    return _search_block_values(tuple(counts))
+
+
+def honor_block_values(counts) -> tuple[tuple[int, ...], tuple[int, ...] | None]:
+    """
+    字牌の枚数配列から、ブロックの評価値を求める関数.
+    字牌は順子にならないため、刻子(2点)と対子(1点)だけを数える.
+
+    Args:
+        counts: 長さ7の枚数配列.
+
+    Returns:
+        tuple: (雀頭なしの評価値, 雀頭ありの評価値). suit_block_valuesと同じ形式.
+    """
+    return _honor_block_values(tuple(counts))
+
+
+@functools.lru_cache(maxsize=4096)
+def _honor_block_values(counts: tuple[int, ...]) -> tuple[tuple[int, ...], tuple[int, ...] | None]:
+    """honor_block_valuesの本体. 字牌の枚数配列ごとに結果をキャッシュする."""
+    values = sorted((2 if c >= 3 else 1 for c in counts if c >= 2), reverse=True)
+    no_head = _best_of(values)
+    head = None
+    # 雀頭にする字牌を1種類選ぶ. 残りの枚数で再びブロックを数える.
+    for c in counts:
+        if c < 2:
+            continue
+        rest = list(values)
+        rest.remove(2 if c >= 3 else 1)
+        if c == 4:
+            rest.append(1)
+        candidate = _best_of(sorted(rest, reverse=True))
+        head = candidate if head is None else tuple(map(max, head, candidate))
+    return no_head, head
+
+
+def _best_of(values: list[int]) -> tuple[int, ...]:
+    """降順に並んだブロックの評価値から、ブロック数 k=0-4 ごとの合計の最大値を求める関数."""
+    best = [0]
+    for k in range(4):
+        best.append(best[-1] + (values[k] if k < len(values) else 0))
+    return tuple(best)
+
+
+@functools.lru_cache(maxsize=65536)
+def _merge_block_values(acc: tuple, part: tuple) -> tuple:
+    """
+    2つの評価値を、使うブロック数の合計ごとに組み合わせる関数(max-plus畳み込み).
+    評価値の種類は少ないため、結果をキャッシュする.
+
+    Args:
+        acc (tuple) : これまでの (雀頭なしの評価値, 雀頭ありの評価値).
+        part (tuple): 追加する色の (雀頭なしの評価値, 雀頭ありの評価値).
+
+    Returns:
+        tuple: 組み合わせた (雀頭なしの評価値, 雀頭ありの評価値).
+    """
+    best, best_head = acc
+    no_head, head = part
+    if head is None:
+        head = (_IMPOSSIBLE,) * 5
+    if best_head is None:
+        best_head = (_IMPOSSIBLE,) * 5
+    new_best = []
+    new_head = []
+    for k in range(5):
+        v = w = _IMPOSSIBLE
+        for j in range(k + 1):
+            x = best[j] + no_head[k - j]
+            if x > v:
+                v = x
+            x = best_head[j] + no_head[k - j]
+            if x > w:
+                w = x
+            x = best[j] + head[k - j]
+            if x > w:
+                w = x
+        new_best.append(v)
+        new_head.append(w)
+    return tuple(new_best), (tuple(new_head) if new_head[0] >= 0 else None)
+
+
+def combine_block_values(parts, num_called: int = 0) -> int:
+    """
+    色ごとの評価値を組み合わせて、通常形の向聴数を求める関数.
+
+    Args:
+        parts: (雀頭なしの評価値, 雀頭ありの評価値) のリスト.
+        num_called (int): 鳴き面子の数.
+
+    Returns:
+        int: 通常形の向聴数.
+    """
+    acc = ((0,) * 5, None)
+    for part in parts:
+        acc = _merge_block_values(acc, part)
+    max_blocks = 4 - num_called
+    best, best_head = acc
+    value = best[max_blocks]
+    if best_head is not None and best_head[max_blocks] + 1 > value:
+        value = best_head[max_blocks] + 1
+    return 8 - 2 * num_called - value
+
+
+def normal_shanten(counts: list[int], num_called: int = 0) -> int:
+    """
+    通常形(4面子1雀頭)の向聴数を求める関数.
+
+    Args:
+        counts (list[int]): 門前部分の枚数配列 (長さ34).
+        num_called (int)  : 鳴き面子の数.
+
+    Returns:
+        int: 向聴数 (和了形は-1).
+    """
+    parts = [suit_block_values(counts[base:base + 9]) for base in (0, 9, 18) if any(counts[base:base + 9])]
+    if any(counts[27:]):
+        parts.append(honor_block_values(counts[27:]))
+    return combine_block_values(parts, num_called)
+
+
+def chiitoitsu_shanten(counts: list[int]) -> int:
+    """
+    七対子の向聴数を求める関数. 同じ牌4枚は2対子とみなさない.
+
+    Args:
+        counts (list[int]): 手牌の枚数配列 (長さ34).
+
+    Returns:
+        int: 向聴数 (和了形は-1).
+    """
+    pairs = sum(1 for c in counts if c >= 2)
+    kinds = sum(1 for c in counts if c)
+    return 6 - pairs + max(0, 7 - kinds)
+
+
+def kokushi_shanten(counts: list[int]) -> int:
+    """
+    国士無双の向聴数を求める関数.
+
+    Args:
+        counts (list[int]): 手牌の枚数配列 (長さ34).
+
+    Returns:
+        int: 向聴数 (和了形は-1).
+    """
+    kinds = sum(1 for i in YAOCHU_IDS if counts[i])
+    has_pair = any(counts[i] >= 2 for i in YAOCHU_IDS)
+    return 13 - kinds - (1 if has_pair else 0)
+
+
+def shanten_by_form(hand: list[str], called_mentsu: list[Call] | None = None) -> dict:
+    """
+    和了形ごとの向聴数を求める関数.
+
+    Args:
+        hand (list[str])          : 手牌のリスト (13枚または14枚. 鳴き面子の牌を含んでいてもよい).
+        called_mentsu (list[Call]): 鳴きの情報.
+
+    Returns:
+        dict: "normal", "chiitoitsu", "kokushi" をキーとする向聴数の辞書.
+              鳴きがある場合、七対子と国士無双はNone.
+
+    Raises:
+        ValueError: 牌の文字列が不正な場合や、手牌の枚数が13枚・14枚でない場合.
+    """
+    called_mentsu = called_mentsu or []
+    encoded = EncodedHand(hand, [m.tiles for m in called_mentsu], "")
+    counts = encoded.closed_counts
+    num_called = len(called_mentsu)
+    if num_called > 4 or sum(counts) + 3 * num_called not in (13, 14):
+        raise ValueError(f"向聴数は13枚または14枚の手牌で計算します: {len(hand)}枚")
+    if num_called:
+        return {"normal": normal_shanten(counts, num_called), "chiitoitsu": None, "kokushi": None}
+    return {
+        "normal": normal_shanten(counts),
+        "chiitoitsu": chiitoitsu_shanten(counts),
+        "kokushi": kokushi_shanten(counts),
+    }
+
+
+def shanten(hand: list[str], called_mentsu: list[Call] | None = None) -> int:
+    """
+    手牌の向聴数を求める関数. 通常形・七対子・国士無双のうち最小の値を返す.
+
+    Args:
+        hand (list[str])          : 手牌のリスト (13枚または14枚. 鳴き面子の牌を含んでいてもよい).
+        called_mentsu (list[Call]): 鳴きの情報.
+
+    Returns:
+        int: 向聴数. 聴牌は0、和了形(14枚)は-1.
+
+    Raises:
+        ValueError: 牌の文字列が不正な場合や、手牌の枚数が13枚・14枚でない場合.
+    """
+    return min(v for v in shanten_by_form(hand, called_mentsu).values() if v is not None)
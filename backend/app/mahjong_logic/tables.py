@@ -0,0 +1,457 @@
+# 数牌1色分の事前計算テーブル
+# 1色(9種類)の枚数配列をキーとして、以下の2つのテーブルを事前計算しておく.
+#   - 分解テーブル  : その色の全ての面子・雀頭の分解. 和了形の面子分解に使う.
+#   - 向聴数テーブル: その色から取れる面子・塔子の評価値. 向聴数の計算に使う.
+# 手牌全体の結果は、萬子・筒子・索子の3色分のテーブル参照と字牌の結果の組み合わせで求まる.
+#
+# テーブルはオフラインで生成し、バイナリファイルとして保存する. 読み込み時はmmapで
+# メモリにマップするため、ワーカープロセス間でページが共有される.
+#
+# 生成方法(backendディレクトリで):
+#     python app/mahjong_logic/tables.py
+#
+# 分解テーブルのファイル形式 (すべてネイティブのバイト順):
+#     ヘッダ  : マジック b'MJST', バージョン(uint32), キーの数 n(uint32)
+#     キー    : uint32 × n      (枚数配列を5進数で表した値. 昇順)
+#     オフセット: uint32 × (n + 1) (データ領域内での各キーの開始位置)
+#     データ  : キーごとに分解を並べる. 分解1つは「面子数(1byte) + 面子(1byteずつ)」.
+#               面子1byteは 上位4bit: 種類, 下位4bit: 色内の位置(0-8).
+#
+# 向聴数テーブルのファイル形式:
+#     ヘッダ  : マジック b'MJSH', バージョン(uint32), エントリの数 n(uint32)
+#     データ  : 2byte × n. 枚数の合計が14枚以下の枚数配列を辞書順に並べた順位で引く.
+#               1byte目は雀頭なし、2byte目は雀頭ありの評価値(SHANTEN_VALUESを参照).
+
+import array
+import bisect
+import functools
+import itertools
+import mmap
+import os
+
+TABLE_PATH = os.path.join(os.path.dirname(__file__), 'data', 'suit_table.bin')
+TABLE_MAGIC = b'MJST'
+TABLE_VERSION = 1
+HEADER_SIZE = 12
+
+SHANTEN_TABLE_PATH = os.path.join(os.path.dirname(__file__), 'data', 'shanten_table.bin')
+SHANTEN_TABLE_MAGIC = b'MJSH'
+SHANTEN_TABLE_VERSION = 1
+# 向聴数テーブルに含める1色の枚数の上限.
+MAX_SUIT_TILES = 14
+
+# 面子の種類.
+GROUP_PAIR = 0      # 雀頭
+GROUP_SHUNTSU = 1   # 順子
+GROUP_KOTSU = 2     # 刻子
+GROUP_KANTSU = 3    # 槓子
+GROUP_SIZES = {GROUP_PAIR: 2, GROUP_SHUNTSU: 3, GROUP_KOTSU: 3, GROUP_KANTSU: 4}
+# 1色に含まれうる面子の最大数.
+MAX_MENTSU = 4
+
+
+def suit_key(counts) -> int:
+    """
+    1色分の枚数配列を5進数の整数キーに変換する関数.
+
+    Args:
+        counts: 長さ9の枚数配列 (各要素は0-4).
+
+    Returns:
+        int: テーブルのキー.
+    """
+    key = 0
+    for c in reversed(counts):
+        key = key * 5 + c
+    return key
+
+
+def group_tiles(group: int, base: int) -> tuple[int, ...]:
+    """
+    テーブルの面子1byteを牌IDのタプルに変換する関数.
+
+    Args:
+        group (int): 面子の1byte表現.
+        base (int) : その色の先頭の牌ID (萬子0, 筒子9, 索子18).
+
+    Returns:
+        tuple[int, ...]: 牌IDのタプル.
+    """
+    kind, index = group >> 4, group & 0x0f
+    tile = base + index
+    if kind == GROUP_SHUNTSU:
+        return (tile, tile + 1, tile + 2)
+    return (tile,) * GROUP_SIZES[kind]
+
+
+def build_suit_table() -> dict[int, list[tuple[int, ...]]]:
+    """
+    1色分の分解テーブルを生成する関数.
+    雀頭0-1個と面子0-4個の全ての組み合わせから、枚数配列ごとの分解を求める.
+
+    Returns:
+        dict[int, list[tuple[int, ...]]]: キーから分解(面子1byte表現のタプル)のリストへの辞書.
+    """
+    mentsu_kinds = ([(GROUP_KANTSU, i) for i in range(9)]
+                    + [(GROUP_KOTSU, i) for i in range(9)]
+                    + [(GROUP_SHUNTSU, i) for i in range(7)])
+    table: dict[int, set] = {}
+    for pair in [None] + list(range(9)):
+        for n in range(MAX_MENTSU + 1):
+            for combo in itertools.combinations_with_replacement(mentsu_kinds, n):
+                counts = [0] * 9
+                groups = []
+                if pair is not None:
+                    counts[pair] += 2
+                    groups.append((GROUP_PAIR << 4) | pair)
+                for kind, index in combo:
+                    if kind == GROUP_SHUNTSU:
+                        for k in range(3):
+                            counts[index + k] += 1
+                    else:
+                        counts[index] += GROUP_SIZES[kind]
+                    groups.append((kind << 4) | index)
+                if max(counts) > 4:
+                    continue
+                # 面子は位置順(同じ位置なら槓子・刻子・順子の順)に並べる.
+                groups.sort(key=lambda g: (g & 0x0f, -(g >> 4)))
+                table.setdefault(suit_key(counts), set()).add(tuple(groups))
+    return {key: sorted(decompositions) for key, decompositions in table.items()}
+
+
+def write_suit_table(path: str = TABLE_PATH) -> None:
+    """
+    分解テーブルを生成し、バイナリファイルに書き出す関数.
+
+    Args:
+        path (str): 出力先のファイルパス.
+    """
+    table = build_suit_table()
+    keys = array.array('I', sorted(table))
+    offsets = array.array('I')
+    data = bytearray()
+    for key in keys:
+        offsets.append(len(data))
+        for groups in table[key]:
+            data.append(len(groups))
+            data.extend(groups)
+    offsets.append(len(data))
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(TABLE_MAGIC)
+        f.write(array.array('I', [TABLE_VERSION, len(keys)]).tobytes())
+        f.write(keys.tobytes())
+        f.write(offsets.tobytes())
+        f.write(bytes(data))
+
+
+class SuitTable:
+    """mmapした分解テーブルを参照するクラス"""
+    def __init__(self, path: str = TABLE_PATH):
+        """
+        テーブルファイルをメモリにマップする.
+
+        Args:
+            path (str): テーブルファイルのパス.
+
+        Raises:
+            OSError: ファイルが読み込めない場合.
+            ValueError: ファイルの形式が不正な場合.
+        """
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        header = self._mmap[:HEADER_SIZE]
+        version, n = array.array('I', header[4:]).tolist()
+        if header[:4] != TABLE_MAGIC or version != TABLE_VERSION:
+            raise ValueError(f"分解テーブルの形式が不正です: {path}")
+        view = memoryview(self._mmap)
+        keys_end = HEADER_SIZE + 4 * n
+        offsets_end = keys_end + 4 * (n + 1)
+        self._keys = view[HEADER_SIZE:keys_end].cast('I')
+        self._offsets = view[keys_end:offsets_end].cast('I')
+        self._data = view[offsets_end:]
+        self.lookup = functools.lru_cache(maxsize=8192)(self._lookup)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def _lookup(self, key: int) -> tuple[tuple[int, ...], ...]:
+        """
+        キーに対応する分解を返す関数.
+
+        Args:
+            key (int): suit_keyで求めたキー.
+
+        Returns:
+            tuple[tuple[int, ...], ...]: 分解(面子1byte表現のタプル)のタプル.
+                                         分解できない場合は空のタプル.
+        """
+        index = bisect.bisect_left(self._keys, key)
+        if index == len(self._keys) or self._keys[index] != key:
+            return ()
+        data = self._data
+        pos, end = self._offsets[index], self._offsets[index + 1]
+        decompositions = []
+        while pos < end:
+            length = data[pos]
+            decompositions.append(tuple(data[pos + 1:pos + 1 + length]))
+            pos += 1 + length
+        return tuple(decompositions)
+
+
+def load_suit_table() -> SuitTable | None:
+    """
+    分解テーブルを読み込む関数. ファイルがない場合はNoneを返す.
+
+    Returns:
+        SuitTable | None: 読み込んだテーブル.
+    """
+    try:
+        return SuitTable()
+    except (OSError, ValueError):
+        return None
+
+
+
+# --- 向聴数テーブル ---
+# 1色から取り出した「ブロック」(面子・塔子)の評価値を、使うブロック数 k=0-4 ごとに持つ.
+# 評価値は 面子2点・塔子(対子を含む)1点 の合計の最大値. ブロック数を1つ増やすと
+# 評価値は0-2点増えるため、4つの増分を3進数で1byteにまとめる(0-80).
+# 雀頭を取れない場合(雀頭ありの評価値)は NO_HEAD とする.
+NO_HEAD = 255
+# 1byte -> (k=0, 1, 2, 3, 4 の評価値).
+SHANTEN_VALUES = tuple(
+    tuple(itertools.accumulate((0, b % 3, b // 3 % 3, b // 9 % 3, b // 27 % 3)))
+    for b in range(81)
+)
+
+
+def _count_suffix_arrangements() -> list[list[int]]:
+    """
+    位置 i 以降の枚数配列で、合計が r 枚以下になるものの数 N[i][r] を求める関数.
+
+    Returns:
+        list[list[int]]: N[i][r] (i=0-9, r=0-MAX_SUIT_TILES).
+    """
+    counts = [[1] * (MAX_SUIT_TILES + 1)]
+    for _ in range(9):
+        prev = counts[0]
+        counts.insert(0, [sum(prev[r - v] for v in range(5) if r - v >= 0)
+                          for r in range(MAX_SUIT_TILES + 1)])
+    return counts
+
+
+def _build_rank_offsets() -> tuple[tuple[tuple[int, ...], ...], ...]:
+    """
+    枚数配列の辞書順の順位を求めるための加算表を作る関数.
+    順位は RANK_OFFSETS[i][それまでの枚数の合計][i番目の枚数] の総和になる.
+
+    Returns:
+        tuple: RANK_OFFSETS[i][s][v].
+    """
+    suffix = _count_suffix_arrangements()
+    offsets = []
+    for i in range(9):
+        table = []
+        for s in range(MAX_SUIT_TILES + 1):
+            row = [0]
+            for v in range(4):
+                rest = MAX_SUIT_TILES - s - v
+                row.append(row[-1] + (suffix[i + 1][rest] if rest >= 0 else 0))
+            table.append(tuple(row))
+        offsets.append(tuple(table))
+    return tuple(offsets)
+
+
+RANK_OFFSETS = _build_rank_offsets()
+NUM_SUIT_ARRANGEMENTS = _count_suffix_arrangements()[0][MAX_SUIT_TILES]
+
+
+def suit_rank(counts) -> int:
+    """
+    1色分の枚数配列(合計14枚以下)の辞書順の順位を求める関数.
+
+    Args:
+        counts: 長さ9の枚数配列 (各要素は0-4).
+
+    Returns:
+        int: 向聴数テーブルの位置.
+    """
+    rank = 0
+    total = 0
+    for i, c in enumerate(counts):
+        rank += RANK_OFFSETS[i][total][c]
+        total += c
+    return rank
+
+
+def search_block_values(counts: tuple[int, ...], memo: dict) -> tuple[list[int], list[int] | None]:
+    """
+    1色分の枚数配列から取れるブロックの評価値を全探索で求める関数.
+
+    Args:
+        counts (tuple[int, ...]): 長さ9の枚数配列.
+        memo (dict)             : 探索結果のメモ.
+
+    Returns:
+        tuple: (雀頭なしの評価値, 雀頭ありの評価値). 雀頭が取れない場合、後者はNone.
+    """
+    result = memo.get(counts)
+    if result is not None:
+        return result
+    tile = 0
+    while tile < 9 and counts[tile] == 0:
+        tile += 1
+    if tile == 9:
+        result = ([0] * 5, None)
+        memo[counts] = result
+        return result
+
+    def remove(*tiles):
+        rest = list(counts)
+        for t in tiles:
+            rest[t] -= 1
+        return search_block_values(tuple(rest), memo)
+
+    # 先頭の牌を1枚浮き牌にする.
+    no_head, rest_head = remove(tile)
+    best = no_head[:]
+    best_head = rest_head[:] if rest_head else None
+    # 先頭の牌から始まるブロックを取る.
+    blocks = []
+    if counts[tile] >= 3:
+        blocks.append(((tile, tile, tile), 2))
+    if tile <= 6 and counts[tile + 1] and counts[tile + 2]:
+        blocks.append(((tile, tile + 1, tile + 2), 2))
+    if counts[tile] >= 2:
+        blocks.append(((tile, tile), 1))
+    if tile <= 7 and counts[tile + 1]:
+        blocks.append(((tile, tile + 1), 1))
+    if tile <= 6 and counts[tile + 2]:
+        blocks.append(((tile, tile + 2), 1))
+    for tiles, value in blocks:
+        no_head, rest_head = remove(*tiles)
+        for k in range(1, 5):
+            best[k] = max(best[k], no_head[k - 1] + value)
+        if rest_head:
+            if best_head is None:
+                best_head = [0] * 5
+            for k in range(1, 5):
+                best_head[k] = max(best_head[k], rest_head[k - 1] + value)
+    # 先頭の牌を雀頭にする.
+    if counts[tile] >= 2:
+        no_head, _ = remove(tile, tile)
+        if best_head is None:
+            best_head = [0] * 5
+        for k in range(5):
+            best_head[k] = max(best_head[k], no_head[k])
+    result = (best, best_head)
+    memo[counts] = result
+    return result
+
+
+def _encode_block_values(values: list[int] | None) -> int:
+    """ブロックの評価値を1byteにまとめる関数."""
+    if values is None:
+        return NO_HEAD
+    return sum((values[k + 1] - values[k]) * 3 ** k for k in range(4))
+
+
+def build_shanten_table() -> bytes:
+    """
+    向聴数テーブルを生成する関数.
+    合計14枚以下の全ての枚数配列について、ブロックの評価値を求める.
+
+    Returns:
+        bytes: 枚数配列の順位の順に並べた、2byteずつのデータ.
+    """
+    memo = {}
+    data = bytearray()
+    for counts in itertools.product(range(5), repeat=9):
+        if sum(counts) > MAX_SUIT_TILES:
+            continue
+        no_head, head = search_block_values(counts, memo)
+        data.append(_encode_block_values(no_head))
+        data.append(_encode_block_values(head))
+    return bytes(data)
+
+
+def write_shanten_table(path: str = SHANTEN_TABLE_PATH) -> None:
+    """
+    向聴数テーブルを生成し、バイナリファイルに書き出す関数.
+
+    Args:
+        path (str): 出力先のファイルパス.
+    """
+    data = build_shanten_table()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(SHANTEN_TABLE_MAGIC)
+        f.write(array.array('I', [SHANTEN_TABLE_VERSION, len(data) // 2]).tobytes())
+        f.write(data)
+
+
+class ShantenTable:
+    """mmapした向聴数テーブルを参照するクラス"""
+    def __init__(self, path: str = SHANTEN_TABLE_PATH):
+        """
+        テーブルファイルをメモリにマップする.
+
+        Args:
+            path (str): テーブルファイルのパス.
+
+        Raises:
+            OSError: ファイルが読み込めない場合.
+            ValueError: ファイルの形式が不正な場合.
+        """
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        header = self._mmap[:HEADER_SIZE]
+        version, n = array.array('I', header[4:]).tolist()
+        if (header[:4] != SHANTEN_TABLE_MAGIC or version != SHANTEN_TABLE_VERSION
+                or n != NUM_SUIT_ARRANGEMENTS):
+            raise ValueError(f"向聴数テーブルの形式が不正です: {path}")
+        self._data = memoryview(self._mmap)[HEADER_SIZE:]
+
+    def __len__(self) -> int:
+        return len(self._data) // 2
+
+    def lookup(self, counts) -> tuple[tuple[int, ...], tuple[int, ...] | None]:
+        """
+        1色分の枚数配列から、ブロックの評価値を引く関数.
+
+        Args:
+            counts: 長さ9の枚数配列 (合計14枚以下).
+
+        Returns:
+            tuple: (雀頭なしの評価値, 雀頭ありの評価値). 各評価値は使うブロック数 k=0-4 ごとの値.
+                   雀頭が取れない場合、後者はNone.
+        """
+        pos = suit_rank(counts) * 2
+        head = self._data[pos + 1]
+        return SHANTEN_VALUES[self._data[pos]], (None if head == NO_HEAD else SHANTEN_VALUES[head])
+
+
+def load_shanten_table() -> ShantenTable | None:
+    """
+    向聴数テーブルを読み込む関数. ファイルがない場合はNoneを返す.
+
+    Returns:
+        ShantenTable | None: 読み込んだテーブル.
+    """
+    try:
+        return ShantenTable()
+    except (OSError, ValueError):
+        return None
+
+# インポート時にテーブルをmmapする.
+SUIT_TABLE = load_suit_table()
+SHANTEN_TABLE = load_shanten_table()
+
+
+if __name__ == '__main__':
+    write_suit_table()
+    print(f"分解テーブルを書き出しました: {TABLE_PATH} ({os.path.getsize(TABLE_PATH)} bytes)")
+    write_shanten_table()
+    print(f"向聴数テーブルを書き出しました: {SHANTEN_TABLE_PATH} ({os.path.getsize(SHANTEN_TABLE_PATH)} bytes)")
@@ -0,0 +1,94 @@
+from .helpers import Call
+from .analyzer import HandAnalysis, honor_decompositions, join_decompositions, suit_decompositions
+from .encoding import NUM_TILE_KINDS, SUIT_OF, TILE_NAMES, EncodedHand
+from .scorer import MahjongScorer
+from .shanten import chiitoitsu_shanten, kokushi_shanten, normal_shanten
+from .tables import SUIT_TABLE
+
+# 聴牌形の待ちの列挙
+# 13枚の手牌について、和了になる牌ごとにロン・ツモそれぞれの点数計算結果を求める.
+# 13枚の手牌を色ごとに分解した結果は全ての候補牌で共有し、候補牌を加えた色だけを
+# 分解テーブルで引き直す. 和了形の解析結果はロンとツモで共有する.
+
+
+def enumerate_waits(hand: list[str], called_mentsu: list[Call], **game_state) -> list[dict]:
+    """
+    聴牌形の手牌について、和了になる全ての牌と、それぞれの点数計算結果を返す関数.
+
+    Args:
+        hand (list[str])          : 13枚の手牌のリスト (鳴き面子の牌を含んでいてもよい).
+        called_mentsu (list[Call]): 鳴きの面子リスト.
+        game_state (dict)         : ゲームの状態情報 (MahjongScorerと同じ).
+                                    agari_hai と is_tsumo は候補牌ごとに上書きする.
+
+    Returns:
+        list[dict]: 和了になる牌ごとの辞書のリスト (牌の順).
+            - tile (str)       : 和了牌.
+            - machi (list[str]): 待ちの形 (解釈が複数ある場合は全て).
+            - ron (dict)       : ロン和了時の MahjongScorer.calculate と同じ形式の結果.
+            - tsumo (dict)     : ツモ和了時の MahjongScorer.calculate と同じ形式の結果.
+        聴牌していない場合は空のリスト.
+
+    Raises:
+        ValueError: 牌の文字列が不正な場合や、手牌の枚数が13枚でない場合.
+    """
+    called_tiles = [m.tiles for m in called_mentsu]
+    encoded = EncodedHand(hand, called_tiles, "")
+    closed_counts = encoded.closed_counts[:]
+    num_called = len(called_mentsu)
+    if sum(closed_counts) + 3 * num_called != 13:
+        raise ValueError(f"待ちは13枚の手牌で求めます: {len(hand)}枚")
+
+    # 自分の手牌と鳴き面子で4枚使っている牌は、和了牌にならない.
+    own_counts = closed_counts[:]
+    for tiles in encoded.called:
+        for i in tiles:
+            own_counts[i] += 1
+
+    # 13枚の手牌の色ごとの分解. 候補牌を加えた色以外は、全ての候補牌で共有する.
+    parts = None
+    if SUIT_TABLE is not None:
+        parts = [suit_decompositions(closed_counts, base) for base in (0, 9, 18)]
+        parts.append(honor_decompositions(closed_counts))
+
+    waits = []
+    for tile in range(NUM_TILE_KINDS):
+        if own_counts[tile] >= 4:
+            continue
+        closed_counts[tile] += 1
+        decompositions = None
+        if parts is not None:
+            suit = SUIT_OF[tile]
+            tile_parts = parts[:]
+            tile_parts[suit] = (suit_decompositions(closed_counts, suit * 9) if suit < 3
+                                else honor_decompositions(closed_counts))
+            decompositions = join_decompositions(tile_parts) if all(tile_parts) else []
+            is_agari = bool(decompositions)
+        else:
+            is_agari = normal_shanten(closed_counts, num_called) == -1
+        if num_called == 0:
+            is_agari = is_agari or chiitoitsu_shanten(closed_counts) == -1 or kokushi_shanten(closed_counts) == -1
+        closed_counts[tile] -= 1
+        if not is_agari:
+            continue
+
+        agari_hai = TILE_NAMES[tile]
+        full_hand = list(hand) + [agari_hai]
+        analysis = HandAnalysis(
+            full_hand, called_mentsu, agari_hai,
+            encoded_hand=EncodedHand(full_hand, called_tiles, agari_hai),
+            decompositions=decompositions,
+        )
+        patterns = analysis.agari_combinations
+        if not patterns:
+            continue
+        wait = {
+            "tile": agari_hai,
+            "machi": list(dict.fromkeys(p["machi"] for p in patterns if "machi" in p)),
+        }
+        # 和了形の解析結果はロンとツモで共有し、役と点数だけを計算し直す.
+        for key, is_tsumo in (("ron", False), ("tsumo", True)):
+            state = dict(game_state, agari_hai=agari_hai, is_tsumo=is_tsumo)
+            wait[key] = MahjongScorer(full_hand, called_mentsu, **state).score_patterns(patterns)
+        waits.append(wait)
+    return waits
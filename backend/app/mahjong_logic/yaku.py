@@ -1,15 +1,147 @@
 import collections
+import functools
+from typing import Callable, NamedTuple
+
 from .helpers import Tile, Call
+from .dora import dora_vector_of
+from .features import HandFeatures, build_features, hand_of
 
 KAZEHAI = ['1z', '2z', '3z', '4z']
 SANGENPAI = ['5z', '6z', '7z']
-YAOCHUHAI = ['1m', '9m', '1p', '9p', '1s', '9s'] + KAZEHAI + SANGENPAI
+YAOCHUHAI = frozenset(['1m', '9m', '1p', '9p', '1s', '9s'] + KAZEHAI + SANGENPAI)
+DAISHARIN_TILES = sorted(f'{n}p' for n in range(2, 9) for _ in range(2))
+
+
+class YakuRule(NamedTuple):
+    """
+    役の登録表の1項目.
+
+    Attributes:
+        name (str)              : 役名.
+        check (str)             : 成立を判定するYakuJudgeのメソッド名.
+        han (int | None)        : 門前の飜数. Noneの場合は判定結果(ドラの枚数など)を飜数とする.
+        han_open (int | None)   : 鳴きがある場合の飜数.
+        forms (tuple[str, ...]) : 対象の和了形 ("normal", "chitoitsu", "kokushi").
+        requires (tuple[str, ...]): 前提条件 (PRECONDITIONS のキー). 成り立たない場合は判定しない.
+        excludes (tuple[str, ...]): この役より上位の役. いずれかが成立している場合は判定しない.
+        yakuman (bool)          : 役満か.
+        stop (bool)             : 成立した場合に、以降の役を判定せずに終了するか.
+        local (bool)            : ローカル役か (ゲームの状況の enabled_local_yaku で有効にする).
+    """
+    name: str
+    check: str
+    han: int | None
+    han_open: int | None
+    forms: tuple[str, ...] = ('normal',)
+    requires: tuple[str, ...] = ()
+    excludes: tuple[str, ...] = ()
+    yakuman: bool = False
+    stop: bool = False
+    local: bool = False
+
+
+def _rule(name: str, check: str, han: int | None, han_open: int | None = None, **kwargs) -> YakuRule:
+    """鳴きがある場合の飜数を省略した場合は、門前と同じ飜数とする."""
+    return YakuRule(name, check, han, han if han_open is None else han_open, **kwargs)
+
+
+# 役の判定の前提条件. 条件名 -> ビット. YakuJudge._get_preconditions で一度にまとめて求める.
+# 前提条件は、その条件を要求する全ての役が成立するための必要条件でなければならない.
+PRECONDITIONS = {
+    'menzen': 1 << 0,           # 門前 (判定順を組み立てるときに判定する).
+    'single_suit': 1 << 1,      # 手牌が1種類の色 (字牌を含む) だけ.
+    'one_number_suit': 1 << 2,  # 数牌が1種類の色以下.
+    'yaochu_janto': 1 << 3,     # 雀頭が么九牌.
+    'honor_kotsu': 1 << 4,      # 字牌の刻子・槓子がある.
+    'shuntsu2': 1 << 5,         # 順子が2つ以上.
+    'shuntsu3': 1 << 6,         # 順子が3つ以上.
+    'kotsu3': 1 << 7,           # 刻子・槓子が3つ以上.
+    'kan3': 1 << 8,             # 4枚の面子が3つ以上.
+    'special_win': 1 << 9,      # 天和・地和・ダブル立直・槍槓・嶺上開花・海底・河底のいずれか.
+}
+
+# 和了の状況だけで決まる役のゲームの状況のキー.
+SPECIAL_WIN_KEYS = ('is_tenhou', 'is_chiihou', 'is_double_riichi', 'is_chankan', 'is_rinshan',
+                    'is_haitei', 'is_houtei')
+
+# 役の登録表. 和了形ごとに、この順番で判定する (役満, それ以外の順).
+# 同じ前提条件の役は並べて登録し、まとめて判定を省略できるようにする.
+# 上位の役 (excludes) は、下位の役より前に登録する.
+YAKU_REGISTRY = (
+    # --- 国士無双 ---
+    _rule('国士無双13面待ち', '_is_kokushi_13men_machi', 26, forms=('kokushi',), yakuman=True),
+    _rule('国士無双', '_is_kokushi', 13, forms=('kokushi',), yakuman=True, excludes=('国士無双13面待ち',)),
+
+    # --- 七対子 ---
+    # 字一色七対子は役満. 七対子の役とは複合させたまま返す.
+    _rule('字一色', '_is_tuuiisou', 13, forms=('chitoitsu',), requires=('single_suit',), yakuman=True),
+    _rule('七対子', '_is_chiitoitsu', 2, forms=('chitoitsu',)),
+    _rule('立直', '_is_riiti', 1, forms=('chitoitsu',)),
+    _rule('一発', '_is_ippatsu', 1, forms=('chitoitsu',)),
+    _rule('門前清自摸和', '_is_menzen_tsumo', 1, forms=('chitoitsu',)),
+    _rule('断么九', '_is_tanyao', 1, forms=('chitoitsu',)),
+    _rule('混老頭', '_is_honroutou', 2, forms=('chitoitsu',)),
+    _rule('清一色', '_is_chinitsu', 6, forms=('chitoitsu',), requires=('single_suit',)),
+
+    # --- 通常形の役満 ---
+    _rule('大四喜', '_is_daisuushi', 26, requires=('kotsu3', 'honor_kotsu'), yakuman=True, stop=True),
+    _rule('純正九蓮宝燈', '_is_junsei_churenpoutou', 26, requires=('menzen', 'single_suit'), yakuman=True, stop=True),
+    _rule('九蓮宝燈', '_is_normal_churenpoutou', 13, requires=('menzen', 'single_suit'), yakuman=True,
+          excludes=('純正九蓮宝燈',)),
+    _rule('四暗刻単騎', '_is_suuankou_tanki', 26, requires=('menzen', 'kotsu3'), yakuman=True, stop=True),
+    _rule('四暗刻', '_is_normal_suuankou', 13, requires=('menzen', 'kotsu3'), yakuman=True, excludes=('四暗刻単騎',)),
+    _rule('大三元', '_is_daisangen', 13, requires=('kotsu3', 'honor_kotsu'), yakuman=True),
+    _rule('四槓子', '_is_suukantsu', 13, requires=('kan3',), yakuman=True),
+    _rule('緑一色', '_is_ryuuiisou', 13, yakuman=True),
+    _rule('字一色', '_is_tuuiisou', 13, requires=('single_suit',), yakuman=True),
+    _rule('清老頭', '_is_chinroutou', 13, requires=('yaochu_janto',), yakuman=True),
+    _rule('小四喜', '_is_shousuushi', 13, requires=('kotsu3', 'honor_kotsu'), yakuman=True),
+    _rule('大車輪', '_is_daisharin', 13, requires=('menzen', 'single_suit'), yakuman=True, local=True),
+    _rule('天和', '_is_tenhou', 13, requires=('special_win',), yakuman=True, stop=True),
+    _rule('地和', '_is_chiihou', 13, requires=('special_win',), yakuman=True, stop=True),
+
+    # --- 通常形の役 ---
+    _rule('清一色', '_is_chinitsu', 6, 5, requires=('single_suit',)),
+    _rule('混一色', '_is_honitsu', 3, 2, requires=('one_number_suit',), excludes=('清一色',)),
+    _rule('二盃口', '_is_ryanpeiko', 3, requires=('menzen', 'shuntsu2')),
+    _rule('一盃口', '_is_iipeko', 1, requires=('menzen', 'shuntsu2'), excludes=('二盃口',)),
+    _rule('純全帯么九', '_is_junchan', 3, 2, requires=('yaochu_janto',)),
+    _rule('混全帯么九', '_is_chanta', 2, 1, requires=('yaochu_janto',), excludes=('純全帯么九',)),
+    _rule('混老頭', '_is_honroutou', 2, requires=('yaochu_janto',)),
+    _rule('一気通貫', '_is_ikkitsukan', 2, 1, requires=('shuntsu3',)),
+    _rule('三色同順', '_is_sanshoku_doujun', 2, 1, requires=('shuntsu3',)),
+    _rule('小三元', '_is_shousangen', 2, requires=('honor_kotsu',)),
+    _rule('自風', '_is_jikaze', 1, requires=('honor_kotsu',)),
+    _rule('場風', '_is_bakaze', 1, requires=('honor_kotsu',)),
+    _rule('白', '_is_haku', 1, requires=('honor_kotsu',)),
+    _rule('發', '_is_hatsu', 1, requires=('honor_kotsu',)),
+    _rule('中', '_is_chun', 1, requires=('honor_kotsu',)),
+    _rule('三槓子', '_is_sankantsu', 2, requires=('kan3',)),
+    _rule('対々和', '_is_toitoi', 2, requires=('kotsu3',)),
+    _rule('三暗刻', '_is_sanankou', 2, requires=('kotsu3',)),
+    _rule('三色同刻', '_is_sanshoku_doukou', 2, requires=('kotsu3',)),
+    _rule('ダブル立直', '_is_double_riichi', 2, requires=('special_win',)),
+    _rule('槍槓', '_is_chankan', 1, requires=('special_win',)),
+    _rule('嶺上開花', '_is_rinshan', 1, requires=('special_win',)),
+    _rule('海底摸月', '_is_haitei', 1, requires=('special_win',)),
+    _rule('河底撈魚', '_is_houtei', 1, requires=('special_win',)),
+    _rule('断么九', '_is_tanyao', 1),
+    _rule('平和', '_is_pinfu', 1, requires=('menzen',)),
+    _rule('門前清自摸和', '_is_menzen_tsumo', 1, requires=('menzen',)),
+    _rule('一発', '_is_ippatsu', 1),
+    _rule('立直', '_is_riiti', 1),
+    _rule('ドラ', '_is_dora', None),
+)
+
+# 役満が成立した場合に、役満以外の役を判定しない和了形.
+# 七対子は字一色と七対子などの役を複合させたまま返す.
+YAKUMAN_ONLY_FORMS = frozenset(['normal', 'kokushi'])
 
 class YakuJudge:
     """
     手牌と状況を受け取り, 成立する役を判定するクラス.
     """
-    def __init__(self, analysis: dict, called_mentsu_list: list, context: dict):
+    def __init__(self, analysis: dict, called_mentsu_list: list, context: dict, dora_count: int | None = None):
         """
         役判定に必要な情報を初期化する.
 
@@ -18,185 +150,130 @@ class YakuJudge:
             called_mentsu_list (list): 鳴き牌のリスト.
             context (dict)           : 役判定に必要なコンテキスト情報.
                                         (例: is_tsumo, is_riichi, is_ippatsu, etc.)
+            dora_count (int | None)  : 手牌ごとに数えたドラ・赤ドラ・裏ドラの合計枚数.
+                                        省略した場合は手牌とコンテキストの表示牌から数える.
         """
+        self.analysis = analysis
         self.mentsu_list = analysis["mentsu"]
         self.janto = analysis["janto"]
         self.type = analysis["type"]
-        print(self.type)
-        if self.type != 'chitoitsu' and self.type != 'kokushi':
-            self.hand = [self.janto, self.janto] + sum(self.mentsu_list, [])
-        else:
-            self.hand = self.mentsu_list
         self.machi = analysis.get("machi", "ryanmen")
         self.called_mentsu_list = called_mentsu_list
         self.context = context
+        self._dora_count = dora_count
+        # HandAnalysisの解析結果には特徴量が付いている. ない場合は最初に使うときに求める.
+        self._features = analysis.get("features")
+        self._hand = list(self._features.hand) if self._features is not None else hand_of(analysis)
+        # 複数の役で共有する判定結果.
+        self._churenpoutou = None
+        self._suuankou = None
+
+    @property
+    def hand(self) -> list[str]:
+        """雀頭2枚と面子の牌を並べた手牌 (七対子・国士無双は面子のリスト)."""
+        return self._hand
+
+    @hand.setter
+    def hand(self, hand: list[str]) -> None:
+        """手牌を差し替える. 特徴量は差し替えた手牌で求め直す."""
+        self._hand = hand
+        self._features = None
+
+    @property
+    def features(self) -> HandFeatures:
+        """和了パターンの特徴量."""
+        if self._features is None:
+            self._features = build_features(
+                self.analysis, self.called_mentsu_list, self.context.get('agari_hai'), hand=self._hand
+            )
+        return self._features
         
     def check_all_yaku(self) -> dict:
         """
         成立するすべての役を判定する.
 
         役の判定は、手牌、鳴き牌、和了牌、コンテキスト情報を基に行われる.
+        判定する役と順番は役の登録表(YAKU_REGISTRY)から和了形ごとに組み立てたもので、
+        前提条件が成り立たないグループの役はまとめて判定を省略する.
         判定された役は辞書形式で返される.
 
         Returns:
             dict: 役名と飜数の辞書.
         """
         yaku_dict = {}
-        is_menzen = self.context.get('is_menzen', False)
-        
-        # 国士無双の判定.
-        if self.type == 'kokushi':
-            if self._is_kokushi_13men_machi():
-                yaku_dict['国士無双13面待ち'] = 26
-            else:
-                yaku_dict['国士無双'] = 13
-        
-        # 七対子の判定.
-        elif self.type == 'chitoitsu':
-            # 字一色七対子は役満.
-            if self._is_tuuiisou():
-                yaku_dict['字一色'] = 13
-            # 通常の七対子.
-            yaku_dict['七対子'] = 2
-            if self._is_riiti():
-            # 複合役の判定.
-                yaku_dict['立直'] = 1
-            if self._is_ippatsu():
-                yaku_dict['一発'] = 1
-            if self._is_menzen_tsumo():
-                yaku_dict['門前清自摸和'] = 1
-            if self._is_tanyao():
-                yaku_dict['断么九'] = 1
-            if self._is_honroutou():
-                yaku_dict['混老頭'] = 2
-            if self._is_chinitsu():
-                yaku_dict['清一色'] = 6
-                
-                
-        # 通常の役の判定.
+        is_menzen = bool(self.context.get('is_menzen', False))
+        form = self.type if self.type in ('chitoitsu', 'kokushi') else 'normal'
+        enabled_local = self.context.get('enabled_local_yaku')
+        disabled = self.context.get('disabled_yaku')
+        if enabled_local or disabled:
+            plan = compile_yaku_plan(form, is_menzen, frozenset(enabled_local or ()), frozenset(disabled or ()))
         else:
-            # 役満の判定.
-            if self._is_daisuushi():
-                yaku_dict['大四喜'] = 26
-                return yaku_dict
-            normal, junsei = self._is_churenpoutou()
-            if normal:
-                if junsei:
-                    yaku_dict['純正九蓮宝燈'] = 26
-                    return yaku_dict
-                yaku_dict['九蓮宝燈'] = 13
-            normal, tanki = self._is_suuankou()
-            if normal:
-                if tanki:
-                    yaku_dict['四暗刻単騎'] = 26
-                    return yaku_dict
-                yaku_dict['四暗刻'] = 13
-            if self._is_daisangen():
-                yaku_dict['大三元'] = 13
-            if self._is_suukantsu():
-                yaku_dict['四槓子'] = 13
-            if self._is_ryuuiisou():
-                yaku_dict['緑一色'] = 13
-            if self._is_tuuiisou():
-                yaku_dict['字一色'] = 13
-            if self._is_chinroutou():
-                yaku_dict['清老頭'] = 13
-            if self._is_shousuushi():
-                yaku_dict['小四喜'] = 13
-            if self.context.get('is_tenhou', False):
-                yaku_dict['天和'] = 13
-                return yaku_dict
-            if self.context.get('is_chiihou', False):
-                yaku_dict['地和'] = 13
-                return yaku_dict
+            plan = compile_yaku_plan(form, is_menzen)
+        # 成り立つ前提条件のビット.
+        satisfied = self._get_preconditions()
+
+        for phase in plan.phases:
+            for requires, rules in phase:
+                # 前提条件が成り立たないグループは、まとめて判定を省略する.
+                if requires & ~satisfied:
+                    continue
+                for name, check, han, excludes, stop in rules:
+                    # 上位の役が成立している場合は判定しない.
+                    if excludes and not yaku_dict.keys().isdisjoint(excludes):
+                        continue
+                    result = check(self)
+                    if not result:
+                        continue
+                    # 飜数がない役(ドラ)は、判定結果を飜数とする.
+                    yaku_dict[name] = result if han is None else han
+                    # 以降の役を判定せずに終了する役 (ダブル役満・天和など).
+                    if stop:
+                        return yaku_dict
             # 役満は役満以外の役と複合しないため、ここで終了.
-            if len(yaku_dict) > 0:
+            if plan.yakuman_only and yaku_dict:
                 return yaku_dict
-            
-            #  通常の役の判定.
-            if self._is_chinitsu():
-                if is_menzen:
-                    yaku_dict['清一色'] = 6
-                else:
-                    yaku_dict['清一色'] = 5
-            elif self._is_honitsu():
-                if is_menzen:
-                    yaku_dict['混一色'] = 3
-                else:
-                    yaku_dict['混一色'] = 2
-            if self._is_ryanpeiko():
-                yaku_dict['二盃口'] = 3
-            elif self._is_iipeko():
-                yaku_dict['一盃口'] = 1
-            if self._is_junchan():
-                if is_menzen:
-                    yaku_dict['純全帯么九'] = 3
-                else:
-                    yaku_dict['純全帯么九'] = 2
-            elif self._is_chanta():
-                if is_menzen:
-                    yaku_dict['混全帯么九'] = 2
-                else:
-                    yaku_dict['混全帯么九'] = 1
-            if self._is_ikkitsukan():
-                if is_menzen:
-                    yaku_dict['一気通貫'] = 2
-                else:
-                    yaku_dict['一気通貫'] = 1
-            if self._is_sanshoku_doujun():
-                if is_menzen:
-                    yaku_dict['三色同順'] = 2
-                else:
-                    yaku_dict['三色同順'] = 1
-            if self._is_honroutou():
-                yaku_dict['混老頭'] = 2
-            if self._is_shousangen():
-                yaku_dict['小三元'] = 2
-            if self._is_sankantsu():
-                yaku_dict['三槓子'] = 2
-            if self._is_toitoi():
-                yaku_dict['対々和'] = 2
-            if self._is_sanankou():
-                yaku_dict['三暗刻'] = 2
-            if self._is_sanshoku_doukou():
-                yaku_dict['三色同刻'] = 2
-            if self._is_double_riichi():
-                yaku_dict['ダブル立直'] = 2
-            if self._is_chankan():
-                yaku_dict['槍槓'] = 1
-            if self._is_rinshan():
-                yaku_dict['嶺上開花'] = 1
-            if self._is_haitei():
-                yaku_dict['海底摸月'] = 1
-            if self._is_houtei():
-                yaku_dict['河底撈魚'] = 1
-            if self._is_tanyao():
-                yaku_dict['断么九'] = 1
-            if self._is_jikaze():
-                yaku_dict['自風'] = 1
-            if self._is_bakaze():
-                yaku_dict['場風'] = 1
-            if self._is_haku():
-                yaku_dict['白'] = 1
-            if self._is_hatsu():
-                yaku_dict['發'] = 1
-            if self._is_chun():
-                yaku_dict['中'] = 1
-
-            if self._is_pinfu():
-                yaku_dict['平和'] = 1
-            if self._is_menzen_tsumo():
-                yaku_dict['門前清自摸和'] = 1
-            if self._is_ippatsu():
-                yaku_dict['一発'] = 1
-            if self._is_riiti():
-                yaku_dict['立直'] = 1
-            dora_count = self._is_dora()
-            if dora_count > 0:
-                yaku_dict['ドラ'] = dora_count
         return yaku_dict
             
         
+    # --- 役の判定の前提条件 (PRECONDITIONS) ---
+    def _get_preconditions(self) -> int:
+        """
+        役の判定の前提条件のうち、成り立つものを求める.
+
+        Returns:
+            int: 成り立つ前提条件のビット (PRECONDITIONS) の和.
+        """
+        context = self.context
+        satisfied = 0
+        for key in SPECIAL_WIN_KEYS:
+            if context.get(key, False):
+                satisfied |= PRECONDITIONS['special_win']
+                break
+        if self.janto in YAOCHUHAI:
+            satisfied |= PRECONDITIONS['yaochu_janto']
+        features = self.features
+        suits = features.suit_mask
+        if suits & (suits - 1) == 0:
+            satisfied |= PRECONDITIONS['single_suit']
+        suits &= 0b0111
+        if suits & (suits - 1) == 0:
+            satisfied |= PRECONDITIONS['one_number_suit']
+        num_shuntsu = len(features.shuntsu)
+        if num_shuntsu >= 2:
+            satisfied |= PRECONDITIONS['shuntsu2']
+            if num_shuntsu >= 3:
+                satisfied |= PRECONDITIONS['shuntsu3']
+        kotsu = features.kotsu + features.kantsu
+        if len(kotsu) >= 3:
+            satisfied |= PRECONDITIONS['kotsu3']
+        for tile in kotsu:
+            if tile[1] == 'z':
+                satisfied |= PRECONDITIONS['honor_kotsu']
+                break
+        if features.num_kan >= 3:
+            satisfied |= PRECONDITIONS['kan3']
+        return satisfied
+
     #-- 共通メソッド ---
     def _get_shuntsu_counts(self) -> collections.Counter:
         """
@@ -205,11 +282,10 @@ class YakuJudge:
         Returns:
             collections.Counter: 順子の牌の枚数をカウントしたCounterオブジェクト.
         """
-        shuntsu_list = [mentsu for mentsu in self.mentsu_list if len(set(mentsu)) ==3]
+        shuntsu_list = self.features.shuntsu
         if len(shuntsu_list) <2:
             return collections.Counter()
-        shuntsu_tuple = [tuple(sorted(shunstu)) for shunstu in shuntsu_list]
-        return collections.Counter(shuntsu_tuple)
+        return collections.Counter(shuntsu_list)
     
     def _get_shuntsu(self) -> list[str]:
         """
@@ -218,8 +294,7 @@ class YakuJudge:
         Returns:
             list[str]: 順子の牌のリスト.
         """
-        shuntsu_list = [mentsu for mentsu in self.mentsu_list if len(set(mentsu)) == 3]
-        return shuntsu_list
+        return list(self.features.shuntsu)
     
     def _get_kotsu(self) -> list[str]:
         """
@@ -228,8 +303,7 @@ class YakuJudge:
         Returns:
             list[str]: 刻子の牌のリスト.
         """
-        kotsu_list = [mentsu[0] for mentsu in self.mentsu_list if len(set(mentsu)) == 1]
-        return kotsu_list
+        return list(self.features.kotsu)
     
     def _get_kantsu(self) -> list[str]:
         """
@@ -238,9 +312,39 @@ class YakuJudge:
         Returns:
             list[str]: 槓子の牌のリスト.
         """
-        kantsu_list = [mentsu[0] for mentsu in self.mentsu_list if len(set(mentsu)) == 4]
-        return kantsu_list
+        return list(self.features.kantsu)
+
+    def _count_ankou(self) -> int:
+        """
+        暗刻の数をカウントする関数.
+        鳴いた刻子と、ロン和了りで和了牌が完成させた刻子は暗刻に数えない.
+
+        Returns:
+            int: 暗刻の数.
+        """
+        is_ron = not self.context.get('is_tsumo', False)
+        return sum(1 for meld in self.features.melds
+                   if meld.is_kotsu and not meld.is_open and not (is_ron and meld.has_agari))
     
+    # --- 和了形の判定メソッド ---
+    def _is_kokushi(self) -> bool:
+        """
+        国士無双の判定を行う. 国士無双の和了形であれば常に成立する.
+
+        Returns:
+            bool: 国士無双が成立する場合はTrue, それ以外はFalse.
+        """
+        return self.type == 'kokushi'
+
+    def _is_chiitoitsu(self) -> bool:
+        """
+        七対子の判定を行う. 七対子の和了形であれば常に成立する.
+
+        Returns:
+            bool: 七対子が成立する場合はTrue, それ以外はFalse.
+        """
+        return self.type == 'chitoitsu'
+
     # --- 1飜役の判定メソッド ---
     def _is_riiti(self) -> bool:
         """
@@ -263,21 +367,14 @@ class YakuJudge:
     def _is_dora(self) -> int:
         """
         ドラの枚数をカウントする関数.
-        ドラ、赤ドラ、裏ドラの合計を返す.
+        ドラ、赤ドラ、裏ドラの合計を返す. ドラの枚数は面子の構成によらない (dora.py).
         
         Returns:
             int: ドラ、赤ドラ、裏ドラの合計枚数.
         """
-        dora = [d.strip() for d in self.context.get('dora_indicators', '').split(',') if not d.strip().isspace()]
-        ura_dora = [u_d.strip() for u_d in self.context.get('ura_dora_indicators', '').split(',') if not u_d.strip().isspace()]
-        akadora = ['5mr', '5pr', '5sr']  # 赤ドラの牌
-        dora_list = dora + ura_dora + akadora
-        dora_count = 0
-        
-        for tile in self.hand:
-            if tile in dora_list:
-                dora_count += 1
-        return dora_count
+        if self._dora_count is not None:
+            return self._dora_count
+        return dora_vector_of(self.context).count_tiles(self.hand).total
     
     def _is_menzen_tsumo(self) -> bool:
         """
@@ -312,10 +409,8 @@ class YakuJudge:
         # 面前の確認.
         if not self.context.get('is_menzen', False):
             return False
-        # 面子の順子の枚数をカウント.
-        shuntsu_counts = self._get_shuntsu_counts()
         # 同じ順子が2つあるかを確認.
-        return list(shuntsu_counts.values()).count(2) == 1
+        return self.features.shuntsu_counts.count(2) == 1
     
     def _is_jikaze(self) -> bool:
         """
@@ -324,11 +419,7 @@ class YakuJudge:
         Returns:
             bool: 自風が成立する場合はTrue, それ以外はFalse.
         """
-        kotsu_list = self._get_kotsu()
-        jikaze = self.context.get('jikaze', '')
-        if jikaze in kotsu_list:
-            return True
-        return False
+        return self.context.get('jikaze', '') in self.features.kotsu
         
     def _is_bakaze(self) -> bool:
         """
@@ -337,11 +428,7 @@ class YakuJudge:
         Returns:
             bool: 場風が成立する場合はTrue, それ以外はFalse.
         """
-        kotsu_list = self._get_kotsu()
-        bakaze = self.context.get('bakaze', '')
-        if bakaze in kotsu_list:
-            return True
-        return False
+        return self.context.get('bakaze', '') in self.features.kotsu
     
     def _is_haku(self) -> bool:
         """
@@ -350,10 +437,7 @@ class YakuJudge:
         Returns:
             bool: 白が成立する場合はTrue, それ以外はFalse.
         """
-        kotsu_list = self._get_kotsu()
-        if '5z' in kotsu_list:  # 白は5zとして扱う
-            return True
-        return False
+        return '5z' in self.features.kotsu  # 白は5zとして扱う
     
     def _is_hatsu(self) -> bool:
         """
@@ -362,10 +446,7 @@ class YakuJudge:
         Returns:
             bool: 發が成立する場合はTrue, それ以外はFalse.
         """
-        kotsu_list = self._get_kotsu()
-        if '6z' in kotsu_list:  # 發は6zとして扱う
-            return True
-        return False
+        return '6z' in self.features.kotsu  # 發は6zとして扱う
     
     def _is_chun(self) -> bool:
         """
@@ -374,10 +455,7 @@ class YakuJudge:
         Returns:
             bool: 中が成立する場合はTrue, それ以外はFalse.
         """
-        kotsu_list = self._get_kotsu()
-        if '7z' in kotsu_list:  # 中は7zとして扱う
-            return True
-        return False
+        return '7z' in self.features.kotsu  # 中は7zとして扱う
     
     def _is_tanyao(self) -> bool:
         """
@@ -387,10 +465,8 @@ class YakuJudge:
             bool: 断么九が成立する場合はTrue, それ以外はFalse.
         """
         # 么九中牌が含まれていないかをチェック
-        for tile in self.hand:
-            if tile in YAOCHUHAI:
-                return False
-        return True
+        features = self.features
+        return features.num_honors + features.num_terminals == 0
     
     def _is_haitei(self) -> bool:
         """
@@ -445,8 +521,7 @@ class YakuJudge:
         Returns:
             bool: 三色同刻が成立する場合はTrue, それ以外はFalse.
         """
-        # 面子の刻子の枚数をカウント.
-        kotsu_list = self._get_kotsu()
+        kotsu_list = self.features.kotsu
         # 3種類の刻子がそれぞれ1枚ずつあるかを確認.
         if len(kotsu_list) < 3:
             return False
@@ -470,25 +545,7 @@ class YakuJudge:
         Returns:
             bool: 三暗刻が成立する場合はTrue, それ以外はFalse.
         """
-        ankou_count = 0
-        called_mentsu_tuples = [tuple(sorted(called_mentsu.tiles)) for called_mentsu in self.called_mentsu_list]
-        
-        # 面子の刻子をチェック.
-        for mentsu in self.mentsu_list:
-            # 刻子でなければスキップ
-            if len(set(mentsu)) != 1:
-                continue
-            is_ankou = True
-            # 鳴いた面子（ポンなど）は暗刻ではない
-            if tuple(sorted(mentsu)) in called_mentsu_tuples:
-                is_ankou = False
-            # ロン和了りで、和了牌がこの刻子を完成させた場合も暗刻ではない
-            is_ron = not self.context.get('is_tsumo', False)
-            if is_ron and self.context.get('agari_hai') in mentsu:
-                is_ankou = False
-            if is_ankou:
-                ankou_count += 1
-        return ankou_count == 3
+        return self._count_ankou() == 3
     
     def _is_toitoi(self) -> bool:
         """
@@ -497,12 +554,9 @@ class YakuJudge:
         Returns:
             bool: 対々和が成立する場合はTrue, それ以外はFalse.
         """
-        # 面子の刻子の枚数をカウント.
-        kotsu_list = self._get_kotsu()
-        # 面子の順子の枚数をカウント.
-        kantsu_list = self._get_kantsu()
-        # 刻子が4つ以上、順子が0つであれば対々和
-        return (len(kotsu_list) + len(kantsu_list)) == 4
+        # 刻子と槓子が合わせて4つであれば対々和
+        features = self.features
+        return (len(features.kotsu) + len(features.kantsu)) == 4
     
     def _is_sankantsu(self) -> bool:
         """
@@ -511,11 +565,7 @@ class YakuJudge:
         Returns:
             bool: 三槓子が成立する場合はTrue, それ以外はFalse.
         """
-        kantsu_count = 0
-        for mentsu in self.mentsu_list:
-            if len(mentsu) == 4:
-                kantsu_count += 1
-        return kantsu_count == 3
+        return self.features.num_kan == 3
     
     def _is_shousangen(self) -> bool:
         """
@@ -528,8 +578,7 @@ class YakuJudge:
         if  not self.janto or self.janto not in SANGENPAI:
             return False
         # 三元牌の刻子の枚数をカウント.
-        kotsu_list = self._get_kotsu()
-        sangenpai_list = [tile for tile in kotsu_list if tile in SANGENPAI]
+        sangenpai_list = [tile for tile in self.features.kotsu if tile in SANGENPAI]
         sangenpai_list.append(self.janto)  # 雀頭も含める
         # 小三元は、3種類の三元牌のうち2種類が刻子であることを確認.
         return len(set(sangenpai_list)) == 3
@@ -541,12 +590,9 @@ class YakuJudge:
         Returns:
             bool: 混老頭が成立する場合はTrue, それ以外はFalse.
         """
-        # 么九中牌が含まれているかをチェック
-        for tile in self.hand:
-            if tile not in YAOCHUHAI:
-                return False
-        # 刻子の枚数をカウント.
-        return True
+        # 全ての牌が么九中牌かをチェック
+        features = self.features
+        return features.num_honors + features.num_terminals == features.num_tiles
     
     def _is_sanshoku_doujun(self) -> bool:
         """
@@ -555,14 +601,14 @@ class YakuJudge:
         Returns:
             bool: 三色同順が成立する場合はTrue, それ以外はFalse.
         """
-        shuntsu_list = self._get_shuntsu()
+        shuntsu_list = self.features.shuntsu
         if len(shuntsu_list) < 3:
             return False
         
         shuntsu_groups = collections.defaultdict(set)
         for shuntsu in shuntsu_list:
-            # 順子をソートして、開始牌を特定 (例: '1m')
-            start_tile = sorted(shuntsu, key=Tile.sort_key)[0]
+            # 順子は牌の順に並んでいるため、先頭が開始牌 (例: '1m')
+            start_tile = shuntsu[0]
             number = start_tile[0] # 数字部分 (例: '1')
             suit = start_tile[1]   # 種類部分 (例: 'm')
             shuntsu_groups[number].add(suit)
@@ -582,22 +628,20 @@ class YakuJudge:
         Returns:
             bool: 一気通貫が成立する場合はTrue, それ以外はFalse.
         """
-        shuntsu_list = self._get_shuntsu()
+        shuntsu_list = self.features.shuntsu
         if len(shuntsu_list) < 3:
             return False
         
-        # 面子の順子の数字部分を抽出
+        # 順子を種類ごとにまとめる.
         shuntsu_groups = collections.defaultdict(set)
         for shuntsu in shuntsu_list:
             suit = shuntsu[0][1]  # 種類部分 (例: 'm')
-            shuntsu_groups[suit].add(tuple(sorted(shuntsu, key=Tile.sort_key)))
+            shuntsu_groups[suit].add(shuntsu)
             
-        for suit, shuntsu_in_suit in shuntsu_groups.items():
+        for suit, shuntsu_set in shuntsu_groups.items():
             if suit == 'z':
                 continue  # 字牌は除外
             
-            # その種類の順子のセットを作成.
-            shuntsu_set = set(shuntsu_in_suit)
             # 一気通貫の順子のセットを定義.
             target_shuntsu = {
                 (f"1{suit}", f"2{suit}", f"3{suit}"),
@@ -616,20 +660,10 @@ class YakuJudge:
         Returns:
             bool: 混全帯么九が成立する場合はTrue, それ以外はFalse.
         """
-        # 么九中牌が含まれているかをチェック
+        # 雀頭と全ての面子に么九中牌が含まれているかをチェック
         if self.janto not in YAOCHUHAI:
             return False
-        for mentsu in self.mentsu_list:
-            yaochuhai_count = 0
-            for tile in mentsu:
-                if tile in YAOCHUHAI:
-                    yaochuhai_count += 1
-            # 面子に么九中牌が1枚以上含まれているかを確認
-            if yaochuhai_count == 0:
-                return False
-        return True
-    
-    # -- 3飜役の判定メソッド ---
+        return self.features.all_mentsu_yaochu
     def _is_ryanpeiko(self) -> bool:
         """
         二盃口の判定を行う.
@@ -639,10 +673,8 @@ class YakuJudge:
         """
         if not self.context.get('is_menzen', False):
             return False
-        # 面子の順子の枚数をカウント.
-        shuntsu_counts = self._get_shuntsu_counts()
         # 同じ順子が4つあるかを確認.
-        counts_value = list(shuntsu_counts.values())
+        counts_value = self.features.shuntsu_counts
         return counts_value.count(2) == 2 or 4 in counts_value
     
     def _is_junchan(self) -> bool:
@@ -654,10 +686,8 @@ class YakuJudge:
         """
         if not self._is_chanta():
             return False
-        for tile in self.hand:
-            if tile[1] == 'z':
-                return False
-        return True
+        # 字牌を含まないことを確認.
+        return self.features.num_honors == 0
     
     def _is_honitsu(self) -> bool:
         """
@@ -666,17 +696,9 @@ class YakuJudge:
         Returns:
             bool: 混一色が成立する場合はTrue, それ以外はFalse.
         """
-        suit = ''
-        for tile in self.hand:
-            if tile[1] == 'z':
-                continue
-            if len(suit) == 0:
-                suit = tile[1]
-            elif suit != tile[1]:
-                return False
-        return True
-    
-    # --6飜役の判定メソッド ---
+        # 字牌以外の色が1種類以下であることを確認.
+        suits = self.features.suit_mask & 0b0111
+        return suits & (suits - 1) == 0
     def _is_chinitsu(self) -> bool:
         """
         清一色の判定を行う.
@@ -684,17 +706,9 @@ class YakuJudge:
         Returns:
             bool: 清一色が成立する場合はTrue, それ以外はFalse.
         """
-        suit = ''
-        for tile in self.hand:
-            if tile[1] == 'z':
-                False
-            if len(suit) == 0:
-                suit = tile[1]
-            elif suit != tile[1]:
-                return False
-        return True
-    
-    # --役満の判定メソッド ---
+        # 手牌の色が1種類であることを確認.
+        suits = self.features.suit_mask
+        return suits & (suits - 1) == 0
     def _is_daisangen(self) -> bool:
         """
         大三元の判定を行う.
@@ -702,11 +716,9 @@ class YakuJudge:
         Returns:
             bool: 大三元が成立する場合はTrue, それ以外はFalse.
         """
-        # 三元牌の刻子の枚数をカウント.
-        kotsu_list = self._get_kotsu()
-        kantsu_list = self._get_kantsu()
         # 三元牌の刻子と槓子を合わせてカウント.
-        sangenpai_count = sum(1 for tile in kotsu_list + kantsu_list if tile in SANGENPAI)
+        features = self.features
+        sangenpai_count = sum(1 for tile in features.kotsu + features.kantsu if tile in SANGENPAI)
         # 大三元は、3種類の三元牌がすべて刻子であることを確認.
         return sangenpai_count == 3
     
@@ -719,26 +731,8 @@ class YakuJudge:
         """
         if not self.context.get('is_menzen', False):
             return False, False
-        ankou_count = 0
-        called_mentsu_tuples = [tuple(sorted(called_mentsu.tiles)) for called_mentsu in self.called_mentsu_list]
-        
-        # 面子の刻子をチェック.
-        for mentsu in self.mentsu_list:
-            # 刻子でなければスキップ
-            if len(set(mentsu)) != 1:
-                continue
-            is_ankou = True
-            # 鳴いた面子（ポンなど）は暗刻ではない
-            if tuple(sorted(mentsu)) in called_mentsu_tuples:
-                is_ankou = False
-            # ロン和了りで、和了牌がこの刻子を完成させた場合も暗刻ではない
-            is_ron = not self.context.get('is_tsumo', False)
-            if is_ron and self.context.get('agari_hai') in mentsu:
-                is_ankou = False
-            if is_ankou:
-                ankou_count += 1
         # 四暗刻は、暗刻が4つあることを確認.
-        return ankou_count == 4, self.machi == 'tankii'
+        return self._count_ankou() == 4, self.machi == 'tankii'
     
     def _is_suukantsu(self) -> bool:
         """
@@ -747,12 +741,8 @@ class YakuJudge:
         Returns:
             bool: 四槓子が成立する場合はTrue, それ以外はFalse.
         """
-        kantsu_count = 0
-        for mentsu in self.mentsu_list:
-            if len(mentsu) == 4:
-                kantsu_count += 1
         # 四槓子は、槓子が4つあることを確認.
-        return kantsu_count == 4
+        return self.features.num_kan == 4
 
     def _is_ryuuiisou(self) -> bool:
         """
@@ -761,11 +751,8 @@ class YakuJudge:
         Returns:
             bool: 緑一色が成立する場合はTrue, それ以外はFalse.
         """
-        green_tiles = ['2s', '3s', '4s', '6s', '8s', '9s', '6z']
-        for tile in self.hand:
-            if tile not in green_tiles:
-                return False
-        return True
+        features = self.features
+        return features.num_green == features.num_tiles
     
     def _is_tuuiisou(self) -> bool:
         """
@@ -774,10 +761,8 @@ class YakuJudge:
         Returns:
             bool: 字一色が成立する場合はTrue, それ以外はFalse.
         """
-        for tile in self.hand:
-            if tile[1] != 'z':
-                return False
-        return True
+        features = self.features
+        return features.num_honors == features.num_tiles
     
     def _is_chinroutou(self) -> bool:
         """
@@ -786,12 +771,9 @@ class YakuJudge:
         Returns:
             bool: 清老頭が成立する場合はTrue, それ以外はFalse.
         """
-        # 么九中牌が含まれているかをチェック
-        chinroutou_tiles = {"1m", "9m", "1p", "9p", "1s", "9s"}
-        for tile in self.hand:
-            if tile not in chinroutou_tiles:
-                return False
-        return True
+        # 全ての牌が老頭牌かをチェック
+        features = self.features
+        return features.num_terminals == features.num_tiles
     
     def _is_shousuushi(self) -> bool:
         """
@@ -804,9 +786,8 @@ class YakuJudge:
         if not self.janto or self.janto not in KAZEHAI:
             return False
         # 風牌の刻子の枚数をカウント.
-        kotsu_list = self._get_kotsu()
-        kantsu_list = self._get_kantsu()
-        kazehai_count = sum(1 for tile in kotsu_list + kantsu_list if tile in KAZEHAI)
+        features = self.features
+        kazehai_count = sum(1 for tile in features.kotsu + features.kantsu if tile in KAZEHAI)
         # 小四喜は、4種類の風牌のうち3種類が刻子であることを確認.
         return kazehai_count == 3
     
@@ -819,11 +800,8 @@ class YakuJudge:
         """
         if not self.context.get('is_menzen', False):
             return False, False
-        # 面子の順子の枚数をカウント.
-        suit = self.hand[0][1]  # 全ての牌が同じ種類であることを確認
-        if suit == 'z':
-            return False, False
-        if not all(tile[1] == suit for tile in self.hand):
+        # 全ての牌が同じ数牌の種類であることを確認
+        if self.features.suit_mask not in (0b0001, 0b0010, 0b0100):
             return False, False
         # 基本形の確認(1,1,1,2,3,4,5,6,7,8,9,9,9)
         number_counts = collections.Counter(tile[0] for tile in self.hand)
@@ -858,12 +836,89 @@ class YakuJudge:
         Returns:
             bool: 大四喜が成立する場合はTrue, それ以外はFalse.
         """
-        kotsu_list = self._get_kotsu()
-        kantsu_list = self._get_kantsu()
-        kazehai_count = sum(1 for tile in kotsu_list + kantsu_list if tile in KAZEHAI)
+        features = self.features
+        kazehai_count = sum(1 for tile in features.kotsu + features.kantsu if tile in KAZEHAI)
         # 大四喜は、4種類の風牌がすべて刻子であることを確認.
         return kazehai_count == 4
     
+    def _is_junsei_churenpoutou(self) -> bool:
+        """
+        純正九蓮宝燈の判定を行う.
+
+        Returns:
+            bool: 純正九蓮宝燈が成立する場合はTrue, それ以外はFalse.
+        """
+        normal, junsei = self._get_churenpoutou()
+        return normal and junsei
+
+    def _is_normal_churenpoutou(self) -> bool:
+        """
+        九蓮宝燈の判定を行う.
+
+        Returns:
+            bool: 九蓮宝燈が成立する場合はTrue, それ以外はFalse.
+        """
+        return self._get_churenpoutou()[0]
+
+    def _get_churenpoutou(self) -> tuple[bool, bool]:
+        """九蓮宝燈の判定結果. 純正九蓮宝燈と九蓮宝燈で共有する."""
+        if self._churenpoutou is None:
+            self._churenpoutou = self._is_churenpoutou()
+        return self._churenpoutou
+
+    def _is_suuankou_tanki(self) -> bool:
+        """
+        四暗刻単騎の判定を行う.
+
+        Returns:
+            bool: 四暗刻単騎が成立する場合はTrue, それ以外はFalse.
+        """
+        normal, tanki = self._get_suuankou()
+        return normal and tanki
+
+    def _is_normal_suuankou(self) -> bool:
+        """
+        四暗刻の判定を行う.
+
+        Returns:
+            bool: 四暗刻が成立する場合はTrue, それ以外はFalse.
+        """
+        return self._get_suuankou()[0]
+
+    def _get_suuankou(self) -> tuple[bool, bool]:
+        """四暗刻の判定結果. 四暗刻単騎と四暗刻で共有する."""
+        if self._suuankou is None:
+            self._suuankou = self._is_suuankou()
+        return self._suuankou
+
+    def _is_tenhou(self) -> bool:
+        """
+        天和の判定を行う.
+
+        Returns:
+            bool: 天和が成立する場合はTrue, それ以外はFalse.
+        """
+        return self.context.get('is_tenhou', False)
+
+    def _is_chiihou(self) -> bool:
+        """
+        地和の判定を行う.
+
+        Returns:
+            bool: 地和が成立する場合はTrue, それ以外はFalse.
+        """
+        return self.context.get('is_chiihou', False)
+
+    # --ローカル役の判定メソッド ---
+    def _is_daisharin(self) -> bool:
+        """
+        大車輪(筒子の2から8の対子7組)の判定を行う.
+
+        Returns:
+            bool: 大車輪が成立する場合はTrue, それ以外はFalse.
+        """
+        return sorted(Tile.to_normal(tile) for tile in self.hand) == DAISHARIN_TILES
+
     def _is_kokushi_13men_machi(self) -> bool:
         """
         国士無双の13面待ちの判定を行う.
@@ -878,4 +933,72 @@ class YakuJudge:
             if tile not in hand_before_win:
                 return False
         # 13種類の牌がすべて含まれていることを確認
-        return len(set(hand_before_win)) == 13
\ No newline at end of file
+        return len(set(hand_before_win)) == 13
+
+
+class _YakuGroup(NamedTuple):
+    """
+    前提条件が同じ役のグループ.
+    requiresは前提条件のビットの和, rulesは (役名, 判定するメソッド, 飜数, 上位の役, 終了するか) のタプル.
+    """
+    requires: int
+    rules: tuple[tuple[str, Callable, int | None, tuple[str, ...], bool], ...]
+
+
+class _YakuPlan(NamedTuple):
+    """和了形ごとの役の判定順. phasesは (役満のグループ, それ以外の役のグループ)."""
+    phases: tuple[tuple[_YakuGroup, ...], ...]
+    yakuman_only: bool
+
+
+@functools.lru_cache(maxsize=64)
+def compile_yaku_plan(form: str, is_menzen: bool, enabled_local: frozenset = frozenset(),
+                      disabled: frozenset = frozenset()) -> _YakuPlan:
+    """
+    役の登録表から、和了形ごとの役の判定順を組み立てる関数.
+    登録順に並んだ前提条件が同じ役を1つのグループにまとめ、役満とそれ以外に分ける.
+    門前かどうかはここで判定し、飜数を決め、門前が前提条件の役は鳴きがある場合に除く.
+
+    Args:
+        form (str)             : 和了形 ("normal", "chitoitsu", "kokushi").
+        is_menzen (bool)       : 門前か.
+        enabled_local (frozenset): 有効にするローカル役の名前.
+        disabled (frozenset)   : 判定しない役の名前.
+
+    Returns:
+        _YakuPlan: 役の判定順.
+
+    Raises:
+        ValueError: 前提条件やメソッドが存在しない場合や、上位の役が下位の役より後に登録されている場合.
+    """
+    rules = [rule for rule in YAKU_REGISTRY
+             if form in rule.forms and rule.name not in disabled
+             and (not rule.local or rule.name in enabled_local)]
+    phases = []
+    seen = set()
+    for yakuman in (True, False):
+        groups = []
+        for rule in (r for r in rules if r.yakuman == yakuman):
+            for name in rule.excludes:
+                if name not in seen and any(r.name == name for r in rules):
+                    raise ValueError(f"上位の役 {name} は {rule.name} より前に登録してください.")
+            seen.add(rule.name)
+            check = getattr(YakuJudge, rule.check, None)
+            if check is None:
+                raise ValueError(f"役の判定メソッドがありません: {rule.check}")
+            requires = 0
+            for name in rule.requires:
+                if name not in PRECONDITIONS:
+                    raise ValueError(f"前提条件がありません: {name}")
+                requires |= PRECONDITIONS[name]
+            if requires & PRECONDITIONS['menzen']:
+                if not is_menzen:
+                    continue
+                requires &= ~PRECONDITIONS['menzen']
+            entry = (rule.name, check, rule.han if is_menzen else rule.han_open, rule.excludes, rule.stop)
+            if groups and groups[-1][0] == requires:
+                groups[-1][1].append(entry)
+                continue
+            groups.append((requires, [entry]))
+        phases.append(tuple(_YakuGroup(req, tuple(members)) for req, members in groups))
+    return _YakuPlan(tuple(phases), form in YAKUMAN_ONLY_FORMS)
@@ -10,21 +10,85 @@ Flaskアプリケーションのエンドポイントを定義する。
 # 標準モジュールのインポート
 import json
 import traceback
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, current_app, jsonify, request, stream_with_context
 from flask.wrappers import Response
 # 依存モジュールのインポート
 # mahjong_logicsパッケージから各モジュールをインポート
-from .mahjong_logic.helpers import Call, Tile
+from .mahjong_logic.helpers import Tile
+from .mahjong_logic.payments import get_payment_table
 from .mahjong_logic.scorer import MahjongScorer
 # servicesパッケージからモジュールをインポート
-from .services.recognition_service import (NoTilesDetectedError, detect_tiles)
+from .services.recognition_service import (NoTilesDetectedError, detect_tiles,
+                                           get_model_status, recognize_tiles)
+from .services.recognition_session import RecognitionSessionStore
+from .services.scoring_service import (DEFAULT_CHUNK_SIZE, DEFAULT_MAX_ITEMS, ScoringInputError,
+                                       format_score_result, iter_ndjson, iter_stream_lines,
+                                       parse_scoring_item, score_batch)
+
+# 一括計算でNDJSONのストリームとして扱うContent-Type。
+NDJSON_MIMETYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonl')
 
 
 # --- Blueprintの作成 ---
 api = Blueprint('api', __name__)
 
 
+def _recognition_sessions() -> RecognitionSessionStore:
+    """
+    アプリケーションの認識セッションのストアを返す。
+
+    create_app で設定されていない場合(Blueprintだけを登録した場合)は、既定の設定で作成する。
+    """
+    return current_app.extensions.setdefault('recognition_sessions', RecognitionSessionStore())
+
+
 # --- エンドポイント（URL）の定義 ---
+@api.route('/health/ready', methods=['GET'])
+def readiness_endpoint() -> tuple[Response, int]:
+    """
+    /api/health/readyエンドポイント。
+
+    ロードバランサ向けのレディネスチェック。
+    事前読み込みモードと推論サーバーを使う場合は、認識モデルの読み込みと
+    ウォームアップ推論が完了するまで503を返す。事前読み込みを行わない場合や、点数計算専用モードの
+    場合は常に200を返す。
+
+    Returns:
+        モデルの読み込み状態、ウォームアップ時間、重みのバージョン
+        (点数計算結果のストアを使う場合はその統計も)を含む
+        Responseオブジェクトと、HTTPステータスコードのタプル。
+    """
+    model_status = get_model_status()
+    # 推論サーバーを使う場合は、サーバーがモデルを読み込んでいるため、その完了を待つ。
+    waits_for_model = (current_app.config.get('PRELOAD_MODEL', False)
+                       or bool(current_app.config.get('INFERENCE_SERVER')))
+    is_ready = model_status["ready"] or not waits_for_model
+    response_data = {
+        "status": "ready" if is_ready else "not_ready",
+        "scoring_only": current_app.config.get('SCORING_ONLY', False),
+        "model": model_status,
+    }
+    store = current_app.config.get('SCORE_STORE')
+    if store is not None:
+        response_data["score_store"] = store.stats()
+    return jsonify(response_data), 200 if is_ready else 503
+
+
+@api.route('/score_table', methods=['GET'])
+def score_table_endpoint() -> tuple[Response, int]:
+    """
+    /api/score_tableエンドポイント。
+
+    翻数・符ごとの点数早見表を返す。表は事前計算した支払い表をそのまま書き出したもの。
+    クエリ文字列 kiriage=true で切り上げ満貫を採用した表を返す。
+
+    Returns:
+        点数早見表を含むResponseオブジェクトと、HTTPステータスコードのタプル。
+    """
+    kiriage = request.args.get('kiriage', 'false').lower() in ('1', 'true')
+    return jsonify({"status": "success", "data": get_payment_table(kiriage).to_dict()}), 200
+
+
 @api.route('/calculate', methods=['POST'])
 def calculate_score_endpoint() -> tuple[Response, int]:
     """
@@ -47,12 +111,15 @@ def calculate_score_endpoint() -> tuple[Response, int]:
                 err_msg = "「対局情報」がリクエストに含まれていません。"
                 return jsonify({"status": "error", "message": err_msg}), 400
             game_info = json_data['game_info']
-            if 'hand' not in game_info:
+            if not isinstance(game_info, dict) or 'hand' not in game_info:
                 err_msg = "「手牌」が対局情報に含まれていません。"
                 return jsonify({"status": "error", "message": err_msg}), 400
             hand_list = game_info['hand']
         else:
-            print("step1 ok")
+            # 点数計算専用モードでは画像認識を受け付けない(ML関連ライブラリを読み込まないため)
+            if current_app.config.get('SCORING_ONLY', False):
+                err_msg = "このサーバーでは画像認識は無効です。手牌を指定して再度お試しください。"
+                return jsonify({"status": "error", "message": err_msg}), 503
             # 3. 入力値検証
             if 'image' not in request.files:
                 err_msg = "「画像ファイル」がリクエストに含まれていません。"
@@ -61,8 +128,6 @@ def calculate_score_endpoint() -> tuple[Response, int]:
             if 'game_info' not in request.form:
                 err_msg = "「対局情報」がリクエストに含まれていません。"
                 return jsonify({"status": "error", "message": err_msg}), 400
-            
-            print('step2 ok')
 
             image_file = request.files['image']
             game_info_str = request.form['game_info']
@@ -81,8 +146,7 @@ def calculate_score_endpoint() -> tuple[Response, int]:
             try:
                 image_data = image_file.read()
                 hand_list = detect_tiles(image_data)
-                print(hand_list)
-                
+
                 # テスト用の仮リスト.
                 # hand_list = ["1m","2m","3m","2p","3p","4p","5s","6s","7s","1z","1z","1z", "5z", "5z"]
             except NoTilesDetectedError as e:
@@ -94,41 +158,25 @@ def calculate_score_endpoint() -> tuple[Response, int]:
                 return jsonify({"status": "error", "message": str(e)}), 400
 
         # 5. 点数計算
-        called_mentsu_list_data = game_info.get('called_mentsu_list', [])
-        called_mentsu_list = [Call(m['type'], m['tiles'].split(',')) for m in called_mentsu_list_data]
-
-        game_info.pop('hand', None)
-        scorer = MahjongScorer(
-            hand=hand_list,
-            called_mentsu=called_mentsu_list,
-            **game_info
-        )
-        score_data = scorer.calculate()
-
-        if 'error' in score_data:
-            return jsonify({"status": "error", "message": score_data['error'], "hand": sorted(hand_list, key=Tile.sort_key)}), 400
+        try:
+            hand_list, called_mentsu_list, game_state = parse_scoring_item(
+                {"hand": hand_list, "game_info": game_info}
+            )
+            scorer = MahjongScorer(
+                hand=hand_list,
+                called_mentsu=called_mentsu_list,
+                **game_state
+            )
+            score_data = scorer.calculate()
+        except (ScoringInputError, ValueError) as e:
+            # 不正な牌・対局情報の場合
+            return jsonify({"status": "error", "message": str(e)}), 400
 
         # 6. 応答生成
-        # final_score = score_data.get("score", {}).get("total", 0)
-        # full_hand = sorted(hand_list + sum([called_mentsu.tiles for called_mentsu in called_mentsu_list], []))
-        yaku_list = list(score_data.get("yaku", {}).keys())
-
-        print([m.tiles for m in called_mentsu_list])
-        response_data = {
-            "status": "success",
-            "data": {
-                "hand": sorted(hand_list, key=Tile.sort_key),
-                "yaku": yaku_list,
-                "han": score_data.get("han", 0),
-                "fu": score_data.get("fu", 0),
-                "score_name": score_data.get("score_name", ""),
-                "called_mentsu": [m.tiles for m in called_mentsu_list]
-            },
-        }
-        for key, value in score_data.get("score", {}).items():
-            response_data["data"][key] = value
-            
-        print(response_data)  # デバッグ用
+        response_data = format_score_result(hand_list, called_mentsu_list, score_data)
+        if response_data["status"] == "error":
+            return jsonify(response_data), 400
+
         return jsonify(response_data), 200
 
     except Exception as e:
@@ -136,4 +184,164 @@ def calculate_score_endpoint() -> tuple[Response, int]:
         print(f"予期せぬエラーが発生しました: {e}")
         traceback.print_exc()
         err_msg = "サーバー内部でエラーが発生しました。"
-        return jsonify({"status": "error", "message": err_msg}), 500
\ No newline at end of file
+        return jsonify({"status": "error", "message": err_msg}), 500
+
+
+@api.route('/calculate/batch', methods=['POST'])
+def calculate_batch_endpoint() -> tuple[Response, int]:
+    """
+    /api/calculate/batchエンドポイント。
+
+    複数の手牌をまとめて点数計算し、手牌ごとの結果をNDJSON(1行1つのJSON)で順に返す。
+    1つの手牌のエラーは、その手牌の行で返し、一括計算全体は失敗させない。
+    最後の行は {"summary": {...}} で、件数・リクエストのサイズ・同時に処理していた
+    一括計算の数・処理時間を含む。
+
+    リクエスト形式:
+        - application/json: 入力の配列、または {"items": 入力の配列}
+        - application/x-ndjson: 1行に1つの入力(全体を読み込まずに順に処理する)
+        入力は {"hand": 手牌, "called_mentsu_list": 鳴き面子, "game_info": 対局情報}。
+
+    Returns:
+        NDJSONを返すResponseオブジェクトとHTTPステータスコードのタプル。
+    """
+    chunk_size = current_app.config.get('BATCH_CHUNK_SIZE', DEFAULT_CHUNK_SIZE)
+    max_items = current_app.config.get('BATCH_MAX_ITEMS', DEFAULT_MAX_ITEMS)
+
+    if request.mimetype in NDJSON_MIMETYPES:
+        # 行を読みながら、読み込んだサイズを数える。
+        read_bytes = [0]
+
+        def lines():
+            for line in iter_stream_lines(request.stream):
+                read_bytes[0] += len(line)
+                yield line
+
+        items = iter_ndjson(lines())
+        request_bytes = lambda: read_bytes[0]
+    elif request.is_json:
+        json_data = request.get_json(silent=True)
+        if isinstance(json_data, dict):
+            json_data = json_data.get('items')
+        if not isinstance(json_data, list):
+            err_msg = "手牌の入力の配列がリクエストに含まれていません。"
+            return jsonify({"status": "error", "message": err_msg}), 400
+        items = json_data
+        request_bytes = request.content_length
+    else:
+        err_msg = "application/json または application/x-ndjson で送信してください。"
+        return jsonify({"status": "error", "message": err_msg}), 415
+
+    body = score_batch(items, request_bytes, chunk_size=chunk_size, max_items=max_items)
+    return Response(stream_with_context(body), mimetype='application/x-ndjson'), 200
+
+
+@api.route('/recognize', methods=['POST'])
+def recognize_endpoint() -> tuple[Response, int]:
+    """
+    /api/recognizeエンドポイント。
+
+    画像から牌を認識し、牌ごとの認識結果とセッションのトークンを返す。
+    認識した手牌はサーバー側にトークンをキーとして保持するため、手牌の修正や
+    状況の変更による再計算は、/api/score にトークンを渡すだけで行える。
+
+    リクエスト形式: multipart/form-data
+        - key 'image': 画像ファイル
+
+    Returns:
+        トークン・手牌・認識結果(牌・信頼度・バウンディングボックス)を含む
+        Responseオブジェクトと、HTTPステータスコードのタプル。
+    """
+    # 点数計算専用モードでは画像認識を受け付けない(ML関連ライブラリを読み込まないため)
+    if current_app.config.get('SCORING_ONLY', False):
+        err_msg = "このサーバーでは画像認識は無効です。手牌を指定して再度お試しください。"
+        return jsonify({"status": "error", "message": err_msg}), 503
+    image_file = request.files.get('image')
+    if not image_file or image_file.filename == '':
+        err_msg = "「画像ファイル」がリクエストに含まれていません。"
+        return jsonify({"status": "error", "message": err_msg}), 400
+
+    try:
+        detections = recognize_tiles(image_file.read())
+    except (NoTilesDetectedError, ValueError) as e:
+        # 牌が検出できなかった場合・画像データが不正な場合
+        return jsonify({"status": "error", "message": str(e)}), 400
+    except Exception as e:
+        print(f"予期せぬエラーが発生しました: {e}")
+        traceback.print_exc()
+        err_msg = "サーバー内部でエラーが発生しました。"
+        return jsonify({"status": "error", "message": err_msg}), 500
+
+    sessions = _recognition_sessions()
+    session = sessions.create(detections)
+    return jsonify({
+        "status": "success",
+        "data": {
+            "token": session.token,
+            "hand": sorted(session.hand, key=Tile.sort_key),
+            "detections": session.detections,
+            "expires_in": sessions.ttl,
+        },
+    }), 200
+
+
+@api.route('/score', methods=['POST'])
+def score_endpoint() -> tuple[Response, int]:
+    """
+    /api/scoreエンドポイント。
+
+    手牌、または /api/recognize のトークンと対局情報から点数を計算する。
+    画像の再送信・再推論は行わない。
+
+    リクエスト形式: application/json
+        {"token": トークン(任意), "hand": 手牌(任意), "called_mentsu_list": 鳴き面子, "game_info": 対局情報}
+        - hand を省略した場合は、トークンのセッションの手牌を使う。
+        - トークンと hand の両方を指定した場合は、セッションの手牌を hand に置き換える
+          (以降の再計算では修正後の手牌を使う)。トークンの有効期限が切れている、または
+          別のワーカーのセッションの場合は、hand で新しいセッションを作り、新しいトークンを返す。
+        - hand と called_mentsu_list は game_info の中に書いてもよい。
+
+    Returns:
+        /api/calculate と同じ形式(トークンを指定した場合は token を含む)の
+        Responseオブジェクトと、HTTPステータスコードのタプル。
+    """
+    json_data = request.get_json(silent=True)
+    if not isinstance(json_data, dict):
+        err_msg = "「対局情報」がリクエストに含まれていません。"
+        return jsonify({"status": "error", "message": err_msg}), 400
+    item = dict(json_data)
+    token = item.pop('token', None)
+    game_info = item.get('game_info')
+    has_hand = 'hand' in item or (isinstance(game_info, dict) and 'hand' in game_info)
+
+    sessions = _recognition_sessions()
+    session = None
+    if token is not None:
+        session = sessions.get(token) if isinstance(token, str) else None
+        if session is None and not has_hand:
+            err_msg = "認識結果の有効期限が切れました。画像を再度アップロードしてください。"
+            return jsonify({"status": "error", "message": err_msg}), 404
+        if not has_hand:
+            item['hand'] = session.hand
+    elif not has_hand:
+        err_msg = "「手牌」または認識結果のトークンがリクエストに含まれていません。"
+        return jsonify({"status": "error", "message": err_msg}), 400
+
+    try:
+        hand_list, called_mentsu_list, game_state = parse_scoring_item(item)
+        if token is not None and has_hand:
+            if session is None or sessions.update_hand(token, hand_list) is None:
+                token = sessions.create([], hand_list).token
+        score_data = MahjongScorer(hand=hand_list, called_mentsu=called_mentsu_list, **game_state).calculate()
+    except (ScoringInputError, ValueError) as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    except Exception as e:
+        print(f"予期せぬエラーが発生しました: {e}")
+        traceback.print_exc()
+        err_msg = "サーバー内部でエラーが発生しました。"
+        return jsonify({"status": "error", "message": err_msg}), 500
+
+    response_data = format_score_result(hand_list, called_mentsu_list, score_data)
+    if token is not None:
+        response_data["token"] = token
+    return jsonify(response_data), 400 if response_data["status"] == "error" else 200
@@ -5,9 +5,12 @@
 中間的な役割を果たします。YOLOモデルの呼び出し、その出力の処理、
 および特定のエラーのハンドリングを担当します。
 """
+import functools
 import sys
 import os
-from typing import List
+import threading
+import time
+from typing import Dict, List, Tuple
 
 # プロジェクトのルートディレクトリをPythonのパスに追加します。
 # これにより、'ml'のような他のトップレベルディレクトリからモジュールをインポートできます。
@@ -17,15 +20,84 @@ PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..
 if PROJECT_ROOT not in sys.path:
     sys.path.insert(0, PROJECT_ROOT)
 
-try:
-    # パスが設定されたので、'ml'モジュールからインポートできます。
-    # 'recognition.py'には'analyze_hand_from_image'のような関数があると仮定します。
-    from ml.recognition import analyze_hand_from_image
-except ImportError as e:
-    raise ImportError(
-        "'ml.recognition'からのインポートに失敗しました。"
-        "ファイルが存在し、プロジェクト構造が正しいことを確認してください。"
-    ) from e
+from ml.model_registry import weights_path_for, weights_version
+
+# ML関連モジュール(ml.recognition)の読み込みは、torch・ultralytics・cv2などの
+# 重いライブラリを伴うため、最初に画像認識が必要になった時点まで遅延させます。
+# これにより、手牌(JSON)からの点数計算だけを行うワーカーはtorchを読み込みません。
+_recognition_module = None
+_recognition_module_lock = threading.Lock()
+
+
+def _load_recognition_module():
+    """
+    'ml.recognition'モジュールを初回呼び出し時にインポートして返します。
+
+    Returns:
+        インポート済みの'ml.recognition'モジュール。
+
+    Raises:
+        ImportError: 'ml.recognition'またはその依存ライブラリのインポートに失敗した場合。
+    """
+    global _recognition_module
+    if _recognition_module is None:
+        with _recognition_module_lock:
+            if _recognition_module is None:
+                try:
+                    # パスが設定されたので、'ml'モジュールからインポートできます。
+                    import ml.recognition as recognition
+                except ImportError as e:
+                    raise ImportError(
+                        "'ml.recognition'からのインポートに失敗しました。"
+                        "ファイルが存在し、プロジェクト構造が正しいことを確認してください。"
+                    ) from e
+                _recognition_module = recognition
+    return _recognition_module
+
+
+def is_recognition_loaded() -> bool:
+    """
+    ML関連モジュールがすでにインポートされているかを返します。
+
+    Returns:
+        インポート済みならTrue、そうでなければFalse。
+    """
+    return _recognition_module is not None
+
+
+# マイクロバッチの設定。同時に届いた画像を、最大 INFERENCE_MAX_BATCH 枚、または最初の画像が
+# 届いてから最大 INFERENCE_MAX_WAIT_MS ミリ秒まで集めて、1回のバッチ推論にまとめます。
+# INFERENCE_MAX_BATCH が1の場合は、リクエストごとに推論します。
+INFERENCE_MAX_BATCH = int(os.environ.get('MAHJONG_INFERENCE_MAX_BATCH', '') or 8)
+INFERENCE_MAX_WAIT_MS = float(os.environ.get('MAHJONG_INFERENCE_MAX_WAIT_MS', '') or 5.0)
+_inference_scheduler = None
+_inference_scheduler_lock = threading.Lock()
+
+# 推論サーバー(ml/inference_server.py)のクライアント。configure_inference_server で設定すると、
+# このプロセスではモデルを読み込まず、画像を共有メモリ経由でサーバーに渡して推論します。
+_inference_client = None
+
+# 推論バックエンド。'onnx' の場合は、.pt の重みを変換した .onnx の重み(python -m ml.export_onnx)を
+# ONNX Runtimeで推論し、torchとultralyticsを読み込みません。'onnx-int8' の場合は、さらにINT8に
+# 量子化した .int8.onnx の重み(python -m ml.quantize_model)を使います。
+# 'ultralytics' の場合は .pt の重みを使います。
+INFERENCE_BACKEND = os.environ.get('MAHJONG_INFERENCE_BACKEND', '').strip().lower() or 'ultralytics'
+
+# ウォームアップ推論に使うダミー画像の (高さ, 幅)。
+# スマートフォンの縦長・横長写真と、モデルの入力サイズそのものを想定しています。
+WARMUP_IMAGE_SIZES: Tuple[Tuple[int, int], ...] = ((640, 640), (1080, 1920), (1920, 1080))
+
+# モデルの読み込み状態。/api/health/ready から参照されます。
+_model_status = {
+    "loaded": False,
+    "warmed_up": False,
+    "model_path": None,
+    "weights_version": None,
+    "load_seconds": None,
+    "warmup_seconds": [],
+    "error": None,
+}
+_model_status_lock = threading.Lock()
 
 # --- カスタム例外クラス ---
 
@@ -36,34 +108,30 @@ class NoTilesDetectedError(Exception):
 
 # --- サービス関数 ---
 
-def detect_tiles(image_data: bytes) -> List[str]:
+@functools.lru_cache(maxsize=1)
+def resolve_model_path() -> str:
     """
-    画像データを受け取り、認識モデルを呼び出し、検出された牌を返します。
+    使用する学習済みモデルファイルのパスを解決します。
 
-    この関数は、牌認識サービスのメインエントリーポイントとして機能します。
-
-    Args:
-        image_data: 生の画像ファイルの内容（バイト列）。
+    ファイルの存在確認と代替モデルへのフォールバックはプロセス内で1度だけ行い、
+    結果をキャッシュします。INFERENCE_BACKEND が 'onnx'・'onnx-int8' の場合は、同じ名前の
+    .onnx・.int8.onnx ファイルを使います。
 
     Returns:
-        検出された牌の表記を表す文字列のリスト
-        (例: ['1m', '2p', '7s', ...])。
+        使用するモデルファイルのパス。
 
     Raises:
-        NoTilesDetectedError: 認識モデルが牌を検出しなかった場合。
-        FileNotFoundError: 指定されたYOLOモデルファイルが見つからない場合。
-        ValueError: 画像データが破損しているか、サポートされていない形式の場合に
-                    認識モジュールから発生する可能性があります。
+        FileNotFoundError: 学習済みモデルも代替モデルも見つからない場合。
     """
     # プロジェクトルートからの相対パスとして、学習済みモデルファイルへのパスを定義します。
-    model_path = os.path.join(
+    model_path = weights_path_for(os.path.join(
         PROJECT_ROOT, 'runs', 'detect', 'mahjong_train_v3', 'weights', 'best.pt'
-    )
+    ), INFERENCE_BACKEND)
 
     if not os.path.exists(model_path):
         # もし指定された学習済みモデルが見つからない場合、代替を用意することが望ましいです。
         # ここでは、代替としてベースモデルを試します。
-        fallback_path = os.path.join(PROJECT_ROOT, 'yolov8m.pt')
+        fallback_path = weights_path_for(os.path.join(PROJECT_ROOT, 'yolov8m.pt'), INFERENCE_BACKEND)
         if os.path.exists(fallback_path):
             print(f"警告: 学習済みモデルが {model_path} に見つかりません。{fallback_path} を使用します。")
             model_path = fallback_path
@@ -72,19 +140,100 @@ def detect_tiles(image_data: bytes) -> List[str]:
                 f"学習済みYOLOモデルが {model_path} に、代替モデルも {fallback_path} に見つかりませんでした。"
             )
 
+    print(f"認識モデルを使用中: {model_path}")
+    return model_path
+
+
+def _get_inference_scheduler():
+    """
+    マイクロバッチのスケジューラを初回呼び出し時に作成して返します。
+
+    Returns:
+        'ml.inference_scheduler.InferenceScheduler'のインスタンス。
+        INFERENCE_MAX_BATCH が1以下の場合はNone。
+    """
+    global _inference_scheduler
+    if INFERENCE_MAX_BATCH <= 1:
+        return None
+    if _inference_scheduler is None:
+        with _inference_scheduler_lock:
+            if _inference_scheduler is None:
+                from ml.inference_scheduler import InferenceScheduler
+                recognition = _load_recognition_module()
+                model_path = resolve_model_path()
+                _inference_scheduler = InferenceScheduler(
+                    lambda images: recognition.detect_hands_from_images(images, model_path),
+                    max_batch_size=INFERENCE_MAX_BATCH,
+                    max_wait=INFERENCE_MAX_WAIT_MS / 1000,
+                )
+    return _inference_scheduler
+
+
+def configure_inference_server(address, authkey: bytes | None = None):
+    """
+    推論を推論サーバーのプロセスに任せるように設定します。
+
+    Args:
+        address: 推論サーバーのアドレス(UNIXドメインソケットのパス、または "ホスト:ポート")。
+                 Noneの場合は設定を解除し、このプロセスで推論します。
+        authkey: 接続の認証キー。Noneの場合は環境変数 MAHJONG_INFERENCE_AUTHKEY に従います。
+
+    Returns:
+        'ml.inference_server.InferenceClient'のインスタンス。解除した場合はNone。
+    """
+    global _inference_client
+    if address is None:
+        _inference_client = None
+    else:
+        from ml.inference_server import InferenceClient
+        _inference_client = InferenceClient(address, authkey)
+    return _inference_client
+
+
+def recognize_tiles(image_data: bytes) -> List[Dict]:
+    """
+    画像データを受け取り、認識モデルを呼び出し、牌ごとの検出結果を返します。
+
+    この関数は、牌認識サービスのメインエントリーポイントとして機能します。
+    モデルはワーカープロセスごとに1度だけ読み込まれ、以降のリクエストで共有されます。
+    推論サーバーを使う設定の場合は、サーバーのプロセスに読み込まれたモデルを全ワーカーで共有します。
+
+    Args:
+        image_data: 生の画像ファイルの内容（バイト列）。
+
+    Returns:
+        検出結果の辞書のリスト。各要素は牌の表記('tile')、信頼度('confidence')、
+        元画像のピクセル座標のバウンディングボックス('box': [x1, y1, x2, y2])を持ちます。
+
+    Raises:
+        NoTilesDetectedError: 認識モデルが牌を検出しなかった場合。
+        FileNotFoundError: 指定されたYOLOモデルファイルが見つからない場合。
+        ValueError: 画像データが破損しているか、サポートされていない形式の場合に
+                    認識モジュールから発生する可能性があります。
+        ConnectionError: 推論サーバーを使う設定で、サーバーと通信できない場合。
+    """
     try:
         # mlモジュールから中核となる認識関数を呼び出します。
-        print(f"認識モデルを使用中: {model_path}")
-        detected_tiles = analyze_hand_from_image(image_data, model_path)
+        # 推論サーバーを使う場合は、デコードした画像を共有メモリ経由でサーバーに渡します。
+        # マイクロバッチが有効な場合は、同時に届いた他のリクエストの画像とまとめて推論します。
+        client = _inference_client
+        scheduler = _get_inference_scheduler() if client is None else None
+        if client is not None:
+            detections = client.detect(image_data)
+        elif scheduler is not None:
+            detections = scheduler.run(image_data)
+        else:
+            recognition = _load_recognition_module()
+            detections = recognition.detect_hand_from_image(image_data, resolve_model_path())
 
         # モデルからの結果を検証します。
-        if not detected_tiles:
+        if not detections:
             # リストが空の場合、信頼できる牌が一つも識別されなかったことを意味します。
             raise NoTilesDetectedError(
                 "画像から牌を検出できませんでした。画像の角度や明るさを変えて再度お試しください。"
             )
 
-        return detected_tiles
+        return detections
 
     except Exception as e:
         # 分析中に他の予期せぬエラーが発生した場合は、それを再送出します。
@@ -92,3 +241,110 @@ def detect_tiles(image_data: bytes) -> List[str]:
         print(f"認識サービスで予期せぬエラーが発生しました: {e}")
         raise
 
+
+def detect_tiles(image_data: bytes) -> List[str]:
+    """
+    画像データを受け取り、認識モデルを呼び出し、検出された牌を返します。
+
+    Args:
+        image_data: 生の画像ファイルの内容（バイト列）。
+
+    Returns:
+        検出された牌の表記を表す文字列のリスト
+        (例: ['1m', '2p', '7s', ...])。
+
+    Raises:
+        recognize_tiles と同じ例外を送出します。
+    """
+    return [d["tile"] for d in recognize_tiles(image_data)]
+
+
+def preload_model(image_sizes: Tuple[Tuple[int, int], ...] = WARMUP_IMAGE_SIZES) -> dict:
+    """
+    認識モデルを事前に読み込み、ダミー画像でウォームアップ推論を行います。
+
+    読み込みに失敗しても例外は送出せず、エラー内容を状態に記録します。
+    ワーカーは準備未完了として扱われます。
+
+    Args:
+        image_sizes: ウォームアップに使うダミー画像の (高さ, 幅) のタプル。
+
+    Returns:
+        get_model_status()と同じ形式の、読み込み後のモデル状態。
+    """
+    try:
+        model_path = resolve_model_path()
+        start = time.perf_counter()
+        recognition = _load_recognition_module()
+        model = recognition.load_model(model_path)
+        load_seconds = time.perf_counter() - start
+        with _model_status_lock:
+            _model_status.update({
+                "loaded": True,
+                "model_path": model_path,
+                "weights_version": weights_version(model_path),
+                "load_seconds": round(load_seconds, 4),
+                "error": None,
+            })
+
+        warmup_seconds = recognition.warm_up_model(model, list(image_sizes))
+        with _model_status_lock:
+            _model_status.update({
+                "warmed_up": True,
+                "warmup_seconds": [round(t, 4) for t in warmup_seconds],
+            })
+        print(f"認識モデルの事前読み込みが完了しました: {_model_status}")
+    except Exception as e:
+        print(f"認識モデルの事前読み込みに失敗しました: {e}")
+        with _model_status_lock:
+            _model_status["error"] = str(e)
+    return get_model_status()
+
+
+def get_model_status() -> dict:
+    """
+    認識モデルの読み込み状態を返します。
+
+    Returns:
+        読み込み済みか、ウォームアップ済みか、所要時間、重みのバージョンなどを含む辞書。
+        'ready'キーは読み込みとウォームアップの両方が完了している場合にTrueとなります。
+        'recognition_imported'キーはML関連モジュールがインポート済みかを表します。
+        'inference_queue'キーはマイクロバッチの統計(バッチの大きさ、待ち時間、キューの深さなど)で、
+        まだ推論していない場合はNoneです。
+        推論サーバーを使う設定の場合は、読み込み状態とマイクロバッチの統計はサーバーのものを返し、
+        'inference_server'キーにサーバーのアドレス・プロセスID・torchのスレッド数・接続数を含めます。
+    """
+    client = _inference_client
+    if client is not None:
+        return _get_server_status(client)
+    with _model_status_lock:
+        status = dict(_model_status)
+        status["warmup_seconds"] = list(_model_status["warmup_seconds"])
+    status["ready"] = status["loaded"] and status["warmed_up"]
+    status["recognition_imported"] = is_recognition_loaded()
+    scheduler = _inference_scheduler
+    status["inference_queue"] = scheduler.stats() if scheduler is not None else None
+    return status
+
+
+def _get_server_status(client) -> dict:
+    """
+    推論サーバーの状態を、get_model_status()と同じ形式で返します。
+    サーバーと通信できない場合は、準備未完了として扱います。
+    """
+    try:
+        server_status = client.status()
+    except (ConnectionError, OSError, ValueError, RuntimeError) as e:
+        server_status = {"error": str(e)}
+    status = {key: server_status.get(key, default) for key, default in _model_status.items()}
+    status["ready"] = bool(server_status.get("ready", False))
+    status["recognition_imported"] = is_recognition_loaded()
+    status["inference_queue"] = server_status.get("inference_queue")
+    status["inference_server"] = {
+        "address": client.address,
+        "reachable": "pid" in server_status,
+        "pid": server_status.get("pid"),
+        "torch_threads": server_status.get("torch_threads"),
+        "connections": server_status.get("connections"),
+    }
+    return status
@@ -0,0 +1,152 @@
+"""
+認識セッションモジュール。
+
+画像から認識した手牌を、トークンをキーとしてサーバー側に一定時間保持します。
+手牌の修正や立直などの状況の変更で点数を計算し直す場合に、画像を再送信・再推論せずに
+/api/score へトークンを渡すだけで済むようにします。
+
+保持する数には上限があり、超えた場合は最も長く使われていないセッションから追い出します。
+有効期限は最後に使われた時刻から数えます。セッションはワーカープロセスごとのメモリに保持します。
+"""
+import collections
+import secrets
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+# セッションの有効期限(秒)と、保持するセッション数の上限の既定値。
+DEFAULT_SESSION_TTL = 600.0
+DEFAULT_MAX_SESSIONS = 1024
+
+
+@dataclass
+class RecognitionSession:
+    """
+    1枚の画像の認識結果。
+
+    Attributes:
+        token: セッションのトークン。
+        detections: 認識結果(牌・信頼度・バウンディングボックス)のリスト。
+        hand: 点数計算に使う手牌。最初は認識した牌で、修正されると置き換わります。
+    """
+    token: str
+    detections: List[Dict]
+    hand: List[str] = field(default_factory=list)
+
+
+class RecognitionSessionStore:
+    """
+    有効期限と上限付きの認識セッションのストア。複数スレッドから安全に利用できます。
+    """
+    def __init__(self, ttl: float = DEFAULT_SESSION_TTL, maxsize: int = DEFAULT_MAX_SESSIONS,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        ストアを初期化します。
+
+        Args:
+            ttl: セッションの有効期限(秒)。最後に使われた時刻から数えます。
+            maxsize: 保持するセッション数の上限。
+            clock: 現在時刻(秒)を返す関数。
+        """
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._clock = clock
+        # トークン -> (最後に使われた時刻, セッション)。最後に使われた順に並べます。
+        self._sessions = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+
+    def _expire(self, now: float) -> None:
+        """有効期限の切れたセッションを消します(ロックを取って呼びます)。"""
+        while self._sessions:
+            token, (used_at, _) = next(iter(self._sessions.items()))
+            if now - used_at < self.ttl:
+                break
+            del self._sessions[token]
+            self.expirations += 1
+
+    def create(self, detections: List[Dict], hand: Optional[List[str]] = None) -> RecognitionSession:
+        """
+        認識結果から新しいセッションを作ります。
+
+        Args:
+            detections: 認識結果のリスト。各要素は 'tile' キーを持ちます。
+            hand: 点数計算に使う手牌。省略した場合は認識した牌を使います。
+
+        Returns:
+            作成したセッション。
+        """
+        session = RecognitionSession(secrets.token_urlsafe(16), list(detections),
+                                     list(hand) if hand is not None else [d["tile"] for d in detections])
+        now = self._clock()
+        with self._lock:
+            self._expire(now)
+            self._sessions[session.token] = (now, session)
+            while len(self._sessions) > self.maxsize:
+                self._sessions.popitem(last=False)
+                self.evictions += 1
+        return session
+
+    def get(self, token: str) -> Optional[RecognitionSession]:
+        """
+        セッションを取得し、有効期限を延ばします。
+
+        Args:
+            token: セッションのトークン。
+
+        Returns:
+            セッション。存在しないか有効期限が切れている場合はNone。
+        """
+        now = self._clock()
+        with self._lock:
+            self._expire(now)
+            entry = self._sessions.get(token)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._sessions[token] = (now, entry[1])
+            self._sessions.move_to_end(token)
+            self.hits += 1
+            return entry[1]
+
+    def update_hand(self, token: str, hand: List[str]) -> Optional[RecognitionSession]:
+        """
+        セッションの手牌を修正後の手牌に置き換えます。
+
+        Args:
+            token: セッションのトークン。
+            hand: 修正後の手牌。
+
+        Returns:
+            セッション。存在しないか有効期限が切れている場合はNone。
+        """
+        session = self.get(token)
+        if session is not None:
+            with self._lock:
+                session.hand = list(hand)
+        return session
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def stats(self) -> dict:
+        """
+        統計情報を返します。
+
+        Returns:
+            hits, misses, expirations, evictions, size, maxsize, ttl を含む辞書。
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "expirations": self.expirations,
+                "evictions": self.evictions,
+                "size": len(self._sessions),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+            }
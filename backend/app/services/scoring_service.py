@@ -0,0 +1,317 @@
+"""
+点数計算サービスモジュール。
+
+手牌(JSON)からの点数計算の入力の解釈と、応答の組み立てを担当します。
+/api/calculate と /api/calculate/batch で共有します。
+
+一括計算では、手牌をチャンクごとに MahjongScorer.calculate_many でまとめて計算し、
+手牌ごとの結果を1行1つのJSON(NDJSON)として順に返します。
+1つの手牌のエラーは、その手牌の結果としてだけ返し、一括計算全体は失敗させません。
+最後の行には、件数・リクエストのサイズ・同時に処理していた一括計算の数・処理時間の要約を返します。
+"""
+import json
+import threading
+import time
+from typing import Iterable, Iterator
+
+from ..mahjong_logic.encoding import TILE_IDS
+from ..mahjong_logic.helpers import Call, Tile
+from ..mahjong_logic.scorer import MahjongScorer
+
+# NDJSONのストリームを読む単位(バイト)。
+STREAM_BLOCK_SIZE = 64 * 1024
+# 一括計算の1回の calculate_many でまとめて計算する手牌の数。
+DEFAULT_CHUNK_SIZE = 256
+# 1回の一括計算で受け付ける手牌の数の上限。超えた分は読まずに、要約の truncated を真にします。
+DEFAULT_MAX_ITEMS = 10000
+
+# 対局情報のうち、値の型を確かめるキー。ここにないキーは点数計算に使わないため、そのまま渡します。
+FLAG_STATE_KEYS = ('is_tsumo', 'is_oya', 'is_menzen', 'is_riichi', 'is_ippatsu', 'is_double_riichi',
+                   'is_chankan', 'is_rinshan', 'is_haitei', 'is_houtei', 'is_tenhou', 'is_chiihou', 'kiriage')
+COUNT_STATE_KEYS = ('honba', 'kyoutaku')
+TILE_STATE_KEYS = ('agari_hai', 'bakaze', 'jikaze')
+INDICATOR_STATE_KEYS = ('dora_indicators', 'ura_dora_indicators', 'kan_dora_indicators', 'kan_ura_dora_indicators')
+YAKU_STATE_KEYS = ('enabled_local_yaku', 'disabled_yaku')
+
+# このワーカーで処理中の一括計算の数。
+_active_batches = 0
+_active_batches_lock = threading.Lock()
+
+
+class ScoringInputError(ValueError):
+    """点数計算の入力(手牌・鳴き面子・対局情報)が不正な場合に発生する例外。"""
+    pass
+
+
+def parse_called_mentsu(called_mentsu_list_data: list) -> list[Call]:
+    """
+    鳴き面子の入力を Call のリストに変換します。
+
+    Args:
+        called_mentsu_list_data: {"type": 鳴きの種類, "tiles": カンマ区切りの牌} のリスト。
+
+    Returns:
+        Call のリスト。
+    """
+    return [Call(m['type'], m['tiles'].split(',')) for m in called_mentsu_list_data]
+
+
+def _is_str_list(value) -> bool:
+    """値が文字列のリストかどうかを返します。"""
+    return isinstance(value, list) and all(isinstance(v, str) for v in value)
+
+
+def validate_game_state(game_info: dict) -> None:
+    """
+    対局情報の値の型を確かめます。
+
+    Args:
+        game_info: 対局情報の辞書。
+
+    Raises:
+        ScoringInputError: 値の型が正しくない場合。
+    """
+    for key, value in game_info.items():
+        if key in FLAG_STATE_KEYS:
+            ok = isinstance(value, bool)
+        elif key in COUNT_STATE_KEYS:
+            ok = isinstance(value, int) and not isinstance(value, bool) and value >= 0
+        elif key in TILE_STATE_KEYS:
+            ok = isinstance(value, str)
+        elif key in INDICATOR_STATE_KEYS:
+            ok = value is None or isinstance(value, str) or _is_str_list(value)
+        elif key in YAKU_STATE_KEYS:
+            ok = value is None or _is_str_list(value)
+        else:
+            continue
+        if not ok:
+            raise ScoringInputError(f"対局情報の「{key}」の形式が正しくありません。")
+
+
+def parse_scoring_item(item: dict) -> tuple[list[str], list[Call], dict]:
+    """
+    一括計算の1件の入力を、手牌・鳴き面子・対局情報に分けます。
+
+    hand と called_mentsu_list は、/api/calculate と同じく game_info の中に書いても構いません。
+
+    Args:
+        item: {"hand": 手牌, "called_mentsu_list": 鳴き面子, "game_info": 対局情報} の辞書。
+
+    Returns:
+        手牌のリスト、Call のリスト、対局情報(hand・called_mentsu_list を除く)のタプル。
+
+    Raises:
+        ScoringInputError: 入力の形式が正しくない場合。
+    """
+    if not isinstance(item, dict):
+        raise ScoringInputError("手牌の入力はJSONオブジェクトで指定してください。")
+    game_info = item.get('game_info', {})
+    if not isinstance(game_info, dict):
+        raise ScoringInputError("「対局情報」はJSONオブジェクトで指定してください。")
+    game_info = dict(game_info)
+    hand = item.get('hand', game_info.pop('hand', None))
+    game_info.pop('hand', None)
+    if not isinstance(hand, list) or not all(isinstance(t, str) for t in hand):
+        raise ScoringInputError("「手牌」が対局情報に含まれていません。")
+    called_data = item.get('called_mentsu_list', game_info.pop('called_mentsu_list', []))
+    game_info.pop('called_mentsu_list', None)
+    try:
+        called_mentsu = parse_called_mentsu(called_data)
+    except (KeyError, TypeError, AttributeError, ValueError):
+        raise ScoringInputError("「鳴き面子」の形式が正しくありません。") from None
+    validate_game_state(game_info)
+    # 不正な牌があると calculate_many がチャンク全体で失敗するため、ここで除いておきます。
+    for tile in hand + [t for m in called_mentsu for t in m.tiles]:
+        if tile not in TILE_IDS:
+            raise ScoringInputError(f"不正な牌です: {tile}")
+    return hand, called_mentsu, game_info
+
+
+def format_score_result(hand: list[str], called_mentsu: list[Call], score_data: dict) -> dict:
+    """
+    点数計算の結果を応答の形式に変換します。
+
+    Args:
+        hand: 手牌のリスト。
+        called_mentsu: Call のリスト。
+        score_data: MahjongScorer.calculate の結果。
+
+    Returns:
+        成功時は {"status": "success", "data": {...}}、
+        和了形でない・役がない場合は {"status": "error", "message": ..., "hand": ...} の辞書。
+    """
+    sorted_hand = sorted(hand, key=Tile.sort_key)
+    if 'error' in score_data:
+        return {"status": "error", "message": score_data['error'], "hand": sorted_hand}
+    data = {
+        "hand": sorted_hand,
+        "yaku": list(score_data.get("yaku", {}).keys()),
+        "han": score_data.get("han", 0),
+        "fu": score_data.get("fu", 0),
+        "score_name": score_data.get("score_name", ""),
+        "called_mentsu": [m.tiles for m in called_mentsu],
+    }
+    for key, value in score_data.get("score", {}).items():
+        data[key] = value
+    return {"status": "success", "data": data}
+
+
+def iter_stream_lines(stream, block_size: int = STREAM_BLOCK_SIZE) -> Iterator[bytes]:
+    """
+    ストリームをブロックごとに読み、行に分けて返します。
+
+    WSGIの入力ストリームを1行ずつ読むと1バイトずつの読み込みになるため、まとめて読んで分けます。
+
+    Args:
+        stream: read(size) を持つバイト列のストリーム。
+        block_size: 1回に読むバイト数。
+
+    Yields:
+        改行を含む1行分のバイト列(最後の行は改行を含まない場合があります)。
+    """
+    rest = b""
+    while True:
+        block = stream.read(block_size)
+        if not block:
+            break
+        lines = (rest + block).split(b"\n")
+        rest = lines.pop()
+        for line in lines:
+            yield line + b"\n"
+    if rest:
+        yield rest
+
+
+def iter_ndjson(lines: Iterable[bytes]) -> Iterator[dict | ScoringInputError]:
+    """
+    NDJSONの行を1件ずつ解析します。空行は読み飛ばします。
+
+    Args:
+        lines: NDJSONの行(バイト列)。
+
+    Yields:
+        解析した入力。JSONとして不正な行は ScoringInputError。
+    """
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            yield ScoringInputError("JSON形式が正しくありません。")
+
+
+def _score_chunk(chunk: list[tuple[int, object]]) -> list[dict]:
+    """
+    チャンク内の手牌をまとめて計算し、入力の順に結果の行を返します。
+
+    不正な手牌があると calculate_many 全体が例外になるため、その場合は1件ずつ計算し直して
+    エラーをその手牌だけに留めます。
+    """
+    lines = [None] * len(chunk)
+    parsed = []
+    for position, (index, item) in enumerate(chunk):
+        try:
+            if isinstance(item, Exception):
+                raise item
+            parsed.append((position, index) + parse_scoring_item(item))
+        except ScoringInputError as e:
+            lines[position] = {"index": index, "status": "error", "message": str(e)}
+
+    if parsed:
+        hands = [p[2] for p in parsed]
+        called = [p[3] for p in parsed]
+        states = [p[4] for p in parsed]
+        try:
+            score_data_list = MahjongScorer.calculate_many(hands, states, called)
+        except Exception:
+            score_data_list = None
+        for i, (position, index, hand, called_mentsu, game_info) in enumerate(parsed):
+            if score_data_list is not None:
+                score_data = score_data_list[i]
+            else:
+                try:
+                    score_data = MahjongScorer(hand, called_mentsu, **game_info).calculate()
+                except (ValueError, TypeError) as e:
+                    lines[position] = {"index": index, "status": "error", "message": str(e)}
+                    continue
+                except Exception as e:
+                    print(f"一括計算で予期せぬエラーが発生しました: {e}")
+                    lines[position] = {"index": index, "status": "error",
+                                       "message": "サーバー内部でエラーが発生しました。"}
+                    continue
+            lines[position] = {"index": index, **format_score_result(hand, called_mentsu, score_data)}
+    return lines
+
+
+def score_batch(items: Iterable[dict | Exception], request_bytes=None,
+                chunk_size: int = DEFAULT_CHUNK_SIZE, max_items: int = DEFAULT_MAX_ITEMS) -> Iterator[str]:
+    """
+    手牌を一括で計算し、手牌ごとの結果と最後の要約をNDJSONの行として返します。
+
+    入力はチャンクごとに読み進めるため、NDJSONのストリームも全体を読み込まずに処理できます。
+
+    Args:
+        items: 一括計算の入力(parse_scoring_item の形式)。解析に失敗した入力は例外オブジェクト。
+        request_bytes: リクエストのサイズ(バイト)、または読み込んだサイズを返す関数。
+        chunk_size: まとめて計算する手牌の数。
+        max_items: 受け付ける手牌の数の上限。
+
+    Yields:
+        改行で終わるJSONの行。手牌ごとの行は {"index": 入力の順番, "status": ..., ...}、
+        最後の行は {"summary": {...}}。
+    """
+    global _active_batches
+    with _active_batches_lock:
+        _active_batches += 1
+        concurrency = _active_batches
+    started = time.perf_counter()
+    scoring_seconds = 0.0
+    slowest_item_ms = 0.0
+    counts = {"success": 0, "error": 0}
+    total = 0
+    truncated = False
+    try:
+        iterator = iter(items)
+        while True:
+            chunk = []
+            for item in iterator:
+                if total >= max_items:
+                    truncated = True
+                    break
+                chunk.append((total, item))
+                total += 1
+                if len(chunk) >= chunk_size:
+                    break
+            if not chunk:
+                break
+            chunk_started = time.perf_counter()
+            lines = _score_chunk(chunk)
+            chunk_seconds = time.perf_counter() - chunk_started
+            scoring_seconds += chunk_seconds
+            # まとめて計算した手牌の処理時間は、チャンクの手牌数で均等に割り当てます。
+            slowest_item_ms = max(slowest_item_ms, chunk_seconds * 1000 / len(chunk))
+            for line in lines:
+                counts[line["status"]] += 1
+                yield json.dumps(line, ensure_ascii=False) + "\n"
+            if truncated:
+                break
+    finally:
+        with _active_batches_lock:
+            _active_batches -= 1
+
+    summary = {
+        "items": total,
+        "succeeded": counts["success"],
+        "failed": counts["error"],
+        "truncated": truncated,
+        "request_bytes": request_bytes() if callable(request_bytes) else request_bytes,
+        "chunk_size": chunk_size,
+        "concurrent_batches": concurrency,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 3),
+        "scoring_ms": round(scoring_seconds * 1000, 3),
+        "mean_item_ms": round(scoring_seconds * 1000 / total, 4) if total else 0.0,
+        "max_chunk_item_ms": round(slowest_item_ms, 4),
+    }
+    yield json.dumps({"summary": summary}, ensure_ascii=False) + "\n"
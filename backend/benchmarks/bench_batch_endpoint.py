@@ -0,0 +1,77 @@
+"""
+一括計算エンドポイント(/api/calculate/batch)の処理時間を計測するベンチマーク。
+
+ランダムに作った和了形(bench_calculate_many.py と同じ)について、/api/calculate に
+1手ずつリクエストする場合と、/api/calculate/batch に1回でまとめて送る場合
+(JSONの配列とNDJSON)の1手あたりの平均処理時間を、Flaskのテストクライアントで比較する。
+ネットワークの往復は含まないため、実際の差はこれより大きくなる。
+両者の結果が一致することも確認する。
+
+実行方法(backendディレクトリで):
+    python benchmarks/bench_batch_endpoint.py
+"""
+
+import json
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app
+from bench_calculate_many import bench, random_agari
+
+# --- 定数定義 ---
+NUM_HANDS: int = 2000
+SEED: int = 0
+
+
+def main() -> None:
+    """1手ずつのリクエストと、一括計算のリクエストを計測する。"""
+    rng = random.Random(SEED)
+    items = []
+    for _ in range(NUM_HANDS):
+        hand, called, game_state = random_agari(rng)
+        called_data = [{"type": c.call_type, "tiles": ",".join(c.tiles)} for c in called]
+        items.append({"hand": hand, "called_mentsu_list": called_data, "game_info": game_state})
+    ndjson = "".join(json.dumps(item) + "\n" for item in items)
+
+    client = create_app(preload_model=False, scoring_only=True).test_client()
+
+    def single() -> list[dict]:
+        results = []
+        for item in items:
+            game_info = {**item["game_info"], "hand": item["hand"], "called_mentsu_list": item["called_mentsu_list"]}
+            results.append(client.post('/api/calculate', json={"game_info": game_info}).get_json())
+        return results
+
+    def batch_json() -> list[dict]:
+        response = client.post('/api/calculate/batch', json=items)
+        return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+    def batch_ndjson() -> list[dict]:
+        response = client.post('/api/calculate/batch', data=ndjson, content_type='application/x-ndjson')
+        return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+    # /api/calculate はデバッグ用の出力を行うため、計測中は捨てる。
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, 'w')
+    try:
+        expected = single()
+        lines = batch_json()
+        assert [{k: v for k, v in line.items() if k != "index"} for line in lines[:-1]] == expected
+        assert batch_ndjson()[:-1] == lines[:-1]
+        times = {"1手ずつ": bench(single), "一括(JSON)": bench(batch_json), "一括(NDJSON)": bench(batch_ndjson)}
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+    print(f"要約: {lines[-1]['summary']}")
+    for name, seconds in times.items():
+        print(f"{name:<12}: {NUM_HANDS}手  {seconds / NUM_HANDS * 1e6:7.1f} us/手  "
+              f"({times['1手ずつ'] / seconds:5.1f}倍)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""
+一括点数計算(MahjongScorer.calculate_many)の処理時間を計測するベンチマーク。
+
+ランダムに作った和了形(鳴き・赤ドラ・ドラ表示牌を含む)について、calculate を
+1手ずつ呼び出すループと calculate_many の1手あたりの平均処理時間を比較する。
+全ての手牌と、一括計算(高速経路)で扱える手牌だけの2通りで計測し、
+両者の結果が一致することも確認する。
+
+実行方法(backendディレクトリで):
+    python benchmarks/bench_calculate_many.py
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.mahjong_logic.batch import evaluate_batch
+from app.mahjong_logic.encoding import TILE_NAMES
+from app.mahjong_logic.helpers import Call
+from app.mahjong_logic.scorer import MahjongScorer
+
+# --- 定数定義 ---
+NUM_HANDS: int = 20000
+ROUNDS: int = 3  # 計測を繰り返し、最小値を採用する回数 (他の処理による揺らぎを除くため)。
+SEED: int = 0
+
+
+def random_agari(rng: random.Random) -> tuple[list[str], list[Call], dict]:
+    """
+    和了形とゲーム状況をランダムに作る。
+
+    Args:
+        rng: 乱数生成器。
+
+    Returns:
+        tuple: (手牌, 鳴き面子, ゲーム状況)。
+    """
+    counts = [0] * 34
+    groups = []
+    suits = rng.sample(range(4), rng.choice([2, 3, 3, 4]))
+    while len(groups) < 5:
+        suit = rng.choice(suits)
+        tile = suit * 9 + rng.randrange(9 if suit < 3 else 7)
+        if not groups:
+            ids = [tile] * 2
+        elif rng.random() < 0.6 and suit < 3 and tile % 9 <= 6:
+            ids = [tile, tile + 1, tile + 2]
+        else:
+            ids = [tile] * 3
+        if all(counts[i] + ids.count(i) <= 4 for i in ids):
+            for i in ids:
+                counts[i] += 1
+            groups.append(ids)
+    hand = [TILE_NAMES[i] for g in groups for i in g]
+    for k, tile in enumerate(hand):
+        if tile in ("5m", "5p", "5s") and tile + "r" not in hand and rng.random() < 0.3:
+            hand[k] = tile + "r"
+    called = []
+    if rng.random() < 0.4:
+        group = [TILE_NAMES[i] for i in rng.choice(groups[1:])]
+        called.append(Call("chi" if len(set(group)) == 3 else "pon", group))
+    game_state = {
+        "agari_hai": rng.choice(hand).replace("r", ""),
+        "is_tsumo": rng.random() < 0.5,
+        "is_menzen": not called,
+        "is_riichi": not called and rng.random() < 0.5,
+        "is_oya": rng.random() < 0.3,
+        "bakaze": "1z",
+        "jikaze": rng.choice(["1z", "2z", "3z", "4z"]),
+        "dora_indicators": rng.choice(["1m", "5p,3z", "9s"]),
+    }
+    return hand, called, game_state
+
+
+def bench(func) -> float:
+    """
+    関数を呼び出し、処理時間の秒数を返す(ROUNDS回の計測の最小値)。
+
+    Args:
+        func: 計測する関数。
+
+    Returns:
+        float: 処理時間の秒数。
+    """
+    best = float("inf")
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def compare(name: str, hands: list, called: list, game_states: list) -> None:
+    """calculate のループと calculate_many を計測し、結果を表示する。"""
+    def loop() -> list[dict]:
+        return [MahjongScorer(h, c, **s).calculate() for h, c, s in zip(hands, called, game_states)]
+
+    def batch() -> list[dict]:
+        return MahjongScorer.calculate_many(hands, game_states, called)
+
+    assert loop() == batch(), name
+    loop_time = bench(loop)
+    batch_time = bench(batch)
+    print(f"{name:<10}: {len(hands):6d}手  ループ {loop_time / len(hands) * 1e6:7.1f} us/手  "
+          f"一括 {batch_time / len(hands) * 1e6:7.1f} us/手  ({loop_time / batch_time:5.1f}倍)")
+
+
+def main() -> None:
+    """全ての手牌と、高速経路で扱える手牌だけをそれぞれ計測する。"""
+    rng = random.Random(SEED)
+    hands, called, game_states = (list(column) for column in zip(*(random_agari(rng) for _ in range(NUM_HANDS))))
+    fast = evaluate_batch(hands, called, game_states).fast.tolist()
+    print(f"高速経路で扱える手牌: {sum(fast) / len(fast):.1%}")
+    compare("全ての手牌", hands, called, game_states)
+    indices = [i for i, f in enumerate(fast) if f]
+    compare("高速経路", [hands[i] for i in indices], [called[i] for i in indices],
+            [game_states[i] for i in indices])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""
+アプリケーション起動時のインポート時間とメモリ使用量(RSS)を計測するベンチマーク。
+
+`create_app()` を新しいPythonプロセスで実行し、所要時間・最大RSS・
+読み込まれた重いライブラリ(torch, ultralytics, cv2, pillow_heif)を表示する。
+点数計算だけを行う場合にML関連ライブラリが読み込まれていれば、
+終了コード1で終了するため、CIなどで退行の検出に使える。
+
+実行方法(backendディレクトリで):
+    python benchmarks/bench_import.py
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+# --- 定数定義 ---
+BACKEND_DIR: str = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+HEAVY_MODULES: tuple[str, ...] = ('torch', 'ultralytics', 'cv2', 'pillow_heif')
+REPEAT: int = 5
+
+# 子プロセスで実行する計測用コード
+PROBE_CODE: str = f"""
+import json, resource, sys, time
+start = time.perf_counter()
+from app import create_app
+app = create_app(preload_model=False)
+client = app.test_client()
+client.post('/api/calculate', json={{'game_info': {{
+    'hand': ['1m','2m','3m','4p','5p','6p','7s','8s','9s','1z','1z','1z','5z','5z'],
+    'agari_hai': '5z', 'is_tsumo': True, 'is_menzen': True}}}})
+elapsed = time.perf_counter() - start
+print(json.dumps({{
+    'seconds': elapsed,
+    'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    'heavy_modules': [m for m in {HEAVY_MODULES!r} if m in sys.modules],
+}}))
+"""
+
+
+def run_probe() -> dict:
+    """
+    新しいPythonプロセスでアプリケーションを作成し、計測結果を返す。
+
+    Returns:
+        dict: 所要秒数、最大RSS(KB)、読み込まれた重いライブラリのリスト。
+    """
+    completed = subprocess.run(
+        [sys.executable, '-c', PROBE_CODE],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+    )
+    # アプリケーションのデバッグ出力が混ざるため、最終行のJSONだけを読む
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main() -> int:
+    """
+    計測を繰り返し、中央値を表示する。
+
+    Returns:
+        int: ML関連ライブラリが読み込まれていなければ0、読み込まれていれば1。
+    """
+    results = [run_probe() for _ in range(REPEAT)]
+    seconds = sorted(r['seconds'] for r in results)[REPEAT // 2]
+    max_rss_mb = sorted(r['max_rss_kb'] for r in results)[REPEAT // 2] / 1024
+    heavy_modules = sorted({m for r in results for m in r['heavy_modules']})
+
+    print(f"起動+点数計算1回の所要時間(中央値): {seconds * 1000:.1f} ms")
+    print(f"最大RSS(中央値): {max_rss_mb:.1f} MB")
+    print(f"読み込まれたML関連ライブラリ: {heavy_modules or 'なし'}")
+    return 1 if heavy_modules else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,82 @@
+"""
+推論バックエンド(ultralytics・ONNX Runtime・ONNX RuntimeのINT8)の読み込み時間・推論時間・メモリ使用量(RSS)を比較するベンチマーク。
+
+バックエンドごとに新しいPythonプロセスで、重みの読み込み(ライブラリのインポートを含む)と、
+ダミー画像(1920x1080)の推論を REPEAT 回行い、所要時間・推論時間の中央値・最大RSS・
+torchが読み込まれたかを表示する。
+.onnx の重みは `python -m ml.export_onnx`、.int8.onnx の重みは `python -m ml.quantize_model` で作成しておく。
+
+実行方法(backendディレクトリで):
+    python benchmarks/bench_inference_backends.py [重みファイル(.pt) ...]
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+# --- 定数定義 ---
+BACKEND_DIR: str = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+PROJECT_ROOT: str = os.path.dirname(BACKEND_DIR)
+DEFAULT_WEIGHTS: str = os.path.join(PROJECT_ROOT, 'runs', 'detect', 'mahjong_train_v3', 'weights', 'best.pt')
+REPEAT: int = 10
+THREADS: int = 4
+
+# 子プロセスで実行する計測用コード
+PROBE_CODE: str = """
+import json, resource, statistics, sys, time
+import numpy as np
+start = time.perf_counter()
+from ml.inference_backends import create_backend, set_num_threads
+set_num_threads({threads})
+backend = create_backend({path!r})
+image = np.random.default_rng(0).integers(0, 255, size=(1080, 1920, 3), dtype=np.uint8)
+backend.predict([image])
+load_seconds = time.perf_counter() - start
+seconds = []
+for _ in range({repeat}):
+    t = time.perf_counter()
+    backend.predict([image])
+    seconds.append(time.perf_counter() - t)
+print(json.dumps({{
+    'load_seconds': load_seconds,
+    'median_ms': statistics.median(seconds) * 1000,
+    'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    'torch_imported': 'torch' in sys.modules,
+}}))
+"""
+
+
+def run_probe(model_path: str) -> dict:
+    """
+    新しいPythonプロセスでバックエンドを作成して推論し、計測結果を返す。
+
+    Args:
+        model_path: 重みファイルのパス。
+
+    Returns:
+        dict: 読み込み秒数、推論時間の中央値(ミリ秒)、最大RSS(KB)、torchが読み込まれたか。
+    """
+    code = PROBE_CODE.format(threads=THREADS, path=model_path, repeat=REPEAT)
+    completed = subprocess.run(
+        [sys.executable, '-c', code], cwd=PROJECT_ROOT, capture_output=True, text=True, check=True,
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    """重みファイルごとに、.pt と変換済みの .onnx・.int8.onnx を計測する。"""
+    for weights_path in sys.argv[1:] or [DEFAULT_WEIGHTS]:
+        base_path = os.path.splitext(weights_path)[0]
+        for model_path in (weights_path, base_path + '.onnx', base_path + '.int8.onnx'):
+            if not os.path.exists(model_path):
+                print(f"{model_path}: 見つかりません(スキップ)")
+                continue
+            result = run_probe(model_path)
+            print(f"{os.path.basename(model_path):<16} 読み込み {result['load_seconds']:6.2f} 秒  "
+                  f"推論 中央値 {result['median_ms']:7.1f} ms  RSS {result['max_rss_kb'] / 1024:7.1f} MB  "
+                  f"torch: {'あり' if result['torch_imported'] else 'なし'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""
+同時アップロード時のマイクロバッチ推論のスループットと待ち時間を計測するベンチマーク。
+
+学習済みの認識モデルで、CLIENTS 個のスレッドが同時にダミー画像(JPEG)を送り続ける状況を再現し、
+マイクロバッチなし(1枚ずつ推論)と、最大バッチサイズ・最大待ち時間を変えたマイクロバッチについて、
+1秒あたりの画像数と1リクエストあたりの待ち時間(中央値・p95)を表示する。
+単独のリクエスト(CLIENTS=1)の待ち時間も計測し、マイクロバッチによる悪化を確認する。
+torch・ultralyticsと重みファイルが必要。
+
+実行方法(backendディレクトリで):
+    python benchmarks/bench_micro_batching.py
+"""
+
+import io
+import os
+import statistics
+import sys
+import threading
+import time
+
+BACKEND_DIR: str = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(BACKEND_DIR))
+
+from ml.inference_scheduler import InferenceScheduler
+
+# --- 定数定義 ---
+CLIENTS: tuple[int, ...] = (1, 4, 8)
+REQUESTS_PER_CLIENT: int = 8
+IMAGE_SIZE: tuple[int, int] = (1080, 1920)  # (高さ, 幅)。スマートフォンの横長写真を想定。
+# (最大バッチサイズ, 最大待ち時間ミリ秒)。(1, 0) はマイクロバッチなし。
+SETTINGS: tuple[tuple[int, float], ...] = ((1, 0.0), (4, 5.0), (8, 5.0), (8, 20.0))
+
+
+def dummy_image() -> bytes:
+    """ノイズを描いたダミーのJPEG画像を作る。"""
+    import numpy as np
+    from PIL import Image
+    rng = np.random.default_rng(0)
+    pixels = rng.integers(0, 255, size=(*IMAGE_SIZE, 3), dtype=np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format='JPEG')
+    return buffer.getvalue()
+
+
+def measure(run, clients: int, image: bytes) -> tuple[float, list[float]]:
+    """
+    clients 個のスレッドから REQUESTS_PER_CLIENT 回ずつ run を呼び出す。
+
+    Args:
+        run: 画像を受け取り、検出結果を返す関数。
+        clients: 同時に送るスレッドの数。
+        image: 送る画像。
+
+    Returns:
+        tuple: (1秒あたりの画像数, リクエストごとの待ち時間の秒数のリスト)。
+    """
+    latencies: list[float] = []
+    lock = threading.Lock()
+
+    def client() -> None:
+        for _ in range(REQUESTS_PER_CLIENT):
+            start = time.perf_counter()
+            run(image)
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return len(latencies) / (time.perf_counter() - start), latencies
+
+
+def main() -> None:
+    """マイクロバッチの設定ごとに、同時に送るスレッドの数を変えて計測する。"""
+    from app.services.recognition_service import resolve_model_path
+    import ml.recognition as recognition
+
+    model_path = resolve_model_path()
+    recognition.warm_up_model(recognition.load_model(model_path), [IMAGE_SIZE])
+    image = dummy_image()
+    print(f"torchのスレッド数: {__import__('torch').get_num_threads()}  画像: {IMAGE_SIZE[1]}x{IMAGE_SIZE[0]}")
+
+    for max_batch_size, max_wait_ms in SETTINGS:
+        if max_batch_size == 1:
+            # マイクロバッチなし: 現状と同じく、リクエストごとに推論する(同時の推論はロックで直列にする)。
+            model_lock = threading.Lock()
+
+            def run(data: bytes) -> list:
+                with model_lock:
+                    return recognition.detect_hand_from_image(data, model_path)
+            scheduler = None
+            name = "バッチなし"
+        else:
+            scheduler = InferenceScheduler(
+                lambda images: recognition.detect_hands_from_images(images, model_path),
+                max_batch_size=max_batch_size, max_wait=max_wait_ms / 1000)
+            run = scheduler.run
+            name = f"最大{max_batch_size}枚/{max_wait_ms:g}ms"
+
+        for clients in CLIENTS:
+            throughput, latencies = measure(run, clients, image)
+            p95 = statistics.quantiles(latencies, n=20)[-1]
+            print(f"{name:<16} 同時{clients}件: {throughput:6.2f} 枚/秒  "
+                  f"待ち時間 中央値 {statistics.median(latencies) * 1000:7.1f} ms  p95 {p95 * 1000:7.1f} ms")
+        if scheduler is not None:
+            print(f"  統計: {scheduler.stats()}")
+            scheduler.close()
+
+
+if __name__ == '__main__':
+    main()
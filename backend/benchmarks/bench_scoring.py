@@ -0,0 +1,77 @@
+"""
+点数計算エンジン(MahjongScorer)の1手あたりの処理時間を計測するベンチマーク。
+
+代表的な和了形(平和、七対子と二盃口の複合、清一色の多面張、鳴き手など)を
+繰り返し計算し、1手あたりの平均処理時間を表示する。
+エンジン内部のデバッグ出力は計測から除外するため破棄する。
+
+実行方法(backendディレクトリで):
+    python benchmarks/bench_scoring.py
+"""
+
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.mahjong_logic.helpers import Call
+from app.mahjong_logic.scorer import MahjongScorer
+
+# --- 定数定義 ---
+REPEAT: int = 200
+
+# (名前, 手牌, 鳴き面子, ゲーム状況)
+SAMPLE_HANDS: list[tuple[str, list[str], list[Call], dict]] = [
+    ("平和ツモ",
+     ["1m", "2m", "3m", "4p", "5p", "6p", "5s", "6s", "7s", "2s", "2s", "2s", "3s", "4s"], [],
+     {"agari_hai": "4s", "is_tsumo": True, "is_menzen": True, "is_riichi": True}),
+    ("二盃口/七対子",
+     ["2m", "2m", "3m", "3m", "4m", "4m", "5s", "5s", "6s", "6s", "7s", "7s", "9p", "9p"], [],
+     {"agari_hai": "9p", "is_tsumo": False, "is_menzen": True}),
+    ("清一色多面張",
+     ["1p", "1p", "1p", "2p", "3p", "4p", "5p", "6p", "7p", "8p", "9p", "9p", "9p", "5p"], [],
+     {"agari_hai": "5p", "is_tsumo": True, "is_menzen": True}),
+    ("刻子多数",
+     ["1s", "1s", "1s", "2s", "2s", "2s", "3s", "3s", "3s", "5z", "5z", "5z", "7p", "7p"], [],
+     {"agari_hai": "3s", "is_tsumo": False, "is_menzen": True}),
+    ("鳴き役牌",
+     ["2m", "3m", "4m", "5p", "6p", "7p", "8s", "8s", "6s", "6s", "5z", "5z", "5z", "6s"],
+     [Call("pon", ["5z", "5z", "5z"])],
+     {"agari_hai": "6s", "is_tsumo": False, "is_oya": True}),
+]
+
+
+def bench(hand: list[str], called_mentsu: list[Call], game_state: dict) -> float:
+    """
+    1つの手牌を繰り返し計算し、1回あたりの平均秒数を返す。
+
+    Args:
+        hand: 手牌のリスト。
+        called_mentsu: 鳴き面子のリスト。
+        game_state: ゲーム状況。
+
+    Returns:
+        float: 1回あたりの平均秒数。
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        for _ in range(REPEAT):
+            MahjongScorer(hand, called_mentsu, **game_state).calculate()
+        return (time.perf_counter() - start) / REPEAT
+
+
+def main() -> None:
+    """全ての代表手を計測し、結果を表示する。"""
+    total = 0.0
+    for name, hand, called_mentsu, game_state in SAMPLE_HANDS:
+        seconds = bench(hand, called_mentsu, game_state)
+        total += seconds
+        print(f"{name:<12}: {seconds * 1e6:9.1f} us/hand")
+    print(f"{'平均':<12}: {total / len(SAMPLE_HANDS) * 1e6:9.1f} us/hand")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+向聴数計算(shanten)の1回あたりの処理時間を計測するベンチマーク。
+
+ランダムに配った13枚・14枚の手牌について、文字列からの計算(shanten)と
+枚数配列からの通常形の計算(normal_shanten)の平均処理時間を表示する。
+あわせて、14枚の手牌の打牌候補の評価(recommend_discards)の処理時間も表示する。
+
+実行方法(backendディレクトリで):
+    python benchmarks/bench_shanten.py
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.mahjong_logic.efficiency import recommend_discards
+from app.mahjong_logic.encoding import TILE_NAMES
+from app.mahjong_logic.shanten import normal_shanten, shanten
+from app.mahjong_logic.tables import SHANTEN_TABLE
+
+# --- 定数定義 ---
+NUM_HANDS: int = 2000
+NUM_DISCARD_HANDS: int = 200
+SEED: int = 0
+
+
+def deal(rng: random.Random, size: int) -> list[int]:
+    """
+    山から size 枚を配り、枚数配列を返す。
+
+    Args:
+        rng: 乱数生成器。
+        size: 配る枚数。
+
+    Returns:
+        list[int]: 長さ34の枚数配列。
+    """
+    wall = [i for i in range(34) for _ in range(4)]
+    counts = [0] * 34
+    for i in rng.sample(wall, size):
+        counts[i] += 1
+    return counts
+
+
+def bench(func, inputs: list) -> float:
+    """
+    全ての入力で関数を呼び出し、1回あたりの平均秒数を返す。
+
+    Args:
+        func: 計測する関数。
+        inputs: 関数に渡す引数のリスト。
+
+    Returns:
+        float: 1回あたりの平均秒数。
+    """
+    start = time.perf_counter()
+    for arg in inputs:
+        func(arg)
+    return (time.perf_counter() - start) / len(inputs)
+
+
+def main() -> None:
+    """13枚・14枚の手牌と打牌候補の評価を計測し、結果を表示する。"""
+    print(f"向聴数テーブル: {'mmap' if SHANTEN_TABLE is not None else 'なし(探索で計算)'}")
+    rng = random.Random(SEED)
+    for size in (13, 14):
+        hands = [deal(rng, size) for _ in range(NUM_HANDS)]
+        names = [[TILE_NAMES[i] for i in range(34) for _ in range(c[i])] for c in hands]
+        print(f"{size}枚 shanten        : {bench(shanten, names) * 1e6:7.1f} us/call")
+        print(f"{size}枚 normal_shanten : {bench(normal_shanten, hands) * 1e6:7.1f} us/call")
+    hands = [deal(rng, 14) for _ in range(NUM_DISCARD_HANDS)]
+    names = [[TILE_NAMES[i] for i in range(34) for _ in range(c[i])] for c in hands]
+    print(f"14枚 recommend_discards: {bench(recommend_discards, names) * 1e3:7.2f} ms/call")
+
+
+if __name__ == '__main__':
+    main()
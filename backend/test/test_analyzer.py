@@ -8,7 +8,7 @@ import os
 # Pythonがモジュールを探すパスのリストに追加する
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 # ...以降のテストコード...
-from app.mahjong_logic.analyzer import HandAnalysis
+from app.mahjong_logic.analyzer import MACHI_TABLE, HandAnalysis, machi_type
 from app.mahjong_logic.helpers import Tile, Call # helpersもインポート
 
 def test_normal_hand_ryanmen():
@@ -233,9 +233,9 @@ def test_hand_with_penchan_wait():
     
 def test_hand_with_chi_meld():
     """チーを含む手牌の解析テスト"""
-    # セットアップ: 123sをチー。残りは456m, 777p, 99z。9zの単騎待ち。
-    hand_concealed = ["4m", "5m", "6m", "7p", "7p", "7p", "9z"]
-    agari_hai = "9z"
+    # セットアップ: 123sをチー。残りは456m, 777p, 77z。7zの単騎待ち(字牌は1z-7zのみ)。
+    hand_concealed = ["4m", "5m", "6m", "7p", "7p", "7p", "7z"]
+    agari_hai = "7z"
     full_hand_concealed = hand_concealed + [agari_hai]
     
     # 鳴きの情報を作成
@@ -249,7 +249,7 @@ def test_hand_with_chi_meld():
     assert len(result) == 1
     pattern = result[0]
 
-    assert pattern["janto"] == "9z"
+    assert pattern["janto"] == "7z"
     assert pattern["machi"] == "tanki"
     
     # 期待される全ての面子（鳴き面子＋手牌の面子）
@@ -332,4 +332,39 @@ def test_invalid_hand_with_too_few_tiles():
 
     # 検証
     # 少牌（ショウハイ）なので、和了形として解釈されてはならない
-    assert len(result) == 0, "13枚の手牌は和了形として解釈されてはならない"
\ No newline at end of file
+    assert len(result) == 0, "13枚の手牌は和了形として解釈されてはならない"
+
+
+def test_iter_combinations_is_lazy():
+    """iter_combinations が agari_combinations と同じパターンを順に返すかテスト"""
+    hand = ["1m", "1m", "1m", "2m", "2m", "2m", "3m", "3m", "3m", "4p", "5p", "6p", "9s", "9s"]
+    analysis = HandAnalysis(hand, [], "3m")
+    assert "agari_combinations" not in vars(analysis)  # 生成時には解析しない
+    assert list(analysis.iter_combinations()) == analysis.agari_combinations
+    assert len(analysis.agari_combinations) == 2  # 刻子3つと順子3つ
+
+def test_iter_combinations_agari_hai_only_in_called_mentsu():
+    """アガリ牌が鳴き面子にしかない場合は、パターンを返さないかテスト"""
+    hand = ["1m", "2m", "3m", "4p", "5p", "6p", "7s", "8s", "9s", "9s", "9s"]
+    called = [Call("pon", ["5z", "5z", "5z"])]
+    assert list(HandAnalysis(hand, called, "5z").iter_combinations()) == []
+
+def test_machi_table():
+    """待ちの形の表が machi_type と一致し、アガリ牌を含む面子だけを持つかテスト"""
+    for (mentsu, agari_id), machi in MACHI_TABLE.items():
+        assert agari_id in mentsu
+        assert machi == machi_type(mentsu, agari_id)
+    assert MACHI_TABLE[(0, 1, 2), 2] == "penchan"
+    assert MACHI_TABLE[(6, 7, 8), 6] == "penchan"
+    assert MACHI_TABLE[(3, 4, 5), 4] == "kanchan"
+    assert ((3, 4, 5), 6) not in MACHI_TABLE
+
+def test_chinitsu_machi_patterns():
+    """清一色の多面張で、分解ごとに全ての待ちの形が列挙されるかテスト"""
+    # 2233445566778m + 8m: 雀頭が2m・5m・8mの解釈があり、8mは両面待ちにも単騎待ちにもなる
+    hand = ["2m", "2m", "3m", "3m", "4m", "4m", "5m", "5m", "6m", "6m", "7m", "7m", "8m", "8m"]
+    analysis = HandAnalysis(hand, [], "8m")
+    patterns = {(p["janto"], p["machi"]) for p in analysis.agari_combinations if p["type"] == "normal"}
+    assert ("8m", "tanki") in patterns
+    assert ("2m", "ryanmen") in patterns
+    assert ("5m", "ryanmen") in patterns
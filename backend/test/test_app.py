@@ -0,0 +1,59 @@
+import io
+import json
+import subprocess
+import pytest
+
+# --- Pythonのimportパスを通すための設定 ---
+import sys
+import os
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, BACKEND_DIR)
+# -----------------------------------------
+
+from app import create_app
+
+
+def test_ml_stack_is_not_imported_at_startup():
+    """アプリケーション作成と手牌(JSON)での点数計算でtorchなどが読み込まれないことのテスト"""
+    code = (
+        "import sys\n"
+        "from app import create_app\n"
+        "app = create_app(preload_model=False)\n"
+        "app.test_client().post('/api/calculate', json={'game_info': {"
+        "'hand': ['1m','2m','3m','4p','5p','6p','7s','8s','9s','1z','1z','1z','5z','5z'],"
+        "'agari_hai': '5z'}})\n"
+        "print([m for m in ('torch', 'ultralytics', 'cv2', 'pillow_heif', 'ml.recognition')"
+        " if m in sys.modules])\n"
+    )
+    completed = subprocess.run(
+        [sys.executable, '-c', code], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+    )
+    assert completed.stdout.strip().splitlines()[-1] == '[]'
+
+
+def test_scoring_only_mode_rejects_images(mocker):
+    """点数計算専用モードでは画像を受け付けず、認識処理も呼ばれないことのテスト"""
+    mock_detect = mocker.patch('app.routes.detect_tiles')
+    app = create_app(preload_model=True, scoring_only=True)
+    assert app.config['PRELOAD_MODEL'] is False
+
+    data = {
+        'image': (io.BytesIO(b"dummy image data"), 'test.jpg'),
+        'game_info': json.dumps({"is_oya": False}),
+    }
+    response = app.test_client().post('/api/calculate', data=data, content_type='multipart/form-data')
+
+    assert response.status_code == 503
+    assert response.get_json()['status'] == 'error'
+    mock_detect.assert_not_called()
+
+
+def test_scoring_only_mode_from_env(monkeypatch):
+    """環境変数MAHJONG_SCORING_ONLYで点数計算専用モードになることのテスト"""
+    monkeypatch.setenv('MAHJONG_SCORING_ONLY', '1')
+    app = create_app()
+
+    response = app.test_client().get('/api/health/ready')
+
+    assert response.status_code == 200
+    assert response.get_json()['scoring_only'] is True
@@ -0,0 +1,158 @@
+import random
+import re
+
+import pytest
+
+# --- Pythonのimportパスを通すための設定 ---
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+# -----------------------------------------
+
+from app.mahjong_logic.batch import evaluate_batch
+from app.mahjong_logic.encoding import TILE_NAMES
+from app.mahjong_logic.helpers import Call
+from app.mahjong_logic.scorer import MahjongScorer
+
+
+def _tiles(text: str) -> list[str]:
+    """"1m2m5mr" のような文字列を牌のリストに変換する."""
+    return re.findall(r"\d[mpsz]r?", text)
+
+
+def _random_agari(rng: random.Random) -> tuple[list[str], list[Call], dict]:
+    """鳴き・槓子・赤ドラ・ゲームの状況の組み合わせを含む和了形をランダムに作る."""
+    counts = [0] * 34
+    groups = []
+    suits = rng.sample(range(4), rng.choice([1, 2, 2, 3, 4]))
+
+    def random_tile() -> int:
+        suit = rng.choice(suits)
+        return suit * 9 + rng.randrange(9 if suit < 3 else 7)
+
+    def take(ids: list[int]) -> bool:
+        if any(counts[i] + ids.count(i) > 4 for i in ids):
+            return False
+        for i in ids:
+            counts[i] += 1
+        groups.append(ids)
+        return True
+
+    while not take([random_tile()] * 2):
+        pass
+    while len(groups) < 5:
+        tile = random_tile()
+        r = rng.random()
+        if r < 0.55 and tile < 27 and tile % 9 <= 6:
+            take([tile, tile + 1, tile + 2])
+        else:
+            take([tile] * (3 if r < 0.95 else 4))
+
+    hand = [TILE_NAMES[i] for g in groups for i in g]
+    for k, tile in enumerate(hand):
+        if tile in ("5m", "5p", "5s") and tile + "r" not in hand and rng.random() < 0.3:
+            hand[k] = tile + "r"
+    called = []
+    if rng.random() < 0.4:
+        for group in rng.sample(groups[1:], rng.randint(1, 2)):
+            tiles = [TILE_NAMES[i] for i in group]
+            kind = "chi" if len(set(group)) == 3 else ("pon" if len(group) == 3 else "minkan")
+            called.append(Call(kind, tiles))
+    game_state = {
+        "agari_hai": rng.choice(hand) if rng.random() < 0.1 else rng.choice(hand).replace("r", ""),
+        "is_tsumo": rng.random() < 0.5,
+        "is_menzen": not called,
+        "is_riichi": not called and rng.random() < 0.5,
+        "is_oya": rng.random() < 0.3,
+        "bakaze": rng.choice(["1z", "2z"]),
+        "jikaze": rng.choice(["1z", "2z", "3z", "4z"]),
+        "dora_indicators": rng.choice(["", "1m", "5p,3z", "5m"]),
+        "ura_dora_indicators": rng.choice(["", "2s"]),
+    }
+    for flag in ("is_ippatsu", "is_haitei", "is_houtei", "is_rinshan", "is_chankan", "is_double_riichi"):
+        if rng.random() < 0.05:
+            game_state[flag] = True
+    if rng.random() < 0.1:
+        game_state["disabled_yaku"] = rng.sample(["平和", "立直", "ドラ", "断么九", "対々和", "一盃口"], 2)
+    return hand, called, game_state
+
+
+def _calculate(hand: list[str], called: list[Call], game_state: dict) -> dict | type:
+    """1つずつ計算した結果 (例外の場合は例外の型)."""
+    try:
+        return MahjongScorer(hand, called, **game_state).calculate()
+    except Exception as e:
+        return type(e)
+
+
+class TestCalculateMany:
+    """一括計算(MahjongScorer.calculate_many)が、1つずつの計算と同じ結果になることのテスト"""
+
+    def test_random_hands(self):
+        """ランダムな和了形で、calculateと同じ結果になること."""
+        rng = random.Random(0)
+        samples = [_random_agari(rng) for _ in range(1500)]
+        # 既存の計算で例外になる手牌は、一括計算でも同じ例外になるため別に確認する.
+        samples = [s for s in samples if isinstance(_calculate(*s), dict)]
+        hands, called, game_states = (list(column) for column in zip(*samples))
+        results = MahjongScorer.calculate_many(hands, game_states, called)
+        for sample, result in zip(samples, results):
+            assert result == _calculate(*sample), sample
+        # 和了パターンが1つに決まる手牌は一括計算される.
+        assert evaluate_batch(hands, called, game_states).fast.mean() > 0.3
+
+    @pytest.mark.parametrize("hand, game_state, fast", [
+        # 平和・断么九・一盃口.
+        ("2m3m4m2m3m4m5p6p7p3s4s5s8s8s", {"agari_hai": "2m", "is_menzen": True}, True),
+        # 赤ドラを含む門前の刻子 (通常の刻子として三暗刻になる).
+        ("5p5p5pr1m1m1m9s9s9s2s3s4s7z7z", {"agari_hai": "7z", "is_menzen": True, "is_tsumo": True}, True),
+        # 赤ドラのアガリ牌.
+        ("2m3m4m2m3m4m5p6p7p3s4s5sr8s8s", {"agari_hai": "5sr", "is_menzen": True}, True),
+        # 七対子と二盃口の両方の形.
+        ("2m2m3m3m4m4m5s5s6s6s7s7s9p9p", {"agari_hai": "9p", "is_menzen": True}, False),
+        # 役満.
+        ("5z5z5z6z6z6z7z7z7z1m2m3m9p9p", {"agari_hai": "9p", "is_menzen": True}, False),
+        # 国士無双.
+        ("1m9m1p9p1s9s1z2z3z4z5z6z7z7z", {"agari_hai": "7z", "is_menzen": True}, False),
+        # 和了形でない.
+        ("1m2m4m5p6p7p3s4s5s8s8s8s9s9s", {"agari_hai": "4m", "is_menzen": True}, False),
+    ])
+    def test_fast_path_and_fallback(self, hand, game_state, fast):
+        """一括計算できる手牌とできない手牌のどちらも、calculateと同じ結果になること."""
+        hand = _tiles(hand)
+        assert evaluate_batch([hand], [[]], [game_state]).fast.tolist() == [fast]
+        assert MahjongScorer.calculate_many([hand], [game_state]) == [_calculate(hand, [], game_state)]
+
+    def test_no_yaku(self):
+        """役がない手牌は、calculateと同じエラーになること."""
+        hand = _tiles("1m2m3m4p5p6p7s8s9s1z1z1z9m9m")
+        called = [Call("chi", ["1m", "2m", "3m"])]
+        game_state = {"agari_hai": "9m", "bakaze": "2z", "jikaze": "3z"}
+        assert MahjongScorer.calculate_many([hand], [game_state], [called]) == [{"error": "役がありません。"}]
+
+    def test_local_yaku(self):
+        """ローカル役の指定がある手牌も、calculateと同じ結果になること."""
+        hand = _tiles("2p2p3p3p4p4p5p5p6p6p7p7p8p8p")
+        game_states = [{"agari_hai": "8p", "is_menzen": True},
+                       {"agari_hai": "8p", "is_menzen": True, "enabled_local_yaku": ["大車輪"]}]
+        results = MahjongScorer.calculate_many([hand, hand], game_states)
+        assert results == [_calculate(hand, [], s) for s in game_states]
+        assert "大車輪" in results[1]["yaku"]
+
+    def test_invalid_tile(self):
+        """不正な牌は、calculateと同じ例外になること."""
+        with pytest.raises(ValueError):
+            MahjongScorer.calculate_many([_tiles("0m") * 14], [{"agari_hai": "1m"}])
+
+    def test_results_are_independent(self):
+        """同じ点数の手牌の結果が、別々の辞書になること."""
+        hand = _tiles("2m3m4m2m3m4m5p6p7p3s4s5s8s8s")
+        results = MahjongScorer.calculate_many([hand, hand], [{"agari_hai": "2m", "is_menzen": True}] * 2)
+        results[0]["yaku"]["ドラ"] = 1
+        results[0]["score"]["total"] = 0
+        assert "ドラ" not in results[1]["yaku"] and results[1]["score"]["total"] > 0
+
+    def test_length_mismatch(self):
+        """手牌とゲームの状況の数が異なる場合はエラーになること."""
+        with pytest.raises(ValueError):
+            MahjongScorer.calculate_many([_tiles("2m3m4m2m3m4m5p6p7p3s4s5s8s8s")], [])
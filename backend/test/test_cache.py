@@ -0,0 +1,90 @@
+import pytest
+
+# --- Pythonのimportパスを通すための設定 ---
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+# -----------------------------------------
+
+from app.mahjong_logic.cache import LRUCache
+from app.mahjong_logic.analyzer import DECOMPOSITION_CACHE, HandAnalysis
+
+
+class TestLRUCache:
+    """LRUCacheクラスのテスト"""
+
+    def test_hit_and_miss(self):
+        """ヒットとミスが数えられるかテスト"""
+        cache = LRUCache(2)
+        assert cache.get("a") is None
+        cache.put("a", 1)
+        assert cache.get("a") == 1
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    def test_eviction_order(self):
+        """上限を超えた場合に最も使われていない要素が追い出されるかテスト"""
+        cache = LRUCache(2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")       # aを最近使ったことにする
+        cache.put("c", 3)    # bが追い出される
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.get("c") == 3
+        assert cache.stats()["evictions"] == 1
+        assert len(cache) == 2
+
+    def test_clear(self):
+        """clearで内容と統計がリセットされるかテスト"""
+        cache = LRUCache(2)
+        cache.put("a", 1)
+        cache.get("a")
+        cache.clear()
+        assert cache.stats() == {"hits": 0, "misses": 0, "evictions": 0, "size": 0, "maxsize": 2}
+
+
+class TestDecompositionCache:
+    """HandAnalysisの面子分解キャッシュのテスト"""
+
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        DECOMPOSITION_CACHE.clear()
+        yield
+        DECOMPOSITION_CACHE.clear()
+
+    def test_rescore_hits_cache(self, mocker):
+        """同じ手牌の再解析では面子分解の探索が行われないかテスト"""
+        hand = ["1m", "2m", "3m", "4p", "5p", "6p", "5s", "6s", "7s", "2s", "2s", "2s", "3s", "4s"]
+        first = HandAnalysis(hand, [], "4s").agari_combinations
+
+        spy = mocker.spy(HandAnalysis, "_find_combinations")
+        second = HandAnalysis(hand, [], "4s").agari_combinations
+
+        assert spy.call_count == 0
+        assert first == second
+        assert DECOMPOSITION_CACHE.stats()["hits"] == 1
+
+    def test_machi_is_recomputed_on_hit(self):
+        """キャッシュヒット時もアガリ牌に応じた待ちが判定されるかテスト"""
+        # 234m 456m 678p 345s 99s: 2mで和了なら両面待ち、7pで和了なら嵌張待ち
+        hand = ["2m", "3m", "4m", "4m", "5m", "6m", "6p", "7p", "8p", "3s", "4s", "5s", "9s", "9s"]
+        ryanmen = HandAnalysis(hand, [], "2m").agari_combinations
+        kanchan = HandAnalysis(hand, [], "7p").agari_combinations
+
+        assert {p["machi"] for p in ryanmen} == {"ryanmen"}
+        assert {p["machi"] for p in kanchan} == {"kanchan"}
+        assert DECOMPOSITION_CACHE.stats()["hits"] == 1
+
+    def test_partial_iteration_is_not_cached(self):
+        """途中で止めた解析では、面子分解がキャッシュされないかテスト"""
+        # 111222333m 456p 99s: 刻子3つと順子3つの2通りに分解できる
+        hand = ["1m", "1m", "1m", "2m", "2m", "2m", "3m", "3m", "3m", "4p", "5p", "6p", "9s", "9s"]
+        analysis = HandAnalysis(hand, [], "3m")
+        patterns = analysis.iter_combinations()
+        next(patterns)
+        patterns.close()
+        assert len(DECOMPOSITION_CACHE) == 0
+
+        assert list(analysis.iter_combinations()) == analysis.agari_combinations
+        assert len(DECOMPOSITION_CACHE) == 1
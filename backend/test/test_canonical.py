@@ -0,0 +1,109 @@
+import itertools
+import re
+
+import pytest
+
+# --- Pythonのimportパスを通すための設定 ---
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+# -----------------------------------------
+
+from app.mahjong_logic.analyzer import DECOMPOSITION_CACHE, HandAnalysis
+from app.mahjong_logic.canonical import (FROM_CANONICAL, IDENTITY, SUIT_SPECIFIC_BITS, TO_CANONICAL,
+                                         canonical_key, to_canonical_name)
+from app.mahjong_logic.encoding import EncodedHand
+from app.mahjong_logic.helpers import Call
+
+
+def _tiles(text: str) -> list[str]:
+    """"1m2m5mr" のような文字列を牌のリストに変換する."""
+    return re.findall(r"\d[mpsz]r?", text)
+
+
+def _permute(tiles: list[str], suits: str) -> list[str]:
+    """萬子・筒子・索子を suits の順の色に置き換える."""
+    return [t[0] + suits['mps'.index(t[1])] + t[2:] if t[1] != 'z' else t for t in tiles]
+
+
+class TestCanonicalKey:
+    """正規化キーのテスト"""
+
+    def test_permutation_tables(self):
+        """牌IDの対応表が互いに逆の対応になっているかテスト"""
+        for order, table in TO_CANONICAL.items():
+            assert [FROM_CANONICAL[order][i] for i in table] == list(range(34))
+        assert TO_CANONICAL[IDENTITY] == tuple(range(34))
+
+    def test_same_key_for_permuted_suits(self):
+        """色を入れ替えただけの手牌が同じキーになるかテスト"""
+        hand = _tiles("1m2m3m4p5pr6p7s7s7s9s9s1z1z1z")
+        called = [["7s", "7s", "7s"]]
+        keys = set()
+        red_fives = set()
+        for suits in itertools.permutations('mps'):
+            suits = ''.join(suits)
+            encoded = EncodedHand(_permute(hand, suits), [_permute(c, suits) for c in called], "1z")
+            key, order = canonical_key(encoded)
+            keys.add(key)
+            # 牌の文字列も、正規の順序に並べ替えると同じになる.
+            red_fives.add(to_canonical_name(_permute(["5pr"], suits)[0], order))
+        assert len(keys) == 1
+        assert len(red_fives) == 1 and red_fives.pop().endswith("r")
+
+    def test_different_hands(self):
+        """赤ドラ・鳴き面子・状況のビットが違う手牌は別のキーになるかテスト"""
+        hand = _tiles("1m2m3m4p5p6p7s7s7s9s9s1z1z1z")
+        base, _ = canonical_key(EncodedHand(hand, [], "1z"))
+        assert canonical_key(EncodedHand(_tiles("1m2m3m4p5pr6p7s7s7s9s9s1z1z1z"), [], "1z"))[0] != base
+        assert canonical_key(EncodedHand(hand, [["7s", "7s", "7s"]], "1z"))[0] != base
+        assert canonical_key(EncodedHand(hand, [], "1z"), context=1)[0] != base
+
+    def test_suit_specific_yaku(self):
+        """緑一色・大車輪が成立しうる手牌は、色を入れ替えた手牌と別のキーになるかテスト"""
+        green = _tiles("2s2s3s3s4s4s6s6s6s8s8s6z6z6z")
+        key, _ = canonical_key(EncodedHand(green, [], "8s"))
+        other, _ = canonical_key(EncodedHand(_permute(green, "psm"), [], "8m"))
+        assert key.suit_specific == SUIT_SPECIFIC_BITS['ryuuiisou']
+        assert other.suit_specific == 0
+        assert key != other
+        wheel, _ = canonical_key(EncodedHand(_tiles("2p2p3p3p4p4p5p5p6p6p7p7p8p8p"), [], "8p"))
+        assert wheel.suit_specific == SUIT_SPECIFIC_BITS['daisharin']
+
+
+class TestCanonicalDecompositionCache:
+    """面子分解のキャッシュを、色を入れ替えた手牌で共有するテスト"""
+
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        DECOMPOSITION_CACHE.clear()
+        yield
+        DECOMPOSITION_CACHE.clear()
+
+    @pytest.mark.parametrize("hand, agari_hai", [
+        ("1m1m1m2m2m2m3m3m3m4p5p6p9s9s", "3m"),
+        ("2m3m4m4m5m6m6p7p8p3s4s5s9s9s", "4m"),
+        ("1s1s2s2s3s3s4p4p5p5p6p6p7z7z", "7z"),
+    ])
+    def test_permuted_hands_share_cache(self, hand, agari_hai):
+        """色を入れ替えた手牌がキャッシュを共有し、キャッシュなしと同じ結果になるかテスト"""
+        hand = _tiles(hand)
+        expected = {}
+        for suits in itertools.permutations('mps'):
+            suits = ''.join(suits)
+            DECOMPOSITION_CACHE.clear()
+            tiles, agari = _permute(hand, suits), _permute([agari_hai], suits)[0]
+            expected[suits] = HandAnalysis(tiles, [], agari).agari_combinations
+        DECOMPOSITION_CACHE.clear()
+        for suits, combinations in expected.items():
+            tiles, agari = _permute(hand, suits), _permute([agari_hai], suits)[0]
+            assert HandAnalysis(tiles, [], agari).agari_combinations == combinations
+        assert len(DECOMPOSITION_CACHE) == 1
+        assert DECOMPOSITION_CACHE.stats()["hits"] == 5
+
+    def test_called_mentsu_do_not_split_cache(self):
+        """鳴き面子だけが違う手牌も、門前部分が同じならキャッシュを共有するかテスト"""
+        hand = _tiles("2m3m4m6p7p8p3s4s5s9s9s")
+        HandAnalysis(hand + ["1z"] * 3, [Call("pon", ["1z"] * 3)], "9s").agari_combinations
+        HandAnalysis(hand + ["2z"] * 3, [Call("pon", ["2z"] * 3)], "9s").agari_combinations
+        assert DECOMPOSITION_CACHE.stats()["hits"] == 1
@@ -0,0 +1,75 @@
+import pytest
+
+# --- Pythonのimportパスを通すための設定 ---
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+# -----------------------------------------
+
+from app.mahjong_logic.dora import DoraCount, dora_vector_of, parse_indicators
+from app.mahjong_logic.encoding import TILE_IDS
+from app.mahjong_logic.helpers import Call
+from app.mahjong_logic.scorer import MahjongScorer
+
+
+class TestDoraVector:
+    """ドラの多重度ベクトルのテスト"""
+
+    def test_list_and_comma_string(self):
+        """表示牌のリストとカンマ区切りの文字列が同じ結果になるかテスト"""
+        assert parse_indicators("1m, 5pr,,3z") == parse_indicators(["1m", "5pr", "3z"])
+        assert parse_indicators(None) == parse_indicators("") == ()
+        assert parse_indicators("1m,xx") == (TILE_IDS["1m"],)
+        assert dora_vector_of({"dora_indicators": "1m,3z"}) == dora_vector_of({"dora_indicators": ["3z", "1m"]})
+
+    def test_next_tile(self):
+        """表示牌の次の牌がドラになるかテスト (9→1, 北→東, 中→白)"""
+        vector = dora_vector_of({"dora_indicators": "9m,4z,7z,5pr"}).dora
+        assert {i for i, v in enumerate(vector) if v} == {TILE_IDS[t] for t in ("1m", "1z", "5z", "6p")}
+
+    def test_multiplicity(self):
+        """同じ表示牌や槓ドラの表示牌が重ねて数えられるかテスト"""
+        vector = dora_vector_of({"dora_indicators": "1m,1m", "kan_dora_indicators": ["1m"]})
+        assert vector.dora[TILE_IDS["2m"]] == 3
+        assert vector.count_tiles(["2m", "2m", "3m"]) == DoraCount(6, 0, 0)
+
+    def test_ura_requires_riichi(self):
+        """裏ドラは立直している場合だけ数えるかテスト"""
+        state = {"ura_dora_indicators": "1p", "kan_ura_dora_indicators": "1p"}
+        assert not any(dora_vector_of(state).ura)
+        assert dora_vector_of({**state, "is_riichi": True}).ura[TILE_IDS["2p"]] == 2
+        assert dora_vector_of({**state, "is_double_riichi": True}).ura[TILE_IDS["2p"]] == 2
+
+    def test_red_five_counts_twice(self):
+        """赤ドラがドラ表示牌の次の牌でもある場合、両方で数えるかテスト"""
+        vector = dora_vector_of({"dora_indicators": "4m"})
+        assert vector.count_tiles(["5mr", "5m", "6m"]) == DoraCount(2, 1, 0)
+        assert vector.count_tiles(["5mr", "5m", "6m"]).total == 3
+
+
+class TestScorerDora:
+    """MahjongScorerのドラの計算のテスト"""
+
+    def test_red_five_in_janto(self):
+        """雀頭の赤ドラも数えるかテスト"""
+        hand = ["1m", "2m", "3m", "4p", "5p", "6p", "6s", "7s", "8s", "2s", "3s", "4s", "5p", "5pr"]
+        scorer = MahjongScorer(hand, [], agari_hai="4s", is_menzen=True, is_riichi=True,
+                               dora_indicators="4p")
+        assert scorer.dora == DoraCount(3, 1, 0)
+        assert scorer.calculate()["yaku"]["ドラ"] == 4
+
+    def test_called_mentsu(self):
+        """鳴き面子の牌と赤ドラを1回だけ数えるかテスト"""
+        hand = ["2m", "3m", "4m", "6p", "7p", "8p", "2s", "2s", "7z", "7z", "7z", "5s", "5sr", "5s"]
+        called = [Call("pon", ["5s", "5sr", "5s"])]
+        scorer = MahjongScorer(hand, called, agari_hai="4m", dora_indicators=["4s", "6z"])
+        assert scorer.dora == DoraCount(6, 1, 0)
+        assert scorer.calculate()["yaku"]["ドラ"] == 7
+
+    @pytest.mark.parametrize("indicators", ["1m", ["1m"]])
+    def test_input_formats(self, indicators):
+        """表示牌の形式によらず同じ点数になるかテスト"""
+        hand = ["1m", "2m", "3m", "2m", "3m", "4m", "6p", "7p", "8p", "2s", "3s", "4s", "9s", "9s"]
+        result = MahjongScorer(hand, [], agari_hai="4s", is_menzen=True, is_tsumo=True,
+                               dora_indicators=indicators).calculate()
+        assert result["yaku"]["ドラ"] == 2
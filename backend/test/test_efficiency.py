@@ -0,0 +1,74 @@
+import random
+
+import pytest
+
+# --- Pythonのimportパスを通すための設定 ---
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+# -----------------------------------------
+
+from app.mahjong_logic.efficiency import recommend_discards
+from app.mahjong_logic.shanten import shanten
+from app.mahjong_logic.encoding import TILE_NAMES
+from app.mahjong_logic.helpers import Call
+
+
+def _tiles(text: str) -> list[str]:
+    """"1m2m3m" のような文字列を牌のリストに変換する."""
+    return [text[i:i + 2] for i in range(0, len(text), 2)]
+
+
+class TestRecommendDiscards:
+    """打牌候補の評価のテスト"""
+
+    def test_best_discard(self):
+        """受け入れが最も多い打牌が先頭に来るかテスト"""
+        hand = _tiles("1m2m3m4p5p6p5s6s7s2s2s2s3s7z")
+        results = recommend_discards(hand)
+        best = results[0]
+        assert best["discard"] == "7z"
+        assert best["shanten"] == 0
+        assert best["ukeire"] == [{"tile": "1s", "remaining": 4},
+                                  {"tile": "3s", "remaining": 3},
+                                  {"tile": "4s", "remaining": 4}]
+        assert best["ukeire_count"] == 11
+        assert len(results) == len(set(hand))
+
+    def test_visible_tiles_reduce_remaining(self):
+        """ドラ表示牌・見えている牌・鳴き面子の牌が残り枚数から除かれるかテスト"""
+        hand = _tiles("2m3m4m5p6p7p8s8s6s7s5z5z5z1z")
+        called = [Call("pon", ["5z", "5z", "5z"])]
+        best = recommend_discards(hand, called, dora_indicators="5s", visible_tiles=["8s"])[0]
+        assert best["discard"] == "1z"
+        assert best["ukeire"] == [{"tile": "5s", "remaining": 3}, {"tile": "8s", "remaining": 1}]
+
+    def test_exhausted_tile_is_not_counted(self):
+        """残り枚数が0の牌は受け入れに含めないかテスト"""
+        hand = _tiles("1m2m3m4p5p6p5s6s7s2s2s2s3s7z")
+        best = recommend_discards(hand, visible_tiles="1s,1s,1s,1s")[0]
+        assert [u["tile"] for u in best["ukeire"]] == ["3s", "4s"]
+
+    def test_matches_full_shanten(self):
+        """ランダムな手牌で、全ての打牌・ツモを shanten で計算した結果と一致するかテスト"""
+        rng = random.Random(0)
+        wall = [i for i in range(34) for _ in range(4)]
+        for _ in range(20):
+            ids = rng.sample(wall, 15)
+            hand = [TILE_NAMES[i] for i in ids[:14]]
+            dora = [TILE_NAMES[ids[14]]]
+            for result in recommend_discards(hand, dora_indicators=dora):
+                rest = hand[:]
+                rest.remove(result["discard"])
+                assert result["shanten"] == shanten(rest)
+                expected = []
+                for tile in TILE_NAMES:
+                    remaining = 4 - (hand + dora).count(tile)
+                    if remaining > 0 and shanten(rest + [tile]) < result["shanten"]:
+                        expected.append({"tile": tile, "remaining": remaining})
+                assert result["ukeire"] == expected
+
+    def test_invalid_size(self):
+        """14枚でない手牌はValueErrorになるかテスト"""
+        with pytest.raises(ValueError):
+            recommend_discards(_tiles("1m2m3m4p5p6p5s6s7s2s2s2s3s"))
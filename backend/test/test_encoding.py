@@ -0,0 +1,89 @@
+import pytest
+
+# --- Pythonのimportパスを通すための設定 ---
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+# -----------------------------------------
+
+from app.mahjong_logic.encoding import (DORA_OF, NUM_TILE_KINDS, TILE_NAMES, EncodedHand,
+                                        from_counts, tile_id, to_counts)
+from app.mahjong_logic.analyzer import HandAnalysis
+from app.mahjong_logic.helpers import Call
+
+
+class TestEncoding:
+    """牌の整数エンコーディングのテスト"""
+
+    @pytest.mark.parametrize("tile, expected", [
+        ("1m", 0), ("9m", 8), ("1p", 9), ("5pr", 13), ("9s", 26), ("1z", 27), ("7z", 33),
+    ])
+    def test_tile_id(self, tile, expected):
+        """牌の文字列が正しいIDに変換されるかテスト"""
+        assert tile_id(tile) == expected
+
+    @pytest.mark.parametrize("tile", ["0m", "8z", "5zr", "", None])
+    def test_invalid_tile_id(self, tile):
+        """不正な牌はValueErrorになるかテスト"""
+        with pytest.raises(ValueError):
+            tile_id(tile)
+
+    def test_round_trip(self):
+        """全ての牌がIDと文字列の間で往復変換できるかテスト"""
+        assert len(TILE_NAMES) == NUM_TILE_KINDS
+        for i, name in enumerate(TILE_NAMES):
+            assert tile_id(name) == i
+
+    @pytest.mark.parametrize("indicator, dora", [
+        ("1m", "2m"), ("9m", "1m"), ("9s", "1s"), ("4z", "1z"), ("3z", "4z"), ("7z", "5z"), ("5z", "6z"),
+    ])
+    def test_dora_of(self, indicator, dora):
+        """ドラ表示牌からドラが正しく求まるかテスト"""
+        assert TILE_NAMES[DORA_OF[tile_id(indicator)]] == dora
+
+    def test_to_counts(self):
+        """枚数配列と赤ドラの枚数が正しく数えられるかテスト"""
+        counts, red_counts = to_counts(["5m", "5mr", "5s", "5sr", "1z", "1z"])
+        assert counts[tile_id("5m")] == 2
+        assert counts[tile_id("5s")] == 2
+        assert counts[tile_id("1z")] == 2
+        assert sum(counts) == 6
+        assert red_counts == [1, 0, 1]
+        assert from_counts(counts) == ["5m", "5m", "5s", "5s", "1z", "1z"]
+
+    def test_encoded_hand_removes_called_tiles(self):
+        """鳴き面子の牌が門前部分から除かれるかテスト"""
+        hand = ["1z", "1z", "1z", "2p", "2p", "5mr", "6m", "7m"]
+        encoded = EncodedHand(hand, [["1z", "1z", "1z"]], "7m")
+        assert encoded.closed_counts[tile_id("1z")] == 0
+        assert encoded.counts[tile_id("1z")] == 3
+        assert encoded.closed_red_counts == [1, 0, 0]
+        assert encoded.agari_id == tile_id("7m")
+
+    def test_encoded_hand_without_called_tiles_in_hand(self):
+        """手牌に鳴き面子の牌が含まれていない場合も、枚数が負にならないかテスト"""
+        encoded = EncodedHand(["2p", "2p"], [["5pr", "6p", "7p"]], "2p")
+        assert min(encoded.closed_counts) == 0
+        assert encoded.closed_red_counts == [0, 0, 0]
+
+
+def test_red_five_is_not_restored_in_mentsu():
+    """解析結果の門前の面子は赤ドラを通常の5で表し、枚数は色ごとに数えるかテスト"""
+    # 345m(赤5m) 555p(赤5p 1枚) 678s 99s 11z + 11z
+    hand = ["3m", "4m", "5mr", "5p", "5pr", "5p", "6s", "7s", "8s", "9s", "9s", "1z", "1z", "1z"]
+    analyzer = HandAnalysis(hand=hand, called_mentsu=[], agari_hai="1z")
+    pattern = analyzer.agari_combinations[0]
+    assert ["5p", "5p", "5p"] in pattern["mentsu"]
+    assert ["3m", "4m", "5m"] in pattern["mentsu"]
+    assert analyzer.encoded_hand.closed_red_counts == [1, 1, 0]
+
+
+def test_red_five_in_called_mentsu_is_not_duplicated():
+    """鳴き面子の赤ドラが門前の面子に重複して戻されないかテスト"""
+    hand = ["5p", "5pr", "5p", "2m", "3m", "4m", "6s", "7s", "8s", "9s"]
+    called = [Call("pon", ["5p", "5pr", "5p"])]
+    analyzer = HandAnalysis(hand=hand + ["9s"], called_mentsu=called, agari_hai="9s")
+    assert len(analyzer.agari_combinations) == 1
+    for pattern in analyzer.agari_combinations:
+        closed = pattern["mentsu"][:-1]
+        assert "5pr" not in sum(closed, [])
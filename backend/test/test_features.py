@@ -0,0 +1,111 @@
+import pytest
+
+# --- Pythonのimportパスを通すための設定 ---
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+# -----------------------------------------
+
+from app.mahjong_logic.analyzer import HandAnalysis
+from app.mahjong_logic.features import HandFeatures, build_features
+from app.mahjong_logic.fu import FuCalculator
+from app.mahjong_logic.helpers import Call
+from app.mahjong_logic.yaku import YakuJudge
+
+
+def _tiles(text: str) -> list[str]:
+    """"1m2m3m" のような文字列を牌のリストに変換する."""
+    return [text[i:i + 2] for i in range(0, len(text), 2)]
+
+
+class TestHandFeatures:
+    """和了パターンの特徴量のテスト"""
+
+    def test_patterns_have_features(self):
+        """HandAnalysisの全ての解析結果に特徴量が付くかテスト"""
+        hand = _tiles("2m2m3m3m4m4m5s5s6s6s7s7s9p9p")
+        patterns = HandAnalysis(hand, [], "9p").agari_combinations
+        assert {p["type"] for p in patterns} == {"normal", "chitoitsu"}
+        for pattern in patterns:
+            assert isinstance(pattern["features"], HandFeatures)
+
+    def test_normal_pattern(self):
+        """通常形の面子の分類と手牌の集計をテスト"""
+        # 123m 456m 789m 111z(ロンで完成) 99p
+        hand = _tiles("1m2m3m4m5m6m7m8m9m1z1z1z9p9p")
+        pattern = HandAnalysis(hand, [], "1z").agari_combinations[0]
+        features = pattern["features"]
+        assert features.shuntsu == (("1m", "2m", "3m"), ("4m", "5m", "6m"), ("7m", "8m", "9m"))
+        assert features.shuntsu_counts == (1, 1, 1)
+        assert features.kotsu == ("1z",)
+        assert len(features.melds) == 1
+        meld = features.melds[0]
+        assert (meld.tile, meld.is_kotsu, meld.is_kantsu, meld.is_open, meld.has_agari) == ("1z", True, False, False, True)
+        assert features.suit_mask == 0b1011
+        assert (features.num_tiles, features.num_honors, features.num_terminals) == (14, 3, 4)
+        assert features.all_mentsu_yaochu is False
+        assert features.agari_hai == "1z"
+
+    def test_called_meld_is_open(self):
+        """鳴いた刻子・槓子がis_openになるかテスト"""
+        hand = _tiles("2m3m4m6p7p8p3s3s5z5z5z2z2z2z2z")
+        called = [Call("pon", ["5z", "5z", "5z"]), Call("minkan", ["2z", "2z", "2z", "2z"])]
+        pattern = HandAnalysis(hand, called, "3s").agari_combinations[0]
+        melds = {m.tile: m for m in pattern["features"].melds}
+        assert melds["5z"].is_open and not melds["5z"].is_kantsu
+        assert melds["2z"].is_open and melds["2z"].is_kantsu
+        assert pattern["features"].num_kan == 1
+
+    def test_features_are_shared_between_machi(self):
+        """同じ分解で待ちの形だけが違うパターンは特徴量を共有するかテスト"""
+        # 123m 345m 678p 234s 99s: 3mで和了すると辺張と両面の解釈がある
+        hand = _tiles("1m2m3m3m4m5m6p7p8p2s3s4s9s9s")
+        patterns = HandAnalysis(hand, [], "3m").agari_combinations
+        normal = [p for p in patterns if p["type"] == "normal"]
+        assert len(normal) >= 2
+        same = [p for p in normal if p["mentsu"] == normal[0]["mentsu"]]
+        assert all(p["features"] is same[0]["features"] for p in same)
+
+    def test_red_five_in_pung_and_peikou(self):
+        """赤ドラを含む刻子・順子を、通常の牌の面子として分類するかテスト"""
+        # 3m4m5mr 3m4m5m 2s2s2s 5p5pr5p(ポン) 9p9p
+        analysis = {"type": "normal", "janto": "9p", "machi": "tanki",
+                    "mentsu": [["3m", "4m", "5mr"], ["3m", "4m", "5m"], ["2s", "2s", "2s"], ["5p", "5pr", "5p"]]}
+        called = [Call("pon", ["5p", "5pr", "5p"])]
+        features = build_features(analysis, called, "5pr")
+        assert features.shuntsu == (("3m", "4m", "5m"), ("3m", "4m", "5m"))
+        assert features.shuntsu_counts == (2,)
+        assert features.kotsu == ("2s", "5p")
+        meld = features.melds[1]
+        assert (meld.tile, meld.is_kotsu, meld.is_open, meld.has_agari) == ("5p", True, True, True)
+
+    def test_features_are_immutable(self):
+        """特徴量は変更できないかテスト"""
+        pattern = HandAnalysis(_tiles("1m2m3m4m5m6m7m8m9m1z1z1z9p9p"), [], "1z").agari_combinations[0]
+        with pytest.raises(AttributeError):
+            pattern["features"].kotsu = ()
+
+    @pytest.mark.parametrize("hand, called, agari_hai, game_state", [
+        ("1m2m3m4m5m6m7m8m9m1z1z1z9p9p", [], "1z", {"is_menzen": True, "jikaze": "1z"}),
+        ("2m2m3m3m4m4m5s5s6s6s7s7s9p9p", [], "9p", {"is_menzen": True, "is_tsumo": True}),
+        ("5s5s5s6s7s8s6s7s8s2s2s2s5z5z", [Call("pon", ["2s", "2s", "2s"])], "5z", {}),
+        ("2m3m4m6p7p8p3s3s5z5z5z2z2z2z2z",
+         [Call("pon", ["5z", "5z", "5z"]), Call("minkan", ["2z", "2z", "2z", "2z"])], "3s", {"jikaze": "2z"}),
+    ])
+    def test_same_result_without_features(self, hand, called, agari_hai, game_state):
+        """特徴量がない解析結果でも、役と符が同じになるかテスト"""
+        game_state = dict(game_state, agari_hai=agari_hai)
+        for pattern in HandAnalysis(_tiles(hand), called, agari_hai).agari_combinations:
+            plain = {k: v for k, v in pattern.items() if k != "features"}
+            yaku = YakuJudge(pattern, called, game_state).check_all_yaku()
+            assert YakuJudge(plain, called, game_state).check_all_yaku() == yaku
+            assert (FuCalculator(plain, called, yaku, game_state).calculate()
+                    == FuCalculator(pattern, called, yaku, game_state).calculate())
+
+    def test_build_features_from_hand(self):
+        """手牌を指定した場合、手牌の集計はその手牌で行うかテスト"""
+        analysis = {"type": "kokushi", "janto": "1m", "mentsu": []}
+        hand = _tiles("1m1m9m1p9p1s9s1z2z3z4z5z6z7z")
+        features = build_features(analysis, [], "9m", hand=hand)
+        assert features.melds == ()
+        assert (features.num_tiles, features.num_honors, features.num_terminals) == (14, 7, 7)
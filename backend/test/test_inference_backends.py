@@ -0,0 +1,142 @@
+import subprocess
+
+import pytest
+
+# --- Pythonのimportパスを通すための設定 ---
+import sys
+import os
+# mlパッケージを読み込むため、リポジトリのルートをパスに追加する
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, ROOT_DIR)
+# -----------------------------------------
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("PIL")
+
+from ml.inference_backends import OnnxBackend, create_backend, letterbox, nms, postprocess
+
+NAMES = {0: "1m", 1: "5z", 2: "9s"}
+
+
+def raw_output(rows, anchors=8):
+    """(4 + クラス数, アンカー数) のモデルの出力を作る。rows は (中心x, 中心y, 幅, 高さ, クラスID, 信頼度)。"""
+    output = np.zeros((4 + len(NAMES), anchors), dtype=np.float32)
+    for i, (cx, cy, w, h, class_id, score) in enumerate(rows):
+        output[:4, i] = (cx, cy, w, h)
+        output[4 + class_id, i] = score
+    return output
+
+
+def write_constant_model(path, output):
+    """入力によらず output をバッチの数だけ返す、ultralytics形式のメタデータ付きONNXモデルを書き出す。"""
+    onnx = pytest.importorskip("onnx")
+    from onnx import TensorProto, helper, numpy_helper
+
+    nodes = [
+        helper.make_node("ReduceSum", ["images", "axes"], ["total"], keepdims=1),
+        helper.make_node("Reshape", ["total", "shape"], ["per_image"]),
+        helper.make_node("Mul", ["per_image", "zero"], ["zeros"]),
+        helper.make_node("Add", ["zeros", "constant"], ["output0"]),
+    ]
+    graph = helper.make_graph(
+        nodes, "constant",
+        [helper.make_tensor_value_info("images", TensorProto.FLOAT, ["batch", 3, "height", "width"])],
+        [helper.make_tensor_value_info("output0", TensorProto.FLOAT, ["batch", output.shape[0], output.shape[1]])],
+        initializer=[
+            numpy_helper.from_array(np.array([1, 2, 3], dtype=np.int64), "axes"),
+            numpy_helper.from_array(np.array([-1, 1, 1], dtype=np.int64), "shape"),
+            numpy_helper.from_array(np.zeros((1,), dtype=np.float32), "zero"),
+            numpy_helper.from_array(output[None], "constant"),
+        ],
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 17)])
+    model.ir_version = 8
+    for key, value in {"names": str(NAMES), "imgsz": "[640, 640]", "stride": "32"}.items():
+        model.metadata_props.add(key=key, value=value)
+    onnx.save(model, str(path))
+
+
+class TestPreprocessing:
+    """レターボックスのテスト"""
+
+    def test_letterbox_square_and_minimal_padding(self):
+        """縦横比を保って縮小し、固定の入力では正方形に、可変の入力では最小の余白にすることのテスト"""
+        pytest.importorskip("cv2")
+        image = np.zeros((1080, 1920, 3), dtype=np.uint8)
+
+        square = letterbox(image, (640, 640))
+        minimal = letterbox(image, (640, 640), auto=True)
+
+        assert square.shape == (640, 640, 3)
+        assert minimal.shape == (384, 640, 3)
+        # 上下の余白は灰色(114)、画像の部分は元の画素
+        assert (square[:140] == 114).all() and (square[140:500] == 0).all() and (square[500:] == 114).all()
+        assert (minimal[:12] == 114).all() and (minimal[12:372] == 0).all()
+
+
+class TestPostprocessing:
+    """NMSと元画像の座標への変換のテスト"""
+
+    def test_nms_keeps_best_of_overlapping_boxes(self):
+        """重なったボックスは信頼度の高いものだけを残し、離れたボックスは残すことのテスト"""
+        boxes = np.array([[0, 0, 10, 10], [1, 1, 11, 11], [50, 50, 60, 60]], dtype=np.float32)
+        scores = np.array([0.8, 0.9, 0.7], dtype=np.float32)
+
+        assert nms(boxes, scores, 0.5).tolist() == [1, 2]
+
+    def test_postprocess(self):
+        """信頼度の閾値・クラスごとのNMS・元画像の座標への変換のテスト"""
+        output = raw_output([
+            (320, 192, 64, 32, 1, 0.9),
+            (321, 192, 64, 32, 1, 0.8),   # 同じ牌の重複は除く
+            (321, 192, 64, 32, 2, 0.6),   # 違う牌は重なっていても残す
+            (100, 100, 10, 10, 0, 0.1),   # 信頼度が低いものは除く
+        ])
+
+        boxes, scores, class_ids = postprocess(output, (384, 640), (1080, 1920))
+
+        assert class_ids.tolist() == [1, 2]
+        assert scores.tolist() == pytest.approx([0.9, 0.6])
+        # 倍率1/3、上の余白12ピクセルを戻す
+        assert boxes[0].tolist() == pytest.approx([864, 492, 1056, 588])
+
+
+class TestOnnxBackend:
+    """ONNX Runtimeのバックエンドのテスト"""
+
+    def test_predict_batch(self, tmp_path):
+        """メタデータのクラス名を読み、バッチの画像ごとに元画像の座標で結果を返すことのテスト"""
+        pytest.importorskip("onnxruntime")
+        pytest.importorskip("cv2")
+        path = tmp_path / "best.onnx"
+        write_constant_model(path, raw_output([(320, 192, 64, 32, 1, 0.9), (100, 100, 20, 20, 0, 0.5)]))
+
+        backend = create_backend(str(path))
+        images = [np.zeros((1080, 1920, 3), dtype=np.uint8)] * 2
+        predictions = backend.predict(images)
+
+        assert isinstance(backend, OnnxBackend)
+        assert backend.names == NAMES and backend.dynamic and backend.image_size == (640, 640)
+        assert len(predictions) == 2
+        boxes, scores, class_ids = predictions[1]
+        assert [backend.names[c] for c in class_ids] == ["5z", "1m"]
+        assert boxes[0].tolist() == pytest.approx([864, 492, 1056, 588])
+
+    def test_onnx_backend_does_not_import_torch(self, tmp_path):
+        """ONNXの重みで推論してもtorchとultralyticsが読み込まれないことのテスト"""
+        pytest.importorskip("onnxruntime")
+        pytest.importorskip("cv2")
+        path = tmp_path / "best.onnx"
+        write_constant_model(path, raw_output([(320, 320, 64, 32, 2, 0.9)]))
+        code = (
+            "import sys\n"
+            "import numpy as np\n"
+            "from ml.inference_backends import create_backend\n"
+            f"backend = create_backend({str(path)!r})\n"
+            "backend.predict([np.zeros((640, 640, 3), dtype=np.uint8)])\n"
+            "print([m for m in ('torch', 'ultralytics') if m in sys.modules])\n"
+        )
+        completed = subprocess.run(
+            [sys.executable, '-c', code], cwd=ROOT_DIR, capture_output=True, text=True, check=True
+        )
+        assert completed.stdout.strip().splitlines()[-1] == '[]'
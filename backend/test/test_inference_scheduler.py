@@ -0,0 +1,120 @@
+import threading
+
+import pytest
+
+# --- Pythonのimportパスを通すための設定 ---
+import sys
+import os
+# mlパッケージを読み込むため、リポジトリのルートをパスに追加する
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+# -----------------------------------------
+
+from ml.inference_scheduler import InferenceScheduler
+from app.services import recognition_service
+
+
+class TestInferenceScheduler:
+    """InferenceSchedulerクラスのテスト"""
+
+    def test_requests_are_batched(self):
+        """同時に積まれたリクエストが1回のバッチになり、呼び出し元ごとに結果が返ることをテスト"""
+        calls = []
+        scheduler = InferenceScheduler(lambda items: calls.append(list(items)) or [x * 10 for x in items],
+                                       max_batch_size=4, max_wait=5.0)
+        futures = [scheduler.submit(i) for i in range(4)]
+
+        assert [f.result(timeout=5) for f in futures] == [0, 10, 20, 30]
+        assert calls == [[0, 1, 2, 3]]
+        stats = scheduler.stats()
+        assert stats["batches"] == 1 and stats["max_batch_seen"] == 4 and stats["batch_sizes"] == {4: 1}
+        assert stats["max_queue_depth"] >= 1
+        scheduler.close()
+
+    def test_max_batch_size(self):
+        """バッチの大きさが上限を超えないことのテスト"""
+        calls = []
+        scheduler = InferenceScheduler(lambda items: calls.append(len(items)) or list(items),
+                                       max_batch_size=3, max_wait=0.05)
+        futures = [scheduler.submit(i) for i in range(7)]
+
+        assert [f.result(timeout=5) for f in futures] == list(range(7))
+        assert max(calls) <= 3 and sum(calls) == 7
+        scheduler.close()
+
+    def test_single_request_waits_at_most_max_wait(self):
+        """単独のリクエストは、待ち時間の上限を過ぎると単独で推論されることのテスト"""
+        scheduler = InferenceScheduler(lambda items: list(items), max_batch_size=8, max_wait=0.01)
+
+        assert scheduler.run("image", timeout=5) == "image"
+        stats = scheduler.stats()
+        assert stats["batch_sizes"] == {1: 1}
+        assert stats["max_wait_seen_ms"] < 1000
+        scheduler.close()
+
+    def test_errors_are_returned_per_request(self):
+        """入力ごとのエラーはその呼び出し元だけに、バッチ全体のエラーは全員に返ることのテスト"""
+        def batch_fn(items):
+            if "crash" in items:
+                raise RuntimeError("batch failed")
+            return [ValueError("bad image") if x == "bad" else x for x in items]
+
+        scheduler = InferenceScheduler(batch_fn, max_batch_size=2, max_wait=5.0)
+        good, bad = scheduler.submit("good"), scheduler.submit("bad")
+        assert good.result(timeout=5) == "good"
+        with pytest.raises(ValueError):
+            bad.result(timeout=5)
+
+        first, second = scheduler.submit("crash"), scheduler.submit("other")
+        for future in (first, second):
+            with pytest.raises(RuntimeError):
+                future.result(timeout=5)
+        scheduler.close()
+
+    def test_close_runs_pending_requests(self):
+        """closeで、積まれたリクエストを実行してから止まることのテスト"""
+        scheduler = InferenceScheduler(lambda items: list(items), max_batch_size=8, max_wait=5.0)
+        future = scheduler.submit(1)
+        scheduler.close()
+        assert future.result(timeout=5) == 1
+        # 止めた後でも、次のリクエストでワーカーを起動し直す.
+        scheduler.max_wait = 0.01
+        assert scheduler.run(2, timeout=5) == 2
+        scheduler.close()
+
+
+class TestRecognitionServiceBatching:
+    """認識サービスのマイクロバッチのテスト"""
+
+    def test_concurrent_uploads_share_a_batch(self, mocker):
+        """同時に届いた画像が1回のバッチ推論にまとめられ、それぞれの結果が返ることのテスト"""
+        batches = []
+
+        class FakeRecognition:
+            @staticmethod
+            def detect_hands_from_images(images, model_path):
+                batches.append(len(images))
+                return [[{"tile": image.decode(), "confidence": 0.9, "box": [0, 0, 1, 1]}] for image in images]
+
+        mocker.patch.object(recognition_service, '_load_recognition_module', return_value=FakeRecognition)
+        mocker.patch.object(recognition_service, 'resolve_model_path', return_value='best.pt')
+        mocker.patch.object(recognition_service, '_inference_scheduler', None)
+        mocker.patch.object(recognition_service, 'INFERENCE_MAX_BATCH', 4)
+        mocker.patch.object(recognition_service, 'INFERENCE_MAX_WAIT_MS', 2000.0)
+
+        tiles = ["1m", "2p", "3s", "4z"]
+        results = {}
+
+        def upload(tile):
+            results[tile] = recognition_service.detect_tiles(tile.encode())
+
+        threads = [threading.Thread(target=upload, args=(t,)) for t in tiles]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=10)
+
+        assert results == {t: [t] for t in tiles}
+        assert batches == [4]
+        assert recognition_service.get_model_status()["inference_queue"]["max_batch_seen"] == 4
+        recognition_service._inference_scheduler.close()
@@ -0,0 +1,179 @@
+import io
+import threading
+
+import pytest
+
+# --- Pythonのimportパスを通すための設定 ---
+import sys
+import os
+# mlパッケージを読み込むため、リポジトリのルートをパスに追加する
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+# -----------------------------------------
+
+# 画像のデコードにPillowを使う
+Image = pytest.importorskip("PIL.Image")
+
+from ml.inference_server import InferenceClient, InferenceServer, is_loopback, parse_address, start_server_process
+from app import create_app
+from app.services import recognition_service
+
+
+class FakeRecognition:
+    """画像の左上の画素(BGR)と大きさを牌の代わりに返す、認識モジュールの代わり。"""
+
+    def __init__(self):
+        self.batches = []
+
+    def detect_hands_from_arrays(self, images, model_path):
+        self.batches.append(len(images))
+        results = []
+        for image in images:
+            if image.shape[0] == 1:
+                raise RuntimeError("inference failed")
+            results.append([{"tile": "1m", "confidence": 0.9,
+                             "box": [0, 0, image.shape[1], image.shape[0]],
+                             "pixel": image[0, 0].tolist()}])
+        return results
+
+
+def png_bytes(width, height, color):
+    """単色のPNG画像を作る。"""
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), color).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def server(tmp_path):
+    """FakeRecognition で推論するサーバーを、UNIXドメインソケットで起動する。"""
+    address = str(tmp_path / "inference.sock")
+    server = InferenceServer("best.pt", address, authkey=b"test", max_batch_size=4, max_wait=0.01)
+    server._recognition = FakeRecognition()
+    server._status.update({"loaded": True, "warmed_up": True})
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    client = InferenceClient(address, authkey=b"test", timeout=10)
+    for _ in range(200):
+        if os.path.exists(address):
+            break
+        threading.Event().wait(0.01)
+    yield server, client
+    server.close()
+    thread.join(timeout=5)
+
+
+def test_parse_address():
+    """ソケットのパスと「ホスト:ポート」の文字列を変換できることのテスト"""
+    assert parse_address("/tmp/inference.sock") == "/tmp/inference.sock"
+    assert parse_address("127.0.0.1:7000") == ("127.0.0.1", 7000)
+
+
+def test_authkey_is_required(tmp_path, mocker):
+    """認証キーがない場合、サーバーは起動せず、ループバック以外のアドレスでは自動でキーを作らないことのテスト"""
+    mocker.patch.dict(os.environ)
+    os.environ.pop("MAHJONG_INFERENCE_AUTHKEY", None)
+    assert is_loopback(str(tmp_path / "inference.sock")) and is_loopback(("127.0.0.1", 7000))
+    assert not is_loopback(("0.0.0.0", 7000))
+
+    with pytest.raises(ValueError):
+        InferenceServer("best.pt", str(tmp_path / "inference.sock"))
+    with pytest.raises(ValueError):
+        start_server_process("best.pt", "0.0.0.0:7000")
+    with pytest.raises(ConnectionError):
+        InferenceClient(str(tmp_path / "inference.sock")).status()
+
+
+def test_does_not_remove_other_files_or_live_servers(server, tmp_path):
+    """ソケット以外のファイルや、動いているサーバーのソケットを消さないことのテスト"""
+    inference_server, client = server
+    path = tmp_path / "not-a-socket"
+    path.write_text("data")
+
+    with pytest.raises(FileExistsError):
+        InferenceServer("best.pt", str(path), authkey=b"test").serve_forever()
+    with pytest.raises(OSError, match="別の推論サーバー"):
+        InferenceServer("best.pt", inference_server.address, authkey=b"test").serve_forever()
+    assert path.read_text() == "data"
+    assert InferenceClient(inference_server.address, authkey=b"test").status()["ready"] is True
+
+
+def test_detect_through_shared_memory(server):
+    """共有メモリで渡した画像が、BGR順の配列としてサーバーで推論されることのテスト"""
+    _, client = server
+
+    detections = client.detect(png_bytes(32, 16, (255, 0, 10)))
+
+    assert detections == [{"tile": "1m", "confidence": 0.9, "box": [0, 0, 32, 16], "pixel": [10, 0, 255]}]
+
+
+def test_concurrent_clients_share_batches(server):
+    """複数のスレッドから同時に送った画像が、1つのサーバーでバッチにまとめられることのテスト"""
+    inference_server, client = server
+    results = {}
+
+    def upload(i):
+        results[i] = client.detect(png_bytes(8 + i, 8, (i, i, i)))
+
+    threads = [threading.Thread(target=upload, args=(i,)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+
+    assert {i: r[0]["box"][2] for i, r in results.items()} == {i: 8 + i for i in range(4)}
+    status = client.status()
+    assert status["ready"] is True and status["connections"] >= 1
+    assert status["inference_queue"]["requests"] == 4
+    assert sum(inference_server._recognition.batches) == 4
+
+
+def test_errors_are_returned_to_the_client(server):
+    """不正な画像とサーバーでの推論エラーが、クライアントに例外として返ることのテスト"""
+    _, client = server
+
+    with pytest.raises(ValueError):
+        client.detect(b"not an image")
+    with pytest.raises(RuntimeError, match="inference failed"):
+        client.detect(png_bytes(4, 1, (0, 0, 0)))
+    # エラーの後も同じ接続を使い続けられる
+    assert client.detect(png_bytes(4, 4, (0, 0, 0)))[0]["tile"] == "1m"
+
+
+def test_unreachable_server(tmp_path):
+    """サーバーに接続できない場合は ConnectionError になることのテスト"""
+    client = InferenceClient(str(tmp_path / "missing.sock"), authkey=b"test")
+    with pytest.raises(ConnectionError):
+        client.status()
+
+
+def test_create_app_uses_inference_server(server, mocker):
+    """推論サーバーを指定したアプリが、サーバーで推論し、その準備状態を返すことのテスト"""
+    _, client = server
+    mocker.patch.object(recognition_service, '_inference_client', None)
+    mocker.patch.dict(os.environ, {"MAHJONG_INFERENCE_AUTHKEY": "test"})
+    load = mocker.patch.object(recognition_service, '_load_recognition_module')
+    app = create_app(preload_model=True, inference_server=client.address)
+    assert app.config['PRELOAD_MODEL'] is False
+
+    response = app.test_client().post(
+        '/api/recognize', data={'image': (io.BytesIO(png_bytes(8, 8, (0, 0, 0))), 'hand.png')},
+        content_type='multipart/form-data')
+    assert response.status_code == 200
+    assert response.get_json()['data']['hand'] == ['1m']
+    load.assert_not_called()
+
+    ready = app.test_client().get('/api/health/ready').get_json()
+    assert ready['status'] == 'ready'
+    assert ready['model']['inference_server']['reachable'] is True
+
+
+def test_readiness_when_inference_server_is_down(tmp_path, mocker):
+    """推論サーバーに接続できない間は、レディネスチェックが503を返すことのテスト"""
+    mocker.patch.object(recognition_service, '_inference_client', None)
+    app = create_app(inference_server=str(tmp_path / "missing.sock"))
+
+    response = app.test_client().get('/api/health/ready')
+
+    assert response.status_code == 503
+    assert response.get_json()['model']['inference_server']['reachable'] is False
@@ -0,0 +1,64 @@
+import pytest
+
+# --- Pythonのimportパスを通すための設定 ---
+import sys
+import os
+# mlパッケージを読み込むため、リポジトリのルートをパスに追加する
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+# -----------------------------------------
+
+from ml.model_registry import ModelRegistry
+
+
+class TestModelRegistry:
+    """ModelRegistryクラスのテスト"""
+
+    @pytest.fixture
+    def weights(self, tmp_path):
+        """ダミーの重みファイルを作成する"""
+        path = tmp_path / "best.pt"
+        path.write_bytes(b"weights-v1")
+        return path
+
+    def test_same_instance_is_shared(self, weights):
+        """同じ重みファイルは1度だけ読み込まれ、同じインスタンスが返ることをテスト"""
+        loaded = []
+        registry = ModelRegistry(lambda path: loaded.append(path) or object())
+
+        first = registry.get(str(weights))
+        second = registry.get(str(weights))
+
+        assert first is second
+        assert len(loaded) == 1
+        assert registry.loads == 1
+        assert registry.hits == 1
+
+    def test_resolved_path_is_used_as_key(self, weights, tmp_path):
+        """シンボリックリンク経由でも同じインスタンスが返ることをテスト"""
+        link = tmp_path / "link.pt"
+        link.symlink_to(weights)
+        registry = ModelRegistry(lambda path: object())
+
+        assert registry.get(str(weights)) is registry.get(str(link))
+        assert registry.loads == 1
+
+    def test_reload_when_mtime_changes(self, weights):
+        """重みファイルが更新された場合は再読み込みされることをテスト"""
+        registry = ModelRegistry(lambda path: object())
+        first = registry.get(str(weights))
+
+        stat = os.stat(weights)
+        os.utime(weights, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        assert not registry.is_loaded(str(weights))
+
+        second = registry.get(str(weights))
+        assert first is not second
+        assert registry.loads == 2
+        assert registry.is_loaded(str(weights))
+
+    def test_missing_file(self, tmp_path):
+        """存在しないファイルはFileNotFoundErrorになることをテスト"""
+        registry = ModelRegistry(lambda path: object())
+        with pytest.raises(FileNotFoundError):
+            registry.get(str(tmp_path / "missing.pt"))
+        assert not registry.is_loaded(str(tmp_path / "missing.pt"))
@@ -0,0 +1,92 @@
+import json
+
+import pytest
+
+# --- Pythonのimportパスを通すための設定 ---
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+# -----------------------------------------
+
+from app.mahjong_logic.payments import (FU_VALUES, MAX_HAN, PaymentTable, get_final_score,
+                                        get_payment_table)
+
+
+def _reference_score(han: int, fu: int, is_oya: bool, is_tsumo: bool) -> tuple[dict, str]:
+    """支払い表を使わずに、点数を直接計算する基準実装."""
+    if han >= 13:
+        score_name, base_p = "役満", 8000
+    elif han >= 11:
+        score_name, base_p = "三倍満", 6000
+    elif han >= 8:
+        score_name, base_p = "倍満", 4000
+    elif han >= 6:
+        score_name, base_p = "跳満", 3000
+    elif han >= 5 or (han == 4 and fu >= 40) or (han == 3 and fu >= 70):
+        score_name, base_p = "満貫", 2000
+    else:
+        score_name, base_p = "", min(fu * 2 ** (han + 2), 2000)
+    if is_oya and is_tsumo:
+        ko_pay = -(-base_p * 2 // 100) * 100
+        return {"total": ko_pay * 3, "payment_per_ko": ko_pay}, score_name
+    if is_tsumo:
+        oya_pay = -(-base_p * 2 // 100) * 100
+        ko_pay = -(-base_p // 100) * 100
+        return {"total": oya_pay + ko_pay * 2, "payment_from_oya": oya_pay, "payment_per_ko": ko_pay}, score_name
+    ron_pay = -(-base_p * (6 if is_oya else 4) // 100) * 100
+    return {"total": ron_pay, "payment_from_ron": ron_pay}, score_name
+
+
+class TestPaymentTable:
+    """支払い表のテスト"""
+
+    @pytest.mark.parametrize("is_oya", [False, True])
+    @pytest.mark.parametrize("is_tsumo", [False, True])
+    def test_matches_reference(self, is_oya, is_tsumo):
+        """全ての翻数・符で、直接計算した点数と一致するかテスト"""
+        for han in range(1, MAX_HAN + 3):
+            for fu in FU_VALUES + (120, 130):
+                state = {"is_oya": is_oya, "is_tsumo": is_tsumo}
+                assert get_final_score(han, fu, state) == _reference_score(han, fu, is_oya, is_tsumo), (han, fu)
+
+    def test_no_yaku(self):
+        """0翻の場合は0点になるかテスト"""
+        assert get_final_score(0, 30, {}) == ({"total": 0, "oya": 0, "ko": 0}, "")
+
+    def test_honba_and_kyoutaku(self):
+        """本場と供託が支払いに加算されるかテスト"""
+        details, _ = get_final_score(1, 30, {"is_tsumo": True, "honba": 2, "kyoutaku": 1})
+        assert details == {"total": 2700, "payment_from_oya": 700, "payment_per_ko": 500,
+                           "honba": 2, "kyoutaku": 1}
+        details, _ = get_final_score(3, 30, {"is_oya": True, "honba": 1})
+        assert details == {"total": 6100, "payment_from_ron": 6100, "honba": 1}
+        details, _ = get_final_score(13, 0, {"is_oya": True, "is_tsumo": True, "honba": 1})
+        assert details["payment_per_ko"] == 16100 and details["total"] == 48300
+
+    def test_kiriage(self):
+        """切り上げ満貫の場合に、4翻30符と3翻60符が満貫になるかテスト"""
+        assert get_final_score(4, 30, {})[0]["total"] == 7700
+        assert get_final_score(4, 30, {"kiriage": True}) == ({"total": 8000, "payment_from_ron": 8000}, "満貫")
+        assert get_final_score(3, 60, {"kiriage": True})[1] == "満貫"
+        assert get_final_score(3, 50, {"kiriage": True})[1] == ""
+
+    def test_table_is_shared_and_immutable(self):
+        """支払い表は一度だけ作られ、変更できないかテスト"""
+        table = get_payment_table()
+        assert table is get_payment_table(False)
+        assert get_payment_table(True).kiriage
+        with pytest.raises(AttributeError):
+            table.kiriage = True
+        with pytest.raises(TypeError):
+            table._payments[1, 30, False, False] = None
+
+    def test_to_json(self):
+        """点数早見表をJSONに書き出せるかテスト"""
+        chart = json.loads(PaymentTable().to_json())
+        assert chart["fu"] == list(FU_VALUES)
+        assert len(chart["rows"]) == 4 * len(FU_VALUES) + (MAX_HAN - 4)
+        row = next(r for r in chart["rows"] if r["han"] == 2 and r["fu"] == 40)
+        assert row == {"han": 2, "fu": 40, "score_name": "", "ko_ron": 2600,
+                       "ko_tsumo": {"payment_from_oya": 1300, "payment_per_ko": 700},
+                       "oya_ron": 3900, "oya_tsumo": {"payment_per_ko": 1300}}
+        assert chart["rows"][-1]["score_name"] == "役満"
@@ -0,0 +1,139 @@
+import pytest
+
+# --- Pythonのimportパスを通すための設定 ---
+import sys
+import os
+# mlパッケージを読み込むため、リポジトリのルートをパスに追加する
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, ROOT_DIR)
+# -----------------------------------------
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("PIL")
+pytest.importorskip("onnxruntime")
+
+from ml.model_registry import weights_path_for
+from ml.quantize_model import detect_head_nodes, format_report, quantize, read_image_paths
+
+NAMES = {0: "5m", 1: "5mr", 2: "9s"}
+
+
+def write_conv_model(path):
+    """畳み込み2層と、ultralyticsと同じ名前の検出ヘッド(/model.1/)を持つ小さなONNXモデルを書き出す。"""
+    onnx = pytest.importorskip("onnx")
+    from onnx import TensorProto, helper, numpy_helper
+
+    rng = np.random.default_rng(0)
+    nodes = [
+        helper.make_node("Conv", ["images", "w0", "b0"], ["x0"], name="/model.0/conv/Conv", pads=[1, 1, 1, 1]),
+        helper.make_node("Relu", ["x0"], ["x1"], name="/model.0/act/Relu"),
+        helper.make_node("Conv", ["x1", "w1", "b1"], ["x2"], name="/model.1/cv2/Conv"),
+        helper.make_node("Reshape", ["x2", "shape"], ["x3"], name="/model.1/Reshape"),
+        helper.make_node("Sigmoid", ["x3"], ["output0"], name="/model.1/Sigmoid"),
+    ]
+    graph = helper.make_graph(
+        nodes, "conv",
+        [helper.make_tensor_value_info("images", TensorProto.FLOAT, ["batch", 3, "height", "width"])],
+        [helper.make_tensor_value_info("output0", TensorProto.FLOAT, ["batch", 4 + len(NAMES), "anchors"])],
+        initializer=[
+            numpy_helper.from_array(rng.normal(size=(8, 3, 3, 3)).astype(np.float32), "w0"),
+            numpy_helper.from_array(rng.normal(size=(8,)).astype(np.float32), "b0"),
+            numpy_helper.from_array(rng.normal(size=(4 + len(NAMES), 8, 1, 1)).astype(np.float32), "w1"),
+            numpy_helper.from_array(np.zeros((4 + len(NAMES),), dtype=np.float32), "b1"),
+            numpy_helper.from_array(np.array([0, 4 + len(NAMES), -1], dtype=np.int64), "shape"),
+        ],
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 17)])
+    model.ir_version = 8
+    for key, value in {"names": str(NAMES), "imgsz": "[64, 64]", "stride": "32"}.items():
+        model.metadata_props.add(key=key, value=value)
+    onnx.save(model, str(path))
+    return model
+
+
+def write_dataset(tmp_path, count=3):
+    """学習画像のフォルダと、それを指す data.yaml を作る。"""
+    from PIL import Image
+
+    image_dir = tmp_path / "dataset" / "train" / "images"
+    image_dir.mkdir(parents=True)
+    rng = np.random.default_rng(0)
+    for i in range(count):
+        Image.fromarray(rng.integers(0, 255, size=(48, 80, 3), dtype=np.uint8)).save(image_dir / f"{i}.jpg")
+    (image_dir / "labels.cache").write_text("")
+    data_yaml = tmp_path / "data.yaml"
+    data_yaml.write_text(f"path: {tmp_path / 'dataset'}\ntrain: train/images\nval: val.txt\nnames: {NAMES}\n")
+    (tmp_path / "dataset" / "val.txt").write_text("train/images/0.jpg\n")
+    return data_yaml
+
+
+class TestWeightsPath:
+    """推論バックエンドごとの重みファイルのパスのテスト"""
+
+    def test_weights_path_for(self):
+        """バックエンドに応じて拡張子を置き換え、不明なバックエンドはエラーにすることのテスト"""
+        assert weights_path_for("w/best.pt", "ultralytics") == "w/best.pt"
+        assert weights_path_for("w/best.pt", "onnx") == "w/best.onnx"
+        assert weights_path_for("w/best.pt", "onnx-int8") == "w/best.int8.onnx"
+        with pytest.raises(ValueError):
+            weights_path_for("w/best.pt", "tensorrt")
+
+
+class TestCalibration:
+    """キャリブレーション画像の読み込みと量子化のテスト"""
+
+    def test_read_image_paths(self, tmp_path):
+        """フォルダと .txt の分割から画像のパスを読み、分割がなければエラーにすることのテスト"""
+        data_yaml = write_dataset(tmp_path)
+
+        train = read_image_paths(str(data_yaml), "train")
+        val = read_image_paths(str(data_yaml), "val")
+
+        assert [os.path.basename(p) for p in train] == ["0.jpg", "1.jpg", "2.jpg"]
+        assert val == [str(tmp_path / "dataset" / "train" / "images" / "0.jpg")]
+        with pytest.raises(ValueError):
+            read_image_paths(str(data_yaml), "test")
+
+    def test_quantize_keeps_head_and_metadata(self, tmp_path):
+        """検出ヘッドの畳み込み以外を除いて量子化し、メタデータを引き継いだモデルで推論できることのテスト"""
+        onnx = pytest.importorskip("onnx")
+        pytest.importorskip("cv2")
+        from ml.inference_backends import create_backend
+
+        fp32_path = tmp_path / "best.onnx"
+        model = write_conv_model(fp32_path)
+        int8_path = weights_path_for(str(tmp_path / "best.pt"), "onnx-int8")
+        calibration = read_image_paths(str(write_dataset(tmp_path)), "train")
+
+        assert detect_head_nodes(model) == ["/model.1/Reshape", "/model.1/Sigmoid"]
+        quantize(str(fp32_path), int8_path, calibration, image_size=64)
+
+        quantized = onnx.load(int8_path)
+        operators = {node.op_type for node in quantized.graph.node}
+        assert {"QuantizeLinear", "DequantizeLinear", "Sigmoid"} <= operators
+        assert {p.key: p.value for p in quantized.metadata_props}["names"] == str(NAMES)
+
+        backend = create_backend(int8_path)
+        assert backend.names == NAMES
+        assert len(backend.predict([np.zeros((48, 80, 3), dtype=np.uint8)])) == 1
+
+
+class TestReport:
+    """比較レポートのテスト"""
+
+    def test_format_report_flags_dropped_classes(self):
+        """PrecisionかRecallが許容より下がったクラスと、片方にしかないクラスを挙げることのテスト"""
+        reference = {"5m": (0.95, 0.90), "5mr": (0.90, 0.85), "9s": (0.99, 0.98)}
+        candidate = {"5m": (0.94, 0.90), "5mr": (0.80, 0.84)}
+
+        report, dropped = format_report(
+            {"best.pt": 50 * 1024 * 1024, "best.int8.onnx": 13 * 1024 * 1024},
+            {"best.pt": 200.0, "best.int8.onnx": 80.0},
+            reference, candidate, max_drop=0.02,
+        )
+
+        assert dropped == ["5mr", "9s"]
+        assert "13.0 MB" in report
+        assert "12.5 枚/秒" in report
+        assert "5mr*" in report
+        assert "低下したクラス: 5mr, 9s" in report
@@ -0,0 +1,73 @@
+# --- Pythonのimportパスを通すための設定 ---
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+# -----------------------------------------
+
+from app.services.recognition_session import RecognitionSessionStore
+
+DETECTIONS = [{"tile": "1m", "confidence": 0.9, "box": [0, 0, 10, 10]},
+              {"tile": "2m", "confidence": 0.8, "box": [10, 0, 20, 10]}]
+
+
+class FakeClock:
+    """テスト用に進められる時計"""
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_create_and_get():
+    """作成したセッションをトークンで取得できることのテスト"""
+    store = RecognitionSessionStore()
+    session = store.create(DETECTIONS)
+    assert store.get(session.token) is session
+    assert session.hand == ["1m", "2m"]
+    assert store.get("unknown") is None
+    assert store.stats()["hits"] == 1 and store.stats()["misses"] == 1
+
+
+def test_create_with_hand():
+    """認識結果なしで、手牌だけのセッションを作れることのテスト"""
+    store = RecognitionSessionStore()
+    session = store.create([], ["1m", "2m", "3m"])
+    assert store.get(session.token).hand == ["1m", "2m", "3m"]
+    assert session.detections == []
+
+
+def test_ttl_is_extended_by_use():
+    """有効期限が最後に使われた時刻から数えられることのテスト"""
+    clock = FakeClock()
+    store = RecognitionSessionStore(ttl=10, clock=clock)
+    token = store.create(DETECTIONS).token
+    clock.now = 8
+    assert store.get(token) is not None
+    clock.now = 16
+    assert store.get(token) is not None
+    clock.now = 27
+    assert store.get(token) is None
+    assert store.stats()["expirations"] == 1 and len(store) == 0
+
+
+def test_maxsize_evicts_least_recently_used():
+    """上限を超えると、最も長く使われていないセッションから追い出すことのテスト"""
+    store = RecognitionSessionStore(maxsize=2)
+    first = store.create(DETECTIONS).token
+    second = store.create(DETECTIONS).token
+    store.get(first)
+    third = store.create(DETECTIONS).token
+    assert store.get(second) is None
+    assert store.get(first) is not None and store.get(third) is not None
+    assert store.stats()["evictions"] == 1
+
+
+def test_update_hand():
+    """修正後の手牌に置き換えられることのテスト"""
+    store = RecognitionSessionStore()
+    session = store.create(DETECTIONS)
+    store.update_hand(session.token, ["3m", "4m"])
+    assert store.get(session.token).hand == ["3m", "4m"]
+    assert store.get(session.token).detections == DETECTIONS
+    assert store.update_hand("unknown", ["3m"]) is None
@@ -0,0 +1,147 @@
+import sqlite3
+
+import pytest
+
+# --- Pythonのimportパスを通すための設定 ---
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+# -----------------------------------------
+
+from app import create_app
+from app.mahjong_logic.helpers import Call
+from app.mahjong_logic.result_store import RULESET_VERSION, ScoreStore, result_key
+from app.mahjong_logic.scorer import MahjongScorer
+
+HAND = ["1m", "2m", "3m", "4p", "5pr", "6p", "7s", "8s", "9s", "1z", "1z", "1z", "5z", "5z"]
+STATE = {"agari_hai": "9s", "is_menzen": True, "is_riichi": True, "jikaze": "1z", "bakaze": "1z",
+         "dora_indicators": ["3p"]}
+
+
+def _permute(tiles: list[str], suits: str) -> list[str]:
+    """萬子・筒子・索子を suits の順の色に置き換える."""
+    return [t[0] + suits['mps'.index(t[1])] + t[2:] if t[1] != 'z' else t for t in tiles]
+
+
+def _key(hand: list[str], called: list[Call] = (), **state) -> str | None:
+    scorer = MahjongScorer(hand, list(called), **state)
+    return result_key(scorer.encoded_hand, scorer.called_mentsu, scorer.game_state, scorer.dora)
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ScoreStore(str(tmp_path / "scores.sqlite3"), flush_interval=0.05)
+    MahjongScorer.result_store = store
+    yield store
+    MahjongScorer.result_store = None
+    store.close()
+
+
+class TestResultKey:
+    """結果のキーのテスト"""
+
+    def test_permuted_suits_share_key(self):
+        """色と、アガリ牌・ドラ表示牌の色を入れ替えただけの手牌が同じキーになるかテスト"""
+        keys = set()
+        for suits in ("mps", "spm", "pms"):
+            state = {**STATE, "agari_hai": _permute(["9s"], suits)[0],
+                     "dora_indicators": _permute(STATE["dora_indicators"], suits)}
+            keys.add(_key(_permute(HAND, suits), **state))
+        assert len(keys) == 1
+
+    def test_scoring_state_changes_key(self):
+        """点数に関わる状況・ドラの枚数・鳴き面子が違えば別のキーになるかテスト"""
+        base = _key(HAND, **STATE)
+        assert _key(HAND, **{**STATE, "is_tsumo": True}) != base
+        assert _key(HAND, **{**STATE, "honba": 1}) != base
+        assert _key(HAND, **{**STATE, "dora_indicators": ["4z"]}) != base
+        assert _key(HAND, **{**STATE, "agari_hai": "7s"}) != base
+        called = [Call("pon", ["1z", "1z", "1z"])]
+        assert _key(HAND, called, **{**STATE, "is_menzen": False}) != _key(HAND, **{**STATE, "is_menzen": False})
+        # 同じ枚数のドラになる表示牌は同じキーになる.
+        assert _key(HAND, **{**STATE, "dora_indicators": ["4p"]}) == base
+
+    def test_unserializable_state_has_no_key(self):
+        """JSONで表せない状況を含む場合はキーを作らないかテスト"""
+        assert _key(HAND, **{**STATE, "honba": object()}) is None
+
+
+class TestScoreStore:
+    """点数計算の結果のストアのテスト"""
+
+    def test_same_result_with_and_without_store(self, store):
+        """ストアの有無、保存の前後で結果が変わらないかテスト"""
+        MahjongScorer.result_store = None
+        expected = MahjongScorer(HAND, [], **STATE).calculate()
+        MahjongScorer.result_store = store
+        assert MahjongScorer(HAND, [], **STATE).calculate() == expected
+        assert MahjongScorer(HAND, [], **STATE).calculate() == expected
+        store.flush()
+        assert MahjongScorer(HAND, [], **STATE).calculate() == expected
+        assert store.stats()["hits"] == 2 and store.stats()["misses"] == 1
+
+    def test_permuted_hand_hits(self, store):
+        """色を入れ替えた手牌が保存された結果を使うかテスト"""
+        MahjongScorer(HAND, [], **STATE).calculate()
+        state = {**STATE, "agari_hai": _permute(["9s"], "spm")[0],
+                 "dora_indicators": _permute(STATE["dora_indicators"], "spm")}
+        result = MahjongScorer(_permute(HAND, "spm"), [], **state).calculate()
+        assert store.stats()["hits"] == 1
+        MahjongScorer.result_store = None
+        assert MahjongScorer(_permute(HAND, "spm"), [], **state).calculate() == result
+
+    def test_green_hand_not_shared_with_other_suits(self, store):
+        """9sを含む緑一色と、色を入れ替えた清一色が、保存された結果を共有しないかテスト"""
+        green = ["2s", "3s", "4s", "2s", "3s", "4s", "6s", "6s", "6s", "8s", "8s", "8s", "9s", "9s"]
+        state = {"agari_hai": "9s", "is_menzen": True, "is_tsumo": True, "jikaze": "1z", "bakaze": "1z"}
+        hands = []
+        for suits in ("psm", "smp", "mps"):
+            hands.append((_permute(green, suits), {**state, "agari_hai": _permute(["9s"], suits)[0]}))
+        MahjongScorer.result_store = None
+        expected = [MahjongScorer(hand, [], **s).calculate() for hand, s in hands]
+        assert [("緑一色" in result["yaku"]) for result in expected] == [False, False, True]
+        MahjongScorer.result_store = store
+        for _ in range(2):
+            assert [MahjongScorer(hand, [], **s).calculate() for hand, s in hands] == expected
+            store.flush()
+
+    def test_shared_between_instances(self, store, tmp_path):
+        """書き込んだ結果を、同じファイルを開いた別のストアから読めるかテスト"""
+        result = MahjongScorer(HAND, [], **STATE).calculate()
+        store.flush()
+        other = ScoreStore(store.path)
+        assert other.get(_key(HAND, **STATE)) == result
+        assert store.stats()["writes"] == 1 and store.stats()["pending"] == 0
+
+    def test_wal_mode(self, store):
+        """WALモードで開かれているかテスト"""
+        connection = sqlite3.connect(store.path)
+        assert connection.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        connection.close()
+
+    def test_ruleset_version_invalidates(self, tmp_path):
+        """規則のバージョンが変わると、古い結果を消すかテスト"""
+        path = str(tmp_path / "scores.sqlite3")
+        old = ScoreStore(path, ruleset_version="old")
+        old.put("key", {"han": 1})
+        old.close()
+        assert ScoreStore(path, ruleset_version="old").get("key") == {"han": 1}
+        assert ScoreStore(path).get("key") is None
+        assert ScoreStore(path, ruleset_version="old").get("key") is None
+        assert ScoreStore(path).ruleset_version == RULESET_VERSION
+
+
+def test_create_app_with_score_store(tmp_path, monkeypatch):
+    """環境変数MAHJONG_SCORE_STOREでストアが有効になり、統計を返すかテスト"""
+    monkeypatch.setenv('MAHJONG_SCORE_STORE', str(tmp_path / "scores.sqlite3"))
+    monkeypatch.setattr(MahjongScorer, 'result_store', None)
+    app = create_app(preload_model=False)
+    client = app.test_client()
+
+    for _ in range(2):
+        response = client.post('/api/calculate', json={'game_info': {'hand': HAND, **STATE}})
+        assert response.status_code == 200
+
+    stats = client.get('/api/health/ready').get_json()['score_store']
+    assert stats['hits'] >= 1
+    app.config['SCORE_STORE'].close()
@@ -10,6 +10,7 @@ import sys
 import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from app.routes import api
+from app.mahjong_logic.helpers import Tile
 
 @pytest.fixture
 def client():
@@ -99,4 +100,208 @@ def test_calculate_score_missing_image(client):
     
     response_data = response.get_json()
     assert response_data['status'] == 'error'
-    assert '「画像ファイル」がリクエストに含まれていません' in response_data['message']
\ No newline at end of file
+    assert '「画像ファイル」がリクエストに含まれていません' in response_data['message']
+
+
+def test_calculate_score_invalid_tile(client):
+    """手牌に不正な牌が含まれる場合は400を返すことのテスト（失敗ケース）"""
+    game_info = {"hand": BATCH_HAND[:-1] + ["9z"], "agari_hai": "5z", "is_menzen": True, "is_riichi": True}
+
+    response = client.post('/api/calculate', json={"game_info": game_info})
+
+    assert response.status_code == 400
+    assert response.get_json()['status'] == 'error'
+
+
+@pytest.mark.parametrize("key, value", [("honba", "1"), ("jikaze", ["1z"]), ("is_riichi", "yes"),
+                                        ("dora_indicators", 5)])
+def test_calculate_score_invalid_game_info(client, key, value):
+    """対局情報の値の型が正しくない場合は400を返すことのテスト（失敗ケース）"""
+    game_info = {"hand": BATCH_HAND, "agari_hai": "5z", "is_menzen": True, key: value}
+
+    for path, payload in (('/api/calculate', {"game_info": game_info}), ('/api/score', {"game_info": game_info})):
+        response = client.post(path, json=payload)
+
+        assert response.status_code == 400
+        assert key in response.get_json()['message']
+
+
+def test_readiness_without_preload(client, mocker):
+    """事前読み込みを行わない場合は、モデル未読み込みでも200を返すことのテスト"""
+    mocker.patch('app.routes.get_model_status', return_value={"ready": False, "loaded": False})
+
+    response = client.get('/api/health/ready')
+
+    assert response.status_code == 200
+    assert response.get_json()['status'] == 'ready'
+
+
+def test_readiness_waits_for_preload(client, mocker):
+    """事前読み込みモードでは、ウォームアップが終わるまで503を返すことのテスト"""
+    client.application.config['PRELOAD_MODEL'] = True
+    mocker.patch('app.routes.get_model_status', return_value={"ready": False, "loaded": True})
+
+    response = client.get('/api/health/ready')
+
+    assert response.status_code == 503
+    assert response.get_json()['status'] == 'not_ready'
+
+
+def test_readiness_after_preload(client, mocker):
+    """事前読み込みが完了していれば、モデルの状態とともに200を返すことのテスト"""
+    client.application.config['PRELOAD_MODEL'] = True
+    model_status = {
+        "ready": True,
+        "loaded": True,
+        "warmed_up": True,
+        "weights_version": "best.pt@0123456789ab",
+        "warmup_seconds": [0.5, 0.1, 0.1],
+    }
+    mocker.patch('app.routes.get_model_status', return_value=model_status)
+
+    response = client.get('/api/health/ready')
+
+    assert response.status_code == 200
+    response_data = response.get_json()
+    assert response_data['status'] == 'ready'
+    assert response_data['model']['weights_version'] == "best.pt@0123456789ab"
+
+def test_score_table(client):
+    """点数早見表のエンドポイントのテスト"""
+    response = client.get('/api/score_table')
+    assert response.status_code == 200
+    data = response.get_json()["data"]
+    assert data["kiriage"] is False
+    row = next(r for r in data["rows"] if r["han"] == 1 and r["fu"] == 30)
+    assert row["ko_ron"] == 1000 and row["oya_ron"] == 1500
+
+    data = client.get('/api/score_table?kiriage=true').get_json()["data"]
+    row = next(r for r in data["rows"] if r["han"] == 4 and r["fu"] == 30)
+    assert data["kiriage"] is True and row["score_name"] == "満貫" and row["ko_ron"] == 8000
+
+
+BATCH_HAND = ["1m", "2m", "3m", "4p", "5p", "6p", "7s", "8s", "9s", "1z", "1z", "1z", "5z", "5z"]
+
+
+def _ndjson(response) -> list[dict]:
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+def test_calculate_batch(client):
+    """一括計算で手牌ごとの結果と要約を返し、1件のエラーで全体が失敗しないことのテスト"""
+    game_info = {"agari_hai": "5z", "is_menzen": True, "is_riichi": True}
+    items = [
+        {"hand": BATCH_HAND, "game_info": game_info},
+        {"hand": BATCH_HAND[:-1] + ["xx"], "game_info": game_info},
+        {"game_info": {**game_info, "hand": BATCH_HAND, "is_tsumo": True}},
+        "not an object",
+    ]
+    response = client.post('/api/calculate/batch', json=items)
+
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    lines = _ndjson(response)
+    assert [line.get("index") for line in lines[:-1]] == [0, 1, 2, 3]
+    assert [line.get("status") for line in lines[:-1]] == ["success", "error", "success", "error"]
+    single = client.post('/api/calculate', json={"game_info": {**game_info, "hand": BATCH_HAND}}).get_json()
+    assert lines[0]["data"] == single["data"]
+
+    summary = lines[-1]["summary"]
+    assert summary["items"] == 4 and summary["succeeded"] == 2 and summary["failed"] == 2
+    assert summary["request_bytes"] > 0
+    assert summary["truncated"] is False and summary["concurrent_batches"] >= 1
+
+
+def test_calculate_batch_ndjson_stream(client):
+    """NDJSONの入力を1行ずつ処理し、不正な行もその行のエラーとして返すことのテスト"""
+    client.application.config['BATCH_CHUNK_SIZE'] = 2
+    client.application.config['BATCH_MAX_ITEMS'] = 4
+    item = json.dumps({"hand": BATCH_HAND, "game_info": {"agari_hai": "5z", "is_menzen": True, "is_tsumo": True}})
+    body = "\n".join([item, "{broken", "", item, item, item]) + "\n"
+
+    response = client.post('/api/calculate/batch', data=body, content_type='application/x-ndjson')
+
+    lines = _ndjson(response)
+    assert [line.get("status") for line in lines[:-1]] == ["success", "error", "success", "success"]
+    summary = lines[-1]["summary"]
+    assert summary["items"] == 4 and summary["truncated"] is True and summary["chunk_size"] == 2
+    assert summary["request_bytes"] > 0
+
+
+def test_calculate_batch_rejects_non_array(client):
+    """入力の配列がない場合は400を返すことのテスト"""
+    response = client.post('/api/calculate/batch', json={"hand": BATCH_HAND})
+    assert response.status_code == 400
+    response = client.post('/api/calculate/batch', data="x", content_type='text/plain')
+    assert response.status_code == 415
+
+
+DETECTIONS = [{"tile": t, "confidence": 0.9, "box": [i * 10.0, 0.0, i * 10.0 + 9.0, 12.0]}
+              for i, t in enumerate(BATCH_HAND)]
+
+
+def _recognize(client, mocker):
+    """認識をモックして /api/recognize を呼び出し、応答のdataを返す"""
+    mock_recognize = mocker.patch('app.routes.recognize_tiles', return_value=DETECTIONS)
+    data = {'image': (io.BytesIO(b"dummy image data"), 'test.jpg')}
+    response = client.post('/api/recognize', data=data, content_type='multipart/form-data')
+    assert response.status_code == 200
+    return response.get_json()['data'], mock_recognize
+
+
+def test_recognize_returns_detections_and_token(client, mocker):
+    """認識結果(牌・信頼度・ボックス)とトークンを返すことのテスト"""
+    data, _ = _recognize(client, mocker)
+    assert data['token']
+    assert data['detections'] == DETECTIONS
+    assert sorted(data['hand']) == sorted(BATCH_HAND)
+
+
+def test_score_with_token_does_not_recognize_again(client, mocker):
+    """トークンで再計算する場合、画像の認識を再度行わず、修正した手牌を以降も使うことのテスト"""
+    data, mock_recognize = _recognize(client, mocker)
+    token = data['token']
+    game_info = {"agari_hai": "5z", "is_menzen": True, "is_riichi": True, "bakaze": "1z", "jikaze": "1z"}
+
+    response = client.post('/api/score', json={"token": token, "game_info": game_info})
+    assert response.status_code == 200
+    assert response.get_json()['data']['hand'] == data['hand']
+    han = response.get_json()['data']['han']
+
+    # 手牌を修正して再計算する (5z を 6z に).
+    corrected = BATCH_HAND[:-2] + ["6z", "6z"]
+    response = client.post('/api/score', json={"token": token, "hand": corrected,
+                                               "game_info": {**game_info, "agari_hai": "6z"}})
+    assert response.status_code == 200
+    assert response.get_json()['token'] == token
+
+    # 立直を外して再計算する (手牌は修正後のものを使う).
+    response = client.post('/api/score', json={"token": token,
+                                               "game_info": {**game_info, "agari_hai": "6z", "is_riichi": False}})
+    assert response.status_code == 200
+    assert "6z" in response.get_json()['data']['hand']
+    assert response.get_json()['data']['han'] == han - 1
+    mock_recognize.assert_called_once()
+
+
+def test_score_with_unknown_token(client):
+    """存在しない・期限切れのトークンでは404を返すことのテスト"""
+    response = client.post('/api/score', json={"token": "unknown", "game_info": {"agari_hai": "5z"}})
+    assert response.status_code == 404
+    response = client.post('/api/score', json={"game_info": {"agari_hai": "5z"}})
+    assert response.status_code == 400
+
+
+def test_score_with_stale_token_and_hand(client):
+    """期限切れ・別ワーカーのトークンでも手牌があれば計算し、新しいセッションを作ることのテスト"""
+    game_info = {"agari_hai": "5z", "is_menzen": True, "is_riichi": True, "bakaze": "1z", "jikaze": "1z"}
+
+    response = client.post('/api/score', json={"token": "stale", "hand": BATCH_HAND, "game_info": game_info})
+    assert response.status_code == 200
+    token = response.get_json()['token']
+    assert token != "stale"
+
+    # 新しいトークンで、手牌を送らずに再計算できる.
+    response = client.post('/api/score', json={"token": token, "game_info": {**game_info, "is_riichi": False}})
+    assert response.status_code == 200
+    assert response.get_json()['data']['hand'] == sorted(BATCH_HAND, key=Tile.sort_key)
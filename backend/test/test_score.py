@@ -88,4 +88,26 @@ class TestMahjongScorer:
         assert result["han"] == 4
         assert result["fu"] == 40 # 満貫なので符は実質無関係
         assert result["score_name"] == "満貫"
-        assert result["score"]["total"] == 8000
\ No newline at end of file
+        assert result["score"]["total"] == 8000
+
+    def test_red_five_in_closed_triplet(self):
+        """赤ドラを含む門前の刻子も暗刻に数えるケース"""
+        # 手牌: 222m 5mr5m5m 666z 789m 33z + 6z(ツモ)
+        hand = ["2m","2m","2m","5mr","5m","5m","6z","6z","7m","8m","9m","3z","3z"]
+        agari_hai = "6z"
+        full_hand = hand + [agari_hai]
+
+        game_state = {
+            "is_tsumo": True,
+            "is_menzen": True,
+            "is_riichi": True,
+        }
+
+        scorer = MahjongScorer(full_hand, [], agari_hai=agari_hai, **game_state)
+        result = scorer.calculate()
+
+        # 混一色(3) + 發(1) + 三暗刻(2) + ツモ(1) + リーチ(1) + 赤ドラ(1) = 9飜 -> 倍満
+        assert result["han"] == 9
+        assert "三暗刻" in result["yaku"]
+        assert result["score_name"] == "倍満"
+        assert result["score"]["total"] == 16000
@@ -0,0 +1,126 @@
+import random
+import re
+
+import pytest
+
+# --- Pythonのimportパスを通すための設定 ---
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+# -----------------------------------------
+
+from app.mahjong_logic.analyzer import HandAnalysis
+from app.mahjong_logic.encoding import TILE_NAMES
+from app.mahjong_logic.fu import FuCalculator
+from app.mahjong_logic.helpers import Call
+from app.mahjong_logic.scorer import MahjongScorer
+from app.mahjong_logic.yaku import YakuJudge
+
+
+def _tiles(text: str) -> list[str]:
+    """"1m2m5mr" のような文字列を牌のリストに変換する."""
+    return re.findall(r"\d[mpsz]r?", text)
+
+
+def _exhaustive(scorer: MahjongScorer, patterns: list[dict]) -> dict:
+    """全てのパターンの役と符を判定して最高点を選ぶ、枝刈りなしの基準実装."""
+    if not patterns:
+        return {"error": "和了形ではありません。"}
+    best_result = None
+    highest_score = -1
+    for pattern in patterns:
+        # ドラは手牌ごとに数える (雀頭の赤ドラは和了パターンの文字列に残らないため).
+        found_yaku = YakuJudge(pattern, scorer.called_mentsu, scorer.game_state, scorer.dora.total).check_all_yaku()
+        han = sum(found_yaku.values())
+        if han == 0:
+            continue
+        fu = FuCalculator(pattern, scorer.called_mentsu, found_yaku, scorer.game_state).calculate()
+        score_details, score_name = scorer._get_final_score(han, fu)
+        if score_details["total"] > highest_score:
+            highest_score = score_details["total"]
+            best_result = {"yaku": found_yaku, "han": han, "fu": fu,
+                           "score_name": score_name, "score": score_details}
+    return best_result or {"error": "役がありません。"}
+
+
+def _random_agari(rng: random.Random) -> tuple[list[str], list[Call], dict]:
+    """解釈が複数になりやすい(色の少ない)和了形と、ゲーム状況をランダムに作る."""
+    counts = [0] * 34
+    groups = []
+    suits = rng.sample(range(4), rng.choice([1, 1, 2, 3]))
+
+    def random_tile() -> int:
+        suit = rng.choice(suits)
+        return suit * 9 + rng.randrange(9 if suit < 3 else 7)
+
+    def take(ids: list[int]) -> bool:
+        if any(counts[i] + ids.count(i) > 4 for i in ids):
+            return False
+        for i in ids:
+            counts[i] += 1
+        groups.append(ids)
+        return True
+
+    while not take([random_tile()] * 2):
+        pass
+    while len(groups) < 5:
+        tile = random_tile()
+        if rng.random() < 0.5 and tile < 27 and tile % 9 <= 6:
+            take([tile, tile + 1, tile + 2])
+        else:
+            take([tile] * 3)
+
+    hand = [TILE_NAMES[i] for g in groups for i in g]
+    for k, tile in enumerate(hand):
+        if tile in ("5m", "5p", "5s") and tile + "r" not in hand and rng.random() < 0.3:
+            hand[k] = tile + "r"
+    called = []
+    if rng.random() < 0.3:
+        group = [TILE_NAMES[i] for i in rng.choice(groups[1:])]
+        called.append(Call("chi" if len(set(group)) == 3 else "pon", group))
+    game_state = {
+        "agari_hai": TILE_NAMES[rng.choice(rng.choice(groups))],
+        "is_tsumo": rng.random() < 0.5,
+        "is_menzen": not called,
+        "is_riichi": not called and rng.random() < 0.5,
+        "is_oya": rng.random() < 0.3,
+        "bakaze": "1z",
+        "jikaze": rng.choice(["1z", "2z", "3z", "4z"]),
+        "dora_indicators": rng.choice(["", "1m", "5p,3z"]),
+    }
+    return hand, called, game_state
+
+
+class TestBestInterpretationSearch:
+    """高点法の解釈選択(枝刈りあり)が、全探索と同じ結果になることのテスト"""
+
+    @pytest.mark.parametrize("hand, game_state", [
+        ("2m2m3m3m4m4m5s5s6s6s7s7s9p9p", {"agari_hai": "9p", "is_menzen": True}),
+        ("1m1m1m2m2m2m3m3m3m4p5p6p9s9s", {"agari_hai": "3m", "is_menzen": True, "is_riichi": True}),
+        ("2p2p2p3p3p3p4p4p4p5p5p6s7s8s", {"agari_hai": "5p", "is_tsumo": True, "is_menzen": True}),
+        ("1s1s1s2s2s2s3s3s3s4s4s4s5s5s", {"agari_hai": "5s", "is_menzen": True}),
+        ("5sr5s1s2s3s6s7s8s9s9s9s6s7s8s", {"agari_hai": "3s", "is_oya": True, "dora_indicators": "1m"}),
+    ])
+    def test_many_interpretations(self, hand, game_state):
+        """解釈が複数ある手牌で、全探索と同じ結果になること."""
+        hand = _tiles(hand)
+        scorer = MahjongScorer(hand, [], **game_state)
+        patterns = HandAnalysis(hand, [], game_state["agari_hai"]).agari_combinations
+        assert len(patterns) >= 2
+        assert scorer.calculate() == _exhaustive(scorer, patterns)
+
+    def test_random_hands(self):
+        """ランダムな和了形で、全探索と同じ結果になること."""
+        rng = random.Random(0)
+        for _ in range(300):
+            hand, called, game_state = _random_agari(rng)
+            scorer = MahjongScorer(hand, called, **game_state)
+            patterns = HandAnalysis(hand, called, game_state["agari_hai"]).agari_combinations
+            assert scorer.score_patterns(patterns) == _exhaustive(scorer, patterns), (hand, game_state)
+
+    def test_yakuman_stops_search(self):
+        """役満のパターンが見つかった場合、役満の結果を返すこと."""
+        hand = _tiles("1s1s1s2s2s2s3s3s3s4s4s4s5s5s")
+        result = MahjongScorer(hand, [], agari_hai="5s", is_menzen=True, is_tsumo=True).calculate()
+        assert result["score_name"] == "役満"
+        assert "四暗刻" in result["yaku"] or "四暗刻単騎" in result["yaku"]
@@ -0,0 +1,102 @@
+import random
+
+import pytest
+
+# --- Pythonのimportパスを通すための設定 ---
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+# -----------------------------------------
+
+from app.mahjong_logic.shanten import _search_block_values, normal_shanten, shanten, shanten_by_form, suit_block_values
+from app.mahjong_logic.tables import NUM_SUIT_ARRANGEMENTS, SHANTEN_TABLE, suit_rank
+from app.mahjong_logic.analyzer import HandAnalysis
+from app.mahjong_logic.encoding import TILE_NAMES
+from app.mahjong_logic.helpers import Call
+
+
+def _tiles(text: str) -> list[str]:
+    """"1m2m3m" のような文字列を牌のリストに変換する."""
+    return [text[i:i + 2] for i in range(0, len(text), 2)]
+
+
+def _deal(rng: random.Random, size: int) -> list[int]:
+    """山からランダムに配った枚数配列を返す."""
+    counts = [0] * 34
+    for i in rng.sample([i for i in range(34) for _ in range(4)], size):
+        counts[i] += 1
+    return counts
+
+
+class TestShanten:
+    """向聴数計算のテスト"""
+
+    @pytest.mark.parametrize("hand, expected", [
+        ("1m2m3m4p5p6p5s6s7s2s2s2s3s4s", -1),   # 和了形
+        ("1m2m3m4p5p6p5s6s7s2s2s2s3s", 0),      # 聴牌
+        ("1m1m1m1m2m2m2m2m3m3m3m3m4m4m", -1),   # 同じ牌4枚を含む和了形
+        ("1m1m2m2m3m3m4p4p5p5p6s6s7z", 0),      # 七対子の聴牌
+        ("1m9m1p9p1s9s1z2z3z4z5z6z7z", 0),      # 国士無双13面待ち
+        ("1m4m7m1p4p7p1s4s7s1z2z3z4z", 6),
+    ])
+    def test_known_hands(self, hand, expected):
+        """代表的な手牌の向聴数が正しいかテスト"""
+        assert shanten(_tiles(hand)) == expected
+
+    def test_by_form(self):
+        """和了形ごとの向聴数が求まるかテスト"""
+        result = shanten_by_form(_tiles("1m1m2m2m3m3m4p4p5p5p6s6s7z"))
+        assert result == {"normal": 1, "chiitoitsu": 0, "kokushi": 10}
+
+    def test_with_called_mentsu(self):
+        """鳴きがある場合は通常形だけを計算するかテスト"""
+        hand = _tiles("5z5z5z2m3m4m5p6p7p8s8s6s7s")
+        result = shanten_by_form(hand + ["1z"], [Call("pon", ["5z", "5z", "5z"])])
+        assert result == {"normal": 0, "chiitoitsu": None, "kokushi": None}
+        assert shanten(hand + ["5s"], [Call("pon", ["5z", "5z", "5z"])]) == -1
+
+    @pytest.mark.parametrize("hand", ["1m2m3m", "1m2m3m4p5p6p5s6s7s2s2s2s3s4s5s"])
+    def test_invalid_size(self, hand):
+        """13枚・14枚以外の手牌はValueErrorになるかテスト"""
+        with pytest.raises(ValueError):
+            shanten(_tiles(hand))
+
+    def test_one_draw_changes_by_at_most_one(self):
+        """ランダムな13枚で、1枚ツモった後の向聴数が0または1だけ小さくなるかテスト"""
+        rng = random.Random(0)
+        for _ in range(200):
+            counts = _deal(rng, 13)
+            before = normal_shanten(counts)
+            after = []
+            for tile in range(34):
+                if counts[tile] == 4:
+                    continue
+                counts[tile] += 1
+                after.append(normal_shanten(counts))
+                if after[-1] == -1:
+                    hand = [TILE_NAMES[i] for i in range(34) for _ in range(counts[i])]
+                    patterns = HandAnalysis(hand, [], TILE_NAMES[tile]).agari_combinations
+                    assert any(p["type"] == "normal" for p in patterns)
+                counts[tile] -= 1
+            assert min(after) == before - 1
+            assert max(after) <= before
+
+
+class TestShantenTable:
+    """向聴数テーブルのテスト"""
+
+    def test_rank_covers_all_arrangements(self):
+        """枚数配列の順位が0から始まり、テーブルの大きさと一致するかテスト"""
+        assert suit_rank([0] * 9) == 0
+        assert suit_rank([4, 4, 4, 2, 0, 0, 0, 0, 0]) == NUM_SUIT_ARRANGEMENTS - 1
+
+    @pytest.mark.skipif(SHANTEN_TABLE is None, reason="向聴数テーブルが生成されていません")
+    def test_table_matches_search(self):
+        """テーブルの値が探索の結果と一致するかテスト"""
+        assert len(SHANTEN_TABLE) == NUM_SUIT_ARRANGEMENTS
+        rng = random.Random(1)
+        for _ in range(500):
+            counts = _deal(rng, rng.randint(0, 14))
+            for base in (0, 9, 18):
+                suit = counts[base:base + 9]
+                assert suit_block_values(suit) == _search_block_values(tuple(suit))
@@ -0,0 +1,105 @@
+import random
+
+import pytest
+
+# --- Pythonのimportパスを通すための設定 ---
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+# -----------------------------------------
+
+from app.mahjong_logic.tables import SUIT_TABLE, SuitTable, build_suit_table, suit_key, write_suit_table
+from app.mahjong_logic.analyzer import DECOMPOSITION_CACHE, HandAnalysis
+from app.mahjong_logic.encoding import TILE_NAMES
+
+pytestmark = pytest.mark.skipif(SUIT_TABLE is None, reason="分解テーブルが生成されていません")
+
+
+def _random_agari_hand(rng: random.Random) -> list[str]:
+    """4面子1雀頭の形をした手牌をランダムに作る."""
+    counts = [0] * 34
+    tiles = []
+
+    def take(ids):
+        if any(counts[i] + ids.count(i) > 4 for i in ids):
+            return False
+        for i in ids:
+            counts[i] += 1
+        tiles.extend(TILE_NAMES[i] for i in ids)
+        return True
+
+    while not take([rng.randrange(34)] * 2):
+        pass
+    made = 0
+    while made < 4:
+        tile = rng.randrange(34)
+        if rng.random() < 0.6 and tile < 27 and tile % 9 <= 6:
+            made += take([tile, tile + 1, tile + 2])
+        else:
+            made += take([tile] * 3)
+    return tiles
+
+
+class TestSuitTable:
+    """色ごとの分解テーブルのテスト"""
+
+    def test_file_matches_generator(self, tmp_path):
+        """保存されたテーブルが生成処理の結果と一致するかテスト"""
+        path = tmp_path / "suit_table.bin"
+        write_suit_table(str(path))
+        table = SuitTable(str(path))
+        assert len(table) == len(SUIT_TABLE)
+        expected = build_suit_table()
+        for key in list(expected)[:500]:
+            assert table.lookup(key) == tuple(expected[key])
+
+    def test_lookup_invalid_shape(self):
+        """分解できない枚数配列は空のタプルを返すかテスト"""
+        assert SUIT_TABLE.lookup(suit_key([1, 0, 0, 0, 0, 0, 0, 0, 0])) == ()
+        assert SUIT_TABLE.lookup(suit_key([1, 1, 1, 0, 0, 0, 0, 0, 0])) == ((0x10,),)
+
+    def test_invalid_file_is_rejected(self, tmp_path):
+        """形式の違うファイルはValueErrorになるかテスト"""
+        path = tmp_path / "broken.bin"
+        path.write_bytes(b"XXXX" + bytes(8))
+        with pytest.raises(ValueError):
+            SuitTable(str(path))
+
+
+class TestTableDecomposition:
+    """テーブルによる面子分解が再帰探索と一致するかのテスト"""
+
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        DECOMPOSITION_CACHE.clear()
+        yield
+        DECOMPOSITION_CACHE.clear()
+
+    @pytest.mark.parametrize("hand", [
+        ["1m", "1m", "1m", "1m", "2m", "2m", "2m", "2m", "3m", "3m", "3m", "3m", "4m", "4m"],
+        ["1p", "1p", "1p", "2p", "3p", "4p", "5p", "6p", "7p", "8p", "9p", "9p", "9p", "5p"],
+        ["1s", "1s", "1s", "2s", "2s", "2s", "3s", "3s", "3s", "5z", "5z", "5z", "7p", "7p"],
+        ["1z", "1z", "1z", "1z", "2z", "2z", "3m", "4m", "5m", "6s", "7s", "8s", "9p", "9p", "9p"],
+    ])
+    def test_known_hands(self, hand):
+        """代表的な手牌で分解結果が一致するかテスト"""
+        analyzer = HandAnalysis(hand, [], hand[-1])
+        counts = analyzer.encoded_hand.closed_counts
+        assert list(analyzer._iter_decompositions()) == analyzer._decompose_recursive(counts)
+
+    def test_random_hands(self):
+        """ランダムな和了形で分解結果が一致するかテスト"""
+        rng = random.Random(0)
+        for _ in range(300):
+            hand = _random_agari_hand(rng)
+            analyzer = HandAnalysis(hand, [], hand[0])
+            counts = analyzer.encoded_hand.closed_counts
+            table = list(analyzer._iter_decompositions())
+            assert table == analyzer._decompose_recursive(counts)
+            assert table
+
+    def test_honor_pairs(self):
+        """字牌の対子が2組ある手牌は分解できないかテスト"""
+        hand = ["1z", "1z", "2z", "2z", "1m", "2m", "3m", "4m", "5m", "6m", "7m", "8m", "9m", "9m"]
+        analyzer = HandAnalysis(hand, [], "9m")
+        assert list(analyzer._iter_decompositions()) == []
@@ -0,0 +1,74 @@
+import pytest
+
+# --- Pythonのimportパスを通すための設定 ---
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+# -----------------------------------------
+
+from app.mahjong_logic.waits import enumerate_waits
+from app.mahjong_logic.scorer import MahjongScorer
+from app.mahjong_logic.encoding import TILE_NAMES
+from app.mahjong_logic.helpers import Call
+
+GAME_STATE = {"is_menzen": True, "is_riichi": True, "dora_indicators": "1m", "bakaze": "1z", "jikaze": "2z"}
+
+
+def _tiles(text: str) -> list[str]:
+    """"1m2m3m" のような文字列を牌のリストに変換する."""
+    return [text[i:i + 2] for i in range(0, len(text), 2)]
+
+
+class TestEnumerateWaits:
+    """聴牌形の待ちの列挙のテスト"""
+
+    @pytest.mark.parametrize("hand, expected", [
+        ("1m2m3m4p5p6p5s6s7s2s2s2s3s", ["1s", "3s", "4s"]),
+        ("1p1p1p2p3p4p5p6p7p8p9p9p9p", [f"{i}p" for i in range(1, 10)]),  # 九蓮宝燈
+        ("1m1m2m2m3m3m4p4p5p5p6s6s7z", ["7z"]),                            # 七対子
+        ("1m9m1p9p1s9s1z2z3z4z5z6z7z", [f"{i}{s}" for s in "mps" for i in (1, 9)]
+         + [f"{i}z" for i in range(1, 8)]),                                   # 国士無双13面待ち
+        ("1m4m7m1p4p7p1s4s7s1z2z3z4z", []),                                 # 聴牌していない
+    ])
+    def test_wait_tiles(self, hand, expected):
+        """和了になる牌が全て列挙されるかテスト"""
+        waits = enumerate_waits(_tiles(hand), [], **GAME_STATE)
+        assert [w["tile"] for w in waits] == expected
+
+    def test_machi(self):
+        """待ちの形が和了牌ごとに求まるかテスト"""
+        waits = enumerate_waits(_tiles("1m2m3m4p5p6p5s6s7s2s2s2s3s"), [], **GAME_STATE)
+        machi = {w["tile"]: w["machi"] for w in waits}
+        assert machi["1s"] == ["ryanmen"]
+        assert machi["3s"] == ["tanki"]
+
+    def test_fourth_copy_is_not_a_wait(self):
+        """自分で4枚使っている牌は和了牌にならないかテスト"""
+        waits = enumerate_waits(_tiles("1m1m1m1m2m3m4p5p6p7s8s9s9s"), [], **GAME_STATE)
+        assert "1m" not in [w["tile"] for w in waits]
+
+    @pytest.mark.parametrize("hand, called", [
+        ("1m2m3m4p5p6p5s6s7s2s2s2s3s", []),
+        ("2m3m4m5p6p7p8s8s6s7s5z5z5z", [Call("pon", ["5z", "5z", "5z"])]),
+        ("1s1s1s2s3s4s5s6s7s8s9s9s9s", []),
+    ])
+    def test_matches_scorer(self, hand, called):
+        """各和了牌の結果が、14枚の手牌を MahjongScorer で計算した結果と一致するかテスト"""
+        hand = _tiles(hand)
+        state = dict(GAME_STATE, is_menzen=not called)
+        waits = {w["tile"]: w for w in enumerate_waits(hand, called, **state)}
+        for tile in TILE_NAMES:
+            if hand.count(tile) == 4:
+                continue
+            for key, is_tsumo in (("ron", False), ("tsumo", True)):
+                scorer = MahjongScorer(hand + [tile], called, **dict(state, agari_hai=tile, is_tsumo=is_tsumo))
+                expected = scorer.calculate()
+                if expected.get("error") == "和了形ではありません。":
+                    assert tile not in waits
+                else:
+                    assert waits[tile][key] == expected
+
+    def test_invalid_size(self):
+        """13枚でない手牌はValueErrorになるかテスト"""
+        with pytest.raises(ValueError):
+            enumerate_waits(_tiles("1m2m3m4p5p6p5s6s7s2s2s2s3s4s"), [], **GAME_STATE)
@@ -97,6 +97,21 @@ class TestYakuJudge:
         judge = YakuJudge(analysis, [], context)
         assert judge.check_all_yaku() == {"三暗刻": 2}
 
+    def test_toitoi_with_red_five_pung(self):
+        """赤ドラを含む刻子も対々和・三暗刻に数えるテスト"""
+        analysis = {"type": "normal", "mentsu": [["2m","2m","2m"],["5p","5pr","5p"],["6s","6s","6s"],["8s","8s","8s"]], "janto": "1z", "machi": "shanpon"}
+        melds = [Call("pon", ["2m","2m","2m"])]
+        context = {"is_menzen": False, "is_tsumo": True, "agari_hai": "8s"}
+        judge = YakuJudge(analysis, melds, context)
+        assert judge.check_all_yaku() == {"対々和": 2, "三暗刻": 2, "ドラ": 1}
+
+    def test_iipeko_with_red_five(self):
+        """赤ドラを含む順子も一盃口に数えるテスト"""
+        analysis = {"type": "normal", "mentsu": [["3m","4m","5mr"],["3m","4m","5m"],["7p","8p","9p"],["1s","1s","1s"]], "janto": "9s", "machi": "tanki"}
+        context = {"is_menzen": True, "agari_hai": "9s"}
+        judge = YakuJudge(analysis, [], context)
+        assert judge.check_all_yaku() == {"一盃口": 1, "ドラ": 1}
+
     def test_sanshoku_doujun_open(self):
         analysis = {"type": "normal", "mentsu": [["2m","3m","4m"],["2p","3p","4p"],["2s","3s","4s"],["9m","9m","9m"]], "janto": "1p", "machi": "kanchan"}
         melds = [Call("chi", ["2m", "3m", "4m"])]
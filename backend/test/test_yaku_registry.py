@@ -0,0 +1,113 @@
+import pytest
+
+# --- Pythonのimportパスを通すための設定 ---
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+# -----------------------------------------
+
+from app.mahjong_logic import yaku
+from app.mahjong_logic.analyzer import HandAnalysis
+from app.mahjong_logic.yaku import YakuJudge, compile_yaku_plan
+
+
+def _tiles(text: str) -> list[str]:
+    """"1m2m3m" のような文字列を牌のリストに変換する."""
+    return [text[i:i + 2] for i in range(0, len(text), 2)]
+
+
+def _judge_all(text: str, agari_hai: str, **context) -> list[dict]:
+    """全ての和了パターンの役を判定する."""
+    context.setdefault("agari_hai", agari_hai)
+    context.setdefault("is_menzen", True)
+    patterns = HandAnalysis(_tiles(text), [], agari_hai).agari_combinations
+    return [YakuJudge(p, [], context).check_all_yaku() for p in patterns]
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    """役の登録表を差し替えるためのフィクスチャ. 組み立て済みの判定順は前後で破棄する."""
+    compile_yaku_plan.cache_clear()
+    yield lambda rules: monkeypatch.setattr(yaku, "YAKU_REGISTRY", tuple(rules))
+    compile_yaku_plan.cache_clear()
+
+
+class TestCompileYakuPlan:
+    """役の判定順の組み立てのテスト"""
+
+    def test_groups_by_preconditions(self):
+        """前提条件が同じ役が1つのグループにまとまるかテスト"""
+        plan = compile_yaku_plan("normal", True)
+        names = [[rule[0] for rule in group.rules] for group in plan.phases[1]]
+        assert ["小三元", "自風", "場風", "白", "發", "中"] in names
+        assert plan.yakuman_only
+
+    def test_open_hand_drops_menzen_yaku(self):
+        """鳴きがある場合は門前が前提条件の役を判定しないかテスト"""
+        plan = compile_yaku_plan("normal", False)
+        names = {rule[0] for phase in plan.phases for group in phase for rule in group.rules}
+        assert "平和" not in names and "九蓮宝燈" not in names
+        # 喰い下がりの飜数になる.
+        honitsu = next(rule for group in plan.phases[1] for rule in group.rules if rule[0] == "混一色")
+        assert honitsu[2] == 2
+
+    def test_excluder_must_come_first(self, registry):
+        """上位の役が下位の役より後に登録されている場合はエラーになるかテスト"""
+        registry([
+            yaku._rule("混一色", "_is_honitsu", 3, 2, excludes=("清一色",)),
+            yaku._rule("清一色", "_is_chinitsu", 6, 5),
+        ])
+        with pytest.raises(ValueError):
+            compile_yaku_plan("normal", True)
+
+    def test_unknown_precondition(self, registry):
+        """存在しない前提条件はエラーになるかテスト"""
+        registry([yaku._rule("断么九", "_is_tanyao", 1, requires=("no_such_condition",))])
+        with pytest.raises(ValueError):
+            compile_yaku_plan("normal", True)
+
+    def test_unknown_method(self, registry):
+        """存在しない判定メソッドはエラーになるかテスト"""
+        registry([yaku._rule("断么九", "_is_no_such_yaku", 1)])
+        with pytest.raises(ValueError):
+            compile_yaku_plan("normal", True)
+
+
+class TestYakuRegistry:
+    """役の登録表による役判定のテスト"""
+
+    def test_honor_yaku_skipped_without_honor_kotsu(self, mocker):
+        """字牌の刻子がない手牌では、字牌の刻子の役を判定しないかテスト"""
+        spies = [mocker.spy(YakuJudge, name) for name in ("_is_shousangen", "_is_haku", "_is_daisangen")]
+        results = _judge_all("2m3m4m5p6p7p3s4s5s6s7s8s9m9m", "8s", is_tsumo=True)
+        assert results == [{"門前清自摸和": 1}]
+        assert all(spy.call_count == 0 for spy in spies)
+
+    def test_disabled_yaku(self):
+        """disabled_yakuで指定した役を判定しないかテスト"""
+        results = _judge_all("2m3m4m5p6p7p3s4s5s6s7s8s9m9m", "8s", is_tsumo=True,
+                             disabled_yaku=["門前清自摸和"])
+        assert results == [{}]
+
+    def test_local_yaku_is_off_by_default(self):
+        """ローカル役の大車輪は、指定しない場合は判定しないかテスト"""
+        results = _judge_all("2p2p3p3p4p4p5p5p6p6p7p7p8p8p", "8p")
+        assert all("大車輪" not in r for r in results)
+        assert any("清一色" in r for r in results)
+
+    def test_enabled_local_yaku(self):
+        """enabled_local_yakuで大車輪を有効にできるかテスト"""
+        results = _judge_all("2p2p3p3p4p4p5p5p6p6p7p7p8p8p", "8p", enabled_local_yaku=["大車輪"])
+        normal = [r for r in results if "七対子" not in r]
+        assert normal and all(r == {"大車輪": 13} for r in normal)
+
+    def test_tenhou_stops(self):
+        """天和が成立した場合に、以降の役を判定せずに終了するかテスト"""
+        results = _judge_all("2m3m4m5p6p7p3s4s5s6s7s8s9m9m", "8s", is_tsumo=True, is_tenhou=True)
+        assert results == [{"天和": 13}]
+
+    def test_chitoitsu_tuuiisou_keeps_chiitoitsu(self):
+        """字一色七対子は七対子と複合したまま返すかテスト"""
+        results = _judge_all("1z1z2z2z3z3z4z4z5z5z6z6z7z7z", "7z")
+        assert len(results) == 1
+        assert results[0]["字一色"] == 13 and results[0]["七対子"] == 2
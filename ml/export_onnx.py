@@ -0,0 +1,181 @@
+"""
+学習済みの重み(runs/detect/*/weights/best.pt)をONNX形式に変換し、
+ONNX Runtimeでの検出結果がultralytics(torch)と一致するかをテスト画像で確認する。
+
+変換した .onnx は .pt と同じフォルダに保存する。バックエンドで使うには、
+環境変数 MAHJONG_INFERENCE_BACKEND=onnx を指定する(ml/inference_backends.py)。
+
+一致の確認では、画像ごとに両方のバックエンドで推論し、
+牌の組(手牌)が一致した画像の割合と、同じ牌のボックスの対応(IoU)・信頼度の差を表示する。
+手牌が一致した割合が --min-agreement 未満なら、終了コード1で終了する。
+
+実行方法(リポジトリのルートで):
+    python -m ml.export_onnx                                  # 全ての best.pt を変換する
+    python -m ml.export_onnx --check test/images              # 変換後、テスト画像で一致を確認する
+    python -m ml.export_onnx --skip-export --check test/images
+"""
+
+import argparse
+import os
+import sys
+from collections import Counter
+from glob import glob
+from typing import Dict, List, Optional
+
+import numpy as np
+
+try:
+    from ml.inference_backends import OnnxBackend, UltralyticsBackend, box_iou, decode_image
+    from ml.model_registry import weights_path_for
+    from ml.recognition import TILE_NAME_MAP, _detections_from_prediction
+except ImportError:
+    # `python ml/export_onnx.py` のようにスクリプトとして直接実行された場合
+    from inference_backends import OnnxBackend, UltralyticsBackend, box_iou, decode_image
+    from model_registry import weights_path_for
+    from recognition import TILE_NAME_MAP, _detections_from_prediction
+
+# --- 定数定義 ---
+WEIGHTS_PATTERN: str = "runs/detect/*/weights/best.pt"
+IMAGE_SIZE: int = 640
+IMAGE_EXTENSIONS = ("*.jpg", "*.jpeg", "*.png", "*.bmp")
+# 同じ牌のボックスを対応づけるIoUの閾値
+MATCH_IOU: float = 0.5
+
+
+def export(weights_path: str, image_size: int = IMAGE_SIZE, opset: Optional[int] = None) -> str:
+    """
+    .pt の重みをONNX形式に変換する。
+
+    入力の大きさとバッチは可変(dynamic)にし、マイクロバッチと縦横比を保った入力に対応させる。
+
+    Args:
+        weights_path (str): .pt の重みファイルのパス。
+        image_size (int): 入力の大きさ(学習時と同じ)。
+        opset (Optional[int]): ONNXのopsetのバージョン。Noneならultralyticsの既定値。
+
+    Returns:
+        str: 保存した .onnx ファイルのパス。
+    """
+    from ultralytics import YOLO
+
+    print(f"ONNX形式に変換しています: {weights_path}")
+    onnx_path = YOLO(weights_path).export(format="onnx", imgsz=image_size, dynamic=True,
+                                          simplify=True, opset=opset)
+    print(f"-> 保存しました: {onnx_path}")
+    return str(onnx_path)
+
+
+def compare_predictions(reference: List[Dict], candidate: List[Dict]) -> Dict:
+    """
+    1枚の画像の2つの検出結果を比べる。
+
+    Args:
+        reference (List[Dict]): 基準(ultralytics)の検出結果。
+        candidate (List[Dict]): 比べる(ONNX Runtime)の検出結果。
+
+    Returns:
+        Dict: 手牌が一致したか(same_hand)、同じ牌でIoUが MATCH_IOU 以上のボックスの数(matched)、
+              対応したボックスの信頼度の差の最大(max_conf_diff)を含む辞書。
+    """
+    same_hand = Counter(d["tile"] for d in reference) == Counter(d["tile"] for d in candidate)
+    matched, conf_diffs = 0, []
+    used = set()
+    for ref in reference:
+        best = None
+        for i, cand in enumerate(candidate):
+            if i in used or cand["tile"] != ref["tile"]:
+                continue
+            if box_iou(np.array(ref["box"]), np.array([cand["box"]]))[0] >= MATCH_IOU:
+                best = i
+                break
+        if best is not None:
+            used.add(best)
+            matched += 1
+            conf_diffs.append(abs(ref["confidence"] - candidate[best]["confidence"]))
+    return {
+        "same_hand": same_hand,
+        "matched": matched,
+        "reference": len(reference),
+        "candidate": len(candidate),
+        "max_conf_diff": max(conf_diffs, default=0.0),
+    }
+
+
+def check_parity(weights_path: str, onnx_path: str, image_folder: str) -> float:
+    """
+    テスト画像で、ONNX Runtimeとultralyticsの検出結果が一致するかを確認する。
+
+    Args:
+        weights_path (str): .pt の重みファイルのパス。
+        onnx_path (str): .onnx の重みファイルのパス。
+        image_folder (str): テスト画像のフォルダ。
+
+    Returns:
+        float: 手牌が一致した画像の割合。画像がない場合は1.0。
+    """
+    image_files = sorted(f for ext in IMAGE_EXTENSIONS for f in glob(os.path.join(image_folder, ext)))
+    if not image_files:
+        print(f"指定フォルダに画像が見つかりません: {image_folder}")
+        return 1.0
+
+    reference_backend = UltralyticsBackend(weights_path)
+    candidate_backend = OnnxBackend(onnx_path)
+    unknown = {n for n in candidate_backend.names.values() if n not in TILE_NAME_MAP}
+    if unknown:
+        print(f"警告: TILE_NAME_MAPにないクラス名があります: {sorted(unknown)}")
+
+    same_hands = matched = reference_total = candidate_total = 0
+    max_conf_diff = 0.0
+    for image_path in image_files:
+        with open(image_path, "rb") as f:
+            image = decode_image(f.read())
+        reference = _detections_from_prediction(reference_backend, reference_backend.predict([image])[0])
+        candidate = _detections_from_prediction(candidate_backend, candidate_backend.predict([image])[0])
+        result = compare_predictions(reference, candidate)
+        same_hands += result["same_hand"]
+        matched += result["matched"]
+        reference_total += result["reference"]
+        candidate_total += result["candidate"]
+        max_conf_diff = max(max_conf_diff, result["max_conf_diff"])
+        if not result["same_hand"]:
+            print(f"  不一致: {os.path.basename(image_path)} "
+                  f"ultralytics={sorted(d['tile'] for d in reference)} onnx={sorted(d['tile'] for d in candidate)}")
+
+    agreement = same_hands / len(image_files)
+    print(f"画像: {len(image_files)}枚  手牌の一致: {same_hands}枚 ({agreement:.1%})")
+    print(f"検出数: ultralytics {reference_total} / onnx {candidate_total}  "
+          f"対応したボックス: {matched} (IoU≥{MATCH_IOU})  信頼度の差の最大: {max_conf_diff:.4f}")
+    return agreement
+
+
+def main() -> None:
+    """コマンドライン引数に従って、変換と一致の確認を行う。"""
+    parser = argparse.ArgumentParser(description="YOLOの重みをONNX形式に変換し、検出結果の一致を確認する")
+    parser.add_argument("weights", nargs="*", help=f"変換する .pt の重み(省略時は {WEIGHTS_PATTERN})")
+    parser.add_argument("--imgsz", type=int, default=IMAGE_SIZE, help="入力の大きさ")
+    parser.add_argument("--opset", type=int, default=None, help="ONNXのopsetのバージョン")
+    parser.add_argument("--skip-export", action="store_true", help="変換せず、既存の .onnx で確認だけ行う")
+    parser.add_argument("--check", metavar="IMAGE_FOLDER", default=None, help="一致を確認するテスト画像のフォルダ")
+    parser.add_argument("--min-agreement", type=float, default=0.98, help="手牌が一致した画像の割合の下限")
+    args = parser.parse_args()
+
+    weights_paths = args.weights or sorted(glob(WEIGHTS_PATTERN))
+    if not weights_paths:
+        print(f"重みファイルが見つかりません: {WEIGHTS_PATTERN}")
+        sys.exit(1)
+
+    failed = False
+    for weights_path in weights_paths:
+        onnx_path = weights_path_for(weights_path, "onnx")
+        if not args.skip_export:
+            onnx_path = export(weights_path, args.imgsz, args.opset)
+        if args.check:
+            print(f"\n--- {weights_path} と {onnx_path} の検出結果を比較しています ---")
+            if check_parity(weights_path, onnx_path, args.check) < args.min_agreement:
+                print(f"-> 手牌の一致が {args.min_agreement:.1%} 未満です。")
+                failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
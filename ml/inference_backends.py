@@ -0,0 +1,312 @@
+"""
+牌検出の推論バックエンド。
+
+バックエンドはBGR順の画像配列のバッチを受け取り、画像ごとに
+(元画像の座標のボックス, 信頼度, クラスID) の配列を返す。
+
+- UltralyticsBackend: ultralytics(torch)で .pt の重みを推論する。
+- OnnxBackend: ONNX Runtime(CPU)で .onnx の重みを推論する。前処理(レターボックス)と
+  後処理(NMS・元画像の座標への変換)はNumPyで行い、torchとultralyticsを読み込まない。
+  前処理・後処理は ultralytics の predict と同じ手順・既定値にしてある。
+
+どちらを使うかは重みファイルの拡張子で決まる(create_backend)。
+.onnx の重みは `python -m ml.export_onnx` で作成する。
+"""
+
+import ast
+import io
+import sys
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from PIL import Image
+
+# --- 定数定義 ---
+DEFAULT_IMAGE_SIZE: Tuple[int, int] = (640, 640)  # (高さ, 幅)
+DEFAULT_STRIDE: int = 32
+# ultralytics の predict の既定値
+CONF_THRESHOLD: float = 0.25
+IOU_THRESHOLD: float = 0.7
+MAX_DETECTIONS: int = 300
+MAX_NMS_BOXES: int = 30000
+LETTERBOX_COLOR: int = 114
+# クラスごとのNMSを1回で行うため、クラスIDに応じてボックスをずらす量(ピクセル)
+_CLASS_OFFSET: float = 7680.0
+INVALID_IMAGE_MESSAGE: str = "画像データが不正で読み込めません。HEIC, JPEG, PNG形式か確認してください。"
+
+# 1枚の画像の推論結果: (ボックス (N, 4) の [x1, y1, x2, y2], 信頼度 (N,), クラスID (N,))
+Prediction = Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+# 推論に使うCPUスレッド数。Noneなら各ライブラリの既定値。
+_num_threads: Optional[int] = None
+
+
+def set_num_threads(num_threads: Optional[int]) -> None:
+    """
+    推論に使うCPUスレッド数を設定する。
+
+    以降に作成するバックエンドと、読み込み済みのtorchに反映する。
+
+    Args:
+        num_threads: スレッド数。Noneなら各ライブラリの既定値。
+    """
+    global _num_threads
+    _num_threads = num_threads
+    if num_threads and "torch" in sys.modules:
+        sys.modules["torch"].set_num_threads(num_threads)
+
+
+def decode_image(image_data: bytes) -> np.ndarray:
+    """
+    画像データをデコードし、バックエンドに渡す形式の配列にする。
+
+    Args:
+        image_data (bytes): 画像のバイトデータ。
+
+    Returns:
+        np.ndarray: BGR順の (高さ, 幅, 3) のuint8配列。
+
+    Raises:
+        ValueError: 画像データが不正で読み込めない場合。
+    """
+    try:
+        image = Image.open(io.BytesIO(image_data)).convert("RGB")
+    except Exception:
+        raise ValueError(INVALID_IMAGE_MESSAGE) from None
+    return np.asarray(image)[:, :, ::-1]
+
+
+def letterbox(image: np.ndarray, new_shape: Tuple[int, int], stride: int = DEFAULT_STRIDE,
+              auto: bool = False) -> np.ndarray:
+    """
+    縦横比を保って縮小・拡大し、余白を埋めてモデルの入力の大きさにする。
+
+    Args:
+        image (np.ndarray): BGR順の (高さ, 幅, 3) のuint8配列。
+        new_shape (Tuple[int, int]): 入力の (高さ, 幅)。
+        stride (int): autoの場合に、余白を揃える単位。
+        auto (bool): Trueなら、余白を stride の倍数に必要な分だけにする(入力の大きさが可変のモデル用)。
+
+    Returns:
+        np.ndarray: 余白を埋めた (高さ, 幅, 3) のuint8配列。
+    """
+    import cv2
+
+    height, width = image.shape[:2]
+    ratio = min(new_shape[0] / height, new_shape[1] / width)
+    new_width, new_height = int(round(width * ratio)), int(round(height * ratio))
+    pad_width, pad_height = new_shape[1] - new_width, new_shape[0] - new_height
+    if auto:
+        pad_width, pad_height = pad_width % stride, pad_height % stride
+    pad_width, pad_height = pad_width / 2, pad_height / 2
+
+    if (width, height) != (new_width, new_height):
+        image = cv2.resize(image, (new_width, new_height), interpolation=cv2.INTER_LINEAR)
+    top, bottom = int(round(pad_height - 0.1)), int(round(pad_height + 0.1))
+    left, right = int(round(pad_width - 0.1)), int(round(pad_width + 0.1))
+    padded = np.full((new_height + top + bottom, new_width + left + right, 3), LETTERBOX_COLOR, dtype=np.uint8)
+    padded[top:top + new_height, left:left + new_width] = image
+    return padded
+
+
+def to_input_tensor(images: Sequence[np.ndarray]) -> np.ndarray:
+    """
+    レターボックス済みのBGR画像を、モデルの入力 (N, 3, 高さ, 幅) のfloat32(0〜1、RGB順)にする。
+    """
+    batch = np.stack(images)[..., ::-1].transpose(0, 3, 1, 2)
+    return np.ascontiguousarray(batch, dtype=np.float32) / 255.0
+
+
+def box_iou(box: np.ndarray, boxes: np.ndarray) -> np.ndarray:
+    """1つのボックス (4,) と複数のボックス (N, 4) のIoUを返す。ボックスは [x1, y1, x2, y2]。"""
+    x1 = np.maximum(box[0], boxes[:, 0])
+    y1 = np.maximum(box[1], boxes[:, 1])
+    x2 = np.minimum(box[2], boxes[:, 2])
+    y2 = np.minimum(box[3], boxes[:, 3])
+    intersection = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area = (box[2] - box[0]) * (box[3] - box[1])
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    return intersection / np.maximum(area + areas - intersection, 1e-9)
+
+
+def nms(boxes: np.ndarray, scores: np.ndarray, iou_threshold: float) -> np.ndarray:
+    """
+    信頼度の高い順に、重なり(IoU)が閾値を超えるボックスを除く。
+
+    Args:
+        boxes (np.ndarray): (N, 4) の [x1, y1, x2, y2]。
+        scores (np.ndarray): (N,) の信頼度。
+        iou_threshold (float): 除くIoUの閾値。
+
+    Returns:
+        np.ndarray: 残したボックスの添字(信頼度の高い順)。
+    """
+    order = np.argsort(-scores, kind="stable")
+    keep = []
+    while order.size:
+        best = order[0]
+        keep.append(best)
+        rest = order[1:]
+        order = rest[box_iou(boxes[best], boxes[rest]) <= iou_threshold]
+    return np.array(keep, dtype=np.int64)
+
+
+def postprocess(output: np.ndarray, input_shape: Tuple[int, int], image_shape: Tuple[int, int],
+                conf_threshold: float = CONF_THRESHOLD, iou_threshold: float = IOU_THRESHOLD,
+                max_detections: int = MAX_DETECTIONS) -> Prediction:
+    """
+    1枚の画像のモデルの出力から、NMSで検出結果を選び、ボックスを元画像の座標に戻す。
+
+    Args:
+        output (np.ndarray): (4 + クラス数, アンカー数) の出力。先頭4行は [中心x, 中心y, 幅, 高さ]。
+        input_shape (Tuple[int, int]): モデルの入力の (高さ, 幅)。
+        image_shape (Tuple[int, int]): 元画像の (高さ, 幅)。
+        conf_threshold (float): 採用する信頼度の閾値。
+        iou_threshold (float): NMSのIoUの閾値。
+        max_detections (int): 1枚あたりの検出数の上限。
+
+    Returns:
+        Prediction: 元画像の座標のボックス、信頼度、クラスID(信頼度の高い順)。
+    """
+    predictions = output.T
+    class_scores = predictions[:, 4:]
+    class_ids = class_scores.argmax(axis=1)
+    scores = class_scores[np.arange(len(class_ids)), class_ids]
+    candidates = scores > conf_threshold
+    xywh, scores, class_ids = predictions[candidates, :4], scores[candidates], class_ids[candidates]
+
+    order = np.argsort(-scores, kind="stable")[:MAX_NMS_BOXES]
+    xywh, scores, class_ids = xywh[order], scores[order], class_ids[order]
+    boxes = np.empty_like(xywh)
+    boxes[:, :2] = xywh[:, :2] - xywh[:, 2:] / 2
+    boxes[:, 2:] = xywh[:, :2] + xywh[:, 2:] / 2
+
+    # クラスの違うボックスは重なっていても残す
+    keep = nms(boxes + class_ids[:, None] * _CLASS_OFFSET, scores, iou_threshold)[:max_detections]
+    boxes, scores, class_ids = boxes[keep], scores[keep], class_ids[keep]
+
+    # レターボックスの余白と倍率を戻す
+    gain = min(input_shape[0] / image_shape[0], input_shape[1] / image_shape[1])
+    pad_x = round((input_shape[1] - image_shape[1] * gain) / 2 - 0.1)
+    pad_y = round((input_shape[0] - image_shape[0] * gain) / 2 - 0.1)
+    boxes[:, [0, 2]] = np.clip((boxes[:, [0, 2]] - pad_x) / gain, 0, image_shape[1])
+    boxes[:, [1, 3]] = np.clip((boxes[:, [1, 3]] - pad_y) / gain, 0, image_shape[0])
+    return boxes, scores, class_ids.astype(np.int64)
+
+
+class InferenceBackend:
+    """推論バックエンドの基底クラス。
+
+    Attributes:
+        name (str): バックエンドの名前。
+        model_path (str): 重みファイルのパス。
+        names (Dict[int, str]): クラスIDからモデルのクラス名への対応表。
+    """
+    name: str = ""
+
+    def __init__(self, model_path: str):
+        self.model_path = model_path
+        self.names: Dict[int, str] = {}
+
+    def predict(self, images: List[np.ndarray]) -> List[Prediction]:
+        """
+        画像のバッチを推論する。
+
+        Args:
+            images (List[np.ndarray]): BGR順の (高さ, 幅, 3) のuint8配列のリスト。
+
+        Returns:
+            List[Prediction]: 入力と同じ順の、画像ごとの推論結果。
+        """
+        raise NotImplementedError
+
+
+class UltralyticsBackend(InferenceBackend):
+    """ultralytics(torch)で .pt の重みを推論するバックエンド。"""
+    name = "ultralytics"
+
+    def __init__(self, model_path: str):
+        super().__init__(model_path)
+        import torch
+        from ultralytics import YOLO
+        if _num_threads:
+            torch.set_num_threads(_num_threads)
+        self.model = YOLO(model_path)
+        self.names = dict(self.model.names)
+
+    def predict(self, images: List[np.ndarray]) -> List[Prediction]:
+        # verbose=Falseでコンソールへの詳細なログ出力を抑制
+        results = self.model(images, verbose=False)
+
+        return [
+            (result.boxes.xyxy.cpu().numpy(), result.boxes.conf.cpu().numpy(),
+             result.boxes.cls.cpu().numpy().astype(np.int64))
+            for result in results
+        ]
+
+
+class OnnxBackend(InferenceBackend):
+    """ONNX Runtime(CPU)で .onnx の重みを推論するバックエンド。torchを読み込まない。
+
+    クラス名と入力の大きさは、ultralytics が書き出したモデルのメタデータから読む。
+    入力の大きさが可変(export の dynamic=True)なら、同じ大きさの画像のバッチは
+    ultralytics と同じく最小の余白でレターボックスする。
+    """
+    name = "onnx"
+
+    def __init__(self, model_path: str, conf_threshold: float = CONF_THRESHOLD,
+                 iou_threshold: float = IOU_THRESHOLD, max_detections: int = MAX_DETECTIONS):
+        super().__init__(model_path)
+        import onnxruntime
+
+        options = onnxruntime.SessionOptions()
+        if _num_threads:
+            options.intra_op_num_threads = _num_threads
+        self.session = onnxruntime.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.conf_threshold = conf_threshold
+        self.iou_threshold = iou_threshold
+        self.max_detections = max_detections
+
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        if "names" in metadata:
+            self.names = {int(k): v for k, v in ast.literal_eval(metadata["names"]).items()}
+        batch, _, height, width = model_input.shape
+        if "imgsz" in metadata:
+            height, width = ast.literal_eval(metadata["imgsz"])
+        self.image_size = (int(height), int(width)) if isinstance(height, int) else DEFAULT_IMAGE_SIZE
+        self.stride = int(metadata.get("stride", DEFAULT_STRIDE))
+        self.dynamic = not all(isinstance(d, int) for d in model_input.shape[2:])
+        # バッチの大きさが固定(既定の export では1)なら、その大きさずつ推論する
+        self.batch_size = batch if isinstance(batch, int) else None
+
+    def predict(self, images: List[np.ndarray]) -> List[Prediction]:
+        auto = self.dynamic and len({image.shape for image in images}) == 1
+        padded = [letterbox(image, self.image_size, self.stride, auto) for image in images]
+        tensor = to_input_tensor(padded)
+        step = self.batch_size or len(images)
+        outputs = np.concatenate([
+            self.session.run(None, {self.input_name: tensor[i:i + step]})[0]
+            for i in range(0, len(images), step)
+        ])
+        return [
+            postprocess(output, tensor.shape[2:], image.shape[:2], self.conf_threshold,
+                        self.iou_threshold, self.max_detections)
+            for output, image in zip(outputs, images)
+        ]
+
+
+def create_backend(model_path: str) -> InferenceBackend:
+    """
+    重みファイルの拡張子に応じたバックエンドを作成する。
+
+    Args:
+        model_path (str): 重みファイルのパス。.onnx なら OnnxBackend、それ以外は UltralyticsBackend。
+
+    Returns:
+        InferenceBackend: 作成したバックエンド。
+    """
+    if model_path.lower().endswith(".onnx"):
+        return OnnxBackend(model_path)
+    return UltralyticsBackend(model_path)
@@ -0,0 +1,202 @@
+"""
+複数のリクエストの推論をまとめて実行するマイクロバッチのスケジューラ。
+
+同時に届いた画像をキューに集め、最大 max_batch_size 枚、または最初の画像が届いてから
+最大 max_wait 秒まで待ってから、1回のバッチ推論として実行する。
+結果は呼び出し元ごとの Future で返す。
+
+推論中に届いた画像は次のバッチにまとまるため、max_wait が0でも負荷が高いときはバッチになる。
+単独のリクエストが待つ時間は最大 max_wait 秒である。
+推論はワーカースレッド1つで順に実行する(モデルを複数スレッドから同時に呼び出さない)。
+"""
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional
+
+
+class _Request:
+    """キューに積む1件の推論リクエスト。"""
+    __slots__ = ("payload", "future", "enqueued_at")
+
+    def __init__(self, payload: Any):
+        self.payload = payload
+        self.future: Future = Future()
+        self.enqueued_at = time.perf_counter()
+
+
+class InferenceScheduler:
+    """推論リクエストをマイクロバッチにまとめて実行するクラス。
+
+    Attributes:
+        max_batch_size (int): 1回のバッチ推論にまとめる最大件数。
+        max_wait (float): バッチの最初のリクエストが届いてから、次のリクエストを待つ最大秒数。
+    """
+
+    def __init__(self, batch_fn: Callable[[List[Any]], List[Any]],
+                 max_batch_size: int = 8, max_wait: float = 0.005):
+        """InferenceSchedulerを初期化する。ワーカースレッドは最初のリクエストで起動する。
+
+        Args:
+            batch_fn: 入力のリストを受け取り、同じ順の結果のリストを返す関数。
+                      結果が例外オブジェクトの場合、その入力の呼び出し元に例外として返す。
+            max_batch_size: 1回のバッチ推論にまとめる最大件数。
+            max_wait: バッチの最初のリクエストが届いてから、次のリクエストを待つ最大秒数。
+        """
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size は1以上を指定してください。")
+        self._batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._lock = threading.Lock()
+        self._queue: Optional[queue.Queue] = None
+        self._worker: Optional[threading.Thread] = None
+        self._worker_pid: Optional[int] = None
+        self._reset_stats()
+
+    def _reset_stats(self) -> None:
+        """統計情報を初期化する。"""
+        self.requests = 0
+        self.batches = 0
+        self.max_batch_seen = 0
+        self.batch_sizes: Dict[int, int] = {}
+        self.max_queue_depth = 0
+        self._wait_seconds = 0.0
+        self._max_wait_seconds = 0.0
+        self._inference_seconds = 0.0
+        self._max_inference_seconds = 0.0
+
+    def _ensure_worker(self) -> queue.Queue:
+        """ワーカースレッドを起動する。フォーク後の子プロセスでは起動し直す(ロックを取って呼ぶ)。"""
+        if self._worker is None or self._worker_pid != os.getpid() or not self._worker.is_alive():
+            self._queue = queue.Queue()
+            self._worker = threading.Thread(target=self._run, args=(self._queue,),
+                                            name="inference-scheduler", daemon=True)
+            self._worker_pid = os.getpid()
+            self._worker.start()
+        return self._queue
+
+    def submit(self, payload: Any) -> Future:
+        """推論リクエストをキューに積む。
+
+        Args:
+            payload: batch_fn に渡す1件の入力。
+
+        Returns:
+            結果を受け取る Future。
+        """
+        request = _Request(payload)
+        with self._lock:
+            requests = self._ensure_worker()
+            requests.put(request)
+            self.requests += 1
+            self.max_queue_depth = max(self.max_queue_depth, requests.qsize())
+        return request.future
+
+    def run(self, payload: Any, timeout: Optional[float] = None) -> Any:
+        """推論リクエストを積み、結果を待って返す。
+
+        Args:
+            payload: batch_fn に渡す1件の入力。
+            timeout: 結果を待つ最大秒数。Noneなら無制限。
+
+        Returns:
+            その入力の結果。
+
+        Raises:
+            batch_fn がその入力の結果として返した例外、または batch_fn が送出した例外。
+        """
+        return self.submit(payload).result(timeout)
+
+    def _collect(self, requests: queue.Queue, first: _Request) -> List[Optional[_Request]]:
+        """最初のリクエストに続くリクエストを、件数か待ち時間の上限までまとめる。"""
+        batch = [first]
+        deadline = first.enqueued_at + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                request = requests.get(timeout=remaining) if remaining > 0 else requests.get_nowait()
+            except queue.Empty:
+                break
+            batch.append(request)
+            if request is None:
+                break
+        return batch
+
+    def _run(self, requests: queue.Queue) -> None:
+        """ワーカースレッドの本体。None を受け取ると、積まれた分を実行して終了する。"""
+        running = True
+        while running:
+            first = requests.get()
+            if first is None:
+                break
+            batch = self._collect(requests, first)
+            if batch[-1] is None:
+                batch.pop()
+                running = False
+
+            started = time.perf_counter()
+            try:
+                results = self._batch_fn([r.payload for r in batch])
+                if len(results) != len(batch):
+                    raise RuntimeError("バッチ推論の結果の数が入力の数と一致しません。")
+            except Exception as e:
+                results = [e] * len(batch)
+            finished = time.perf_counter()
+
+            for request, result in zip(batch, results):
+                if isinstance(result, BaseException):
+                    request.future.set_exception(result)
+                else:
+                    request.future.set_result(result)
+
+            with self._lock:
+                size = len(batch)
+                self.batches += 1
+                self.max_batch_seen = max(self.max_batch_seen, size)
+                self.batch_sizes[size] = self.batch_sizes.get(size, 0) + 1
+                waits = [started - r.enqueued_at for r in batch]
+                self._wait_seconds += sum(waits)
+                self._max_wait_seconds = max(self._max_wait_seconds, max(waits))
+                self._inference_seconds += finished - started
+                self._max_inference_seconds = max(self._max_inference_seconds, finished - started)
+
+    def close(self) -> None:
+        """積まれたリクエストを実行し、ワーカースレッドを止める。"""
+        with self._lock:
+            worker = self._worker if self._worker_pid == os.getpid() else None
+            if worker is not None:
+                self._queue.put(None)
+            self._worker = None
+            self._worker_pid = None
+        if worker is not None:
+            worker.join()
+
+    def stats(self) -> Dict[str, Any]:
+        """統計情報を返す。
+
+        Returns:
+            設定(max_batch_size, max_wait_ms)、件数(requests, batches)、バッチの大きさ
+            (mean_batch_size, max_batch_seen, batch_sizes)、キューの深さ(queue_depth, max_queue_depth)、
+            待ち時間と推論時間の平均・最大(ミリ秒)を含む辞書。
+        """
+        with self._lock:
+            images = sum(size * count for size, count in self.batch_sizes.items())
+            return {
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000,
+                "requests": self.requests,
+                "batches": self.batches,
+                "mean_batch_size": round(images / self.batches, 3) if self.batches else 0.0,
+                "max_batch_seen": self.max_batch_seen,
+                "batch_sizes": dict(sorted(self.batch_sizes.items())),
+                "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+                "max_queue_depth": self.max_queue_depth,
+                "mean_wait_ms": round(self._wait_seconds * 1000 / images, 3) if images else 0.0,
+                "max_wait_seen_ms": round(self._max_wait_seconds * 1000, 3),
+                "mean_inference_ms": round(self._inference_seconds * 1000 / self.batches, 3) if self.batches else 0.0,
+                "max_inference_ms": round(self._max_inference_seconds * 1000, 3),
+            }
@@ -0,0 +1,510 @@
+"""
+認識モデルの推論だけを行うサーバープロセスと、Flaskワーカーから使うクライアント。
+
+サーバープロセスだけが認識モデルを読み込み、複数のFlaskワーカー(プロセス・スレッド)からの
+推論リクエストを受け付ける。モデルの重みはサーバーに1つだけ置かれ、torchのスレッド数も
+リクエスト処理とは別に指定できる。同時に届いた画像は InferenceScheduler でバッチ推論にまとめる。
+
+クライアント(Flaskワーカー)は画像をデコードし、画素を共有メモリ(multiprocessing.shared_memory)に
+書き込んで、共有メモリの名前と形状だけを接続(multiprocessing.connection)で送る。
+サーバーは共有メモリをコピーせずに配列として参照して推論し、検出結果を同じ接続で返す。
+共有メモリの作成と削除はクライアントが行う。クライアントはtorchを読み込まない。
+
+接続の認証キーは、サーバーとクライアントで同じものを環境変数 MAHJONG_INFERENCE_AUTHKEY で指定する。
+接続では pickle したメッセージを受け取るため、キーを知っていれば任意のコードを実行できる。
+既定のキーは設けず、start_server_process で起動する場合はキーがなければランダムに作る。
+
+起動方法(リポジトリのルートで):
+    MAHJONG_INFERENCE_AUTHKEY=... python -m ml.inference_server --address /tmp/mahjong-inference.sock --threads 4
+"""
+
+import argparse
+import ipaddress
+import multiprocessing
+import os
+import secrets
+import socket
+import stat
+import tempfile
+import threading
+import time
+from multiprocessing import resource_tracker, shared_memory
+from multiprocessing.connection import Client, Listener
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+try:
+    from ml.inference_backends import decode_image, set_num_threads
+    from ml.inference_scheduler import InferenceScheduler
+    from ml.model_registry import weights_path_for, weights_version
+except ImportError:
+    # `python ml/inference_server.py` のようにスクリプトとして直接実行された場合
+    from inference_backends import decode_image, set_num_threads
+    from inference_scheduler import InferenceScheduler
+    from model_registry import weights_path_for, weights_version
+
+# --- 定数定義 ---
+DEFAULT_ADDRESS: str = os.path.join(tempfile.gettempdir(), "mahjong-inference.sock")
+# 接続の認証キーを指定する環境変数
+AUTHKEY_ENV: str = "MAHJONG_INFERENCE_AUTHKEY"
+DEFAULT_TIMEOUT: float = 30.0
+WARMUP_IMAGE_SIZES: Tuple[Tuple[int, int], ...] = ((640, 640), (1080, 1920), (1920, 1080))
+
+# サーバーから返すエラーの種類と、クライアントで送出する例外の対応表
+_ERROR_TYPES = {"ValueError": ValueError, "FileNotFoundError": FileNotFoundError}
+_attach_lock = threading.Lock()
+
+
+def parse_address(address: Union[str, Tuple[str, int]]) -> Union[str, Tuple[str, int]]:
+    """
+    サーバーのアドレスを multiprocessing.connection の形式に変換する。
+
+    Args:
+        address: UNIXドメインソケットのパス、または "ホスト:ポート" の文字列。
+
+    Returns:
+        ソケットのパス、または (ホスト, ポート) のタプル。
+    """
+    if isinstance(address, str) and os.sep not in address:
+        host, _, port = address.rpartition(":")
+        if host and port.isdigit():
+            return host, int(port)
+    return address
+
+
+def default_authkey() -> Optional[bytes]:
+    """環境変数 MAHJONG_INFERENCE_AUTHKEY の認証キーを返す。未設定ならNone。"""
+    return os.environ.get(AUTHKEY_ENV, "").encode() or None
+
+
+def is_loopback(address: Union[str, Tuple[str, int]]) -> bool:
+    """
+    アドレスがこのマシンからしか接続できないものかを返す。
+
+    Args:
+        address: parse_address で変換したアドレス。
+
+    Returns:
+        bool: UNIXドメインソケット、またはループバックのホストならTrue。
+    """
+    if isinstance(address, str):
+        return True
+    host = address[0]
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def _is_stale_socket(path: str) -> bool:
+    """
+    ソケットファイルが、終了したサーバーの残したものかを返す。
+
+    Raises:
+        FileExistsError: ソケット以外のファイルの場合。
+        OSError: サーバーが動いていて接続できる場合。
+    """
+    if not stat.S_ISSOCK(os.stat(path).st_mode):
+        raise FileExistsError(f"{path} はソケットではないため、推論サーバーのアドレスに使えません。")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(path)
+        except ConnectionRefusedError:
+            return True
+    raise OSError(f"{path} では別の推論サーバーが動いています。")
+
+
+def _attach_shared_memory(name: str) -> shared_memory.SharedMemory:
+    """
+    クライアントが作成した共有メモリを開く。
+
+    削除はクライアントが行うため、このプロセスのリソーストラッカーには登録しない
+    (登録すると、画像ごとの名前がトラッカーに溜まり続け、サーバーの終了時に
+    削除済みの共有メモリを削除しようとして警告が出る)。
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        pass
+    # Python 3.12以前は track 引数がなく、開くだけで登録されるため、登録の関数を一時的に差し替える
+    with _attach_lock:
+        register = resource_tracker.register
+        resource_tracker.register = lambda name, rtype: None
+        try:
+            return shared_memory.SharedMemory(name=name)
+        finally:
+            resource_tracker.register = register
+
+
+class InferenceClient:
+    """推論サーバーに画像を送り、検出結果を受け取るクライアント。
+
+    接続はスレッドごとに1つ作り、フォーク後の子プロセスでは作り直す。
+
+    Attributes:
+        address: サーバーのアドレス。
+        timeout (float): 1回の推論の結果を待つ最大秒数。
+    """
+
+    def __init__(self, address: Union[str, Tuple[str, int]] = DEFAULT_ADDRESS,
+                 authkey: Optional[bytes] = None, timeout: float = DEFAULT_TIMEOUT):
+        """InferenceClientを初期化する。サーバーへの接続は最初のリクエストで行う。
+
+        Args:
+            address: サーバーのアドレス(parse_address の形式)。
+            authkey: 接続の認証キー。Noneなら接続するときの default_authkey()。
+            timeout: 1回の推論の結果を待つ最大秒数。
+        """
+        self.address = parse_address(address)
+        self._authkey = authkey
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self):
+        """このスレッドの接続を返す。未接続なら接続する。"""
+        connection = getattr(self._local, "connection", None)
+        if connection is None or self._local.pid != os.getpid():
+            authkey = self._authkey or default_authkey()
+            if authkey is None:
+                raise ConnectionError(f"認証キーが設定されていません(環境変数 {AUTHKEY_ENV})。")
+            connection = Client(self.address, authkey=authkey)
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def _disconnect(self) -> None:
+        """このスレッドの接続を閉じる。次のリクエストで接続し直す。"""
+        connection = getattr(self._local, "connection", None)
+        self._local.connection = None
+        if connection is not None and self._local.pid == os.getpid():
+            try:
+                connection.close()
+            except OSError:
+                pass
+
+    def _call(self, message: tuple) -> Any:
+        """
+        サーバーにメッセージを送り、応答を返す。
+
+        Raises:
+            ConnectionError: サーバーに接続できない、または応答がない場合。
+            ValueError, FileNotFoundError, RuntimeError: サーバーで発生したエラー。
+        """
+        try:
+            connection = self._connection()
+            connection.send(message)
+            if not connection.poll(self.timeout):
+                raise TimeoutError(f"推論サーバーが {self.timeout} 秒以内に応答しませんでした。")
+            status, payload = connection.recv()
+        except (OSError, EOFError) as e:
+            # 応答が途中の接続は使い回せないため、閉じて次のリクエストで接続し直す
+            self._disconnect()
+            raise ConnectionError(f"推論サーバー {self.address} と通信できません: {e}") from e
+        if status == "error":
+            error_type, error_message = payload
+            raise _ERROR_TYPES.get(error_type, RuntimeError)(error_message)
+        return payload
+
+    def detect(self, image_data: bytes) -> List[Dict]:
+        """
+        画像から牌を検出する。
+
+        Args:
+            image_data (bytes): 画像のバイトデータ。
+
+        Returns:
+            List[Dict]: 検出結果のリスト(ml.recognition.detect_hand_from_image と同じ形式)。
+
+        Raises:
+            ValueError: 画像データが不正で読み込めない場合。
+            ConnectionError: サーバーに接続できない、または応答がない場合。
+        """
+        image = decode_image(image_data)
+        shm = shared_memory.SharedMemory(create=True, size=image.nbytes)
+        try:
+            np.ndarray(image.shape, dtype=np.uint8, buffer=shm.buf)[:] = image
+            return self._call(("detect", shm.name, image.shape))
+        finally:
+            shm.close()
+            shm.unlink()
+
+    def status(self) -> Dict[str, Any]:
+        """
+        サーバーの状態を返す。
+
+        Returns:
+            InferenceServer.status() の辞書。
+
+        Raises:
+            ConnectionError: サーバーに接続できない、または応答がない場合。
+        """
+        return self._call(("status",))
+
+
+class InferenceServer:
+    """認識モデルを1つだけ読み込み、クライアントからの推論リクエストを処理するサーバー。
+
+    接続ごとにスレッドを1つ起動し、推論は InferenceScheduler のワーカースレッドでバッチにまとめて実行する。
+
+    Attributes:
+        model_path (str): 使用するYOLOモデルのファイルパス。
+        address: 待ち受けるアドレス。
+    """
+
+    def __init__(self, model_path: str, address: Union[str, Tuple[str, int]] = DEFAULT_ADDRESS,
+                 authkey: Optional[bytes] = None, max_batch_size: int = 8, max_wait: float = 0.005,
+                 torch_threads: Optional[int] = None,
+                 warmup_sizes: Tuple[Tuple[int, int], ...] = WARMUP_IMAGE_SIZES):
+        """InferenceServerを初期化する。
+
+        Args:
+            model_path: 使用するYOLOモデルのファイルパス。
+            address: 待ち受けるアドレス(parse_address の形式)。
+            authkey: 接続の認証キー。Noneなら default_authkey()。
+            max_batch_size: 1回のバッチ推論にまとめる最大枚数。
+            max_wait: バッチの最初の画像が届いてから、次の画像を待つ最大秒数。
+            torch_threads: 推論(torch、またはONNX Runtime)に使うスレッド数。Noneなら既定値。
+            warmup_sizes: ウォームアップに使うダミー画像の (高さ, 幅) のタプル。
+
+        Raises:
+            ValueError: 認証キーが指定されていない場合。
+        """
+        self.model_path = model_path
+        self.address = parse_address(address)
+        self._authkey = authkey or default_authkey()
+        if self._authkey is None:
+            raise ValueError(f"推論サーバーの認証キーを指定してください(環境変数 {AUTHKEY_ENV})。")
+        self.torch_threads = torch_threads
+        self.warmup_sizes = warmup_sizes
+        self._scheduler = InferenceScheduler(self._detect_batch, max_batch_size=max_batch_size,
+                                             max_wait=max_wait)
+        self._recognition = None
+        self._listener: Optional[Listener] = None
+        self._lock = threading.Lock()
+        self._connections = 0
+        # 推論の後もモデル側が配列を参照していて閉じられなかった共有メモリ。次のリクエストで閉じ直す。
+        self._unclosed: List[shared_memory.SharedMemory] = []
+        self._status: Dict[str, Any] = {
+            "loaded": False,
+            "warmed_up": False,
+            "model_path": model_path,
+            "weights_version": None,
+            "load_seconds": None,
+            "warmup_seconds": [],
+            "error": None,
+        }
+
+    def load(self) -> None:
+        """推論のスレッド数を設定し、モデルを読み込んでウォームアップ推論を行う。"""
+        try:
+            start = time.perf_counter()
+            set_num_threads(self.torch_threads)
+            try:
+                import ml.recognition as recognition
+            except ImportError:
+                import recognition
+            model = recognition.load_model(self.model_path)
+            self._recognition = recognition
+            self._status.update({
+                "loaded": True,
+                "weights_version": weights_version(self.model_path),
+                "load_seconds": round(time.perf_counter() - start, 4),
+            })
+            warmup_seconds = recognition.warm_up_model(model, list(self.warmup_sizes))
+            self._status.update({
+                "warmed_up": True,
+                "warmup_seconds": [round(t, 4) for t in warmup_seconds],
+            })
+            print(f"推論サーバーの準備が完了しました: {self._status}")
+        except Exception as e:
+            print(f"推論サーバーでモデルの読み込みに失敗しました: {e}")
+            self._status["error"] = str(e)
+
+    def _detect_batch(self, images: List[np.ndarray]) -> List[Any]:
+        """InferenceScheduler から呼ばれる、画像のバッチ推論。"""
+        if self._recognition is None:
+            raise RuntimeError(f"認識モデルが読み込まれていません: {self._status['error']}")
+        return self._recognition.detect_hands_from_arrays(images, self.model_path)
+
+    def _close_shared_memory(self, shm: shared_memory.SharedMemory) -> None:
+        """共有メモリを閉じる。まだ参照されている場合は後で閉じ直す。"""
+        with self._lock:
+            pending, self._unclosed = self._unclosed + [shm], []
+            for item in pending:
+                try:
+                    item.close()
+                except BufferError:
+                    self._unclosed.append(item)
+
+    def _detect(self, name: str, shape: Tuple[int, int, int]) -> List[Dict]:
+        """共有メモリ上の画像をコピーせずに推論する。"""
+        shm = _attach_shared_memory(name)
+        try:
+            image = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+            try:
+                return self._scheduler.run(image)
+            finally:
+                del image
+        finally:
+            self._close_shared_memory(shm)
+
+    def status(self) -> Dict[str, Any]:
+        """
+        サーバーの状態を返す。
+
+        Returns:
+            読み込み状態(loaded, warmed_up, ready)、所要時間、重みのバージョン、
+            プロセスID、torchのスレッド数、接続数、マイクロバッチの統計(inference_queue)を含む辞書。
+        """
+        status = dict(self._status)
+        status["ready"] = status["loaded"] and status["warmed_up"]
+        status["pid"] = os.getpid()
+        status["torch_threads"] = self.torch_threads
+        status["connections"] = self._connections
+        status["inference_queue"] = self._scheduler.stats()
+        return status
+
+    def _handle(self, connection) -> None:
+        """1つの接続のリクエストを順に処理する。"""
+        with self._lock:
+            self._connections += 1
+        try:
+            while True:
+                try:
+                    message = connection.recv()
+                except (EOFError, OSError):
+                    break
+                try:
+                    if message[0] == "detect":
+                        reply = ("ok", self._detect(message[1], tuple(message[2])))
+                    elif message[0] == "status":
+                        reply = ("ok", self.status())
+                    else:
+                        reply = ("error", ("ValueError", f"不明なリクエストです: {message[0]}"))
+                except Exception as e:
+                    reply = ("error", (type(e).__name__, str(e)))
+                try:
+                    connection.send(reply)
+                except (EOFError, OSError):
+                    break
+        finally:
+            connection.close()
+            with self._lock:
+                self._connections -= 1
+
+    def serve_forever(self) -> None:
+        """接続を待ち受け、接続ごとにスレッドを起動してリクエストを処理する。"""
+        if isinstance(self.address, str) and os.path.exists(self.address) and _is_stale_socket(self.address):
+            # 前回のサーバーが残したソケットファイルを消す
+            os.unlink(self.address)
+        listener = self._listener = Listener(self.address, authkey=self._authkey)
+        print(f"推論サーバーを起動しました: {self.address} (pid={os.getpid()})")
+        while True:
+            try:
+                connection = listener.accept()
+            except multiprocessing.AuthenticationError as e:
+                print(f"推論サーバーへの接続を拒否しました: {e}")
+                continue
+            except (OSError, EOFError):
+                # 認証の途中で切断された接続(_is_stale_socket の確認など)
+                if self._listener is None:
+                    break
+                continue
+            if self._listener is None:
+                # close() が accept を起こすための接続
+                connection.close()
+                break
+            threading.Thread(target=self._handle, args=(connection,), daemon=True).start()
+
+    def close(self) -> None:
+        """待ち受けを止め、積まれた推論を実行してからワーカースレッドを止める。"""
+        listener, self._listener = self._listener, None
+        if listener is not None:
+            # accept で待っているスレッドは close だけでは戻らないため、接続して起こす
+            try:
+                Client(self.address, authkey=self._authkey).close()
+            except (OSError, EOFError):
+                pass
+            listener.close()
+        self._scheduler.close()
+
+
+def serve(model_path: str, address: Union[str, Tuple[str, int]] = DEFAULT_ADDRESS,
+          authkey: Optional[bytes] = None, max_batch_size: int = 8, max_wait: float = 0.005,
+          torch_threads: Optional[int] = None) -> None:
+    """
+    推論サーバーを作成し、モデルを読み込んでから接続を待ち受ける(戻らない)。
+
+    引数は InferenceServer と同じ。
+    """
+    server = InferenceServer(model_path, address, authkey, max_batch_size, max_wait, torch_threads)
+    server.load()
+    server.serve_forever()
+
+
+def start_server_process(model_path: str, address: Union[str, Tuple[str, int]] = DEFAULT_ADDRESS,
+                         authkey: Optional[bytes] = None, max_batch_size: int = 8,
+                         max_wait: float = 0.005, torch_threads: Optional[int] = None):
+    """
+    推論サーバーを別プロセス(spawn)で起動する。
+
+    親プロセスが終了するとサーバーも終了する(デーモンプロセス)。
+    モデルの読み込みを待たずに戻るため、準備ができたかは InferenceClient.status() で確認する。
+    認証キーが指定されておらず、環境変数 MAHJONG_INFERENCE_AUTHKEY もなければ、ランダムなキーを作って
+    環境変数に設定する(このプロセスのクライアントと、フォークしたワーカーが同じキーを使う)。
+    引数は InferenceServer と同じ。
+
+    Returns:
+        multiprocessing.Process: 起動したサーバーのプロセス。
+
+    Raises:
+        ValueError: 認証キーを指定せずに、ループバック以外のアドレスで待ち受けようとした場合。
+    """
+    authkey = authkey or default_authkey()
+    if authkey is None:
+        if not is_loopback(parse_address(address)):
+            raise ValueError(f"ループバック以外のアドレス {address} で待ち受ける場合は、"
+                             f"認証キーを指定してください(環境変数 {AUTHKEY_ENV})。")
+        os.environ[AUTHKEY_ENV] = secrets.token_hex(32)
+        authkey = default_authkey()
+    context = multiprocessing.get_context("spawn")
+    process = context.Process(
+        target=serve,
+        args=(model_path, address, authkey, max_batch_size, max_wait, torch_threads),
+        name="inference-server",
+        daemon=True,
+    )
+    process.start()
+    return process
+
+
+def main() -> None:
+    """コマンドラインから推論サーバーを起動する。"""
+    parser = argparse.ArgumentParser(description="麻雀牌認識の推論サーバー")
+    parser.add_argument("--model", default=None,
+                        help="重みファイル(.pt、.onnx、.int8.onnx)のパス。省略時は runs/detect/mahjong_train_v3/weights/"
+                             "best.pt(環境変数 MAHJONG_INFERENCE_BACKEND に応じて best.onnx、best.int8.onnx)")
+    parser.add_argument("--address", default=os.environ.get("MAHJONG_INFERENCE_SERVER") or DEFAULT_ADDRESS,
+                        help="UNIXドメインソケットのパス、または ホスト:ポート")
+    parser.add_argument("--threads", type=int, default=None, help="推論(torch、またはONNX Runtime)に使うスレッド数")
+    parser.add_argument("--max-batch", type=int, default=8, help="1回のバッチ推論にまとめる最大枚数")
+    parser.add_argument("--max-wait-ms", type=float, default=5.0, help="バッチの画像を待つ最大ミリ秒")
+    args = parser.parse_args()
+    if default_authkey() is None:
+        parser.error(f"認証キーを環境変数 {AUTHKEY_ENV} で指定してください。")
+
+    model_path = args.model
+    if model_path is None:
+        project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+        backend = os.environ.get("MAHJONG_INFERENCE_BACKEND", "").strip().lower() or "ultralytics"
+        model_path = weights_path_for(
+            os.path.join(project_root, "runs", "detect", "mahjong_train_v3", "weights", "best.pt"), backend)
+    serve(model_path, args.address, max_batch_size=args.max_batch,
+          max_wait=args.max_wait_ms / 1000, torch_threads=args.threads)
+
+
+if __name__ == "__main__":
+    main()
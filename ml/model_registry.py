@@ -0,0 +1,136 @@
+"""
+学習済みモデルをワーカープロセス内でキャッシュするレジストリ。
+
+同じチェックポイントに対する読み込みはプロセス内で1度だけ行い、
+以降のリクエストには同じインスタンスを返す。
+キャッシュのキーは解決済みの絶対パスとファイルの更新時刻(mtime)であり、
+重みファイルが差し替えられた場合は自動的に再読み込みされる。
+"""
+
+import hashlib
+import os
+import threading
+from typing import Any, Callable, Dict, Tuple
+
+
+class ModelRegistry:
+    """チェックポイントごとに読み込み済みモデルを保持するクラス。
+
+    Attributes:
+        loads (int): 実際にモデルを読み込んだ回数。
+        hits (int): キャッシュ済みのインスタンスを返した回数。
+    """
+
+    def __init__(self, loader: Callable[[str], Any]):
+        """ModelRegistryを初期化する。
+
+        Args:
+            loader: モデルファイルのパスを受け取り、モデルを返す関数
+                    (例: ultralyticsの`YOLO`クラス)。
+        """
+        self._loader = loader
+        self._models: Dict[str, Tuple[int, Any]] = {}
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.hits = 0
+
+    @staticmethod
+    def _cache_key(model_path: str) -> Tuple[str, int]:
+        """モデルファイルのキャッシュキー(絶対パス, mtime)を返す。
+
+        Args:
+            model_path: モデルファイルのパス。
+
+        Returns:
+            解決済みの絶対パスとナノ秒単位の更新時刻のタプル。
+
+        Raises:
+            FileNotFoundError: モデルファイルが存在しない場合。
+        """
+        resolved_path = os.path.realpath(model_path)
+        return resolved_path, os.stat(resolved_path).st_mtime_ns
+
+    def get(self, model_path: str) -> Any:
+        """モデルを取得する。未読み込み、または更新されていれば読み込む。
+
+        Args:
+            model_path: モデルファイルのパス。
+
+        Returns:
+            読み込み済みのモデルインスタンス。
+        """
+        resolved_path, mtime = self._cache_key(model_path)
+        # 読み込みは重いため、同じモデルを複数スレッドが同時に読み込まないようロックする
+        with self._lock:
+            cached = self._models.get(resolved_path)
+            if cached is not None and cached[0] == mtime:
+                self.hits += 1
+                return cached[1]
+            model = self._loader(resolved_path)
+            self._models[resolved_path] = (mtime, model)
+            self.loads += 1
+            return model
+
+    def is_loaded(self, model_path: str) -> bool:
+        """最新の重みファイルが読み込み済みかどうかを返す。
+
+        Args:
+            model_path: モデルファイルのパス。
+
+        Returns:
+            読み込み済みならTrue、そうでなければFalse。
+        """
+        try:
+            resolved_path, mtime = self._cache_key(model_path)
+        except FileNotFoundError:
+            return False
+        cached = self._models.get(resolved_path)
+        return cached is not None and cached[0] == mtime
+
+    def clear(self) -> None:
+        """キャッシュされた全てのモデルを破棄する。"""
+        with self._lock:
+            self._models.clear()
+
+
+def weights_version(model_path: str) -> str:
+    """重みファイルのバージョン文字列(ファイル名と内容のハッシュ)を返す。
+
+    Args:
+        model_path: モデルファイルのパス。
+
+    Returns:
+        バージョン文字列 (例: 'best.pt@3f2a9c1b0d4e')。
+    """
+    digest = hashlib.sha256()
+    with open(model_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return f"{os.path.basename(model_path)}@{digest.hexdigest()[:12]}"
+
+
+# 推論バックエンドごとの重みファイルの拡張子。.onnx は ml/export_onnx.py、
+# .int8.onnx は ml/quantize_model.py で .pt から作成する。
+WEIGHTS_SUFFIXES: Dict[str, str] = {
+    "ultralytics": ".pt",
+    "onnx": ".onnx",
+    "onnx-int8": ".int8.onnx",
+}
+
+
+def weights_path_for(weights_path: str, backend: str) -> str:
+    """推論バックエンドが使う重みファイルのパスを返す。
+
+    Args:
+        weights_path: .pt の重みファイルのパス。
+        backend: 推論バックエンドの名前(WEIGHTS_SUFFIXES のキー)。
+
+    Returns:
+        拡張子を置き換えたパス (例: 'best.pt' -> 'best.int8.onnx')。
+
+    Raises:
+        ValueError: 不明なバックエンドの場合。
+    """
+    if backend not in WEIGHTS_SUFFIXES:
+        raise ValueError(f"不明な推論バックエンドです: {backend} ({', '.join(WEIGHTS_SUFFIXES)} のいずれか)")
+    return os.path.splitext(weights_path)[0] + WEIGHTS_SUFFIXES[backend]
@@ -0,0 +1,359 @@
+"""
+学習済みの重み(runs/detect/*/weights/best.pt)をINT8に量子化したONNXモデル(best.int8.onnx)を作成し、
+FP32の best.pt と比べたレポート(モデルの大きさ・推論時間・クラスごとのPrecision/Recall)を出力する。
+
+量子化はONNX Runtimeの静的量子化(QDQ形式、重みは出力チャネルごとのINT8、活性はUINT8)で行い、
+活性の範囲は ml/data/data.yaml の学習画像(train)から抜き出したキャリブレーション画像で求める。
+検出ヘッド(最後の /model.N/)の畳み込み以外のノード(DFL・ボックスの復元・Concat)は量子化しない。
+ボックスの座標(0〜640)とクラスの確率(0〜1)が1つの出力にまとめられるため、
+1つのスケールで量子化するとクラスの確率がほぼ0か1に丸められてしまうからである。
+
+クラスごとのPrecision/Recallは ml/evaluate_model.py と同じく YOLO(...).val() の metrics.box.p・.r で求め、
+INT8で --max-drop より下がったクラスがあれば終了コード1で終了する。赤ドラ(5mr・5pr・5sr)は
+通常の5と見分けにくく量子化の影響を受けやすいため、レポートで印をつける。
+
+バックエンドで使うには、環境変数 MAHJONG_INFERENCE_BACKEND=onnx-int8 を指定する。
+
+実行方法(リポジトリのルートで):
+    python -m ml.quantize_model                               # best.pt を量子化し、レポートを出力する
+    python -m ml.quantize_model --skip-quantize               # 既存の best.int8.onnx でレポートだけ出力する
+    python -m ml.quantize_model --calib-images 300 --no-eval  # 量子化だけ行う(精度の評価をしない)
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from onnxruntime.quantization import CalibrationDataReader
+
+try:
+    from ml.inference_backends import create_backend, decode_image, letterbox, set_num_threads, to_input_tensor
+    from ml.model_registry import weights_path_for
+except ImportError:
+    # `python ml/quantize_model.py` のようにスクリプトとして直接実行された場合
+    from inference_backends import create_backend, decode_image, letterbox, set_num_threads, to_input_tensor
+    from model_registry import weights_path_for
+
+# --- 定数定義 ---
+WEIGHTS_PATH: str = "runs/detect/mahjong_train_v3/weights/best.pt"
+DATA_YAML_PATH: str = "ml/data/data.yaml"
+IMAGE_SIZE: int = 640
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+# キャリブレーションに使う学習画像の枚数
+CALIBRATION_IMAGES: int = 200
+# 許容するクラスごとのPrecision/Recallの低下
+MAX_DROP: float = 0.02
+# 通常の5と見分けにくい赤ドラのクラス
+RED_FIVES = ("5mr", "5pr", "5sr")
+LATENCY_REPEAT: int = 20
+
+
+def read_image_paths(data_yaml: str, split: str = "train") -> List[str]:
+    """
+    ultralytics形式のデータセット設定(data.yaml)から、指定した分割の画像のパスを読む。
+
+    分割の値は、画像のフォルダ・画像のパスを1行ずつ書いた .txt・それらのリストのいずれか。
+    相対パスは path(省略時は data.yaml のフォルダ)からのパスとする。
+
+    Args:
+        data_yaml (str): data.yaml のパス。
+        split (str): 'train'・'val'・'test' のいずれか。
+
+    Returns:
+        List[str]: 画像のパス(ソート済み)。
+
+    Raises:
+        ValueError: data.yaml に指定した分割がない場合。
+    """
+    import yaml
+
+    with open(data_yaml, encoding="utf-8") as f:
+        config = yaml.safe_load(f) or {}
+    if not config.get(split):
+        raise ValueError(f"{data_yaml} に '{split}' の画像が指定されていません")
+
+    root = config.get("path") or os.path.dirname(data_yaml)
+    if not os.path.isabs(root) and not os.path.isdir(root):
+        root = os.path.join(os.path.dirname(data_yaml), root)
+    entries = config[split] if isinstance(config[split], list) else [config[split]]
+
+    image_paths = []
+    for entry in entries:
+        entry = entry if os.path.isabs(entry) else os.path.join(root, entry)
+        if os.path.isdir(entry):
+            image_paths += [
+                os.path.join(folder, name)
+                for folder, _, names in os.walk(entry) for name in names
+                if name.lower().endswith(IMAGE_EXTENSIONS)
+            ]
+        elif entry.endswith(".txt"):
+            with open(entry, encoding="utf-8") as f:
+                lines = [line.strip() for line in f if line.strip()]
+            image_paths += [
+                line if os.path.isabs(line) else os.path.join(os.path.dirname(entry), line) for line in lines
+            ]
+        else:
+            image_paths.append(entry)
+    return sorted(image_paths)
+
+
+class ImageCalibrationReader(CalibrationDataReader):
+    """キャリブレーション画像を、推論時と同じ前処理(正方形のレターボックス)で1枚ずつ渡す。"""
+
+    def __init__(self, image_paths: Iterable[str], input_name: str, image_size: int = IMAGE_SIZE):
+        self.image_paths = list(image_paths)
+        self.input_name = input_name
+        self.image_size = image_size
+        self._iterator = iter(self.image_paths)
+
+    def get_next(self) -> Optional[Dict[str, np.ndarray]]:
+        for image_path in self._iterator:
+            with open(image_path, "rb") as f:
+                try:
+                    image = decode_image(f.read())
+                except ValueError:
+                    print(f"  読み込めない画像をスキップしました: {image_path}")
+                    continue
+            padded = letterbox(image, (self.image_size, self.image_size))
+            return {self.input_name: to_input_tensor([padded])}
+        return None
+
+    def rewind(self) -> None:
+        self._iterator = iter(self.image_paths)
+
+
+def detect_head_nodes(model) -> List[str]:
+    """
+    ultralyticsが書き出したONNXモデルから、検出ヘッドの畳み込み以外のノード名を返す。
+
+    Args:
+        model (onnx.ModelProto): ONNXモデル。
+
+    Returns:
+        List[str]: 最後の /model.N/ に属し、Conv以外のノードの名前。
+    """
+    layers = [
+        int(node.name.split("/")[1].split(".")[1])
+        for node in model.graph.node if node.name.startswith("/model.")
+    ]
+    if not layers:
+        return []
+    prefix = f"/model.{max(layers)}/"
+    return [node.name for node in model.graph.node if node.name.startswith(prefix) and node.op_type != "Conv"]
+
+
+def quantize(onnx_path: str, output_path: str, calibration_paths: List[str], image_size: int = IMAGE_SIZE,
+             per_channel: bool = True, quantize_head: bool = False) -> str:
+    """
+    FP32のONNXモデルをINT8に静的量子化する。
+
+    Args:
+        onnx_path (str): FP32の .onnx ファイルのパス。
+        output_path (str): 量子化したモデルの保存先。
+        calibration_paths (List[str]): キャリブレーション画像のパス。
+        image_size (int): キャリブレーション画像の入力の大きさ。
+        per_channel (bool): 重みを出力チャネルごとに量子化するか。
+        quantize_head (bool): 検出ヘッドの畳み込み以外のノードも量子化するか。
+
+    Returns:
+        str: 保存した量子化モデルのパス。
+    """
+    import onnx
+    from onnxruntime.quantization import CalibrationMethod, QuantFormat, QuantType, quantize_static
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    fp32_model = onnx.load(onnx_path)
+    input_name = fp32_model.graph.input[0].name
+    excluded = [] if quantize_head else detect_head_nodes(fp32_model)
+
+    print(f"INT8に量子化しています: {onnx_path} (キャリブレーション画像 {len(calibration_paths)}枚、"
+          f"量子化しないノード {len(excluded)}個)")
+    with tempfile.TemporaryDirectory() as work_dir:
+        preprocessed_path = os.path.join(work_dir, "preprocessed.onnx")
+        quant_pre_process(onnx_path, preprocessed_path)
+        quantize_static(
+            preprocessed_path, output_path,
+            ImageCalibrationReader(calibration_paths, input_name, image_size),
+            quant_format=QuantFormat.QDQ,
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8,
+            per_channel=per_channel,
+            nodes_to_exclude=excluded,
+            calibrate_method=CalibrationMethod.MinMax,
+        )
+
+    # クラス名・入力の大きさなど、OnnxBackend が読むメタデータを引き継ぐ
+    quantized_model = onnx.load(output_path)
+    del quantized_model.metadata_props[:]
+    quantized_model.metadata_props.extend(fp32_model.metadata_props)
+    onnx.save(quantized_model, output_path)
+    print(f"-> 保存しました: {output_path}")
+    return output_path
+
+
+def measure_latency(model_path: str, image: np.ndarray, repeat: int = LATENCY_REPEAT) -> float:
+    """
+    1枚の画像の推論時間の中央値(ミリ秒)を測る。最初の1回(ウォームアップ)は含めない。
+
+    Args:
+        model_path (str): 重みファイルのパス。
+        image (np.ndarray): BGR順の画像。
+        repeat (int): 計測の回数。
+
+    Returns:
+        float: 推論時間の中央値(ミリ秒)。
+    """
+    backend = create_backend(model_path)
+    backend.predict([image])
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        backend.predict([image])
+        seconds.append(time.perf_counter() - start)
+    return statistics.median(seconds) * 1000
+
+
+def per_class_metrics(model_path: str, data_yaml: str, image_size: int = IMAGE_SIZE) -> Dict[str, Tuple[float, float]]:
+    """
+    ml/evaluate_model.py と同じく YOLO(...).val() で評価し、クラスごとのPrecision/Recallを返す。
+
+    Args:
+        model_path (str): 重みファイル(.pt または .onnx)のパス。
+        data_yaml (str): data.yaml のパス。
+        image_size (int): 入力の大きさ。
+
+    Returns:
+        Dict[str, Tuple[float, float]]: クラス名から (Precision, Recall) への辞書。
+            評価データに現れないクラスは含まない。
+    """
+    from ultralytics import YOLO
+
+    metrics = YOLO(model_path, task="detect").val(data=data_yaml, imgsz=image_size, verbose=False, plots=False)
+    return {
+        metrics.names[int(class_id)]: (float(metrics.box.p[i]), float(metrics.box.r[i]))
+        for i, class_id in enumerate(metrics.box.ap_class_index)
+    }
+
+
+def format_report(sizes: Dict[str, int], latencies: Dict[str, float],
+                  reference: Dict[str, Tuple[float, float]], candidate: Dict[str, Tuple[float, float]],
+                  max_drop: float = MAX_DROP) -> Tuple[str, List[str]]:
+    """
+    量子化の比較レポートを作る。
+
+    Args:
+        sizes (Dict[str, int]): ファイル名からファイルの大きさ(バイト)への辞書。
+        latencies (Dict[str, float]): ファイル名から推論時間の中央値(ミリ秒)への辞書。
+        reference (Dict[str, Tuple[float, float]]): FP32のクラスごとの (Precision, Recall)。
+        candidate (Dict[str, Tuple[float, float]]): INT8のクラスごとの (Precision, Recall)。
+        max_drop (float): 許容するPrecision/Recallの低下。
+
+    Returns:
+        Tuple[str, List[str]]: レポートの文字列と、PrecisionかRecallが max_drop より下がったクラス名のリスト。
+    """
+    lines = ["# INT8量子化の比較レポート", "", "## モデルの大きさ"]
+    for name, size in sizes.items():
+        lines.append(f"{name:<16} {size / 1024 / 1024:8.1f} MB")
+
+    lines += ["", "## 推論時間(1枚、中央値)"]
+    for name, latency in latencies.items():
+        lines.append(f"{name:<16} {latency:8.1f} ms  ({1000 / latency:6.1f} 枚/秒)")
+
+    dropped: List[str] = []
+    if reference or candidate:
+        lines += ["", f"## クラスごとのPrecision/Recall(FP32 -> INT8、'!' は {max_drop:.2f} より低下、"
+                      f"'*' は赤ドラ)",
+                  f"{'クラス':<6} {'P(FP32)':>8} {'P(INT8)':>8} {'差':>7} {'R(FP32)':>8} {'R(INT8)':>8} {'差':>7}"]
+        for name in sorted(set(reference) | set(candidate)):
+            if name not in reference or name not in candidate:
+                lines.append(f"{name:<6} 片方の評価結果にありません")
+                dropped.append(name)
+                continue
+            (p_ref, r_ref), (p_int8, r_int8) = reference[name], candidate[name]
+            flag = "!" if p_ref - p_int8 > max_drop or r_ref - r_int8 > max_drop else " "
+            if flag == "!":
+                dropped.append(name)
+            mark = "*" if name in RED_FIVES else " "
+            lines.append(f"{name + mark:<6} {p_ref:8.4f} {p_int8:8.4f} {p_int8 - p_ref:+7.4f} "
+                         f"{r_ref:8.4f} {r_int8:8.4f} {r_int8 - r_ref:+7.4f} {flag}")
+        common = sorted(set(reference) & set(candidate))
+        if common:
+            p_ref, r_ref = (float(np.mean([reference[n][k] for n in common])) for k in (0, 1))
+            p_int8, r_int8 = (float(np.mean([candidate[n][k] for n in common])) for k in (0, 1))
+            lines.append(f"{'平均':<6} {p_ref:8.4f} {p_int8:8.4f} {p_int8 - p_ref:+7.4f} "
+                         f"{r_ref:8.4f} {r_int8:8.4f} {r_int8 - r_ref:+7.4f}")
+        lines += ["", f"低下したクラス: {', '.join(dropped) if dropped else 'なし'}"]
+    return "\n".join(lines) + "\n", dropped
+
+
+def main() -> None:
+    """コマンドライン引数に従って、量子化とレポートの出力を行う。"""
+    parser = argparse.ArgumentParser(description="YOLOの重みをINT8に量子化し、FP32と比較する")
+    parser.add_argument("weights", nargs="?", default=WEIGHTS_PATH, help=f"FP32の .pt の重み(既定: {WEIGHTS_PATH})")
+    parser.add_argument("--data", default=DATA_YAML_PATH, help="キャリブレーション・評価に使う data.yaml")
+    parser.add_argument("--imgsz", type=int, default=IMAGE_SIZE, help="入力の大きさ")
+    parser.add_argument("--calib-images", type=int, default=CALIBRATION_IMAGES,
+                        help="キャリブレーションに使う学習画像の枚数")
+    parser.add_argument("--per-tensor", action="store_true", help="重みを出力チャネルごとではなくテンソルごとに量子化する")
+    parser.add_argument("--quantize-head", action="store_true", help="検出ヘッドの畳み込み以外のノードも量子化する")
+    parser.add_argument("--skip-quantize", action="store_true", help="量子化せず、既存の .int8.onnx でレポートだけ出力する")
+    parser.add_argument("--no-eval", action="store_true", help="クラスごとのPrecision/Recallを評価しない")
+    parser.add_argument("--max-drop", type=float, default=MAX_DROP, help="許容するPrecision/Recallの低下")
+    parser.add_argument("--threads", type=int, default=None, help="推論時間の計測に使うスレッド数")
+    parser.add_argument("--report", default=None,
+                        help="レポートの保存先(既定: 重みのフォルダの親の quantization_report.txt)")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.weights):
+        print(f"重みファイルが見つかりません: {args.weights}")
+        sys.exit(1)
+    onnx_path = weights_path_for(args.weights, "onnx")
+    int8_path = weights_path_for(args.weights, "onnx-int8")
+
+    if not args.skip_quantize:
+        if not os.path.exists(onnx_path):
+            try:
+                from ml.export_onnx import export
+            except ImportError:
+                from export_onnx import export
+            onnx_path = export(args.weights, args.imgsz)
+        train_images = read_image_paths(args.data, "train")
+        calibration_paths = random.Random(0).sample(train_images, min(args.calib_images, len(train_images)))
+        quantize(onnx_path, int8_path, calibration_paths, args.imgsz,
+                 per_channel=not args.per_tensor, quantize_head=args.quantize_head)
+
+    set_num_threads(args.threads)
+    model_paths = [path for path in (args.weights, onnx_path, int8_path) if os.path.exists(path)]
+    image = np.random.default_rng(0).integers(0, 255, size=(1080, 1920, 3), dtype=np.uint8)
+    sizes = {os.path.basename(path): os.path.getsize(path) for path in model_paths}
+    latencies = {}
+    for path in model_paths:
+        print(f"推論時間を計測しています: {path}")
+        latencies[os.path.basename(path)] = measure_latency(path, image)
+
+    reference, candidate = {}, {}
+    if not args.no_eval:
+        print(f"データセットでモデルを評価中: {args.data}")
+        reference = per_class_metrics(args.weights, args.data, args.imgsz)
+        candidate = per_class_metrics(int8_path, args.data, args.imgsz)
+
+    report, dropped = format_report(sizes, latencies, reference, candidate, args.max_drop)
+    report_path = args.report or os.path.join(os.path.dirname(os.path.dirname(args.weights)),
+                                              "quantization_report.txt")
+    with open(report_path, "w", encoding="utf-8") as f:
+        f.write(report)
+    print(report)
+    print(f"レポートを保存しました: {report_path}")
+    if dropped:
+        print(f"-> PrecisionかRecallが {args.max_drop:.2f} より下がったクラスがあります: {', '.join(dropped)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
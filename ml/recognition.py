@@ -3,21 +3,33 @@ YOLOモデルを用いて指定された単一の画像から麻雀牌を検出
 検出結果とセグメンテーションマスクを描画した画像を保存する。
 
 検出結果は牌の文字列と信頼度のタプルのリストとして取得できます。
+アプリケーションからの推論は推論バックエンド(ml/inference_backends.py)を通して行い、
+ONNXの重み(.onnx)を使う場合はtorchとultralyticsを読み込まない。
 """
+from __future__ import annotations
 
 import os
+import time
 import uuid
 from pprint import pprint
-from typing import Dict, List, Tuple
+from typing import TYPE_CHECKING, Dict, List, Tuple, Union
 
 import cv2
 import numpy as np
-from ultralytics import YOLO
 from glob import glob
-import io
-from PIL import Image
 import pillow_heif
 
+try:
+    from ml.inference_backends import InferenceBackend, Prediction, create_backend, decode_image
+    from ml.model_registry import ModelRegistry
+except ImportError:
+    # `python ml/recognition.py` のようにスクリプトとして直接実行された場合
+    from inference_backends import InferenceBackend, Prediction, create_backend, decode_image
+    from model_registry import ModelRegistry
+
+if TYPE_CHECKING:
+    from ultralytics import YOLO
+
 # --- 定数定義 ---
 MODEL_PATH: str = "./runs/detect/mahjong_train_v3/weights/best.pt"
 CONFIDENCE_THRESHOLD: float = 0.0
@@ -38,6 +50,9 @@ TILE_NAME_MAP = {
     "6z": "6z", "7z": "7z",
 }
 
+# 読み込み済み推論バックエンドのプロセス内キャッシュ
+MODEL_REGISTRY = ModelRegistry(create_backend)
+
 
 class Meld:
     """鳴き面子（チー、ポン、カン）を表すクラス。（プレースホルダー）"""
@@ -196,80 +211,191 @@ def process_folder(
 
     return results
 
-def analyze_hand_from_image(image_data: bytes, model_path: str) -> List[str]:
+def load_model(model_path: str) -> InferenceBackend:
     """
-    画像データ（バイト列）とモデルパスを受け取り、麻雀牌を検出してリストで返す。
+    推論バックエンドを取得する。同じ重みファイルはプロセス内で1度だけ読み込まれる。
 
     Args:
-        image_data (bytes): 解析対象の画像のバイトデータ。
-        model_path (str): 使用するYOLOv8モデルのファイルパス。
+        model_path (str): 重みファイルのパス。.onnx ならONNX Runtime、.pt ならultralyticsで推論する。
 
     Returns:
-        List[str]: 検出された牌の文字列リスト (例: ['1m', '2p', ...])。
+        InferenceBackend: 読み込み済みの推論バックエンド。
+    """
+    return MODEL_REGISTRY.get(model_path)
 
-    Raises:
-        ValueError: 画像データが不正で読み込めない場合に発生。
+
+def warm_up_model(
+    model: InferenceBackend, image_sizes: List[Tuple[int, int]]
+) -> List[float]:
     """
-    # 1. モデルを読み込む
+    ダミー画像で推論を実行し、初回推論時のカーネル選択や計算グラフ構築を済ませる。
+
+    Args:
+        model (InferenceBackend): 読み込み済みの推論バックエンド。
+        image_sizes (List[Tuple[int, int]]): ダミー画像の (高さ, 幅) のリスト。
+
+    Returns:
+        List[float]: 各サイズの推論に要した秒数のリスト。
+    """
+    elapsed_seconds: List[float] = []
+    for height, width in image_sizes:
+        dummy_image = np.zeros((height, width, 3), dtype=np.uint8)
+        start = time.perf_counter()
+        model.predict([dummy_image])
+        elapsed_seconds.append(time.perf_counter() - start)
+    return elapsed_seconds
+
+
+def _detections_from_prediction(model: InferenceBackend, prediction: Prediction) -> List[Dict]:
+    """
+    1枚の画像の推論結果を、牌ごとの検出結果のリストに変換する。
+
+    Args:
+        model (InferenceBackend): 推論に使ったバックエンド（クラス名の参照に使う）。
+        prediction (Prediction): 1枚の画像の (ボックス, 信頼度, クラスID)。
+
+    Returns:
+        List[Dict]: detect_hand_from_image と同じ形式の検出結果のリスト。
+    """
+    detections: List[Dict] = []
+    boxes, confidences, class_ids = prediction
+
+    # 検出結果を処理する
+    for box, conf, class_id in zip(boxes, confidences, class_ids):
+        conf = float(conf)  # 信頼度
+
+        # 信頼度が閾値を超えているものだけを採用
+        if conf > CONFIDENCE_THRESHOLD:
+            model_class_name = model.names[int(class_id)]  # モデルが持つクラス名を取得
+
+            # クラス名をアプリケーション用の牌表記に変換
+            hand_tile_str = TILE_NAME_MAP.get(model_class_name)
+            if hand_tile_str:
+                detections.append({
+                    "tile": hand_tile_str,
+                    "confidence": round(conf, 4),
+                    "box": [round(float(v), 1) for v in box],
+                })
+            else:
+                # TILE_NAME_MAPに定義されていないクラスが検出された場合
+                print(f"警告: 不明なクラス名が検出されました: {model_class_name}")
+
+    return detections
+
+
+def detect_hands_from_images(images_data: List[bytes], model_path: str) -> List[Union[List[Dict], Exception]]:
+    """
+    複数の画像データをまとめて1回のバッチ推論にかけ、画像ごとの検出結果を返す。
+    同時に届いたリクエストの画像をまとめて推論するために使う（backend/app/services/recognition_service.py）。
+
+    Args:
+        images_data (List[bytes]): 解析対象の画像のバイトデータのリスト。
+        model_path (str): 使用する重みファイルのパス。
+
+    Returns:
+        List[Union[List[Dict], Exception]]: 入力と同じ順の、画像ごとの検出結果のリスト
+            （detect_hand_from_image と同じ形式）。読み込めない画像は ValueError のオブジェクト。
+    """
+    # 1. モデルを取得する(読み込み済みならキャッシュを使う)
     try:
-        model = YOLO(model_path)
+        model = load_model(model_path)
     except Exception as e:
         print(f"モデルの読み込み中にエラーが発生しました: {model_path}")
         raise e
 
-    # 2. 画像データをOpenCVが扱える形式に変換する
-    try:
-        image = Image.open(io.BytesIO(image_data)).convert("RGB")
-    except Exception as e:
-        raise ValueError("画像データが不正で読み込めません。HEIC, JPEG, PNG形式か確認してください。") from e
+    # 2. 画像データをモデルが扱える形式に変換する。読み込めない画像はその画像だけエラーにする
+    outputs: List[Union[List[Dict], Exception]] = [None] * len(images_data)
+    images = []
+    for i, image_data in enumerate(images_data):
+        try:
+            images.append((i, decode_image(image_data)))
+        except ValueError as e:
+            outputs[i] = e
 
-    # 3. モデルで推論を実行する
-    # verbose=Falseでコンソールへの詳細なログ出力を抑制
-    results = model(image, verbose=False)
+    # 3. モデルで推論を実行する(複数の画像は1回のバッチ推論になる)
+    if images:
+        detections = _detect_decoded(model, [image for _, image in images])
+        for (i, _), result in zip(images, detections):
+            outputs[i] = result
+    return outputs
+
+
+def _detect_decoded(model: InferenceBackend, images: List[np.ndarray]) -> List[List[Dict]]:
+    """
+    デコード済みの画像をまとめて1回のバッチ推論にかけ、画像ごとの検出結果を返す。
+
+    Args:
+        model (InferenceBackend): 読み込み済みの推論バックエンド。
+        images (List[np.ndarray]): BGR順の (高さ, 幅, 3) のuint8配列のリスト。
+
+    Returns:
+        List[List[Dict]]: 入力と同じ順の、画像ごとの検出結果のリスト。
+    """
+    return [_detections_from_prediction(model, prediction) for prediction in model.predict(images)]
+
+
+def detect_hands_from_arrays(images: List[np.ndarray], model_path: str) -> List[List[Dict]]:
+    """
+    デコード済みの画像(配列)をまとめて1回のバッチ推論にかけ、画像ごとの検出結果を返す。
+    推論サーバー(ml/inference_server.py)が、共有メモリ上の画像をコピーせずに推論するために使う。
+
+    Args:
+        images (List[np.ndarray]): BGR順の (高さ, 幅, 3) のuint8配列のリスト。
+        model_path (str): 使用する重みファイルのパス。
 
-    detected_tiles: List[str] = []
-    
-    # # 4. デバッグ用に結果画像
-    # # YOLOの結果からバウンディングボックス付きの画像(NumPy配列)を取得
-    # annotated_frame = results[0].plot()
-
-    # # 保存先ディレクトリをプロジェクトルート直下に設定
-    # project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
-    # output_dir = os.path.join(project_root, 'recognition_outputs')
-    # os.makedirs(output_dir, exist_ok=True)
-
-    # # ユニークなファイル名を生成して保存
-    # unique_filename = f"{uuid.uuid4().hex}.jpg"
-    # save_path = os.path.join(output_dir, unique_filename)
-    # cv2.imwrite(save_path, annotated_frame)
-    # print(f"デバッグ用の認識結果画像を保存しました: {save_path}")
-
-    # 4. 検出結果を処理する
-    # results[0]に最初の画像の結果が含まれている
-    if results[0].boxes:
-        for box in results[0].boxes:
-            conf = float(box.conf[0])  # 信頼度
-
-            # 信頼度が閾値を超えているものだけを採用
-            if conf > CONFIDENCE_THRESHOLD:
-                class_id = int(box.cls[0])  # クラスID
-                model_class_name = model.names[class_id]  # モデルが持つクラス名を取得
-
-                # クラス名をアプリケーション用の牌表記に変換
-                hand_tile_str = TILE_NAME_MAP.get(model_class_name)
-                if hand_tile_str:
-                    detected_tiles.append(hand_tile_str)
-                else:
-                    # TILE_NAME_MAPに定義されていないクラスが検出された場合
-                    print(f"警告: 不明なクラス名が検出されました: {model_class_name}")
-
-    return detected_tiles
+    Returns:
+        List[List[Dict]]: 入力と同じ順の、画像ごとの検出結果のリスト
+            （detect_hand_from_image と同じ形式）。
+    """
+    return _detect_decoded(load_model(model_path), images)
+
+
+def detect_hand_from_image(image_data: bytes, model_path: str) -> List[Dict]:
+    """
+    画像データ（バイト列）とモデルパスを受け取り、麻雀牌を検出して、牌ごとの
+    検出結果（牌・信頼度・バウンディングボックス）をリストで返す。
+
+    Args:
+        image_data (bytes): 解析対象の画像のバイトデータ。
+        model_path (str): 使用する重みファイル(.pt または .onnx)のパス。
+
+    Returns:
+        List[Dict]: 検出結果のリスト。各要素は
+            {"tile": 牌の文字列, "confidence": 信頼度, "box": [x1, y1, x2, y2]}
+            （ボックスは元画像のピクセル座標）。
+
+    Raises:
+        ValueError: 画像データが不正で読み込めない場合に発生。
+    """
+    detections = detect_hands_from_images([image_data], model_path)[0]
+    if isinstance(detections, Exception):
+        raise detections
+    return detections
+
+
+def analyze_hand_from_image(image_data: bytes, model_path: str) -> List[str]:
+    """
+    画像データ（バイト列）とモデルパスを受け取り、麻雀牌を検出してリストで返す。
+
+    Args:
+        image_data (bytes): 解析対象の画像のバイトデータ。
+        model_path (str): 使用する重みファイル(.pt または .onnx)のパス。
+
+    Returns:
+        List[str]: 検出された牌の文字列リスト (例: ['1m', '2p', ...])。
+
+    Raises:
+        ValueError: 画像データが不正で読み込めない場合に発生。
+    """
+    return [d["tile"] for d in detect_hand_from_image(image_data, model_path)]
 
 if __name__ == "__main__":
     mode=MODE
     if not os.path.exists(OUTPUT_FOLDER):
         os.makedirs(OUTPUT_FOLDER)
 
+    from ultralytics import YOLO
+
     print("YOLOモデルを読み込んでいます...")
     yolo_model = YOLO(MODEL_PATH)
     print("モデルの読み込み完了。")